@@ -0,0 +1,210 @@
+"""
+Server-side aggregation of FortiOS records
+"""
+
+import heapq
+from collections import Counter
+from typing import (
+    Any,
+    Dict,
+    Generic,
+    Hashable,
+    Iterable,
+    List,
+    Optional,
+    Tuple,
+    TypeVar,
+)
+
+from .encoding import cell_text
+
+# Number of groups returned by summarize() when the caller sets no limit
+DEFAULT_TOP_N = 25
+# Groups tracked by a SpaceSaving sketch per group returned
+SKETCH_CAPACITY_FACTOR = 40
+MIN_SKETCH_CAPACITY = 1000
+
+# Group key type of a SpaceSaving sketch
+K = TypeVar("K", bound=Hashable)
+
+
+def summarize(
+    records: Iterable[Dict[str, Any]],
+    group_by: Optional[List[str]] = None,
+    top_n: int = DEFAULT_TOP_N,
+) -> Dict[str, Any]:
+    """
+    Count records, optionally grouped by field values, in one pass.
+
+    Reference lists (e.g. srcintf) group by their member names, so
+    group_by=["srcintf", "dstintf"] counts policies per interface pair.
+
+    Returns:
+        {"count": total} plus, when grouping, the top_n largest groups
+        (largest first), the number of distinct groups and how many
+        records fell in groups that were left out
+    """
+    total = 0
+    counts: Counter = Counter()
+    for record in records:
+        total += 1
+        if group_by:
+            counts[tuple(cell_text(record.get(field)) for field in group_by)] += 1
+
+    summary: Dict[str, Any] = {"count": total}
+    if group_by:
+        top = counts.most_common(top_n if top_n > 0 else DEFAULT_TOP_N)
+        summary.update(
+            {
+                "group_by": group_by,
+                "groups": [
+                    {"group": dict(zip(group_by, key)), "count": count}
+                    for key, count in top
+                ],
+                "distinct_groups": len(counts),
+                "other_count": total - sum(count for _, count in top),
+            }
+        )
+    return summary
+
+
+class SpaceSaving(Generic[K]):
+    """
+    Approximate heaviest groups of a stream in bounded memory.
+
+    The SpaceSaving algorithm (Metwally et al.) keeps at most capacity
+    counters. A new group arriving when all are in use takes over the
+    smallest counter, inheriting its count as the possible overestimate
+    (error) of the new group. Any group whose true total exceeds
+    total / capacity is guaranteed to be tracked, and while no more than
+    capacity distinct groups have been seen every count is exact.
+    """
+
+    def __init__(self, capacity: int):
+        self.capacity = max(capacity, 1)
+        self.total = 0
+        self.evictions = 0
+        self._counts: Dict[K, int] = {}
+        self._errors: Dict[K, int] = {}
+        # One (count, key) entry per tracked key; a count may be stale (too
+        # low), which is fixed up lazily when the entry reaches the top
+        self._heap: List[Tuple[int, K]] = []
+
+    @property
+    def exact(self) -> bool:
+        """Whether every count so far is exact (nothing was evicted)"""
+        return self.evictions == 0
+
+    def add(self, key: K, weight: int = 1) -> None:
+        """Count weight for a group"""
+        self.total += weight
+        counts = self._counts
+        if key in counts:
+            counts[key] += weight
+            return
+        if len(counts) < self.capacity:
+            counts[key] = weight
+            self._errors[key] = 0
+            heapq.heappush(self._heap, (weight, key))
+            return
+
+        heap = self._heap
+        while heap[0][0] != counts[heap[0][1]]:
+            heapq.heapreplace(heap, (counts[heap[0][1]], heap[0][1]))
+        smallest, victim = heapq.heappop(heap)
+        del counts[victim], self._errors[victim]
+        self.evictions += 1
+        counts[key] = smallest + weight
+        self._errors[key] = smallest
+        heapq.heappush(heap, (smallest + weight, key))
+
+    def top(self, n: int) -> List[Tuple[K, int, int]]:
+        """The n largest groups as (key, count, error), largest first"""
+        largest = heapq.nlargest(n, self._counts.items(), key=lambda item: item[1])
+        return [(key, count, self._errors[key]) for key, count in largest]
+
+
+def _weight(record: Dict[str, Any], sum_fields: Optional[List[str]]) -> int:
+    if not sum_fields:
+        return 1
+    weight = 0
+    for field in sum_fields:
+        value = record.get(field)
+        if isinstance(value, (int, float)) and not isinstance(value, bool):
+            weight += int(value)
+    return weight
+
+
+class GroupAggregator:
+    """
+    Heaviest groups of an unbounded record stream, fed one record at a time.
+
+    Like summarize(), but memory is bounded by a SpaceSaving sketch rather
+    than growing with the number of distinct groups, so it suits log and
+    session streams of millions of entries. Groups are weighted by 1 per
+    record, or by the sum of the numeric sum_fields (e.g. sentbyte and
+    rcvdbyte).
+    """
+
+    def __init__(
+        self,
+        group_by: List[str],
+        top_n: int = DEFAULT_TOP_N,
+        sum_fields: Optional[List[str]] = None,
+        capacity: int = 0,
+    ):
+        self.group_by = group_by
+        self.top_n = top_n if top_n > 0 else DEFAULT_TOP_N
+        self.sum_fields = sum_fields
+        self.count = 0
+        self._sketch: SpaceSaving[Tuple[str, ...]] = SpaceSaving(
+            capacity or max(self.top_n * SKETCH_CAPACITY_FACTOR, MIN_SKETCH_CAPACITY)
+        )
+
+    def add(self, record: Dict[str, Any]) -> None:
+        """Count one record"""
+        self.count += 1
+        key = tuple(cell_text(record.get(field)) for field in self.group_by)
+        self._sketch.add(key, _weight(record, self.sum_fields))
+
+    def result(self) -> Dict[str, Any]:
+        """
+        The aggregate so far.
+
+        Returns:
+            {"count": records seen, "total": summed weight, "groups": top_n
+            groups with their "value" (and "error", the largest possible
+            overestimate, when the sketch had to evict), "exact": whether
+            all values are exact}
+        """
+        groups = []
+        for key, value, error in self._sketch.top(self.top_n):
+            group: Dict[str, Any] = {
+                "group": dict(zip(self.group_by, key)),
+                "value": value,
+            }
+            if error:
+                group["error"] = error
+            groups.append(group)
+        return {
+            "count": self.count,
+            "total": self._sketch.total,
+            "group_by": self.group_by,
+            "metric": "+".join(self.sum_fields) if self.sum_fields else "count",
+            "groups": groups,
+            "exact": self._sketch.exact,
+        }
+
+
+def aggregate_stream(
+    records: Iterable[Dict[str, Any]],
+    group_by: List[str],
+    top_n: int = DEFAULT_TOP_N,
+    sum_fields: Optional[List[str]] = None,
+    capacity: int = 0,
+) -> Dict[str, Any]:
+    """Heaviest groups of a record stream in one pass (see GroupAggregator)"""
+    aggregator = GroupAggregator(group_by, top_n, sum_fields, capacity)
+    for record in records:
+        aggregator.add(record)
+    return aggregator.result()
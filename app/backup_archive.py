@@ -0,0 +1,344 @@
+"""
+Content-addressed archive of FortiGate config backups
+"""
+
+import hashlib
+import json
+import logging
+import os
+import sqlite3
+import tempfile
+import threading
+import time
+import zlib
+from datetime import datetime, timezone
+from pathlib import Path
+from typing import Any, Dict, Iterable, Iterator, List, NamedTuple, Optional
+
+from .storage import data_dir
+
+logger = logging.getLogger(__name__)
+
+BACKUP_DIR = "backups"
+BACKUP_INDEX = "index.sqlite3"
+# Chunk boundaries fall after a line whose CRC32 has these bits clear, so
+# chunks average about (BOUNDARY_MASK + 1) lines of config (~8-16 KiB)
+BOUNDARY_MASK = 0xFF
+MIN_CHUNK_SIZE = 2 * 1024
+MAX_CHUNK_SIZE = 64 * 1024
+
+_SCHEMA = """
+CREATE TABLE IF NOT EXISTS backups (
+    id INTEGER PRIMARY KEY AUTOINCREMENT,
+    owner TEXT NOT NULL DEFAULT '',
+    device TEXT NOT NULL,
+    taken_at REAL NOT NULL,
+    day TEXT NOT NULL,
+    size INTEGER NOT NULL,
+    sha256 TEXT NOT NULL,
+    chunks TEXT NOT NULL
+);
+"""
+# Created once an index from an older version has gained its owner column
+_INDEXES = """
+CREATE INDEX IF NOT EXISTS backups_owner ON backups (owner, device, taken_at);
+CREATE INDEX IF NOT EXISTS backups_owner_day ON backups (owner, day, device);
+"""
+
+
+def iter_chunks(body: Iterable[bytes]) -> Iterator[bytes]:
+    """
+    Split a byte stream into content-defined chunks.
+
+    Cuts are made after lines whose hash matches BOUNDARY_MASK (and no
+    earlier than MIN_CHUNK_SIZE), so an edit only changes the chunk it falls
+    in: the boundaries around it, and every other chunk of the backup, stay
+    where they were. Lines longer than MAX_CHUNK_SIZE are cut anyway, which
+    bounds the memory held to about one chunk.
+    """
+    pending = bytearray()
+    line_start = 0
+    for data in body:
+        start = 0
+        while start < len(data):
+            newline = data.find(b"\n", start)
+            end = len(data) if newline < 0 else newline + 1
+            pending += data[start:end]
+            start = end
+            if newline >= 0:
+                line = memoryview(pending)[line_start:]
+                boundary = len(pending) >= MIN_CHUNK_SIZE and not (
+                    zlib.crc32(line) & BOUNDARY_MASK
+                )
+                line.release()
+                line_start = len(pending)
+                if boundary or len(pending) >= MAX_CHUNK_SIZE:
+                    yield bytes(pending)
+                    pending.clear()
+                    line_start = 0
+            while len(pending) >= MAX_CHUNK_SIZE:
+                yield bytes(pending[:MAX_CHUNK_SIZE])
+                del pending[:MAX_CHUNK_SIZE]
+                line_start = 0
+    if pending:
+        yield bytes(pending)
+
+
+class StoredContent(NamedTuple):
+    """Chunks written for one backup body, before it is recorded"""
+
+    chunks: List[List[Any]]  # [[sha256, size], ...] in order
+    size: int
+    sha256: str
+    new_chunks: int
+    stored_bytes: int  # compressed bytes of the new chunks
+
+
+def _day(timestamp: float) -> str:
+    return datetime.fromtimestamp(timestamp, timezone.utc).strftime("%Y-%m-%d")
+
+
+def _describe(row: sqlite3.Row) -> Dict[str, Any]:
+    return {
+        "backup_id": row["id"],
+        "device": row["device"],
+        "taken_at": datetime.fromtimestamp(row["taken_at"], timezone.utc).isoformat(
+            timespec="seconds"
+        ),
+        "date": row["day"],
+        "size": row["size"],
+        "sha256": row["sha256"],
+    }
+
+
+class BackupArchive:
+    """
+    Config backups stored as compressed, content-addressed chunks.
+
+    Each chunk is kept once under chunks/<ab>/<sha256>, however many
+    backups (of however many devices) contain it, so repeated backups of
+    an unchanged config cost little more than an index row. The index is a
+    SQLite database of backups by owner, device and UTC date; a backup is
+    only indexed once all its chunks are on disk.
+
+    Every read takes the owner (see result_buffer.owner_key) the backup was
+    recorded for: backups of other owners are reported as not found, even
+    under the same device name. Rows indexed before owners were recorded
+    have an empty owner and are not returned to anyone.
+    """
+
+    def __init__(self, root: Optional[Path] = None):
+        self._root = root
+        self._lock = threading.Lock()
+        self._conn: Optional[sqlite3.Connection] = None
+
+    @property
+    def root(self) -> Path:
+        return self._root or data_dir() / BACKUP_DIR
+
+    def _chunk_path(self, digest: str) -> Path:
+        return self.root / "chunks" / digest[:2] / digest
+
+    def _connect(self) -> sqlite3.Connection:
+        if self._conn is None:
+            self.root.mkdir(parents=True, exist_ok=True)
+            conn = sqlite3.connect(
+                str(self.root / BACKUP_INDEX), check_same_thread=False
+            )
+            conn.row_factory = sqlite3.Row
+            conn.execute("PRAGMA journal_mode=WAL")
+            conn.executescript(_SCHEMA)
+            columns = {
+                row["name"] for row in conn.execute("PRAGMA table_info(backups)")
+            }
+            if "owner" not in columns:
+                conn.execute(
+                    "ALTER TABLE backups ADD COLUMN owner TEXT NOT NULL DEFAULT ''"
+                )
+            conn.executescript(_INDEXES)
+            self._conn = conn
+            logger.info(f"Config backup archive: {self.root}")
+        return self._conn
+
+    def _write_chunk(self, digest: str, chunk: bytes) -> int:
+        """Store a chunk unless present; returns the compressed bytes written"""
+        path = self._chunk_path(digest)
+        if path.exists():
+            return 0
+        path.parent.mkdir(parents=True, exist_ok=True)
+        data = zlib.compress(chunk)
+        fd, tmp = tempfile.mkstemp(dir=path.parent, prefix=".tmp-")
+        try:
+            with os.fdopen(fd, "wb") as f:
+                f.write(data)
+            os.replace(tmp, path)
+        except BaseException:
+            os.unlink(tmp)
+            raise
+        return len(data)
+
+    def write(self, body: Iterable[bytes]) -> StoredContent:
+        """
+        Store the chunks of a backup body as it streams in.
+
+        Raises:
+            OSError: If a chunk cannot be written
+        """
+        chunks: List[List[Any]] = []
+        digest = hashlib.sha256()
+        size = new_chunks = stored_bytes = 0
+        for chunk in iter_chunks(body):
+            chunk_digest = hashlib.sha256(chunk).hexdigest()
+            written = self._write_chunk(chunk_digest, chunk)
+            if written:
+                new_chunks += 1
+                stored_bytes += written
+            chunks.append([chunk_digest, len(chunk)])
+            digest.update(chunk)
+            size += len(chunk)
+        return StoredContent(chunks, size, digest.hexdigest(), new_chunks, stored_bytes)
+
+    def record(
+        self,
+        owner: str,
+        device: str,
+        content: StoredContent,
+        taken_at: Optional[float] = None,
+    ) -> Dict[str, Any]:
+        """
+        Index a written backup of a device for an owner.
+
+        Raises:
+            sqlite3.Error: If the index cannot be written
+        """
+        taken_at = time.time() if taken_at is None else taken_at
+        with self._lock:
+            conn = self._connect()
+            cursor = conn.execute(
+                "INSERT INTO backups "
+                "(owner, device, taken_at, day, size, sha256, chunks) "
+                "VALUES (?, ?, ?, ?, ?, ?, ?)",
+                (
+                    owner,
+                    device,
+                    taken_at,
+                    _day(taken_at),
+                    content.size,
+                    content.sha256,
+                    json.dumps(content.chunks, separators=(",", ":")),
+                ),
+            )
+            conn.commit()
+            row = conn.execute(
+                "SELECT * FROM backups WHERE id = ?", (cursor.lastrowid,)
+            ).fetchone()
+        return _describe(row)
+
+    def list(
+        self,
+        owner: str,
+        device: Optional[str] = None,
+        date: Optional[str] = None,
+        limit: int = 100,
+    ) -> List[Dict[str, Any]]:
+        """An owner's backups of a device and/or UTC date (YYYY-MM-DD), newest first"""
+        where, args = ["owner = ?"], [owner]
+        if device:
+            where.append("device = ?")
+            args.append(device)
+        if date:
+            where.append("day = ?")
+            args.append(date)
+        query = "SELECT * FROM backups WHERE " + " AND ".join(where)
+        query += " ORDER BY taken_at DESC, id DESC LIMIT ?"
+        with self._lock:
+            rows = self._connect().execute(query, (*args, limit)).fetchall()
+        return [_describe(row) for row in rows]
+
+    def find(
+        self, owner: str, device: str, date: Optional[str] = None
+    ) -> Optional[Dict[str, Any]]:
+        """An owner's latest backup of a device, on or before a UTC date if given"""
+        query = "SELECT * FROM backups WHERE owner = ? AND device = ?"
+        args: List[Any] = [owner, device]
+        if date:
+            query += " AND day <= ?"
+            args.append(date)
+        query += " ORDER BY taken_at DESC, id DESC LIMIT 1"
+        with self._lock:
+            row = self._connect().execute(query, args).fetchone()
+        return None if row is None else _describe(row)
+
+    def get(self, owner: str, backup_id: int) -> Optional[Dict[str, Any]]:
+        """An owner's backup by id"""
+        with self._lock:
+            row = (
+                self._connect()
+                .execute(
+                    "SELECT * FROM backups WHERE id = ? AND owner = ?",
+                    (backup_id, owner),
+                )
+                .fetchone()
+            )
+        return None if row is None else _describe(row)
+
+    def _chunk_list(self, owner: str, backup_id: int) -> List[List[Any]]:
+        with self._lock:
+            row = (
+                self._connect()
+                .execute(
+                    "SELECT chunks FROM backups WHERE id = ? AND owner = ?",
+                    (backup_id, owner),
+                )
+                .fetchone()
+            )
+        if row is None:
+            raise KeyError(backup_id)
+        return json.loads(row["chunks"])
+
+    def iter_content(self, owner: str, backup_id: int) -> Iterator[bytes]:
+        """
+        Stream the bytes of an owner's backup chunk by chunk.
+
+        Raises:
+            KeyError: If the owner has no such backup
+            OSError: If one of its chunks is missing
+        """
+        for digest, _ in self._chunk_list(owner, backup_id):
+            yield zlib.decompress(self._chunk_path(digest).read_bytes())
+
+    def read(
+        self, owner: str, backup_id: int, offset: int = 0, length: int = -1
+    ) -> bytes:
+        """
+        Bytes of an owner's backup, decompressing only the chunks in the range.
+
+        Raises:
+            KeyError: If the owner has no such backup
+            OSError: If one of its chunks is missing
+        """
+        stop = None if length < 0 else offset + length
+        parts = []
+        position = 0
+        for digest, size in self._chunk_list(owner, backup_id):
+            chunk_start, position = position, position + size
+            if position <= offset:
+                continue
+            if stop is not None and chunk_start >= stop:
+                break
+            data = zlib.decompress(self._chunk_path(digest).read_bytes())
+            begin = max(offset - chunk_start, 0)
+            end = size if stop is None else min(stop - chunk_start, size)
+            parts.append(data[begin:end])
+        return b"".join(parts)
+
+    def close(self) -> None:
+        """Close the index; the next use reopens it"""
+        with self._lock:
+            if self._conn is not None:
+                self._conn.close()
+            self._conn = None
+
+
+# Archive used by the backup tools
+BACKUPS = BackupArchive()
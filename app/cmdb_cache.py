@@ -0,0 +1,127 @@
+"""
+Cache of CMDB tables validated by the FortiGate configuration revision
+"""
+
+import threading
+import time
+from collections import OrderedDict
+from typing import Any, Dict, List, NamedTuple, Optional, Tuple
+
+from .storage import SNAPSHOTS, SnapshotStore
+
+# Maximum number of cached tables; the least recently used go first
+DEFAULT_MAX_CACHED_TABLES = 128
+# Tables of registered devices: name -> CMDB endpoint
+TABLES = {
+    "addresses": "cmdb/firewall/address",
+    "address-groups": "cmdb/firewall/addrgrp",
+    "vips": "cmdb/firewall/vip",
+    "vip-groups": "cmdb/firewall/vipgrp",
+    "policies": "cmdb/firewall/policy",
+    "services": "cmdb/firewall.service/custom",
+    "service-groups": "cmdb/firewall.service/group",
+    "external-resources": "cmdb/system/external-resource",
+}
+
+# (owner_key of the caller, endpoint)
+TableKey = Tuple[str, str]
+
+
+class CachedTable(NamedTuple):
+    """A table read together with the configuration revision it was read at"""
+
+    revision: str
+    records: List[Any]
+    meta: Dict[str, Any]
+    fetched_at: float
+
+
+class TableCache:
+    """
+    Thread-safe LRU cache of whole CMDB tables.
+
+    Entries are keyed by caller and endpoint, so callers whose API tokens
+    may see different objects never share cached records. An entry is only
+    trusted while the FortiGate still reports the revision it was read at.
+
+    With a snapshot store, every table is also written through to disk and
+    tables missing from memory are loaded from it lazily, so a restarted
+    server starts from its last snapshots instead of cold.
+    """
+
+    def __init__(
+        self,
+        max_tables: int = DEFAULT_MAX_CACHED_TABLES,
+        store: Optional[SnapshotStore] = None,
+    ):
+        self.max_tables = max_tables
+        self.store = store
+        self._lock = threading.Lock()
+        self._tables: "OrderedDict[TableKey, CachedTable]" = OrderedDict()
+
+    def _remember(self, key: TableKey, table: CachedTable) -> None:
+        with self._lock:
+            self._tables[key] = table
+            self._tables.move_to_end(key)
+            while len(self._tables) > self.max_tables:
+                self._tables.popitem(last=False)
+
+    def get(self, key: TableKey) -> Optional[CachedTable]:
+        """Cached table for key, whatever its revision (None if not cached)"""
+        with self._lock:
+            table = self._tables.get(key)
+            if table is not None:
+                self._tables.move_to_end(key)
+                return table
+        if self.store is None:
+            return None
+        snapshot = self.store.load(key)
+        if snapshot is None:
+            return None
+        table = CachedTable(*snapshot)
+        self._remember(key, table)
+        return table
+
+    def put(
+        self,
+        key: TableKey,
+        revision: str,
+        records: List[Any],
+        meta: Dict[str, Any],
+    ) -> None:
+        """Store a table read at revision"""
+        table = CachedTable(revision, records, meta, time.time())
+        self._remember(key, table)
+        if self.store is not None:
+            self.store.save(key, *table)
+
+    def revalidate(self, key: TableKey, revision: str) -> bool:
+        """
+        Mark a cached table as current at a newer revision.
+
+        Only for tables known not to have changed between the two revisions.
+        Returns False if the table is not cached.
+        """
+        table = self.get(key)
+        if table is None:
+            return False
+        self._remember(key, table._replace(revision=revision))
+        if self.store is not None:
+            self.store.set_revision(key, revision)
+        return True
+
+    def invalidate(self, key: TableKey) -> None:
+        """Forget one table (e.g. after it was written to)"""
+        with self._lock:
+            self._tables.pop(key, None)
+        if self.store is not None:
+            self.store.delete(key)
+
+    def clear(self) -> None:
+        """Forget all tables held in memory (snapshots on disk are kept)"""
+        with self._lock:
+            self._tables.clear()
+
+
+# Shared table cache, backed by the on-disk snapshot store
+CMDB_CACHE = TableCache(store=SNAPSHOTS)
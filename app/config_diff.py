@@ -0,0 +1,204 @@
+"""
+Structural diff of FortiGate configs and CMDB tables
+"""
+
+import hashlib
+import threading
+from collections import OrderedDict
+from typing import Any, Dict, Iterable, Iterator, List, Optional
+
+from .backup_archive import BackupArchive
+from .encoding import cell_text
+
+# Record fields tried, in order, as the key of a CMDB record
+RECORD_KEY_FIELDS = ("q_origin_key", "name", "policyid", "id", "seq-num")
+# Parsed backups kept for repeated diffs against the same baseline
+MAX_CACHED_TREES = 8
+
+
+class ConfigNode:
+    """
+    One config section or object: its settings and keyed sub-sections.
+
+    Nodes are compared by a Merkle digest over their settings and the
+    digests of their children, so identical subtrees of two configs are
+    recognised with one comparison, however large they are.
+    """
+
+    __slots__ = ("settings", "children", "_digest")
+
+    def __init__(self):
+        self.settings: Dict[str, str] = {}
+        self.children: Dict[str, "ConfigNode"] = {}
+        self._digest: Optional[bytes] = None
+
+    def child(self, key: str) -> "ConfigNode":
+        """Sub-section by key, created if missing (repeated blocks are merged)"""
+        node = self.children.get(key)
+        if node is None:
+            node = self.children[key] = ConfigNode()
+        return node
+
+    @property
+    def digest(self) -> bytes:
+        if self._digest is None:
+            h = hashlib.sha256()
+            for name in sorted(self.settings):
+                h.update(f"s\0{name}\0{self.settings[name]}\0".encode())
+            # Children in order: policy order, for one, is part of the config
+            for key in self.children:
+                h.update(f"c\0{key}\0".encode())
+                h.update(self.children[key].digest)
+            self._digest = h.digest()
+        return self._digest
+
+
+def iter_lines(chunks: Iterable[bytes]) -> Iterator[str]:
+    """Decode a stream of byte chunks into lines"""
+    pending = b""
+    for chunk in chunks:
+        lines = (pending + chunk).split(b"\n")
+        pending = lines.pop()
+        for line in lines:
+            yield line.decode("utf-8", "replace")
+    if pending:
+        yield pending.decode("utf-8", "replace")
+
+
+def _unquote(text: str) -> str:
+    text = text.strip()
+    if len(text) >= 2 and text[0] == text[-1] == '"':
+        return text[1:-1].replace('\\"', '"')
+    return text
+
+
+def _open_quote(text: str) -> bool:
+    """Whether text ends inside a double-quoted string"""
+    quotes = text.count('"') - text.count('\\"')
+    return quotes % 2 == 1
+
+
+def parse_config(lines: Iterable[str]) -> ConfigNode:
+    """
+    Parse FortiOS CLI config (as in a config backup) into a tree.
+
+    "config <path>" blocks become children keyed by path, "edit <name>"
+    entries children keyed by the unquoted name, and "set"/"unset" lines
+    settings. Values quoted over several lines (certificates, scripts) are
+    kept whole.
+    """
+    root = ConfigNode()
+    stack = [root]
+    lines = iter(lines)
+    for line in lines:
+        line = line.strip()
+        if not line or line.startswith("#"):
+            continue
+        command, _, rest = line.partition(" ")
+        if command in ("set", "unset"):
+            name, _, value = rest.partition(" ")
+            while _open_quote(value):
+                more = next(lines, None)
+                if more is None:
+                    break
+                value += "\n" + more
+            stack[-1].settings[name] = value if command == "set" else "<unset>"
+        elif command == "config":
+            stack.append(stack[-1].child(rest.strip()))
+        elif command == "edit":
+            stack.append(stack[-1].child(_unquote(rest)))
+        elif command in ("next", "end") and len(stack) > 1:
+            stack.pop()
+    return root
+
+
+_trees: "OrderedDict[str, ConfigNode]" = OrderedDict()
+_trees_lock = threading.Lock()
+
+
+def backup_tree(
+    archive: BackupArchive, owner: str, backup: Dict[str, Any]
+) -> ConfigNode:
+    """
+    Parsed tree of an archived backup.
+
+    Trees are cached by content hash, so diffing a series of backups
+    against the same baseline (or identical backups of several devices)
+    parses each distinct config once.
+    """
+    with _trees_lock:
+        tree = _trees.get(backup["sha256"])
+        if tree is not None:
+            _trees.move_to_end(backup["sha256"])
+            return tree
+    tree = parse_config(iter_lines(archive.iter_content(owner, backup["backup_id"])))
+    tree.digest  # computed once, outside the lock
+    with _trees_lock:
+        _trees[backup["sha256"]] = tree
+        while len(_trees) > MAX_CACHED_TREES:
+            _trees.popitem(last=False)
+    return tree
+
+
+def clear_tree_cache() -> None:
+    """Drop cached backup trees"""
+    with _trees_lock:
+        _trees.clear()
+
+
+def _record_key(record: Dict[str, Any], index: int) -> str:
+    for field in RECORD_KEY_FIELDS:
+        if record.get(field) not in (None, ""):
+            return str(record[field])
+    return f"#{index}"
+
+
+def table_tree(records: Iterable[Dict[str, Any]]) -> ConfigNode:
+    """Tree of a CMDB table: one child per record, keyed by its mkey"""
+    root = ConfigNode()
+    for index, record in enumerate(records):
+        node = root.child(_record_key(record, index))
+        for field, value in record.items():
+            if field != "q_origin_key":
+                node.settings[field] = cell_text(value)
+    return root
+
+
+def diff_trees(
+    old: ConfigNode, new: ConfigNode, path: Optional[List[str]] = None
+) -> List[Dict[str, Any]]:
+    """
+    Added, removed, modified and reordered objects between two trees.
+
+    Only subtrees whose digests differ are visited, so the cost grows with
+    the size of the change, not the size of the config. Each change is
+    {"path", "change"}; modified objects also list the settings that
+    differ as {name: {"old", "new"}} (None where a setting is absent).
+    """
+    path = path or []
+    if old.digest == new.digest:
+        return []
+
+    location = "/".join(path)
+    changes: List[Dict[str, Any]] = []
+    if old.settings != new.settings:
+        settings = {
+            name: {"old": old.settings.get(name), "new": new.settings.get(name)}
+            for name in {**old.settings, **new.settings}
+            if old.settings.get(name) != new.settings.get(name)
+        }
+        changes.append({"path": location, "change": "modified", "settings": settings})
+
+    common = [key for key in old.children if key in new.children]
+    if common != [key for key in new.children if key in old.children]:
+        # Order matters for some tables (e.g. policies are evaluated in order)
+        changes.append({"path": location, "change": "reordered"})
+    for key in old.children:
+        if key not in new.children:
+            changes.append({"path": "/".join(path + [key]), "change": "removed"})
+    for key in new.children:
+        if key not in old.children:
+            changes.append({"path": "/".join(path + [key]), "change": "added"})
+    for key in common:
+        changes.extend(diff_trees(old.children[key], new.children[key], path + [key]))
+    return changes
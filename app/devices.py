@@ -0,0 +1,107 @@
+"""
+Registry of FortiGates the server watches on behalf of its clients
+"""
+
+import re
+import threading
+import uuid
+import weakref
+from typing import Any, Dict, List, NamedTuple, Optional, Tuple
+
+from .result_buffer import owner_key
+
+# Device names appear in resource URIs (fortios://<name>/<table>)
+DEVICE_NAME_PATTERN = re.compile(r"^[A-Za-z0-9][A-Za-z0-9_.\-]{0,62}$")
+
+
+class Device(NamedTuple):
+    """A registered FortiGate and the credentials used to read it"""
+
+    name: str
+    url: str
+    token: str
+    vdom: str
+    # Session that registered the device (see session_scope)
+    scope: str = ""
+
+    @property
+    def key(self) -> Tuple[str, str]:
+        """Registry key: device names are only unique within a scope"""
+        return self.scope, self.name
+
+    @property
+    def owner(self) -> str:
+        """owner_key() for the device credentials (shares cached tables with tool calls)"""
+        return owner_key(self.url, self.token, self.vdom)
+
+    def describe(self) -> Dict[str, str]:
+        """Device details that are safe to return to clients (no token)"""
+        return {"name": self.name, "url": self.url, "vdom": self.vdom}
+
+
+class DeviceRegistry:
+    """
+    Thread-safe, in-memory registry of FortiGates.
+
+    Devices belong to the scope (MCP session) that registered them and are
+    only visible to it, so one client never uses the credentials another
+    client registered. Registered credentials are only ever held in memory;
+    they are lost when the server restarts and must be registered again.
+    """
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._devices: Dict[Tuple[str, str], Device] = {}
+
+    def register(self, device: Device) -> None:
+        """Add or replace a device"""
+        with self._lock:
+            self._devices[device.key] = device
+
+    def unregister(self, name: str, scope: str = "") -> bool:
+        """Remove a device; False if it is not registered in the scope"""
+        with self._lock:
+            return self._devices.pop((scope, name), None) is not None
+
+    def get(self, name: str, scope: str = "") -> Optional[Device]:
+        """Device registered in a scope by name (None if unknown)"""
+        with self._lock:
+            return self._devices.get((scope, name))
+
+    def all(self, scope: Optional[str] = None) -> List[Device]:
+        """Devices of a scope (of every scope if None), ordered by name"""
+        with self._lock:
+            devices = self._devices.values()
+            return sorted(d for d in devices if scope is None or d.scope == scope)
+
+    def drop_scope(self, scope: str) -> None:
+        """Forget all devices of a scope"""
+        with self._lock:
+            for key in [key for key in self._devices if key[0] == scope]:
+                del self._devices[key]
+
+    def clear(self) -> None:
+        """Forget all devices"""
+        with self._lock:
+            self._devices.clear()
+
+
+# Devices registered through the register_fortigate tool
+DEVICES = DeviceRegistry()
+
+_scopes_lock = threading.Lock()
+_scopes: "weakref.WeakKeyDictionary[Any, str]" = weakref.WeakKeyDictionary()
+
+
+def session_scope(session: Any) -> str:
+    """
+    Registry scope of an MCP session.
+
+    The devices of a scope are dropped when its session goes away.
+    """
+    with _scopes_lock:
+        scope = _scopes.get(session)
+        if scope is None:
+            scope = _scopes[session] = uuid.uuid4().hex
+            weakref.finalize(session, DEVICES.drop_scope, scope)
+        return scope
@@ -0,0 +1,138 @@
+"""
+Serialization of tool results for MCP responses
+"""
+
+import csv
+import io
+import json
+from typing import Any, Dict, List, Optional
+
+
+class RawJSON(bytes):
+    """
+    An upstream JSON document forwarded as-is.
+
+    Tool results may hold RawJSON values at their top level; dumps_result()
+    splices the bytes into the response text instead of decoding and
+    re-encoding them.
+    """
+
+    @classmethod
+    def wrap(cls, body: bytes) -> "RawJSON":
+        """
+        Wrap a response body once it is known to be one UTF-8 JSON object.
+
+        The body is validated by a parse that keeps nothing (every object is
+        dropped as soon as it is read), so no decoded tree is built and the
+        body is never re-encoded.
+
+        Raises:
+            ValueError: If the body is not UTF-8 or not a single JSON object
+        """
+        stripped = body.strip()
+        if not (stripped.startswith(b"{") and stripped.endswith(b"}")):
+            raise ValueError("Body is not a JSON object")
+        json.loads(body.decode("utf-8"), object_pairs_hook=_discard)
+        return cls(body)
+
+
+def _discard(pairs: Any) -> None:
+    return None
+
+
+def encoded_size(value: Any, depth: int = 2) -> int:
+    """
+    Approximate number of bytes value adds to a dumps_result() response.
+
+    Accounts for the indentation of a value nested depth levels deep (list
+    items under "data" are two levels deep) and its trailing separator.
+    """
+    text = json.dumps(value, indent=2)
+    return len(text) + (text.count("\n") + 1) * 2 * depth + 2
+
+
+def dumps_result(result: Dict[str, Any]) -> str:
+    """
+    Serialize a tool result to the JSON text returned to the MCP client.
+
+    Regular values are encoded with json.dumps(indent=2) as before; top-level
+    RawJSON values (validated by RawJSON.wrap) are appended verbatim after it.
+    """
+    raw = {key: value for key, value in result.items() if isinstance(value, RawJSON)}
+    if not raw:
+        return json.dumps(result, indent=2)
+
+    plain = {key: value for key, value in result.items() if key not in raw}
+    text = json.dumps(plain, indent=2)
+    # Drop the closing brace so the raw members can be appended
+    parts = [text[:-2] + "," if plain else "{"]
+    members = [
+        f"\n  {json.dumps(key)}: {value.decode('utf-8')}" for key, value in raw.items()
+    ]
+    parts.append(",".join(members))
+    parts.append("\n}")
+    return "".join(parts)
+
+
+def table_columns(records: List[Any], fields: Optional[List[str]] = None) -> List[str]:
+    """Columns for tabular output: the requested fields, else every key in first-seen order"""
+    if fields:
+        return list(fields)
+    columns: Dict[str, None] = {}
+    for record in records:
+        if isinstance(record, dict):
+            columns.update(dict.fromkeys(record))
+    return list(columns)
+
+
+def cell_text(value: Any) -> str:
+    """
+    Flatten one field value into a table cell.
+
+    Reference lists (e.g. srcaddr) become their member names separated by
+    spaces, quoted where a name contains one, as in the FortiOS CLI.
+    """
+    if value is None:
+        return ""
+    if isinstance(value, list):
+        names = []
+        for item in value:
+            if isinstance(item, dict):
+                item = item.get("name", item.get("q_origin_key", ""))
+            item = str(item)
+            names.append(f'"{item}"' if " " in item else item)
+        return " ".join(names)
+    if isinstance(value, dict):
+        return json.dumps(value, separators=(",", ":"))
+    return str(value)
+
+
+def csv_lines(rows: List[List[Any]]) -> List[str]:
+    """Encode rows of cell values as CSV lines (each ending in a newline)"""
+    out = io.StringIO()
+    writer = csv.writer(out, lineterminator="\n")
+    lines = []
+    for row in rows:
+        writer.writerow(row)
+        lines.append(out.getvalue())
+        out.seek(0)
+        out.truncate()
+    return lines
+
+
+def csv_records(records: List[Any], columns: List[str]) -> List[str]:
+    """Encode records as CSV lines in the order of columns"""
+    return csv_lines(
+        [
+            [
+                cell_text(record.get(c)) if isinstance(record, dict) else ""
+                for c in columns
+            ]
+            for record in records
+        ]
+    )
+
+
+def string_size(text: str) -> int:
+    """Number of bytes text adds to a response when encoded as part of a JSON string"""
+    return len(json.dumps(text)) - 2
@@ -4,10 +4,21 @@ FortiOS API Client for MCP Server
 
 import json
 import logging
+import socket
+import threading
 import time
-from typing import Any, Dict, Optional
+import weakref
+from concurrent.futures import FIRST_COMPLETED, Future, ThreadPoolExecutor
+from concurrent.futures import TimeoutError as FutureTimeoutError
+from concurrent.futures import wait
+from typing import Any, Callable, Dict, Iterator, List, Optional, Union
 
 import requests
+import urllib3
+from requests.adapters import HTTPAdapter
+
+from .latency import ENDPOINT_LATENCY, endpoint_class
+from .streaming import StreamParseError, iter_json_array
 
 logger = logging.getLogger(__name__)
 
@@ -15,41 +26,214 @@ logger = logging.getLogger(__name__)
 DEFAULT_MAX_RETRIES = 3
 DEFAULT_RETRY_BACKOFF = 1.0  # seconds
 
+# Read size for streamed response bodies
+STREAM_CHUNK_SIZE = 64 * 1024
+
+# Adaptive timeouts are clamped to this range (seconds)
+MIN_TIMEOUT = 2.0
+MAX_TIMEOUT = 120.0
+
+# Hedged reads: the backup endpoint is tried once the primary is slower than
+# its p95 latency (or the default below until enough samples exist)
+HEDGE_PERCENTILE = 95
+DEFAULT_HEDGE_DELAY = 1.0  # seconds
+MIN_HEDGE_DELAY = 0.05  # seconds
+
+_hedge_executor = ThreadPoolExecutor(max_workers=16, thread_name_prefix="fortios-hedge")
+
+
+def parse_urls(url: Union[str, List[str]]) -> List[str]:
+    """
+    Split a FortiGate target into its management URLs.
+
+    Args:
+        url: One URL, a comma-separated string of URLs (HA cluster members)
+            or a list of URLs
+
+    Returns:
+        List of URLs without trailing slashes
+    """
+    urls = url.split(",") if isinstance(url, str) else url
+    return [u.strip().rstrip("/") for u in urls if u.strip()]
+
+
+def _response_size(response: requests.Response) -> Optional[int]:
+    """Body size in bytes, if it can be determined without copying"""
+    content_length = response.headers.get("Content-Length")
+    if isinstance(content_length, str) and content_length.isdigit():
+        return int(content_length)
+    content = getattr(response, "_content", None)
+    if isinstance(content, (bytes, bytearray)):
+        return len(content)
+    return None
+
+
+def _close_response(future: "Future[requests.Response]") -> None:
+    """Close the response of a finished request that is no longer needed"""
+    if not future.cancelled() and future.exception() is None:
+        future.result().close()
+
+
+def deadline_after(seconds: Optional[float]) -> Optional[float]:
+    """
+    Convert a time budget into an absolute deadline.
+
+    Args:
+        seconds: Time budget in seconds (None or <= 0 for no deadline)
+
+    Returns:
+        Deadline on the time.monotonic() clock, or None for no deadline
+    """
+    if seconds is None or seconds <= 0:
+        return None
+    return time.monotonic() + seconds
+
+
+class CancelToken:
+    """
+    Cancellation handle shared by the clients working on one tool call.
+
+    Cancelling wakes any retry backoff and shuts down the sockets of
+    in-flight requests so the worker thread is released right away.
+    """
+
+    def __init__(self):
+        self._event = threading.Event()
+        self._lock = threading.Lock()
+        self._callbacks: List[Callable[[], None]] = []
+
+    @property
+    def cancelled(self) -> bool:
+        """Whether cancel() has been called"""
+        return self._event.is_set()
+
+    def cancel(self) -> None:
+        """Cancel the call and run every registered abort callback"""
+        with self._lock:
+            self._event.set()
+            callbacks, self._callbacks = self._callbacks, []
+        for callback in callbacks:
+            try:
+                callback()
+            except Exception as e:
+                logger.debug(f"Cancel callback failed: {e}")
+
+    def add_callback(self, callback: Callable[[], None]) -> None:
+        """Register a callback to run on cancel (runs at once if already cancelled)"""
+        with self._lock:
+            if not self._event.is_set():
+                self._callbacks.append(callback)
+                return
+        callback()
+
+    def wait(self, timeout: float) -> bool:
+        """Sleep up to timeout seconds; returns True if cancelled meanwhile"""
+        return self._event.wait(timeout)
+
+
+class _CancellableAdapter(HTTPAdapter):
+    """HTTP adapter whose open connections can be shut down by a CancelToken"""
+
+    def __init__(self, cancel_token: CancelToken):
+        self._connections: weakref.WeakSet = weakref.WeakSet()
+        super().__init__()
+        cancel_token.add_callback(self._abort_connections)
+
+    def get_connection_with_tls_context(self, request, verify, proxies=None, cert=None):
+        pool = super().get_connection_with_tls_context(
+            request, verify, proxies=proxies, cert=cert
+        )
+        if not getattr(pool, "_cancel_tracked", False):
+            connections = self._connections
+            base_cls = pool.ConnectionCls
+
+            class _TrackedConnection(base_cls):  # type: ignore[valid-type,misc]
+                def connect(self):
+                    super().connect()
+                    connections.add(self)
+
+            pool.ConnectionCls = _TrackedConnection
+            pool._cancel_tracked = True
+        return pool
+
+    def _abort_connections(self) -> None:
+        """Shut down every socket so blocked reads fail immediately"""
+        for conn in list(self._connections):
+            sock = getattr(conn, "sock", None)
+            if sock is None:
+                continue
+            try:
+                # Bypass SSLSocket.shutdown, which tears down TLS state
+                # underneath the thread that is still reading
+                socket.socket.shutdown(sock, socket.SHUT_RDWR)
+            except OSError:
+                pass
+
 
 class FortiOSClient:
     """FortiOS API client for MCP server"""
 
     def __init__(
         self,
-        url: str,
+        url: Union[str, List[str]],
         token: str,
         vdom: str = "root",
         verify_ssl: bool = False,
-        timeout: int = 10,
+        timeout: float = 10,
         max_retries: int = DEFAULT_MAX_RETRIES,
         retry_backoff: float = DEFAULT_RETRY_BACKOFF,
+        deadline: Optional[float] = None,
+        cancel_token: Optional[CancelToken] = None,
+        hedge_reads: bool = True,
+        adaptive_timeout: bool = True,
     ):
         """
         Initialize FortiOS API client
 
         Args:
-            url: FortiGate URL (e.g., https://192.168.1.99)
+            url: FortiGate URL (e.g., https://192.168.1.99). Several
+                management URLs of an HA cluster can be given as a list or a
+                comma-separated string; requests go to the fastest healthy one
+                and fail over to the others
             token: API access token
             vdom: Virtual domain (default: root)
             verify_ssl: Whether to verify SSL certificates
-            timeout: Request timeout in seconds (default: 10)
+            timeout: Request timeout in seconds (default: 10). With
+                adaptive_timeout this only applies until the latency of an
+                endpoint class on this device has been measured
             max_retries: Maximum number of retries for transient failures
             retry_backoff: Base backoff time in seconds between retries
+            deadline: Absolute time.monotonic() deadline shared by every
+                request made through this client (None for no deadline)
+            cancel_token: Token that aborts in-flight requests and retries
+                when the calling tool is cancelled
+            hedge_reads: Whether GETs to a multi-endpoint target are hedged
+                to a second endpoint when the first is slow
+            adaptive_timeout: Whether timeouts follow the observed latency and
+                response size per (device, endpoint class), clamped to
+                [MIN_TIMEOUT, MAX_TIMEOUT]
         """
-        self.url = url.rstrip("/")
+        self.urls = parse_urls(url)
+        if not self.urls:
+            raise ValueError("At least one FortiGate URL is required")
+        self.url = self.urls[0]
         self.token = token
         self.vdom = vdom
         self.verify_ssl = verify_ssl
         self.timeout = timeout
         self.max_retries = max_retries
         self.retry_backoff = retry_backoff
+        self.deadline = deadline
+        self.cancel_token = cancel_token
+        self.hedge_reads = hedge_reads
+        self.adaptive_timeout = adaptive_timeout
         self.session = requests.Session()
 
+        if cancel_token is not None:
+            adapter = _CancellableAdapter(cancel_token)
+            self.session.mount("https://", adapter)
+            self.session.mount("http://", adapter)
+
         # Set headers
         self.session.headers.update(
             {"Authorization": f"Bearer {token}", "Content-Type": "application/json"}
@@ -61,85 +245,334 @@ class FortiOSClient:
 
             urllib3.disable_warnings(urllib3.exceptions.InsecureRequestWarning)
 
-    def _make_request(
-        self, method: str, endpoint: str, data: Optional[Dict] = None
-    ) -> Dict[str, Any]:
+    def _remaining(self) -> Optional[float]:
+        """Seconds left before the deadline (None if there is no deadline)"""
+        if self.deadline is None:
+            return None
+        return self.deadline - time.monotonic()
+
+    def _request_timeout(self, base_url: str, endpoint: str) -> float:
+        """HTTP timeout for endpoint on base_url, before deadline capping"""
+        if not self.adaptive_timeout:
+            return self.timeout
+        return ENDPOINT_LATENCY.timeout(
+            (base_url, endpoint_class(endpoint)),
+            base_url,
+            default=self.timeout,
+            floor=MIN_TIMEOUT,
+            ceiling=MAX_TIMEOUT,
+        )
+
+    def _attempt_timeout(self, base_url: str, endpoint: str) -> float:
+        """HTTP timeout for the next attempt, shrunk to fit the deadline"""
+        timeout = self._request_timeout(base_url, endpoint)
+        remaining = self._remaining()
+        if remaining is None:
+            return timeout
+        return min(timeout, remaining)
+
+    def _deadline_exceeded(self, method: str, endpoint: str) -> Dict[str, Any]:
+        """Build the error result returned when the deadline has passed"""
+        logger.warning(f"Deadline exceeded for {method.upper()} {endpoint}")
+        return {
+            "status": "error",
+            "message": f"Deadline exceeded for {method.upper()} {endpoint}",
+            "http_status": 0,
+            "deadline_exceeded": True,
+        }
+
+    def _cancelled(self) -> bool:
+        """Whether the calling tool has been cancelled"""
+        return self.cancel_token is not None and self.cancel_token.cancelled
+
+    def _cancelled_result(self, method: str, endpoint: str) -> Dict[str, Any]:
+        """Build the error result returned when the call is cancelled"""
+        logger.info(f"Cancelled {method.upper()} {endpoint}")
+        return {
+            "status": "error",
+            "message": f"Request cancelled: {method.upper()} {endpoint}",
+            "http_status": 0,
+            "cancelled": True,
+        }
+
+    def _sleep(self, wait_time: float) -> bool:
+        """Sleep between retries; returns False if cancelled meanwhile"""
+        if self.cancel_token is None:
+            time.sleep(wait_time)
+            return True
+        return not self.cancel_token.wait(wait_time)
+
+    def _backoff(self, attempt: int) -> Optional[float]:
         """
-        Make HTTP request to FortiOS API with retry logic.
+        Compute the wait before the next retry.
+
+        Returns:
+            Wait time in seconds, or None if waiting would pass the deadline
+        """
+        if (attempt + 1) % len(self.urls) != 0:
+            # Fail over to the next endpoint right away; back off only once
+            # every endpoint of the target has failed
+            wait_time = 0.0
+        else:
+            wait_time = self.retry_backoff * (2 ** (attempt // len(self.urls)))
+        remaining = self._remaining()
+        if remaining is not None and wait_time >= remaining:
+            return None
+        return wait_time
+
+    def _send(
+        self,
+        method: str,
+        base_url: str,
+        endpoint: str,
+        params: Dict[str, Any],
+        data: Optional[Dict],
+        timeout: float,
+        stream: bool = False,
+    ) -> requests.Response:
+        """Send one HTTP request to one management URL, recording its latency"""
+        # Use explicit string formatting instead of urljoin to avoid path issues
+        url = f"{base_url}/api/v2/{endpoint}"
+
+        start = time.monotonic()
+        try:
+            if method.upper() == "GET":
+                response = self.session.get(
+                    url,
+                    params=params,
+                    verify=self.verify_ssl,
+                    timeout=timeout,
+                    stream=stream,
+                )
+            elif method.upper() == "POST":
+                response = self.session.post(
+                    url,
+                    params=params,
+                    json=data,
+                    verify=self.verify_ssl,
+                    timeout=timeout,
+                    stream=stream,
+                )
+            elif method.upper() == "PUT":
+                response = self.session.put(
+                    url,
+                    params=params,
+                    json=data,
+                    verify=self.verify_ssl,
+                    timeout=timeout,
+                    stream=stream,
+                )
+            elif method.upper() == "DELETE":
+                response = self.session.delete(
+                    url,
+                    params=params,
+                    verify=self.verify_ssl,
+                    timeout=timeout,
+                    stream=stream,
+                )
+            else:
+                raise ValueError(f"Unsupported HTTP method: {method}")
+        except requests.exceptions.ConnectionError:
+            ENDPOINT_LATENCY.record_failure(base_url)
+            raise
+        except requests.exceptions.Timeout:
+            ENDPOINT_LATENCY.record_failure(base_url)
+            ENDPOINT_LATENCY.record_failure(
+                (base_url, endpoint_class(endpoint)), timed_out=True
+            )
+            raise
+
+        elapsed = time.monotonic() - start
+        size = _response_size(response)
+        ENDPOINT_LATENCY.record(base_url, elapsed, size)
+        ENDPOINT_LATENCY.record((base_url, endpoint_class(endpoint)), elapsed, size)
+        return response
+
+    def _hedge_delay(self, base_url: str, endpoint: str, timeout: float) -> float:
+        """How long to wait on base_url before hedging to another endpoint"""
+        delay = ENDPOINT_LATENCY.percentile(
+            (base_url, endpoint_class(endpoint)), HEDGE_PERCENTILE
+        )
+        if delay is None:
+            delay = ENDPOINT_LATENCY.percentile(base_url, HEDGE_PERCENTILE)
+        if delay is None:
+            delay = DEFAULT_HEDGE_DELAY
+        return min(max(delay, MIN_HEDGE_DELAY), timeout)
+
+    def _hedged_get(
+        self,
+        endpoints: List[str],
+        endpoint: str,
+        params: Dict[str, Any],
+        timeout: float,
+        stream: bool = False,
+    ) -> requests.Response:
+        """
+        GET from the first endpoint, hedging to the second if it is slow.
+
+        The backup request is only sent once the primary has been outstanding
+        for longer than its p95 latency. The first successful response wins;
+        if both fail, the last error is raised for the retry loop to handle.
+        """
+        primary, backup = endpoints[0], endpoints[1]
+        delay = self._hedge_delay(primary, endpoint, timeout)
+
+        first = _hedge_executor.submit(
+            self._send, "GET", primary, endpoint, params, None, timeout, stream
+        )
+        try:
+            return first.result(timeout=delay)
+        except FutureTimeoutError:
+            pass
+
+        logger.info(f"Hedging GET {endpoint} to backup endpoint after {delay:.3f}s")
+        second = _hedge_executor.submit(
+            self._send,
+            "GET",
+            backup,
+            endpoint,
+            params,
+            None,
+            max(timeout - delay, 0),
+            stream,
+        )
+
+        pending = {first, second}
+        error: Optional[BaseException] = None
+        while pending:
+            done, pending = wait(pending, return_when=FIRST_COMPLETED)
+            for future in done:
+                error = future.exception()
+                if error is None:
+                    # The loser may still be streaming a body on a pooled
+                    # connection; close it as soon as it returns
+                    loser = second if future is first else first
+                    loser.add_done_callback(_close_response)
+                    return future.result()
+        assert error is not None
+        raise error
+
+    def _read_body(
+        self, response: requests.Response, method: str, endpoint: str
+    ) -> Optional[Dict[str, Any]]:
+        """
+        Download a streamed body, checking cancel and the deadline between reads.
+
+        Each read returns whatever has arrived (up to STREAM_CHUNK_SIZE), so
+        a slow body is checked every time data trickles in, not per chunk.
+
+        Returns:
+            None once response.content holds the body, or the error result
+            if the call was cancelled or ran past the deadline first
+        """
+        if getattr(response, "_content", False) is not False:
+            return None
+        chunks = []
+        try:
+            while True:
+                if self._cancelled():
+                    response.close()
+                    return self._cancelled_result(method, endpoint)
+                remaining = self._remaining()
+                if remaining is not None and remaining <= 0:
+                    response.close()
+                    return self._deadline_exceeded(method, endpoint)
+                chunk = response.raw.read1(STREAM_CHUNK_SIZE, decode_content=True)
+                if not chunk:
+                    break
+                chunks.append(chunk)
+        except urllib3.exceptions.ReadTimeoutError as e:
+            raise requests.exceptions.ConnectionError(e)
+        except urllib3.exceptions.ProtocolError as e:
+            raise requests.exceptions.ChunkedEncodingError(e)
+        response._content = b"".join(chunks)
+        return None
+
+    def _send_with_retries(
+        self,
+        method: str,
+        endpoint: str,
+        data: Optional[Dict] = None,
+        params: Optional[Dict[str, Any]] = None,
+        stream: bool = False,
+    ) -> Union[requests.Response, Dict[str, Any]]:
+        """
+        Send an HTTP request to the FortiOS API with retry and failover.
 
         Args:
             method: HTTP method (GET, POST, PUT, DELETE)
             endpoint: API endpoint (should not start with /)
             data: Request data for POST/PUT
+            params: Extra query parameters (vdom is always added)
+            stream: Whether to return before the body is downloaded
 
         Returns:
-            API response as dictionary
+            The HTTP response, or an error result dictionary if the request
+            failed, was cancelled or ran past the deadline
         """
-        # Use explicit string formatting instead of urljoin to avoid path issues
-        url = f"{self.url}/api/v2/{endpoint}"
-
         # Add vdom parameter
-        params = {"vdom": self.vdom}
+        params = {**(params or {}), "vdom": self.vdom}
+
+        # Fastest healthy endpoint first; later attempts fail over in order
+        endpoints = ENDPOINT_LATENCY.rank(self.urls)
 
         last_exception: Optional[requests.exceptions.RequestException] = None
         for attempt in range(self.max_retries):
+            if self._cancelled():
+                return self._cancelled_result(method, endpoint)
+
+            shift = attempt % len(endpoints)
+            candidates = endpoints[shift:] + endpoints[:shift]
+
+            timeout = self._attempt_timeout(candidates[0], endpoint)
+            if timeout <= 0:
+                return self._deadline_exceeded(method, endpoint)
+
+            # Under a deadline the body is streamed too, so a body that keeps
+            # trickling in cannot outlive the deadline
+            send_stream = stream or self.deadline is not None
             try:
-                if method.upper() == "GET":
-                    response = self.session.get(
-                        url, params=params, verify=self.verify_ssl, timeout=self.timeout
-                    )
-                elif method.upper() == "POST":
-                    response = self.session.post(
-                        url,
-                        params=params,
-                        json=data,
-                        verify=self.verify_ssl,
-                        timeout=self.timeout,
-                    )
-                elif method.upper() == "PUT":
-                    response = self.session.put(
-                        url,
-                        params=params,
-                        json=data,
-                        verify=self.verify_ssl,
-                        timeout=self.timeout,
-                    )
-                elif method.upper() == "DELETE":
-                    response = self.session.delete(
-                        url, params=params, verify=self.verify_ssl, timeout=self.timeout
+                if method.upper() == "GET" and self.hedge_reads and len(candidates) > 1:
+                    response = self._hedged_get(
+                        candidates, endpoint, params, timeout, send_stream
                     )
                 else:
-                    raise ValueError(f"Unsupported HTTP method: {method}")
+                    response = self._send(
+                        method,
+                        candidates[0],
+                        endpoint,
+                        params,
+                        data,
+                        timeout,
+                        send_stream,
+                    )
+
+                if not stream:
+                    failure = self._read_body(response, method, endpoint)
+                    if failure is not None:
+                        return failure
 
                 # Log request details (endpoint only, not full URL with host)
                 logger.info(
                     f"{method.upper()} {endpoint} - Status: {response.status_code}"
                 )
 
-                # Try to parse JSON response
-                try:
-                    result = response.json()
-                except json.JSONDecodeError:
-                    result = {
-                        "status": "error",
-                        "message": "Invalid JSON response",
-                        "raw_response": response.text[:500],
-                    }
-
-                # Add HTTP status code to result
-                result["http_status"] = response.status_code
-
-                return result
+                return response
 
             except requests.exceptions.ConnectionError as e:
+                if self._cancelled():
+                    return self._cancelled_result(method, endpoint)
                 last_exception = e
                 if attempt < self.max_retries - 1:
-                    wait_time = self.retry_backoff * (2**attempt)
+                    wait_time = self._backoff(attempt)
+                    if wait_time is None:
+                        return self._deadline_exceeded(method, endpoint)
                     logger.warning(
                         f"Connection error on attempt {attempt + 1}/{self.max_retries}, "
                         f"retrying in {wait_time}s: {e}"
                     )
-                    time.sleep(wait_time)
+                    if not self._sleep(wait_time):
+                        return self._cancelled_result(method, endpoint)
                 else:
                     logger.error(
                         f"Connection failed after {self.max_retries} attempts: {e}"
@@ -148,18 +581,23 @@ class FortiOSClient:
             except requests.exceptions.Timeout as e:
                 last_exception = e
                 if attempt < self.max_retries - 1:
-                    wait_time = self.retry_backoff * (2**attempt)
+                    wait_time = self._backoff(attempt)
+                    if wait_time is None:
+                        return self._deadline_exceeded(method, endpoint)
                     logger.warning(
                         f"Timeout on attempt {attempt + 1}/{self.max_retries}, "
                         f"retrying in {wait_time}s: {e}"
                     )
-                    time.sleep(wait_time)
+                    if not self._sleep(wait_time):
+                        return self._cancelled_result(method, endpoint)
                 else:
                     logger.error(
                         f"Request timed out after {self.max_retries} attempts: {e}"
                     )
 
             except requests.exceptions.RequestException as e:
+                if self._cancelled():
+                    return self._cancelled_result(method, endpoint)
                 # Non-retryable request errors
                 logger.error(f"Request failed: {e}")
                 return {
@@ -168,6 +606,11 @@ class FortiOSClient:
                     "http_status": 0,
                 }
 
+        # Last attempt was cut short by the deadline
+        remaining = self._remaining()
+        if remaining is not None and remaining <= 0:
+            return self._deadline_exceeded(method, endpoint)
+
         # All retries exhausted
         return {
             "status": "error",
@@ -175,9 +618,205 @@ class FortiOSClient:
             "http_status": 0,
         }
 
-    def get(self, endpoint: str) -> Dict[str, Any]:
+    def _make_request(
+        self,
+        method: str,
+        endpoint: str,
+        data: Optional[Dict] = None,
+        params: Optional[Dict[str, Any]] = None,
+    ) -> Dict[str, Any]:
+        """
+        Make HTTP request to FortiOS API with retry logic.
+
+        Args:
+            method: HTTP method (GET, POST, PUT, DELETE)
+            endpoint: API endpoint (should not start with /)
+            data: Request data for POST/PUT
+            params: Extra query parameters
+
+        Returns:
+            API response as dictionary
+        """
+        response = self._send_with_retries(method, endpoint, data, params)
+        if isinstance(response, dict):
+            return response
+
+        # Try to parse JSON response
+        try:
+            result = response.json()
+        except json.JSONDecodeError:
+            result = {
+                "status": "error",
+                "message": "Invalid JSON response",
+                "raw_response": response.text[:500],
+            }
+
+        # Add HTTP status code to result
+        result["http_status"] = response.status_code
+
+        return result
+
+    def iter_results(
+        self,
+        endpoint: str,
+        meta: Optional[Dict[str, Any]] = None,
+        params: Optional[Dict[str, Any]] = None,
+    ) -> Iterator[Any]:
+        """
+        Stream the records of a GET response one by one.
+
+        The body is read in STREAM_CHUNK_SIZE chunks and parsed incrementally,
+        so a huge CMDB table never sits in memory as bytes, text and a decoded
+        tree at once. Retries and failover apply until the response headers
+        arrive; after that, errors end the stream.
+
+        Args:
+            endpoint: API endpoint (should not start with /)
+            meta: Dict that receives http_status and every top-level member of
+                the response except results. On failure it gets the same
+                error fields a get() result would have ("status": "error",
+                "message", and deadline_exceeded or cancelled when relevant);
+                check it once the iterator is exhausted.
+            params: Extra query parameters
+
+        Yields:
+            Items of the response "results" array
+        """
+        meta = {} if meta is None else meta
+        response = self._send_with_retries("GET", endpoint, params=params, stream=True)
+        if isinstance(response, dict):
+            meta.update(response)
+            return
+
+        with response:
+            meta["http_status"] = response.status_code
+            if response.status_code != 200:
+                try:
+                    meta.update(response.json())
+                except json.JSONDecodeError:
+                    meta.update(
+                        {
+                            "status": "error",
+                            "message": "Invalid JSON response",
+                            "raw_response": response.text[:500],
+                        }
+                    )
+                meta["http_status"] = response.status_code
+                return
+
+            try:
+                yield from iter_json_array(
+                    self._iter_body(response, endpoint, meta), "results", meta
+                )
+            except StreamParseError as e:
+                # A stream cut short by cancel or deadline is already reported
+                if not (meta.get("cancelled") or meta.get("deadline_exceeded")):
+                    meta.update(
+                        {"status": "error", "message": f"Invalid JSON response: {e}"}
+                    )
+            except requests.exceptions.RequestException as e:
+                if self._cancelled():
+                    meta.update(self._cancelled_result("GET", endpoint))
+                else:
+                    logger.error(f"Stream of {endpoint} failed: {e}")
+                    meta.update(
+                        {"status": "error", "message": f"Request failed: {str(e)}"}
+                    )
+                meta["http_status"] = response.status_code
+
+    def iter_body(
+        self,
+        endpoint: str,
+        meta: Optional[Dict[str, Any]] = None,
+        params: Optional[Dict[str, Any]] = None,
+    ) -> Iterator[bytes]:
+        """
+        Stream the raw body of a GET response in STREAM_CHUNK_SIZE chunks.
+
+        For downloads (e.g. config backups) that should go to disk without
+        ever being held in memory whole.
+
+        Args:
+            endpoint: API endpoint (should not start with /)
+            meta: Dict that receives http_status and, on failure, the same
+                error fields a get() result would have; check it once the
+                iterator is exhausted, since a stream cut short by an error,
+                cancel or the deadline simply ends early
+            params: Extra query parameters
+
+        Yields:
+            Body chunks of a 200 response (nothing for other statuses)
+        """
+        meta = {} if meta is None else meta
+        response = self._send_with_retries("GET", endpoint, params=params, stream=True)
+        if isinstance(response, dict):
+            meta.update(response)
+            return
+
+        with response:
+            meta["http_status"] = response.status_code
+            if response.status_code != 200:
+                try:
+                    meta.update(response.json())
+                except json.JSONDecodeError:
+                    meta.update(
+                        {
+                            "status": "error",
+                            "message": "Invalid JSON response",
+                            "raw_response": response.text[:500],
+                        }
+                    )
+                meta["http_status"] = response.status_code
+                return
+
+            try:
+                yield from self._iter_body(response, endpoint, meta)
+            except requests.exceptions.RequestException as e:
+                if self._cancelled():
+                    meta.update(self._cancelled_result("GET", endpoint))
+                else:
+                    logger.error(f"Stream of {endpoint} failed: {e}")
+                    meta.update(
+                        {"status": "error", "message": f"Request failed: {str(e)}"}
+                    )
+                meta["http_status"] = response.status_code
+
+    def _iter_body(
+        self, response: requests.Response, endpoint: str, meta: Dict[str, Any]
+    ) -> Iterator[bytes]:
+        """Yield body chunks until done, cancelled or past the deadline"""
+        for chunk in response.iter_content(chunk_size=STREAM_CHUNK_SIZE):
+            if self._cancelled():
+                meta.update(self._cancelled_result("GET", endpoint))
+                meta["http_status"] = response.status_code
+                return
+            remaining = self._remaining()
+            if remaining is not None and remaining <= 0:
+                meta.update(self._deadline_exceeded("GET", endpoint))
+                meta["http_status"] = response.status_code
+                return
+            yield chunk
+
+    def get(
+        self, endpoint: str, params: Optional[Dict[str, Any]] = None
+    ) -> Dict[str, Any]:
         """GET request"""
-        return self._make_request("GET", endpoint)
+        return self._make_request("GET", endpoint, params=params)
+
+    def get_raw(
+        self, endpoint: str, params: Optional[Dict[str, Any]] = None
+    ) -> Dict[str, Any]:
+        """
+        GET request that returns the response body undecoded.
+
+        Returns:
+            {"http_status": ..., "body": bytes}, or an error result dictionary
+            (as from get()) if the request itself failed
+        """
+        response = self._send_with_retries("GET", endpoint, params=params)
+        if isinstance(response, dict):
+            return response
+        return {"http_status": response.status_code, "body": response.content}
 
     def post(self, endpoint: str, data: Dict[str, Any]) -> Dict[str, Any]:
         """POST request"""
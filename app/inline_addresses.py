@@ -0,0 +1,190 @@
+"""
+Inline IPs, CIDRs, ranges and FQDNs resolved to address objects
+"""
+
+import ipaddress
+import re
+import threading
+from collections import OrderedDict
+from typing import Any, Dict, Iterable, Optional, Tuple
+
+FQDN_PATTERN = re.compile(
+    r"^(?!-)[A-Za-z0-9-]{1,63}(?<!-)(\.[A-Za-z0-9-]{1,63})*\.[A-Za-z]{2,}$"
+)
+# Inline FQDNs need a prefix (fqdn:example.com), since object names may
+# look like host names
+FQDN_PREFIX = "fqdn"
+# Longest address object name FortiOS accepts
+MAX_NAME_LENGTH = 79
+# Built indexes kept (one per device and config revision)
+MAX_CACHED_ADDRESS_INDEXES = 64
+
+# What an address object matches: ("ipmask", "10.0.0.0/24"),
+# ("iprange", "10.0.0.1-10.0.0.9") or ("fqdn", "example.com")
+AddressKey = Tuple[str, str]
+
+
+def _ipv4(text: str) -> Optional[ipaddress.IPv4Address]:
+    try:
+        return ipaddress.IPv4Address(text.strip())
+    except ValueError:
+        return None
+
+
+def _ipv6(text: str) -> bool:
+    try:
+        return ipaddress.ip_network(text.strip(), strict=False).version == 6
+    except ValueError:
+        return False
+
+
+def parse_inline(value: str) -> Optional[AddressKey]:
+    """
+    Key of an inline address (IPv4 host, CIDR, range or fqdn:<name>).
+
+    Returns None for anything else, which is taken as an object name.
+
+    Raises:
+        ValueError: For a CIDR with host bits set, a reversed range, an
+            invalid FQDN or an IPv6 value
+    """
+    text = value.strip()
+    prefix, colon, rest = text.partition(":")
+    if colon and prefix.strip().lower() == FQDN_PREFIX:
+        fqdn = rest.strip().rstrip(".")
+        if not FQDN_PATTERN.match(fqdn):
+            raise ValueError(f"'{fqdn}' is not a valid FQDN")
+        return "fqdn", fqdn.lower()
+    parts = text.split("-")
+    if any(_ipv6(part) for part in parts):
+        raise ValueError(f"'{text}' is IPv6; inline addresses must be IPv4")
+    if len(parts) == 2:
+        start, end = _ipv4(parts[0]), _ipv4(parts[1])
+        if start is not None and end is not None:
+            if start > end:
+                raise ValueError(f"range '{text}' ends before it starts")
+            return "iprange", f"{start}-{end}"
+    if _ipv4(text.split("/")[0]) is not None:
+        try:
+            network = ipaddress.IPv4Network(text)
+        except ValueError as e:
+            raise ValueError(f"'{text}' is not a network: {e}")
+        return "ipmask", network.with_prefixlen
+    return None
+
+
+def record_key(record: Dict[str, Any]) -> Optional[AddressKey]:
+    """Key of an existing address object, or None if it is not a plain one"""
+    interface = record.get("associated-interface") or ""
+    if isinstance(interface, dict):
+        interface = interface.get("q_origin_key") or interface.get("name") or ""
+    if interface not in ("", "any") or record.get("sub-type", "sdn") != "sdn":
+        return None
+    kind = record.get("type", "ipmask")
+    try:
+        if kind == "ipmask":
+            subnet = str(record.get("subnet", "")).replace(" ", "/")
+            return kind, ipaddress.IPv4Network(subnet, strict=False).with_prefixlen
+        if kind == "iprange":
+            start = ipaddress.IPv4Address(record.get("start-ip", ""))
+            end = ipaddress.IPv4Address(record.get("end-ip", ""))
+            return kind, f"{start}-{end}"
+    except ValueError:
+        return None
+    if kind == "fqdn" and record.get("fqdn"):
+        return kind, str(record["fqdn"]).rstrip(".").lower()
+    return None
+
+
+def object_name(key: AddressKey) -> str:
+    """
+    Name given to an address object created for an inline value.
+
+    Raises:
+        ValueError: When the name would be too long
+    """
+    kind, value = key
+    if kind == "ipmask":
+        address, prefixlen = value.split("/")
+        name = f"host-{address}" if prefixlen == "32" else f"net-{address}_{prefixlen}"
+    elif kind == "iprange":
+        name = f"range-{value}"
+    else:
+        name = f"fqdn-{value}"
+    if len(name) > MAX_NAME_LENGTH:
+        raise ValueError(f"'{value}' is too long for an address object name")
+    return name
+
+
+def address_body(key: AddressKey, name: str, comment: str = "") -> Dict[str, Any]:
+    """Request body creating the address object for a key"""
+    kind, value = key
+    body: Dict[str, Any] = {"name": name, "type": kind}
+    if kind == "ipmask":
+        network = ipaddress.IPv4Network(value)
+        body["subnet"] = f"{network.network_address} {network.netmask}"
+    elif kind == "iprange":
+        body["start-ip"], body["end-ip"] = value.split("-")
+    else:
+        body["fqdn"] = value
+    if comment:
+        body["comment"] = comment
+    return body
+
+
+class AddressIndex:
+    """Existing address objects by name and by what they match"""
+
+    def __init__(self, records: Iterable[Dict[str, Any]]):
+        self.names = set()
+        self._by_key: Dict[AddressKey, str] = {}
+        for record in records:
+            name = record.get("name") if isinstance(record, dict) else None
+            if not name:
+                continue
+            self.names.add(name)
+            key = record_key(record)
+            if key is None:
+                continue
+            # The first name in sort order wins, so repeated calls agree
+            current = self._by_key.get(key)
+            if current is None or name < current:
+                self._by_key[key] = name
+
+    def __contains__(self, name: str) -> bool:
+        return name in self.names
+
+    def find(self, key: AddressKey) -> Optional[str]:
+        """Name of an existing object matching exactly the same addresses"""
+        return self._by_key.get(key)
+
+
+class AddressIndexCache:
+    """Thread-safe LRU of built indexes keyed by owner and config revision"""
+
+    def __init__(self, max_indexes: int = MAX_CACHED_ADDRESS_INDEXES):
+        self.max_indexes = max_indexes
+        self._lock = threading.Lock()
+        self._indexes: "OrderedDict[Tuple[str, str], AddressIndex]" = OrderedDict()
+
+    def get(self, key: Tuple[str, str]) -> Optional[AddressIndex]:
+        with self._lock:
+            index = self._indexes.get(key)
+            if index is not None:
+                self._indexes.move_to_end(key)
+            return index
+
+    def put(self, key: Tuple[str, str], index: AddressIndex) -> None:
+        with self._lock:
+            self._indexes[key] = index
+            self._indexes.move_to_end(key)
+            while len(self._indexes) > self.max_indexes:
+                self._indexes.popitem(last=False)
+
+    def clear(self) -> None:
+        with self._lock:
+            self._indexes.clear()
+
+
+# Address indexes used to resolve inline policy addresses
+ADDRESS_INDEXES = AddressIndexCache()
@@ -0,0 +1,195 @@
+"""
+Latency tracking for FortiGate API endpoints
+"""
+
+import math
+import threading
+import time
+from collections import deque
+from typing import Deque, Dict, Hashable, List, Optional
+
+# EWMA smoothing factor for latency samples
+DEFAULT_EWMA_ALPHA = 0.2
+# Number of recent samples kept per key for percentile estimates
+DEFAULT_SAMPLE_WINDOW = 100
+# Minimum samples before percentiles are trusted
+MIN_PERCENTILE_SAMPLES = 5
+# Seconds an endpoint is ranked last after a connection failure
+FAILURE_PENALTY = 30.0
+# Adaptive timeouts: smoothed latency plus this many mean deviations
+TIMEOUT_DEVIATIONS = 4
+# Responses at least this large feed the per-device throughput estimate
+MIN_THROUGHPUT_BYTES = 64 * 1024
+
+
+class LatencyStats:
+    """Latency statistics for one key (EWMA plus a window of recent samples)"""
+
+    def __init__(
+        self, alpha: float = DEFAULT_EWMA_ALPHA, window: int = DEFAULT_SAMPLE_WINDOW
+    ):
+        self.alpha = alpha
+        self.ewma: Optional[float] = None
+        self.deviation = 0.0
+        self.ewma_bytes: Optional[float] = None
+        self.throughput: Optional[float] = None
+        self.timeout_backoff = 1
+        self.samples: Deque[float] = deque(maxlen=window)
+        self.last_failure: Optional[float] = None
+
+    def record(self, seconds: float, size: Optional[int] = None) -> None:
+        """Record a successful request latency and, if known, its response size"""
+        if self.ewma is None:
+            self.ewma = seconds
+            self.deviation = seconds / 2
+        else:
+            self.deviation += self.alpha * (abs(seconds - self.ewma) - self.deviation)
+            self.ewma += self.alpha * (seconds - self.ewma)
+        if size is not None:
+            if self.ewma_bytes is None:
+                self.ewma_bytes = float(size)
+            else:
+                self.ewma_bytes += self.alpha * (size - self.ewma_bytes)
+            if size >= MIN_THROUGHPUT_BYTES and seconds > 0:
+                rate = size / seconds
+                if self.throughput is None:
+                    self.throughput = rate
+                else:
+                    self.throughput += self.alpha * (rate - self.throughput)
+        self.samples.append(seconds)
+        self.timeout_backoff = 1
+        self.last_failure = None
+
+    def record_failure(self, timed_out: bool = False) -> None:
+        """Record a connection failure or timeout"""
+        self.last_failure = time.monotonic()
+        if timed_out:
+            # Like TCP RTO backoff: give the next attempt twice as long
+            self.timeout_backoff = min(self.timeout_backoff * 2, 64)
+
+    def percentile(self, pct: float) -> Optional[float]:
+        """Latency percentile over the sample window (None if too few samples)"""
+        if len(self.samples) < MIN_PERCENTILE_SAMPLES:
+            return None
+        ordered = sorted(self.samples)
+        index = min(len(ordered) - 1, math.ceil(pct / 100 * len(ordered)) - 1)
+        return ordered[max(index, 0)]
+
+    def recently_failed(self) -> bool:
+        """Whether the key failed within the failure penalty window"""
+        return (
+            self.last_failure is not None
+            and time.monotonic() - self.last_failure < FAILURE_PENALTY
+        )
+
+
+class LatencyTracker:
+    """Thread-safe registry of LatencyStats keyed by endpoint"""
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._stats: Dict[Hashable, LatencyStats] = {}
+
+    def _get(self, key: Hashable) -> LatencyStats:
+        stats = self._stats.get(key)
+        if stats is None:
+            stats = self._stats[key] = LatencyStats()
+        return stats
+
+    def record(self, key: Hashable, seconds: float, size: Optional[int] = None) -> None:
+        """Record a successful request latency (and response size) for key"""
+        with self._lock:
+            self._get(key).record(seconds, size)
+
+    def record_failure(self, key: Hashable, timed_out: bool = False) -> None:
+        """Record a failed request for key"""
+        with self._lock:
+            self._get(key).record_failure(timed_out)
+
+    def ewma(self, key: Hashable) -> Optional[float]:
+        """Smoothed latency for key (None if never measured)"""
+        with self._lock:
+            stats = self._stats.get(key)
+            return stats.ewma if stats else None
+
+    def percentile(self, key: Hashable, pct: float) -> Optional[float]:
+        """Latency percentile for key (None if too few samples)"""
+        with self._lock:
+            stats = self._stats.get(key)
+            return stats.percentile(pct) if stats else None
+
+    def timeout(
+        self,
+        key: Hashable,
+        device_key: Hashable,
+        default: float,
+        floor: float,
+        ceiling: float,
+    ) -> float:
+        """
+        Adaptive request timeout for key.
+
+        Smoothed latency plus TIMEOUT_DEVIATIONS mean deviations, plus the time
+        the device needs to transfer a typical response of this class at its
+        observed throughput, doubled after each consecutive timeout and
+        clamped to [floor, ceiling]. Unmeasured keys get the default.
+        """
+        with self._lock:
+            stats = self._stats.get(key)
+            if stats is None or stats.ewma is None:
+                if stats is not None and stats.timeout_backoff > 1:
+                    return min(default * stats.timeout_backoff, ceiling)
+                return default
+            estimate = stats.ewma + TIMEOUT_DEVIATIONS * stats.deviation
+            device = self._stats.get(device_key)
+            if stats.ewma_bytes and device is not None and device.throughput:
+                estimate += stats.ewma_bytes / device.throughput
+            estimate *= stats.timeout_backoff
+        return min(max(estimate, floor), ceiling)
+
+    def rank(self, keys: List[str]) -> List[str]:
+        """
+        Order endpoints from best to worst.
+
+        Endpoints that failed recently go last. The rest are ordered by
+        smoothed latency; unmeasured endpoints sort first so they get probed,
+        and ties keep the configured order.
+        """
+        with self._lock:
+
+            def score(key: str):
+                stats = self._stats.get(key)
+                if stats is None:
+                    return (False, 0.0)
+                return (stats.recently_failed(), stats.ewma or 0.0)
+
+            return sorted(keys, key=score)
+
+    def clear(self) -> None:
+        """Forget all statistics"""
+        with self._lock:
+            self._stats.clear()
+
+
+# Shared latency statistics, keyed both by FortiGate management URL (whole
+# device) and by (management URL, endpoint class)
+ENDPOINT_LATENCY = LatencyTracker()
+
+
+def endpoint_class(endpoint: str) -> str:
+    """
+    Group API endpoints that cost about the same to serve.
+
+    CMDB tables and single objects are separate classes (a full
+    cmdb/firewall/policy pull is far slower than cmdb/firewall/policy/5);
+    monitor and other endpoints are classed by their full path.
+
+    Examples:
+        cmdb/firewall/policy    -> cmdb/firewall/policy
+        cmdb/firewall/policy/5  -> cmdb/firewall/policy/*
+        monitor/system/status   -> monitor/system/status
+    """
+    parts = endpoint.split("?", 1)[0].strip("/").split("/")
+    if parts[0] == "cmdb" and len(parts) > 3:
+        return "/".join(parts[:3]) + "/*"
+    return "/".join(parts)
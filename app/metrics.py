@@ -0,0 +1,330 @@
+"""
+In-memory time series of FortiGate monitor metrics
+"""
+
+import asyncio
+import logging
+import os
+import random
+import threading
+import time
+from array import array
+from typing import Any, Dict, List, Optional, Tuple
+
+import anyio
+
+from .devices import DEVICES, Device
+from .fortios_client import deadline_after
+from .tools import FortiOSTools
+
+logger = logging.getLogger(__name__)
+
+# Comma-separated metrics to sample (empty: sampling disabled)
+METRICS_ENV = "FORTIOS_METRICS"
+# Seconds between samples
+METRICS_INTERVAL_ENV = "FORTIOS_METRICS_INTERVAL"
+DEFAULT_METRICS_INTERVAL = 60.0
+# Samples kept per device and metric (a day at the default interval)
+DEFAULT_RING_SIZE = 1440
+# Metrics of monitor/system/resource/usage that can be sampled
+RESOURCE_USAGE_ENDPOINT = "monitor/system/resource/usage"
+VALID_METRICS = ("cpu", "mem", "disk", "session", "session6", "setuprate")
+# Time budget for one sample of one device
+SAMPLE_DEADLINE = 30.0
+# A trend is reported as rising/falling when the fitted line moves by more
+# than this fraction of the mean over the window
+TREND_THRESHOLD = 0.05
+
+
+class RingBuffer:
+    """
+    Fixed-size series of (timestamp, value) samples.
+
+    Timestamps and values live in two preallocated array('d') columns;
+    once full, each new sample overwrites the oldest.
+    """
+
+    def __init__(self, capacity: int = DEFAULT_RING_SIZE):
+        self.capacity = max(capacity, 1)
+        self._times = array("d", bytes(8 * self.capacity))
+        self._values = array("d", bytes(8 * self.capacity))
+        self._next = 0
+        self._count = 0
+
+    def __len__(self) -> int:
+        return self._count
+
+    def append(self, timestamp: float, value: float) -> None:
+        """Add a sample, dropping the oldest when full"""
+        self._times[self._next] = timestamp
+        self._values[self._next] = value
+        self._next = (self._next + 1) % self.capacity
+        self._count = min(self._count + 1, self.capacity)
+
+    def samples(self, since: float = 0.0) -> Tuple[List[float], List[float]]:
+        """(timestamps, values) of the samples taken at or after since, oldest first"""
+        start = (self._next - self._count) % self.capacity
+        times, values = [], []
+        for i in range(self._count):
+            slot = (start + i) % self.capacity
+            if self._times[slot] >= since:
+                times.append(self._times[slot])
+                values.append(self._values[slot])
+        return times, values
+
+
+def _percentile(ordered: List[float], percent: float) -> float:
+    """Linear-interpolated percentile of sorted values"""
+    position = (len(ordered) - 1) * percent / 100
+    low = int(position)
+    high = min(low + 1, len(ordered) - 1)
+    return ordered[low] + (ordered[high] - ordered[low]) * (position - low)
+
+
+def series_stats(times: List[float], values: List[float]) -> Dict[str, Any]:
+    """
+    Summary of a series: last value, range, mean, percentiles, rate and trend.
+
+    rate_per_second is the change from the first to the last sample over
+    their time span; slope_per_minute comes from a least-squares line fit,
+    which is less sensitive to one noisy sample.
+    """
+    count = len(values)
+    if not count:
+        return {"samples": 0}
+    ordered = sorted(values)
+    mean = sum(values) / count
+    stats: Dict[str, Any] = {
+        "samples": count,
+        "first_at": times[0],
+        "last_at": times[-1],
+        "last": values[-1],
+        "min": ordered[0],
+        "max": ordered[-1],
+        "mean": mean,
+        "p50": _percentile(ordered, 50),
+        "p95": _percentile(ordered, 95),
+        "p99": _percentile(ordered, 99),
+        "rate_per_second": None,
+        "slope_per_minute": None,
+        "trend": "unknown",
+    }
+    span = times[-1] - times[0]
+    if count >= 2 and span > 0:
+        stats["rate_per_second"] = (values[-1] - values[0]) / span
+        mean_time = sum(times) / count
+        variance = sum((t - mean_time) ** 2 for t in times)
+        covariance = sum((t - mean_time) * (v - mean) for t, v in zip(times, values))
+        slope = covariance / variance
+        stats["slope_per_minute"] = slope * 60
+        change = slope * span
+        threshold = TREND_THRESHOLD * abs(mean) if mean else 0.0
+        if change > threshold:
+            stats["trend"] = "rising"
+        elif change < -threshold:
+            stats["trend"] = "falling"
+        else:
+            stats["trend"] = "flat"
+    return stats
+
+
+class MetricsStore:
+    """Thread-safe ring buffers of samples per (device, metric)"""
+
+    def __init__(self, capacity: int = DEFAULT_RING_SIZE):
+        self.capacity = capacity
+        self._lock = threading.Lock()
+        self._series: Dict[Tuple[str, str], RingBuffer] = {}
+
+    def record(self, device: str, metric: str, timestamp: float, value: float) -> None:
+        """Add a sample"""
+        with self._lock:
+            series = self._series.get((device, metric))
+            if series is None:
+                series = self._series[(device, metric)] = RingBuffer(self.capacity)
+            series.append(timestamp, value)
+
+    def query(self, device: str, metric: str, since: float = 0.0) -> Dict[str, Any]:
+        """Statistics of the samples of a device metric taken since a time"""
+        with self._lock:
+            series = self._series.get((device, metric))
+            times, values = series.samples(since) if series else ([], [])
+        return series_stats(times, values)
+
+    def series(self) -> Dict[str, List[str]]:
+        """Sampled metrics per device"""
+        with self._lock:
+            keys = sorted(self._series)
+        result: Dict[str, List[str]] = {}
+        for device, metric in keys:
+            result.setdefault(device, []).append(metric)
+        return result
+
+    def forget(self, device: str) -> None:
+        """Drop the series of a device"""
+        with self._lock:
+            for key in [key for key in self._series if key[0] == device]:
+                del self._series[key]
+
+    def clear(self) -> None:
+        """Drop all series"""
+        with self._lock:
+            self._series.clear()
+
+
+def _resource_value(results: Any, metric: str) -> Optional[float]:
+    """Current value of a metric in a resource usage response"""
+    entry = results.get(metric) if isinstance(results, dict) else None
+    if isinstance(entry, list) and entry:
+        entry = entry[0]
+    if isinstance(entry, dict):
+        entry = entry.get("current")
+    if isinstance(entry, (int, float)) and not isinstance(entry, bool):
+        return float(entry)
+    return None
+
+
+def _series_key(name: str, scope: str = "") -> str:
+    """Store key of a device (names are only unique within a registry scope)"""
+    return f"{scope}/{name}" if scope else name
+
+
+def sample_device(
+    device: Device, metrics: List[str], deadline: Optional[float] = None
+) -> Dict[str, float]:
+    """Current values of metrics on a device (missing ones are left out)"""
+    client = FortiOSTools.create_client(device.url, device.token, device.vdom, deadline)
+    # Without a resource parameter, all resources come back in one response
+    result = client.get(RESOURCE_USAGE_ENDPOINT)
+    if result.get("http_status") != 200:
+        return {}
+    values = {}
+    for metric in metrics:
+        value = _resource_value(result.get("results"), metric)
+        if value is not None:
+            values[metric] = value
+    return values
+
+
+def configured_metrics() -> List[str]:
+    """Metrics to sample, from FORTIOS_METRICS (unknown names are ignored)"""
+    names = [name.strip() for name in os.environ.get(METRICS_ENV, "").split(",")]
+    unknown = [name for name in names if name and name not in VALID_METRICS]
+    if unknown:
+        logger.warning(f"Ignoring unknown metrics in {METRICS_ENV}: {unknown}")
+    return [name for name in VALID_METRICS if name in names]
+
+
+def configured_interval() -> float:
+    """Seconds between samples, from FORTIOS_METRICS_INTERVAL"""
+    try:
+        interval = float(os.environ.get(METRICS_INTERVAL_ENV) or 0)
+    except ValueError:
+        interval = 0
+    return interval if interval > 0 else DEFAULT_METRICS_INTERVAL
+
+
+class MetricsSampler:
+    """
+    Sample monitor metrics of every registered FortiGate into a MetricsStore.
+
+    Off unless metrics are configured. One resource usage request per
+    device and interval covers all metrics, and devices are sampled
+    concurrently. Sampling starts at a random offset within the first
+    interval, so several server replicas do not sample in lockstep.
+    """
+
+    def __init__(self, store: "MetricsStore", metrics: Optional[List[str]] = None):
+        self.store = store
+        self.metrics = metrics
+
+    async def sample_once(self) -> int:
+        """Sample every registered device once; returns the samples recorded"""
+        metrics = self.metrics if self.metrics is not None else configured_metrics()
+        devices = DEVICES.all()
+        names = {_series_key(device.name, device.scope) for device in devices}
+        for name in [name for name in self.store.series() if name not in names]:
+            self.store.forget(name)
+        results = await asyncio.gather(
+            *(
+                anyio.to_thread.run_sync(
+                    sample_device, device, metrics, deadline_after(SAMPLE_DEADLINE)
+                )
+                for device in devices
+            ),
+            return_exceptions=True,
+        )
+        recorded = 0
+        now = time.time()
+        for device, values in zip(devices, results):
+            if isinstance(values, BaseException):
+                logger.warning(f"Metric sample of {device.name} failed: {values}")
+                continue
+            for metric, value in values.items():
+                self.store.record(
+                    _series_key(device.name, device.scope), metric, now, value
+                )
+                recorded += 1
+        return recorded
+
+    async def run(self) -> None:
+        """Sample until cancelled (returns at once when no metrics are configured)"""
+        metrics = self.metrics if self.metrics is not None else configured_metrics()
+        if not metrics:
+            return
+        interval = configured_interval()
+        logger.info(f"Sampling {metrics} every {interval:g}s")
+        await asyncio.sleep(random.uniform(0, interval))
+        while True:
+            try:
+                await self.sample_once()
+            except Exception as e:
+                logger.error(f"Metric sampling failed: {e}")
+            await asyncio.sleep(interval)
+
+
+def query_metric(
+    device: str, metric: str, window_minutes: float = 60, scope: str = ""
+) -> Dict[str, Any]:
+    """
+    Trend, rate and percentiles of a sampled metric, answered from memory.
+
+    Returns a tool result; no request is sent to the FortiGate.
+    """
+    if metric not in VALID_METRICS:
+        return {
+            "success": False,
+            "message": (
+                f"Validation error: Invalid metric '{metric}'. "
+                f"Must be one of: {', '.join(VALID_METRICS)}"
+            ),
+            "details": {},
+        }
+    since = time.time() - window_minutes * 60 if window_minutes > 0 else 0.0
+    stats = METRICS.query(_series_key(device, scope), metric, since)
+    if not stats["samples"]:
+        sampled = configured_metrics()
+        return {
+            "success": False,
+            "message": (
+                f"No samples of {metric} for '{device}' in the last {window_minutes:g} minutes"
+            ),
+            "details": {
+                "sampled_metrics": sampled,
+                "hint": (
+                    "register the device with register_fortigate"
+                    if sampled
+                    else f"set {METRICS_ENV} to enable sampling"
+                ),
+            },
+        }
+    return {
+        "success": True,
+        "message": f"{metric} of '{device}': {stats['trend']}",
+        "data": {"device": device, "metric": metric, **stats},
+    }
+
+
+# Samples of all registered devices, and the sampler started with the server
+METRICS = MetricsStore()
+SAMPLER = MetricsSampler(METRICS)
@@ -0,0 +1,128 @@
+"""
+Join of firewall policies with their hit and traffic counters
+"""
+
+import heapq
+import time
+from array import array
+from datetime import datetime, timezone
+from typing import Any, Dict, Iterable, List, Optional
+
+# Byte counters reported per forwarding path when there is no total
+_BYTE_FIELDS = ("software_bytes", "asic_bytes", "nturbo_bytes")
+
+
+def _int(value: Any) -> int:
+    return value if isinstance(value, int) and not isinstance(value, bool) else 0
+
+
+def _bytes(record: Dict[str, Any]) -> int:
+    if "bytes" in record:
+        return _int(record["bytes"])
+    return sum(_int(record.get(field)) for field in _BYTE_FIELDS)
+
+
+def _timestamp(value: int) -> Optional[str]:
+    if not value:
+        return None
+    return datetime.fromtimestamp(value, timezone.utc).isoformat(timespec="seconds")
+
+
+class PolicyCounters:
+    """
+    Per-policy counters of the policy monitor, stored column by column.
+
+    Each counter is a typed array with one slot per policy, and index maps
+    a policy ID to its slot, so tens of thousands of policies cost a few
+    machine words each instead of a dict per policy.
+    """
+
+    def __init__(self):
+        self.index: Dict[int, int] = {}
+        self.hits = array("q")
+        self.bytes = array("q")
+        self.last_used = array("q")
+
+    def add(self, record: Dict[str, Any]) -> None:
+        """Add the counters of one monitor record (later records win)"""
+        policyid = record.get("policyid")
+        if not isinstance(policyid, int):
+            return
+        slot = self.index.get(policyid)
+        if slot is None:
+            self.index[policyid] = len(self.hits)
+            self.hits.append(_int(record.get("hit_count")))
+            self.bytes.append(_bytes(record))
+            self.last_used.append(_int(record.get("last_used")))
+        else:
+            self.hits[slot] = _int(record.get("hit_count"))
+            self.bytes[slot] = _bytes(record)
+            self.last_used[slot] = _int(record.get("last_used"))
+
+    @classmethod
+    def from_records(cls, records: Iterable[Dict[str, Any]]) -> "PolicyCounters":
+        counters = cls()
+        for record in records:
+            if isinstance(record, dict):
+                counters.add(record)
+        return counters
+
+
+def policy_usage(
+    policies: Iterable[Dict[str, Any]],
+    counters: PolicyCounters,
+    unused_days: int,
+    top_n: int,
+    max_unused: int,
+    now: Optional[float] = None,
+) -> Dict[str, Any]:
+    """
+    Join policies with their counters by policy ID, in one pass.
+
+    Joined counters are gathered into arrays aligned with the policies, and
+    the unused scan and traffic ranking then run over those arrays.
+
+    Returns:
+        Policy count, the policies not used in unused_days (never-used
+        first, then least recently used; at most max_unused of them) and
+        the top_n policies by bytes
+    """
+    now = time.time() if now is None else now
+    # unused_days=0 only flags policies that were never used
+    cutoff = now - unused_days * 86400 if unused_days > 0 else 1
+    rows: List[Dict[str, Any]] = []
+    hits, traffic, last_used = array("q"), array("q"), array("q")
+    missing = 0
+    for policy in policies:
+        policyid = policy.get("policyid")
+        slot = counters.index.get(policyid) if isinstance(policyid, int) else None
+        if slot is None:
+            # Not in the monitor output, e.g. added since the counters were read
+            missing += 1
+        hits.append(0 if slot is None else counters.hits[slot])
+        traffic.append(0 if slot is None else counters.bytes[slot])
+        last_used.append(0 if slot is None else counters.last_used[slot])
+        rows.append(policy)
+
+    def describe(i: int) -> Dict[str, Any]:
+        policy = rows[i]
+        return {
+            "policyid": policy.get("policyid"),
+            "name": policy.get("name", ""),
+            "status": policy.get("status", ""),
+            "hit_count": hits[i],
+            "bytes": traffic[i],
+            "last_used": _timestamp(last_used[i]),
+        }
+
+    unused = [i for i in range(len(rows)) if last_used[i] < cutoff]
+    unused.sort(key=last_used.__getitem__)
+    top = heapq.nlargest(top_n, range(len(rows)), key=traffic.__getitem__)
+    return {
+        "policies": len(rows),
+        "without_counters": missing,
+        "unused_days": unused_days,
+        "unused_count": len(unused),
+        "unused": [describe(i) for i in unused[:max_unused]],
+        "top_by_bytes": [describe(i) for i in top if traffic[i] > 0],
+    }
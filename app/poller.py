@@ -0,0 +1,219 @@
+"""
+Background polling of FortiGate config revisions
+"""
+
+import asyncio
+import logging
+import random
+from typing import Any, Dict, List, NamedTuple, Optional, Set, Tuple
+
+import anyio
+
+from .cmdb_cache import CMDB_CACHE
+from .devices import DEVICES, Device
+from .fortios_client import deadline_after
+from .resources import (
+    SUBSCRIPTIONS,
+    TABLES,
+    SubscriptionRegistry,
+    probe_revision,
+    refresh_table,
+    table_uri,
+)
+from .tools import FortiOSTools
+
+logger = logging.getLogger(__name__)
+
+# Seconds between polls
+DEFAULT_POLL_INTERVAL = 30.0
+# Each device's poll starts at a random offset of up to this fraction of the
+# interval, so a fleet registered at once is not polled in lockstep
+DEFAULT_POLL_JITTER = 0.5
+# Devices polled (and refreshed) at the same time
+DEFAULT_POLL_CONCURRENCY = 4
+# Time budget for one revision probe, log read or table refresh
+POLL_DEADLINE = 30.0
+# Table whose one-record read is used to learn a device's config revision
+REVISION_TABLE = "addresses"
+# Recent system events scanned for config changes
+CONFIG_CHANGE_LOG = "log/memory/event/system"
+CONFIG_CHANGE_ROWS = 200
+# cfgpath of config change events -> table
+_CFGPATH_TABLES = {
+    TABLES[table].split("/", 1)[1].replace("/", "."): table for table in TABLES
+}
+
+
+class _DeviceState(NamedTuple):
+    revision: str
+    # Newest config change event seen (eventtime); None if the log is unusable
+    log_mark: Optional[int]
+
+
+class ConfigLog(NamedTuple):
+    """Config change events found in one read of the system event log"""
+
+    events: List[Dict[str, Any]]  # config change events, newest first
+    rows: int  # rows read, config changes or not
+    oldest: Optional[int]  # eventtime of the oldest row read
+
+
+def _config_changes(
+    device: Device, deadline: Optional[float] = None
+) -> Optional[ConfigLog]:
+    """Recent config change events of a device (None if the log is unavailable)"""
+    client = FortiOSTools.create_client(device.url, device.token, device.vdom, deadline)
+    result = client.get(CONFIG_CHANGE_LOG, params={"rows": CONFIG_CHANGE_ROWS})
+    if result.get("http_status") != 200 or not isinstance(result.get("results"), list):
+        return None
+    rows = result["results"]
+    times = [
+        row["eventtime"]
+        for row in rows
+        if isinstance(row, dict) and isinstance(row.get("eventtime"), int)
+    ]
+    events = [
+        row
+        for row in rows
+        if isinstance(row, dict)
+        and row.get("cfgpath")
+        and isinstance(row.get("eventtime"), int)
+    ]
+    events.sort(key=lambda event: event["eventtime"], reverse=True)
+    return ConfigLog(events, len(rows), min(times) if times else None)
+
+
+def changed_tables(
+    log: Optional[ConfigLog], since: Optional[int]
+) -> Optional[Set[str]]:
+    """
+    Tables touched by config change events newer than since.
+
+    Returns None when the log cannot prove which tables changed: it is
+    unavailable, there is no earlier mark, the window read is full and
+    starts after the mark (older changes may have rotated out), or no
+    event names a cached table although the revision moved.
+    """
+    if log is None or since is None:
+        return None
+    if log.rows >= CONFIG_CHANGE_ROWS and (log.oldest is None or log.oldest > since):
+        return None
+    tables = {
+        _CFGPATH_TABLES[event["cfgpath"]]
+        for event in log.events
+        if event["eventtime"] > since and event["cfgpath"] in _CFGPATH_TABLES
+    }
+    return tables or None
+
+
+class RevisionPoller:
+    """
+    Keep the CMDB cache of registered FortiGates warm and current.
+
+    Each poll reads every device's config revision with a one-record
+    request. When it moves, the config change events in the device's
+    system log tell which tables changed, and only those are downloaded
+    again; unchanged cached tables are marked current at the new revision.
+    If the log cannot tell (logging to memory disabled, older events rotated
+    out, no event naming a cached table), every table is refreshed. Subscribers of a table are sent
+    resources/updated when its records actually changed.
+
+    Devices start at a random offset within the jitter window, and at most
+    max_concurrency devices are polled at once.
+    """
+
+    def __init__(
+        self,
+        interval: float = DEFAULT_POLL_INTERVAL,
+        jitter: float = DEFAULT_POLL_JITTER,
+        max_concurrency: int = DEFAULT_POLL_CONCURRENCY,
+        subscriptions: SubscriptionRegistry = SUBSCRIPTIONS,
+    ):
+        self.interval = interval
+        self.jitter = jitter
+        self.max_concurrency = max_concurrency
+        self.subscriptions = subscriptions
+        self._states: Dict[Tuple[str, str], _DeviceState] = {}
+        self._semaphore: Optional[asyncio.Semaphore] = None
+
+    async def _call(self, func, *args) -> Any:
+        return await anyio.to_thread.run_sync(
+            func, *args, deadline_after(POLL_DEADLINE)
+        )
+
+    async def poll_device(self, device: Device) -> List[str]:
+        """Poll one device; returns the URIs of tables whose records changed"""
+        if self.jitter > 0:
+            await asyncio.sleep(random.uniform(0, self.jitter * self.interval))
+        if self._semaphore is None:
+            self._semaphore = asyncio.Semaphore(self.max_concurrency)
+
+        async with self._semaphore:
+            revision = await self._call(probe_revision, device, REVISION_TABLE)
+            state = self._states.get(device.key)
+            if revision is None or (state is not None and state.revision == revision):
+                return []
+
+            log = await self._call(_config_changes, device)
+            log_mark = log.events[0]["eventtime"] if log and log.events else None
+            tables = changed_tables(log, state.log_mark if state else None)
+            if tables is None:
+                tables = set(TABLES)
+            else:
+                logger.info(
+                    f"{device.name}: revision {revision}, changed tables {sorted(tables)}"
+                )
+
+            changed = []
+            for table in TABLES:
+                key = (device.owner, TABLES[table])
+                cached = CMDB_CACHE.get(key)
+                if cached is not None and cached.revision == revision:
+                    # Already current, e.g. loaded from a snapshot after a restart
+                    continue
+                if table not in tables and CMDB_CACHE.revalidate(key, revision):
+                    continue
+                if await self._call(refresh_table, device, table):
+                    changed.append(table_uri(device.name, table))
+            if log_mark is None and state is not None:
+                log_mark = state.log_mark
+            self._states[device.key] = _DeviceState(revision, log_mark)
+
+        if state is None:
+            # First poll only warms the cache; there is nothing to compare to
+            return []
+        for uri in changed:
+            logger.info(f"{uri} changed at revision {revision}")
+            await self.subscriptions.notify(uri, device.scope)
+        return changed
+
+    async def poll_once(self) -> List[str]:
+        """Poll every registered device once; returns the URIs that changed"""
+        devices = DEVICES.all()
+        keys = {device.key for device in devices}
+        for key in [key for key in self._states if key not in keys]:
+            del self._states[key]
+
+        results = await asyncio.gather(
+            *(self.poll_device(device) for device in devices), return_exceptions=True
+        )
+        changed = []
+        for device, result in zip(devices, results):
+            if isinstance(result, BaseException):
+                logger.warning(f"Revision poll of {device.name} failed: {result}")
+            else:
+                changed.extend(result)
+        return changed
+
+    async def run(self) -> None:
+        """Poll until cancelled"""
+        while True:
+            try:
+                await self.poll_once()
+            except Exception as e:
+                logger.error(f"Revision poll failed: {e}")
+            await asyncio.sleep(self.interval)
+
+
+# Poller started with the server
+POLLER = RevisionPoller()
@@ -0,0 +1,128 @@
+"""
+Local checks of referenced object names against the cached CMDB tables
+"""
+
+import difflib
+import threading
+from collections import OrderedDict
+from typing import Dict, Iterable, List, Optional, Tuple
+
+from .cmdb_cache import CMDB_CACHE, TABLES, CachedTable
+from .references import object_key
+
+# Kinds of referenced names -> tables whose objects carry such names. A
+# name is only rejected locally when all of them are cached, so each kind
+# must list every table FortiOS accepts its names from
+NAME_TABLES = {
+    "address": (
+        "addresses",
+        "address-groups",
+        "vips",
+        "vip-groups",
+        "external-resources",
+    ),
+    "service": ("services", "service-groups"),
+}
+# Suggestions offered for an unknown name
+MAX_SUGGESTIONS = 3
+SUGGESTION_CUTOFF = 0.6
+# Built name indexes kept (one per device, kind and revision)
+MAX_CACHED_NAME_INDEXES = 128
+
+# field -> (kind, names); e.g. {"srcaddr": ("address", ["web", "db"])}
+NameChecks = Dict[str, Tuple[str, List[str]]]
+
+
+class NameIndex:
+    """Set of object names with close-match suggestions for unknown ones"""
+
+    def __init__(self, names: Iterable[str]):
+        self.names = frozenset(names)
+        self._ordered = sorted(self.names)
+
+    def __contains__(self, name: str) -> bool:
+        return name in self.names
+
+    def suggest(self, name: str) -> List[str]:
+        """Closest known names, best first"""
+        return difflib.get_close_matches(
+            name, self._ordered, n=MAX_SUGGESTIONS, cutoff=SUGGESTION_CUTOFF
+        )
+
+
+_lock = threading.Lock()
+_indexes: "OrderedDict[Tuple[str, str, str], NameIndex]" = OrderedDict()
+
+
+def cached_name_index(owner: str, kind: str) -> Optional[Tuple[str, NameIndex]]:
+    """
+    (revision, index) of the names of a kind, from cached tables only.
+
+    None when a table is not cached or the cached copies were read at
+    different revisions; no request is ever sent.
+    """
+    tables: List[CachedTable] = []
+    for name in NAME_TABLES[kind]:
+        table = CMDB_CACHE.get((owner, TABLES[name]))
+        if table is None:
+            return None
+        tables.append(table)
+    revisions = {table.revision for table in tables}
+    if len(revisions) != 1:
+        return None
+    revision = revisions.pop()
+    key = (owner, kind, revision)
+    with _lock:
+        index = _indexes.get(key)
+        if index is not None:
+            _indexes.move_to_end(key)
+            return revision, index
+    index = NameIndex(
+        name
+        for table_name, table in zip(NAME_TABLES[kind], tables)
+        for record in table.records
+        if isinstance(record, dict)
+        for name in [object_key(table_name, record)]
+        if name is not None
+    )
+    with _lock:
+        _indexes[key] = index
+        while len(_indexes) > MAX_CACHED_NAME_INDEXES:
+            _indexes.popitem(last=False)
+    return revision, index
+
+
+def unknown_names(
+    owner: str, checks: NameChecks
+) -> Tuple[Dict[str, str], Dict[str, Dict[str, List[str]]]]:
+    """
+    Names missing from the cached tables, with suggestions.
+
+    Kinds whose tables are not cached are not checked.
+
+    Returns:
+        ({kind: revision checked}, {field: {unknown name: suggestions}})
+    """
+    revisions: Dict[str, str] = {}
+    unknown: Dict[str, Dict[str, List[str]]] = {}
+    for field, (kind, names) in checks.items():
+        cached = cached_name_index(owner, kind)
+        if cached is None:
+            continue
+        revisions[kind], index = cached
+        missing = {name: index.suggest(name) for name in names if name not in index}
+        if missing:
+            unknown[field] = missing
+    return revisions, unknown
+
+
+def describe_unknown(unknown: Dict[str, Dict[str, List[str]]]) -> str:
+    """Unknown names as text, e.g. srcaddr 'web1' (did you mean 'web-1'?)"""
+    parts = []
+    for field, names in unknown.items():
+        for name, suggestions in names.items():
+            hint = ", ".join(f"'{s}'" for s in suggestions)
+            parts.append(
+                f"{field} '{name}'" + (f" (did you mean {hint}?)" if hint else "")
+            )
+    return "; ".join(parts)
@@ -0,0 +1,243 @@
+"""
+Reverse-reference index of CMDB objects and cascade delete plans
+"""
+
+import threading
+from collections import OrderedDict
+from typing import Any, Dict, Iterable, List, NamedTuple, Optional, Set, Tuple
+from urllib.parse import quote
+
+from .cmdb_cache import TABLES
+
+# Tables whose objects share one name space: addresses, address groups,
+# VIPs and VIP groups can all be used where an address is expected
+NAMESPACES = {
+    "addresses": "address",
+    "address-groups": "address",
+    "vips": "address",
+    "vip-groups": "address",
+    "services": "service",
+    "service-groups": "service",
+}
+# Reference fields per table: field -> (name space referenced, multi-valued)
+REFERENCE_FIELDS: Dict[str, Dict[str, Tuple[str, bool]]] = {
+    "address-groups": {
+        "member": ("address", True),
+        "exclude-member": ("address", True),
+    },
+    "service-groups": {"member": ("service", True)},
+    "vip-groups": {"member": ("address", True)},
+    "vips": {
+        "mapped-addr": ("address", False),
+        "service": ("service", True),
+    },
+    "policies": {
+        "srcaddr": ("address", True),
+        "dstaddr": ("address", True),
+        "service": ("service", True),
+    },
+}
+# Places FortiOS also accepts names of a name space that the index does not
+# read; an object missing from the index may still be used there
+UNCHECKED_REFERRERS = {
+    "address": [
+        "central SNAT",
+        "proxy policies",
+        "shaping policies",
+        "local-in policies",
+        "DoS policies",
+        "multicast policies",
+        "IPsec phase 2 selectors",
+        "SD-WAN rules",
+    ],
+    "service": [
+        "proxy policies",
+        "shaping policies",
+        "local-in policies",
+        "SD-WAN rules",
+    ],
+}
+# Tables read to build the index
+INDEXED_TABLES = [t for t in TABLES if t in NAMESPACES or t in REFERENCE_FIELDS]
+# Reference lists that may be left empty
+OPTIONAL_FIELDS = {("address-groups", "exclude-member"), ("vips", "service")}
+# Built indexes kept (one per device and config revision)
+MAX_CACHED_INDEXES = 64
+
+# (table, name)
+ObjectKey = Tuple[str, str]
+
+
+class Reference(NamedTuple):
+    """A field of an object that names another object"""
+
+    table: str
+    name: str
+    field: str
+
+
+def object_key(table: str, record: Dict[str, Any]) -> Optional[str]:
+    """Name of a record as used in its URL (policies go by policy ID)"""
+    key = record.get("policyid") if table == "policies" else record.get("name")
+    return None if key is None or key == "" else str(key)
+
+
+def _referenced(value: Any) -> List[str]:
+    """Names in a reference field: a list of {"name": ...} or a plain string"""
+    if isinstance(value, list):
+        return [m["name"] for m in value if isinstance(m, dict) and m.get("name")]
+    if isinstance(value, str) and value:
+        return [value]
+    return []
+
+
+def object_endpoint(table: str, name: str) -> str:
+    """CMDB endpoint of one object"""
+    return f"{TABLES[table]}/{quote(name, safe='')}"
+
+
+class ReferenceIndex:
+    """
+    Which groups, VIPs and firewall policies use each object, built in one pass.
+
+    Objects are indexed by name space and name, since FortiOS resolves
+    references by name alone: a policy's dstaddr may name an address, an
+    address group or a VIP.
+    """
+
+    def __init__(self, tables: Dict[str, Iterable[Dict[str, Any]]]):
+        self._defined: Dict[Tuple[str, str], List[str]] = {}
+        self._referrers: Dict[Tuple[str, str], List[Reference]] = {}
+        self._values: Dict[Tuple[str, str, str], List[str]] = {}
+        for table, records in tables.items():
+            fields = REFERENCE_FIELDS.get(table, {})
+            for record in records:
+                name = object_key(table, record) if isinstance(record, dict) else None
+                if name is None:
+                    continue
+                namespace = NAMESPACES.get(table, table)
+                self._defined.setdefault((namespace, name), []).append(table)
+                for field, (namespace, _) in fields.items():
+                    names = _referenced(record.get(field))
+                    if not names:
+                        continue
+                    self._values[(table, name, field)] = names
+                    for target in dict.fromkeys(names):
+                        self._referrers.setdefault((namespace, target), []).append(
+                            Reference(table, name, field)
+                        )
+
+    def exists(self, table: str, name: str) -> bool:
+        """Whether an object of the table is defined"""
+        return table in self._defined.get((NAMESPACES.get(table, table), name), [])
+
+    def referrers(self, table: str, name: str) -> List[Reference]:
+        """Objects that reference an object directly (nothing references policies)"""
+        if table not in NAMESPACES:
+            return []
+        return list(self._referrers.get((NAMESPACES[table], name), []))
+
+    @staticmethod
+    def unchecked(table: str) -> List[str]:
+        """Places that may use an object of the table but are not indexed"""
+        return list(UNCHECKED_REFERRERS.get(NAMESPACES.get(table, ""), []))
+
+    def cascade_plan(self, table: str, name: str) -> List[Dict[str, Any]]:
+        """
+        Ordered steps that make an object deletable, ending with its delete.
+
+        A reference is detached by rewriting the referrer's list without
+        the object. When that would leave a required list empty (a group's
+        last member, a policy's last source), or the reference is a single
+        value, the referrer has to go too and is planned the same way
+        first. Detach steps come first, then deletes, referrers before the
+        objects they reference.
+
+        Returns:
+            Steps: {"action": "detach", "table", "name", "field", "remove",
+            "method": "PUT", "endpoint", "data"} or {"action": "delete",
+            "table", "name", "method": "DELETE", "endpoint"}
+        """
+        deletes: List[ObjectKey] = []
+        deleting: Set[ObjectKey] = set()
+        edits: "OrderedDict[Tuple[str, str, str], List[str]]" = OrderedDict()
+
+        def plan(table: str, name: str) -> None:
+            deleting.add((table, name))
+            for ref in self.referrers(table, name):
+                if (ref.table, ref.name) in deleting:
+                    continue
+                key = (ref.table, ref.name, ref.field)
+                current = edits.get(key, self._values[key])
+                remaining = [member for member in current if member != name]
+                multi = REFERENCE_FIELDS[ref.table][ref.field][1]
+                if multi and (remaining or (ref.table, ref.field) in OPTIONAL_FIELDS):
+                    edits[key] = remaining
+                else:
+                    plan(ref.table, ref.name)
+            deletes.append((table, name))
+
+        plan(table, name)
+        steps: List[Dict[str, Any]] = []
+        for (ref_table, ref_name, field), remaining in edits.items():
+            if (ref_table, ref_name) in deleting:
+                continue
+            removed = [
+                m
+                for m in self._values[(ref_table, ref_name, field)]
+                if m not in remaining
+            ]
+            steps.append(
+                {
+                    "action": "detach",
+                    "table": ref_table,
+                    "name": ref_name,
+                    "field": field,
+                    "remove": removed,
+                    "method": "PUT",
+                    "endpoint": object_endpoint(ref_table, ref_name),
+                    "data": {field: [{"name": member} for member in remaining]},
+                }
+            )
+        for del_table, del_name in deletes:
+            steps.append(
+                {
+                    "action": "delete",
+                    "table": del_table,
+                    "name": del_name,
+                    "method": "DELETE",
+                    "endpoint": object_endpoint(del_table, del_name),
+                }
+            )
+        return steps
+
+
+class ReferenceIndexCache:
+    """Thread-safe LRU of built indexes keyed by owner and config revision"""
+
+    def __init__(self, max_indexes: int = MAX_CACHED_INDEXES):
+        self.max_indexes = max_indexes
+        self._lock = threading.Lock()
+        self._indexes: "OrderedDict[Tuple[str, str], ReferenceIndex]" = OrderedDict()
+
+    def get(self, key: Tuple[str, str]) -> Optional[ReferenceIndex]:
+        with self._lock:
+            index = self._indexes.get(key)
+            if index is not None:
+                self._indexes.move_to_end(key)
+            return index
+
+    def put(self, key: Tuple[str, str], index: ReferenceIndex) -> None:
+        with self._lock:
+            self._indexes[key] = index
+            self._indexes.move_to_end(key)
+            while len(self._indexes) > self.max_indexes:
+                self._indexes.popitem(last=False)
+
+    def clear(self) -> None:
+        with self._lock:
+            self._indexes.clear()
+
+
+# Reference indexes built by find_references, cascade_plan and the deletes
+REFERENCE_INDEXES = ReferenceIndexCache()
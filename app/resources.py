@@ -0,0 +1,258 @@
+"""
+CMDB tables of registered FortiGates exposed as MCP resources
+"""
+
+import base64
+import binascii
+import json
+import logging
+import weakref
+from typing import Any, Dict, List, Optional, Tuple
+from urllib.parse import parse_qs, urlsplit
+
+from pydantic import AnyUrl
+
+from .cmdb_cache import CMDB_CACHE, TABLES
+from .devices import DEVICES, Device
+from .fortios_client import CancelToken
+from .tools import REVISION_PROBE_PARAMS, FortiOSTools
+
+logger = logging.getLogger(__name__)
+
+RESOURCE_SCHEME = "fortios"
+# Records per resource page
+DEFAULT_PAGE_SIZE = 500
+# Resources per resources/list page
+DEFAULT_LIST_PAGE_SIZE = 50
+
+
+def table_uri(device: str, table: str) -> str:
+    """Resource URI of a table"""
+    return f"{RESOURCE_SCHEME}://{device}/{table}"
+
+
+def parse_table_uri(uri: str) -> Tuple[str, str, Optional[str]]:
+    """
+    Split a table resource URI into (device, table, cursor).
+
+    Raises:
+        ValueError: If the URI does not name a known table
+    """
+    parts = urlsplit(uri)
+    table = parts.path.strip("/")
+    if parts.scheme != RESOURCE_SCHEME or not parts.netloc or table not in TABLES:
+        raise ValueError(f"Unknown resource: {uri}")
+    cursor = parse_qs(parts.query).get("cursor", [None])[0]
+    return parts.netloc, table, cursor
+
+
+def encode_cursor(position: Dict[str, Any]) -> str:
+    """Opaque cursor for a position"""
+    data = json.dumps(position, separators=(",", ":")).encode()
+    return base64.urlsafe_b64encode(data).decode().rstrip("=")
+
+
+def decode_cursor(cursor: str) -> Dict[str, Any]:
+    """
+    Position encoded in a cursor.
+
+    Raises:
+        ValueError: If the cursor was not issued by this server
+    """
+    try:
+        data = base64.urlsafe_b64decode(cursor + "=" * (-len(cursor) % 4))
+        position = json.loads(data)
+    except (binascii.Error, ValueError):
+        raise ValueError("Invalid cursor")
+    if not isinstance(position, dict) or not isinstance(position.get("o"), int):
+        raise ValueError("Invalid cursor")
+    return position
+
+
+def list_table_resources(
+    cursor: Optional[str] = None,
+    page_size: int = DEFAULT_LIST_PAGE_SIZE,
+    scope: str = "",
+) -> Tuple[List[Dict[str, Any]], Optional[str]]:
+    """
+    One page of the table resources of the devices registered in a scope.
+
+    Returns:
+        (resource descriptions, cursor of the next page or None)
+    """
+    offset = decode_cursor(cursor)["o"] if cursor else 0
+    entries = [(device, table) for device in DEVICES.all(scope) for table in TABLES]
+    end = offset + page_size
+    resources = [
+        {
+            "uri": table_uri(device.name, table),
+            "name": f"{device.name}/{table}",
+            "description": f"{TABLES[table]} of {device.name} (vdom {device.vdom})",
+            "mimeType": "application/json",
+        }
+        for device, table in entries[offset:end]
+    ]
+    next_cursor = encode_cursor({"o": end}) if end < len(entries) else None
+    return resources, next_cursor
+
+
+def _device(name: str, scope: str = "") -> Device:
+    device = DEVICES.get(name, scope)
+    if device is None:
+        raise ValueError(f"FortiGate '{name}' is not registered")
+    return device
+
+
+def read_table_resource(
+    uri: str,
+    page_size: int = DEFAULT_PAGE_SIZE,
+    scope: str = "",
+    deadline: Optional[float] = None,
+    cancel_token: Optional[CancelToken] = None,
+) -> Dict[str, Any]:
+    """
+    Read one page of a table resource of a device registered in a scope.
+
+    Pages are served from the shared CMDB cache. Cursors are tied to the
+    config revision they were issued at, so a client never stitches pages
+    of two different versions of a table together.
+
+    Raises:
+        ValueError: If the URI or cursor is invalid, the device is not
+            registered in the scope, the table changed since the cursor was
+            issued, or the read failed
+    """
+    name, table, cursor = parse_table_uri(uri)
+    device = _device(name, scope)
+    client = FortiOSTools.create_client(
+        device.url, device.token, device.vdom, deadline, cancel_token
+    )
+    result = FortiOSTools.read_cached_table(client, device.owner, TABLES[table])
+    if result.get("http_status") != 200:
+        raise ValueError(
+            f"Could not read {table} from {name}: "
+            f"{result.get('message') or result.get('http_status')}"
+        )
+
+    revision = result.get("revision")
+    offset = 0
+    if cursor:
+        position = decode_cursor(cursor)
+        if position.get("r") != revision:
+            raise ValueError(
+                "The table changed since this cursor was issued; "
+                "read it again from the first page"
+            )
+        offset = position["o"]
+
+    records = result.get("results", [])
+    end = offset + page_size
+    page: Dict[str, Any] = {
+        "uri": table_uri(name, table),
+        "revision": revision,
+        "total": len(records),
+        "offset": offset,
+        "results": records[offset:end],
+    }
+    if end < len(records):
+        next_cursor = encode_cursor({"r": revision, "o": end})
+        page["nextCursor"] = next_cursor
+        page["nextUri"] = f"{page['uri']}?cursor={next_cursor}"
+    return page
+
+
+def probe_revision(
+    device: Device, table: str, deadline: Optional[float] = None
+) -> Optional[str]:
+    """Current config revision reported for a device table (None if unavailable)"""
+    client = FortiOSTools.create_client(device.url, device.token, device.vdom, deadline)
+    result = client.get(TABLES[table], params=REVISION_PROBE_PARAMS)
+    if result.get("http_status") != 200:
+        return None
+    return result.get("revision")
+
+
+def refresh_table(
+    device: Device, table: str, deadline: Optional[float] = None
+) -> Optional[bool]:
+    """
+    Download a device table into the CMDB cache.
+
+    Returns:
+        Whether the records differ from the previously cached copy (True if
+        there was none), or None if the table could not be read
+    """
+    endpoint = TABLES[table]
+    previous = CMDB_CACHE.get((device.owner, endpoint))
+    client = FortiOSTools.create_client(device.url, device.token, device.vdom, deadline)
+    result = FortiOSTools.refresh_cached_table(client, device.owner, endpoint)
+    if result.get("http_status") != 200:
+        return None
+    return previous is None or previous.records != result.get("results")
+
+
+class SubscriptionRegistry:
+    """
+    MCP sessions subscribed to each table resource.
+
+    Subscriptions are kept per device scope, so a session only hears about
+    the devices of its own scope. Sessions are held weakly, so a client
+    that goes away without unsubscribing is dropped with its session. Only
+    used from the event loop, so no locking is needed.
+    """
+
+    def __init__(self):
+        self._subscribers: Dict[Tuple[str, str], "weakref.WeakSet[Any]"] = {}
+
+    @staticmethod
+    def _key(uri: str, scope: str) -> Tuple[str, str]:
+        name, table, _ = parse_table_uri(uri)
+        return scope, table_uri(name, table)
+
+    def subscribe(self, uri: str, session: Any, scope: str = "") -> None:
+        """
+        Subscribe a session to a table (any page URI of it).
+
+        Raises:
+            ValueError: If the URI is invalid or the device is not
+                registered in the scope
+        """
+        name, table, _ = parse_table_uri(uri)
+        _device(name, scope)
+        key = scope, table_uri(name, table)
+        self._subscribers.setdefault(key, weakref.WeakSet()).add(session)
+
+    def unsubscribe(self, uri: str, session: Any, scope: str = "") -> None:
+        """Remove a session's subscription"""
+        sessions = self._subscribers.get(self._key(uri, scope))
+        if sessions is not None:
+            sessions.discard(session)
+
+    def uris(self) -> List[str]:
+        """Table URIs that still have subscribers"""
+        for key in [key for key, sessions in self._subscribers.items() if not sessions]:
+            del self._subscribers[key]
+        return sorted({uri for _, uri in self._subscribers})
+
+    async def notify(self, uri: str, scope: str = "") -> int:
+        """Send resources/updated for a table to the subscribers of a scope; returns how many were sent"""
+        sessions = self._subscribers.get((scope, uri))
+        if sessions is None:
+            return 0
+        sent = 0
+        for session in list(sessions):
+            try:
+                await session.send_resource_updated(AnyUrl(uri))
+                sent += 1
+            except Exception as e:
+                logger.info(f"Dropping subscriber of {uri}: {e}")
+                sessions.discard(session)
+        return sent
+
+    def clear(self) -> None:
+        """Drop all subscriptions"""
+        self._subscribers.clear()
+
+
+# Resource subscriptions of all connected MCP sessions
+SUBSCRIPTIONS = SubscriptionRegistry()
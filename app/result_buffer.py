@@ -0,0 +1,185 @@
+"""
+Size-limited tool results with server-side continuation
+"""
+
+import hashlib
+import secrets
+import threading
+import time
+from collections import OrderedDict
+from typing import Any, Callable, Dict, List, NamedTuple, Optional, Tuple
+
+from .encoding import encoded_size
+
+# Default budgets for the records of one tool result
+DEFAULT_MAX_RESULT_BYTES = 256 * 1024
+DEFAULT_MAX_RESULT_RECORDS = 1000
+# Default budget for a raw body passed through undecoded; larger bodies are
+# decoded and paged like JSON output
+DEFAULT_MAX_RAW_BYTES = 8 * 1024 * 1024
+# Encoded bytes of records a streamed table read keeps (the page plus what is
+# buffered for continuation); the rest of the table is not read
+DEFAULT_MAX_STREAMED_BYTES = 32 * 1024 * 1024
+# Seconds a continuation token stays valid after it was issued
+DEFAULT_CONTINUATION_TTL = 300.0
+# Maximum number of buffered results; the least recently used go first
+DEFAULT_MAX_BUFFERED_RESULTS = 64
+
+
+def owner_key(url: str, token: str, vdom: str) -> str:
+    """Identify the caller a buffered result belongs to without storing the token"""
+    return hashlib.sha256("\0".join((url, vdom, token)).encode()).hexdigest()
+
+
+def split_records(
+    records: List[Any],
+    max_bytes: int,
+    max_records: int,
+    size: Callable[[Any], int] = encoded_size,
+) -> int:
+    """
+    Number of leading records that fit both budgets.
+
+    At least one record is always included so every page makes progress,
+    even if that record alone is over the byte budget.
+    """
+    used = 0
+    for count, record in enumerate(records):
+        if count >= max_records:
+            return count
+        used += size(record)
+        if count and used > max_bytes:
+            return count
+    return len(records)
+
+
+class Page(NamedTuple):
+    """One chunk of a result and what is left of it"""
+
+    records: List[Any]
+    context: Dict[str, Any]
+    continuation_token: Optional[str]
+    remaining: int
+
+
+class _Entry(NamedTuple):
+    owner: str
+    records: List[Any]
+    context: Dict[str, Any]
+    size: Callable[[Any], int]
+    expires: float
+
+
+class ResultBuffer:
+    """
+    Short-lived, thread-safe store of the records left over from tool results.
+
+    A result over budget is cut at a record boundary. The rest is kept under
+    a random continuation token bound to the caller; each continuation serves
+    the next chunk and re-issues a fresh token for what remains.
+    """
+
+    def __init__(
+        self,
+        ttl: float = DEFAULT_CONTINUATION_TTL,
+        max_entries: int = DEFAULT_MAX_BUFFERED_RESULTS,
+    ):
+        self.ttl = ttl
+        self.max_entries = max_entries
+        self._lock = threading.Lock()
+        self._entries: "OrderedDict[str, _Entry]" = OrderedDict()
+
+    def _expire(self, now: float) -> None:
+        for token in [t for t, e in self._entries.items() if e.expires <= now]:
+            del self._entries[token]
+
+    def _store(
+        self,
+        owner: str,
+        records: List[Any],
+        context: Dict[str, Any],
+        size: Callable[[Any], int],
+    ) -> str:
+        token = secrets.token_urlsafe(16)
+        now = time.monotonic()
+        with self._lock:
+            self._expire(now)
+            self._entries[token] = _Entry(owner, records, context, size, now + self.ttl)
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+        return token
+
+    def paginate(
+        self,
+        records: List[Any],
+        owner: str,
+        context: Dict[str, Any],
+        max_bytes: int,
+        max_records: int,
+        size: Callable[[Any], int] = encoded_size,
+    ) -> Page:
+        """
+        Cut records to the budgets, buffering the rest.
+
+        Args:
+            records: All records of the result
+            owner: owner_key() of the caller allowed to continue the result
+            context: Whatever is needed to rebuild later pages (e.g. message,
+                upstream metadata); returned unchanged with every page
+            max_bytes: Budget for the summed encoded size of the records
+            max_records: Budget for the number of records
+            size: Encoded size of one record, also used for later pages
+        """
+        count = split_records(records, max_bytes, max_records, size)
+        if count >= len(records):
+            return Page(records, context, None, 0)
+        rest = records[count:]
+        token = self._store(owner, rest, context, size)
+        return Page(records[:count], context, token, len(rest))
+
+    def resume(
+        self,
+        token: str,
+        owner: str,
+        max_bytes: int,
+        max_records: int,
+    ) -> Optional[Page]:
+        """
+        Serve the next chunk of a buffered result.
+
+        Tokens are single use. Returns None if the token is unknown, expired
+        or belongs to another caller.
+        """
+        with self._lock:
+            self._expire(time.monotonic())
+            entry = self._entries.get(token)
+            if entry is None or not secrets.compare_digest(entry.owner, owner):
+                return None
+            del self._entries[token]
+        return self.paginate(
+            entry.records, owner, entry.context, max_bytes, max_records, entry.size
+        )
+
+    def clear(self) -> None:
+        """Drop all buffered results"""
+        with self._lock:
+            self._entries.clear()
+
+
+def resolve_budget(
+    max_bytes: Optional[int] = None, max_records: Optional[int] = None
+) -> Tuple[int, int]:
+    """Resolve caller budgets, inheriting the defaults for unset (<= 0) values"""
+    return (
+        max_bytes if max_bytes and max_bytes > 0 else DEFAULT_MAX_RESULT_BYTES,
+        max_records if max_records and max_records > 0 else DEFAULT_MAX_RESULT_RECORDS,
+    )
+
+
+def resolve_raw_budget(max_bytes: Optional[int] = None) -> int:
+    """Byte budget of raw output: the caller's, else DEFAULT_MAX_RAW_BYTES"""
+    return max_bytes if max_bytes and max_bytes > 0 else DEFAULT_MAX_RAW_BYTES
+
+
+# Results waiting to be continued, shared by all tool calls
+RESULT_BUFFER = ResultBuffer()
@@ -0,0 +1,190 @@
+"""
+Longest-prefix-match lookups over a cached copy of the routing table
+"""
+
+import ipaddress
+import threading
+import time
+from array import array
+from collections import OrderedDict
+from typing import Any, Dict, Iterable, List, Optional, Tuple
+
+# Active routes per IP version
+ROUTE_ENDPOINTS = {4: "monitor/router/ipv4", 6: "monitor/router/ipv6"}
+# Route counts per type: changes when dynamic routing adds or drops routes
+ROUTE_STATISTICS_ENDPOINT = "monitor/router/statistics"
+# Probed for the configuration revision, which moves on static route edits
+ROUTE_CONFIG_ENDPOINT = "cmdb/router/static"
+# Route tables are read again after this many seconds even when nothing
+# seems to have changed (a dynamic route may change next hop only)
+ROUTE_TABLE_MAX_AGE = 300.0
+# Cached route tables (one per device and IP version); least recently used go first
+MAX_CACHED_ROUTE_TABLES = 256
+# Route fields returned with a lookup
+ROUTE_FIELDS = ("type", "gateway", "interface", "distance", "metric", "priority")
+
+
+class PrefixTrie:
+    """
+    Binary trie of IP prefixes for longest-prefix match.
+
+    Nodes live in three array('l') columns (zero child, one child, value
+    slot) rather than as objects, so a table of many thousands of routes
+    costs a few machine words per node. A lookup walks at most one node
+    per address bit.
+    """
+
+    def __init__(self, bits: int):
+        self.bits = bits
+        self._zero = array("l", [0])
+        self._one = array("l", [0])
+        self._slot = array("l", [-1])
+        self.values: List[Any] = []
+
+    def _child(self, node: int, bit: int) -> int:
+        children = self._one if bit else self._zero
+        child = children[node]
+        if not child:
+            child = children[node] = len(self._slot)
+            self._zero.append(0)
+            self._one.append(0)
+            self._slot.append(-1)
+        return child
+
+    def setdefault(self, network: int, prefixlen: int, default: Any) -> Any:
+        """Value stored for a prefix, storing default first if there is none"""
+        node = 0
+        for shift in range(self.bits - 1, self.bits - 1 - prefixlen, -1):
+            node = self._child(node, (network >> shift) & 1)
+        if self._slot[node] < 0:
+            self._slot[node] = len(self.values)
+            self.values.append(default)
+        return self.values[self._slot[node]]
+
+    def lookup(self, address: int) -> Tuple[int, Any]:
+        """(prefix length, value) of the longest prefix holding address, or (-1, None)"""
+        node, depth = 0, 0
+        best: Tuple[int, Any] = (-1, None)
+        while True:
+            if self._slot[node] >= 0:
+                best = (depth, self.values[self._slot[node]])
+            if depth == self.bits:
+                return best
+            bit = (address >> (self.bits - 1 - depth)) & 1
+            node = (self._one if bit else self._zero)[node]
+            if not node:
+                return best
+            depth += 1
+
+
+def _int(value: Any) -> int:
+    return value if isinstance(value, int) else 0
+
+
+def _preference(route: Dict[str, Any]) -> Tuple[int, int, int]:
+    """Sort key of routes to one prefix: the best route sorts first"""
+    return (
+        _int(route.get("distance")),
+        _int(route.get("priority")),
+        _int(route.get("metric")),
+    )
+
+
+class RouteTable:
+    """
+    Routes of one IP version of a device, one trie per VRF.
+
+    fingerprint identifies the routing state the table was read at; the
+    table is trusted while the device still reports the same fingerprint
+    and it is younger than ROUTE_TABLE_MAX_AGE.
+    """
+
+    def __init__(self, version: int, fingerprint: Any = None):
+        self.version = version
+        self.fingerprint = fingerprint
+        self.fetched_at = time.monotonic()
+        self.routes = 0
+        self._tries: Dict[int, PrefixTrie] = {}
+
+    def add(self, record: Dict[str, Any]) -> None:
+        """Add a route of the routing table monitor (others are ignored)"""
+        try:
+            network = ipaddress.ip_network(record.get("ip_mask", ""), strict=False)
+        except ValueError:
+            return
+        if network.version != self.version:
+            return
+        vrf = _int(record.get("vrf"))
+        trie = self._tries.get(vrf)
+        if trie is None:
+            trie = self._tries[vrf] = PrefixTrie(network.max_prefixlen)
+        routes = trie.setdefault(int(network.network_address), network.prefixlen, [])
+        routes.append({field: record.get(field) for field in ROUTE_FIELDS})
+        routes.sort(key=_preference)
+        self.routes += 1
+
+    @classmethod
+    def from_records(
+        cls, version: int, records: Iterable[Any], fingerprint: Any = None
+    ) -> "RouteTable":
+        table = cls(version, fingerprint)
+        for record in records:
+            if isinstance(record, dict):
+                table.add(record)
+        return table
+
+    def lookup(self, ip: str, vrf: int = 0) -> Dict[str, Any]:
+        """
+        Route used for an IP: the longest matching prefix and its best routes.
+
+        Routes to the same prefix with the best distance and priority are
+        all returned (ECMP).
+        """
+        address = ipaddress.ip_address(ip)
+        trie = self._tries.get(vrf)
+        prefixlen, routes = trie.lookup(int(address)) if trie else (-1, None)
+        if not routes:
+            return {"ip": ip, "prefix": None, "routes": []}
+        network = ipaddress.ip_network(f"{address}/{prefixlen}", strict=False)
+        best = _preference(routes[0])[:2]
+        return {
+            "ip": ip,
+            "prefix": str(network),
+            "routes": [route for route in routes if _preference(route)[:2] == best],
+        }
+
+    def current(self, fingerprint: Any) -> bool:
+        """Whether the table still matches the device's routing state"""
+        age = time.monotonic() - self.fetched_at
+        return fingerprint == self.fingerprint and age < ROUTE_TABLE_MAX_AGE
+
+
+class RouteTableCache:
+    """Thread-safe LRU of route tables keyed by (owner_key, IP version)"""
+
+    def __init__(self, max_tables: int = MAX_CACHED_ROUTE_TABLES):
+        self.max_tables = max_tables
+        self._lock = threading.Lock()
+        self._tables: "OrderedDict[Tuple[str, int], RouteTable]" = OrderedDict()
+
+    def get(self, owner: str, version: int) -> Optional[RouteTable]:
+        with self._lock:
+            table = self._tables.get((owner, version))
+            if table is not None:
+                self._tables.move_to_end((owner, version))
+            return table
+
+    def put(self, owner: str, table: RouteTable) -> None:
+        with self._lock:
+            self._tables[(owner, table.version)] = table
+            self._tables.move_to_end((owner, table.version))
+            while len(self._tables) > self.max_tables:
+                self._tables.popitem(last=False)
+
+    def clear(self) -> None:
+        with self._lock:
+            self._tables.clear()
+
+
+# Route tables read by lookup_routes
+ROUTE_TABLES = RouteTableCache()
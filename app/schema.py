@@ -0,0 +1,216 @@
+"""
+CMDB schemas compiled into validators, cached per firmware build
+"""
+
+import ipaddress
+import threading
+from collections import OrderedDict
+from typing import Any, Callable, Dict, List, Optional, Tuple
+
+# Query parameters that return a table's schema instead of its records
+SCHEMA_PARAMS = {"action": "schema"}
+# Compiled schemas kept (one per firmware build and table)
+MAX_CACHED_SCHEMAS = 256
+# Devices whose firmware build is remembered
+MAX_TRACKED_DEVICES = 1024
+# Schema types holding text limited by "size"
+TEXT_TYPES = {"string", "var-string", "password", "user"}
+IPV4_TYPES = {"ipv4-address", "ipv4-address-any", "ipv4-address-multicast"}
+
+# A compiled field check: value -> problem, or None when the value is valid
+Check = Callable[[Any], Optional[str]]
+
+
+def firmware_of(result: Dict[str, Any]) -> Optional[str]:
+    """Firmware build from the version fields of any API response"""
+    version = result.get("version")
+    if not version:
+        return None
+    build = result.get("build")
+    return f"{version} build {build}" if build is not None else str(version)
+
+
+def _scalar(value: Any) -> Any:
+    """The value of a field, unwrapping {"q_origin_key": ...} and {"name": ...}"""
+    if isinstance(value, dict):
+        for key in ("q_origin_key", "name"):
+            if key in value:
+                return value[key]
+    return value
+
+
+def _option_check(spec: Dict[str, Any]) -> Optional[Check]:
+    options = {o.get("name") for o in spec.get("options") or [] if o.get("name")}
+    if not options:
+        return None
+    multiple = bool(spec.get("multiple_values"))
+    listed = ", ".join(sorted(options))
+
+    def check(value: Any) -> Optional[str]:
+        values = str(value).split() if multiple else [str(value)]
+        bad = [v for v in values if v not in options]
+        if bad or not values:
+            return f"'{value}' is not one of {listed}"
+        return None
+
+    return check
+
+
+def _integer_check(spec: Dict[str, Any]) -> Check:
+    low, high = spec.get("min-value"), spec.get("max-value")
+
+    def check(value: Any) -> Optional[str]:
+        if isinstance(value, bool):
+            return f"'{value}' is not an integer"
+        try:
+            number = int(value)
+        except (TypeError, ValueError):
+            return f"'{value}' is not an integer"
+        if low is not None and number < low:
+            return f"{number} is below {low}"
+        if high is not None and number > high:
+            return f"{number} is above {high}"
+        return None
+
+    return check
+
+
+def _text_check(spec: Dict[str, Any]) -> Optional[Check]:
+    size = spec.get("size")
+    if not size:
+        return None
+
+    def check(value: Any) -> Optional[str]:
+        if len(str(value)) > size:
+            return f"longer than {size} characters"
+        return None
+
+    return check
+
+
+def _ipv4_check(value: Any) -> Optional[str]:
+    try:
+        ipaddress.IPv4Address(str(value))
+    except ValueError:
+        return f"'{value}' is not an IPv4 address"
+    return None
+
+
+def compile_field(spec: Dict[str, Any]) -> Optional[Check]:
+    """Check for one unitary field, or None when its type is not checked locally"""
+    kind = spec.get("type")
+    if kind == "option":
+        return _option_check(spec)
+    if kind == "integer":
+        return _integer_check(spec)
+    if kind in TEXT_TYPES:
+        return _text_check(spec)
+    if kind in IPV4_TYPES:
+        return _ipv4_check
+    return None
+
+
+class TableSchema:
+    """
+    Validator compiled from a table's schema.
+
+    Unitary fields get one check each; sub-tables (member lists and the
+    like) get a nested schema applied to every entry.
+    """
+
+    def __init__(self, children: Dict[str, Dict[str, Any]]):
+        self.checks: Dict[str, Optional[Check]] = {}
+        self.tables: Dict[str, "TableSchema"] = {}
+        for name, spec in children.items():
+            if not isinstance(spec, dict):
+                continue
+            if spec.get("category") == "table":
+                self.tables[name] = TableSchema(spec.get("children") or {})
+            else:
+                self.checks[name] = compile_field(spec)
+
+    @classmethod
+    def from_results(cls, results: Dict[str, Any]) -> "TableSchema":
+        """Build from the results of a ?action=schema read"""
+        return cls(results.get("children") or {})
+
+    def errors(self, data: Dict[str, Any], path: str = "") -> List[str]:
+        """Problems with a request body, as "field: problem" (empty when valid)"""
+        problems = []
+        for field, value in data.items():
+            where = f"{path}{field}"
+            if field.startswith("q_"):
+                continue
+            if field in self.tables:
+                if not isinstance(value, list):
+                    problems.append(f"{where}: expected a list")
+                    continue
+                for i, entry in enumerate(value):
+                    if isinstance(entry, dict):
+                        problems.extend(
+                            self.tables[field].errors(entry, f"{where}[{i}].")
+                        )
+                    else:
+                        problems.append(f"{where}[{i}]: expected an object")
+            elif field in self.checks:
+                check = self.checks[field]
+                problem = check(_scalar(value)) if check is not None else None
+                if problem:
+                    problems.append(f"{where}: {problem}")
+            else:
+                problems.append(f"{where}: unknown field")
+        return problems
+
+
+class SchemaCache:
+    """
+    Thread-safe LRU of compiled schemas keyed by firmware build and endpoint.
+
+    Also remembers each device's firmware build, so a device's schemas are
+    found without a request and a firmware upgrade switches to new ones.
+    """
+
+    def __init__(
+        self,
+        max_schemas: int = MAX_CACHED_SCHEMAS,
+        max_devices: int = MAX_TRACKED_DEVICES,
+    ):
+        self.max_schemas = max_schemas
+        self.max_devices = max_devices
+        self._lock = threading.Lock()
+        self._schemas: "OrderedDict[Tuple[str, str], TableSchema]" = OrderedDict()
+        self._firmware: "OrderedDict[str, str]" = OrderedDict()
+
+    def get(self, key: Tuple[str, str]) -> Optional[TableSchema]:
+        with self._lock:
+            schema = self._schemas.get(key)
+            if schema is not None:
+                self._schemas.move_to_end(key)
+            return schema
+
+    def put(self, key: Tuple[str, str], schema: TableSchema) -> None:
+        with self._lock:
+            self._schemas[key] = schema
+            self._schemas.move_to_end(key)
+            while len(self._schemas) > self.max_schemas:
+                self._schemas.popitem(last=False)
+
+    def firmware(self, owner: str) -> Optional[str]:
+        with self._lock:
+            return self._firmware.get(owner)
+
+    def set_firmware(self, owner: str, firmware: str) -> None:
+        with self._lock:
+            self._firmware[owner] = firmware
+            self._firmware.move_to_end(owner)
+            while len(self._firmware) > self.max_devices:
+                self._firmware.popitem(last=False)
+
+    def clear(self) -> None:
+        with self._lock:
+            self._schemas.clear()
+            self._firmware.clear()
+
+
+# Schemas used to validate writes before they are sent
+SCHEMAS = SchemaCache()
@@ -5,16 +5,35 @@ Run with:
     uvicorn app.server:app --host 0.0.0.0 --port 8000
 """
 
-import json
+import asyncio
+import contextlib
+import functools
 import logging
 from contextlib import asynccontextmanager
+from typing import Any, Callable, Dict, List
 
+import anyio
+from mcp import types
 from mcp.server.fastmcp import FastMCP
+from mcp.server.lowlevel.helper_types import ReadResourceContents
+from pydantic import AnyUrl
 from starlette.applications import Starlette
 from starlette.responses import JSONResponse
 from starlette.routing import Mount, Route
 
-from .tools import FortiOSTools
+from .devices import session_scope
+from .encoding import dumps_result
+from .fortios_client import CancelToken
+from .metrics import SAMPLER, query_metric
+from .poller import POLLER
+from .resources import (
+    RESOURCE_SCHEME,
+    SUBSCRIPTIONS,
+    TABLES,
+    list_table_resources,
+    read_table_resource,
+)
+from .tools import DEFAULT_BACKUP_DEADLINE, FortiOSTools, tool_deadline
 
 # Configure logging
 logging.basicConfig(level=logging.INFO)
@@ -34,13 +53,48 @@ async def health_check(request):
     return JSONResponse({"status": "healthy", "service": "mcp-fortios-server"})
 
 
+async def _run_in_thread(func: Callable[..., Any], *args: Any, **kwargs: Any) -> Any:
+    """
+    Run a blocking call that accepts a cancel_token in a worker thread.
+
+    If the MCP client cancels the request, the shared CancelToken aborts the
+    in-flight FortiGate request and any retry sleep, and the worker thread is
+    abandoned instead of holding the event loop until it finishes.
+    """
+    cancel_token = CancelToken()
+    call = functools.partial(func, *args, cancel_token=cancel_token, **kwargs)
+    try:
+        return await anyio.to_thread.run_sync(call, abandon_on_cancel=True)
+    except anyio.get_cancelled_exc_class():
+        logger.info(f"Call cancelled: {func.__name__}")
+        cancel_token.cancel()
+        raise
+
+
+async def _run_tool(
+    tool: Callable[..., Dict[str, Any]], *args: Any, **kwargs: Any
+) -> str:
+    """Run a blocking FortiOSTools call in a worker thread and encode its result"""
+    return dumps_result(await _run_in_thread(tool, *args, **kwargs))
+
+
+def _caller_scope() -> str:
+    """Device registry scope of the MCP session making the current request"""
+    return session_scope(mcp.get_context().session)
+
+
+async def _run_local(tool: Callable[..., Dict[str, Any]], *args: Any) -> str:
+    """Run a FortiOSTools call that only touches local storage in a worker thread"""
+    return dumps_result(await anyio.to_thread.run_sync(tool, *args))
+
+
 # ===============================
 # FIREWALL POLICY TOOLS
 # ===============================
 
 
 @mcp.tool()
-def create_firewall_policy(
+async def create_firewall_policy(
     name: str,
     srcintf: str,
     dstintf: str,
@@ -54,6 +108,7 @@ def create_firewall_policy(
     status: str = "enable",
     nat: str = "disable",
     logtraffic: str = "utm",
+    deadline_seconds: float = 0,
 ) -> str:
     """Create a firewall policy in FortiGate.
 
@@ -61,16 +116,18 @@ def create_firewall_policy(
         name: Policy name
         srcintf: Source interface names (comma-separated)
         dstintf: Destination interface names (comma-separated)
-        srcaddr: Source address names (comma-separated)
-        dstaddr: Destination address names (comma-separated)
+        srcaddr: Source address names, IPv4 hosts, CIDRs, ranges or fqdn:<name> (comma-separated);
+            inline values reuse a matching address object or create one
+        dstaddr: Destination address names, IPv4 hosts, CIDRs, ranges or fqdn:<name> (comma-separated)
         service: Service names (comma-separated)
         action: Policy action (accept or deny)
-        fortigate_url: FortiGate URL (e.g., https://192.168.1.99)
+        fortigate_url: FortiGate URL (e.g., https://192.168.1.99; comma-separate the addresses of an HA cluster)
         fortigate_token: FortiGate API token
         fortigate_vdom: FortiGate VDOM (default: root)
         status: Policy status (enable or disable)
         nat: NAT setting (enable or disable)
         logtraffic: Log traffic (all, utm, or disable)
+        deadline_seconds: Overall time budget for the call in seconds (0 for the server default)
     """
     # Convert comma-separated strings to lists
     srcintf_list = [s.strip() for s in srcintf.split(",")]
@@ -79,7 +136,8 @@ def create_firewall_policy(
     dstaddr_list = [s.strip() for s in dstaddr.split(",")]
     service_list = [s.strip() for s in service.split(",")]
 
-    result = FortiOSTools.create_firewall_policy(
+    return await _run_tool(
+        FortiOSTools.create_firewall_policy,
         fortigate_url,
         fortigate_token,
         fortigate_vdom,
@@ -93,30 +151,69 @@ def create_firewall_policy(
         status,
         nat,
         logtraffic,
+        deadline=tool_deadline(deadline_seconds),
     )
-    return json.dumps(result, indent=2)
 
 
 @mcp.tool()
-def get_firewall_policies(
+async def get_firewall_policies(
     fortigate_url: str,
     fortigate_token: str,
     fortigate_vdom: str = "root",
     policy_id: str = "",
+    fields: str = "",
+    filters: str = "",
+    output_format: str = "json",
+    mode: str = "records",
+    group_by: str = "",
+    top_n: int = 0,
+    max_bytes: int = 0,
+    max_records: int = 0,
+    continuation_token: str = "",
+    deadline_seconds: float = 0,
 ) -> str:
     """Get firewall policies from FortiGate.
 
     Args:
-        fortigate_url: FortiGate URL (e.g., https://192.168.1.99)
+        fortigate_url: FortiGate URL (e.g., https://192.168.1.99; comma-separate the addresses of an HA cluster)
         fortigate_token: FortiGate API token
         fortigate_vdom: FortiGate VDOM (default: root)
         policy_id: Specific policy ID to retrieve (empty for all policies)
+        fields: Field names to return (comma-separated, empty for all fields)
+        filters: Record filters applied on the server, e.g. 'type==ipmask' or 'name=@web'
+            (operators ==, !=, =@, !@, <, <=, >, >=; ',' for OR, '&' for AND)
+        output_format: 'json' (default), 'csv' for a header row plus one line per record,
+            or 'raw' to forward the FortiGate response in details without re-encoding it
+            (not combinable with fields/filters)
+        mode: 'records' (default) or 'summary' to return counts computed on the server
+        group_by: Fields to count records by in summary mode (comma-separated, e.g. 'action')
+        top_n: Number of largest groups returned in summary mode (0 for the server default)
+        max_bytes: Size budget for the returned records in bytes (0 for the server default)
+        max_records: Maximum number of records returned (0 for the server default)
+        continuation_token: Token from a truncated result, to fetch its next chunk
+        deadline_seconds: Overall time budget for the call in seconds (0 for the server default)
     """
     policy_id_param = policy_id if policy_id else None
-    result = FortiOSTools.get_firewall_policies(
-        fortigate_url, fortigate_token, fortigate_vdom, policy_id_param
+    fields_list = [f.strip() for f in fields.split(",") if f.strip()] or None
+    filters_list = [f.strip() for f in filters.split("&") if f.strip()] or None
+    group_by_list = [f.strip() for f in group_by.split(",") if f.strip()] or None
+    return await _run_tool(
+        FortiOSTools.get_firewall_policies,
+        fortigate_url,
+        fortigate_token,
+        fortigate_vdom,
+        policy_id_param,
+        fields_list,
+        filters_list,
+        output_format,
+        mode,
+        group_by_list,
+        top_n,
+        max_bytes,
+        max_records,
+        continuation_token or None,
+        deadline=tool_deadline(deadline_seconds),
     )
-    return json.dumps(result, indent=2)
 
 
 # ===============================
@@ -125,7 +222,7 @@ def get_firewall_policies(
 
 
 @mcp.tool()
-def create_address(
+async def create_address(
     name: str,
     address_type: str,
     fortigate_url: str,
@@ -137,13 +234,14 @@ def create_address(
     fqdn: str = "",
     comment: str = "",
     color: int = 0,
+    deadline_seconds: float = 0,
 ) -> str:
     """Create an address object in FortiGate.
 
     Args:
         name: Address object name
         address_type: Type of address (ipmask, iprange, fqdn)
-        fortigate_url: FortiGate URL (e.g., https://192.168.1.99)
+        fortigate_url: FortiGate URL (e.g., https://192.168.1.99; comma-separate the addresses of an HA cluster)
         fortigate_token: FortiGate API token
         fortigate_vdom: FortiGate VDOM (default: root)
         subnet: IP/netmask (for ipmask type, e.g., '192.168.1.0 255.255.255.0' or '192.168.1.0/24')
@@ -152,6 +250,7 @@ def create_address(
         fqdn: FQDN (for fqdn type)
         comment: Optional comment
         color: Color for the address object (0-32)
+        deadline_seconds: Overall time budget for the call in seconds (0 for the server default)
     """
     # Convert empty strings to None for optional parameters
     subnet_param = subnet if subnet else None
@@ -159,7 +258,8 @@ def create_address(
     end_ip_param = end_ip if end_ip else None
     fqdn_param = fqdn if fqdn else None
 
-    result = FortiOSTools.create_address(
+    return await _run_tool(
+        FortiOSTools.create_address,
         fortigate_url,
         fortigate_token,
         fortigate_vdom,
@@ -171,48 +271,96 @@ def create_address(
         fqdn_param,
         comment,
         color,
+        deadline=tool_deadline(deadline_seconds),
     )
-    return json.dumps(result, indent=2)
 
 
 @mcp.tool()
-def get_addresses(
+async def get_addresses(
     fortigate_url: str,
     fortigate_token: str,
     fortigate_vdom: str = "root",
     address_name: str = "",
+    fields: str = "",
+    filters: str = "",
+    output_format: str = "json",
+    mode: str = "records",
+    group_by: str = "",
+    top_n: int = 0,
+    max_bytes: int = 0,
+    max_records: int = 0,
+    continuation_token: str = "",
+    deadline_seconds: float = 0,
 ) -> str:
     """Get address objects from FortiGate.
 
     Args:
-        fortigate_url: FortiGate URL (e.g., https://192.168.1.99)
+        fortigate_url: FortiGate URL (e.g., https://192.168.1.99; comma-separate the addresses of an HA cluster)
         fortigate_token: FortiGate API token
         fortigate_vdom: FortiGate VDOM (default: root)
         address_name: Specific address name to retrieve (empty for all addresses)
+        fields: Field names to return (comma-separated, empty for all fields)
+        filters: Record filters applied on the server, e.g. 'type==ipmask' or 'name=@web'
+            (operators ==, !=, =@, !@, <, <=, >, >=; ',' for OR, '&' for AND)
+        output_format: 'json' (default), 'csv' for a header row plus one line per record,
+            or 'raw' to forward the FortiGate response in details without re-encoding it
+            (not combinable with fields/filters)
+        mode: 'records' (default) or 'summary' to return counts computed on the server
+        group_by: Fields to count records by in summary mode (comma-separated, e.g. 'action')
+        top_n: Number of largest groups returned in summary mode (0 for the server default)
+        max_bytes: Size budget for the returned records in bytes (0 for the server default)
+        max_records: Maximum number of records returned (0 for the server default)
+        continuation_token: Token from a truncated result, to fetch its next chunk
+        deadline_seconds: Overall time budget for the call in seconds (0 for the server default)
     """
     address_name_param = address_name if address_name else None
-    result = FortiOSTools.get_addresses(
-        fortigate_url, fortigate_token, fortigate_vdom, address_name_param
+    fields_list = [f.strip() for f in fields.split(",") if f.strip()] or None
+    filters_list = [f.strip() for f in filters.split("&") if f.strip()] or None
+    group_by_list = [f.strip() for f in group_by.split(",") if f.strip()] or None
+    return await _run_tool(
+        FortiOSTools.get_addresses,
+        fortigate_url,
+        fortigate_token,
+        fortigate_vdom,
+        address_name_param,
+        fields_list,
+        filters_list,
+        output_format,
+        mode,
+        group_by_list,
+        top_n,
+        max_bytes,
+        max_records,
+        continuation_token or None,
+        deadline=tool_deadline(deadline_seconds),
     )
-    return json.dumps(result, indent=2)
 
 
 @mcp.tool()
-def delete_address(
-    name: str, fortigate_url: str, fortigate_token: str, fortigate_vdom: str = "root"
+async def delete_address(
+    name: str,
+    fortigate_url: str,
+    fortigate_token: str,
+    fortigate_vdom: str = "root",
+    deadline_seconds: float = 0,
 ) -> str:
     """Delete an address object from FortiGate.
 
     Args:
         name: Address object name to delete
-        fortigate_url: FortiGate URL (e.g., https://192.168.1.99)
+        fortigate_url: FortiGate URL (e.g., https://192.168.1.99; comma-separate the addresses of an HA cluster)
         fortigate_token: FortiGate API token
         fortigate_vdom: FortiGate VDOM (default: root)
+        deadline_seconds: Overall time budget for the call in seconds (0 for the server default)
     """
-    result = FortiOSTools.delete_address(
-        fortigate_url, fortigate_token, fortigate_vdom, name
+    return await _run_tool(
+        FortiOSTools.delete_address,
+        fortigate_url,
+        fortigate_token,
+        fortigate_vdom,
+        name,
+        deadline=tool_deadline(deadline_seconds),
     )
-    return json.dumps(result, indent=2)
 
 
 # ===============================
@@ -221,7 +369,7 @@ def delete_address(
 
 
 @mcp.tool()
-def create_address_group(
+async def create_address_group(
     name: str,
     members: str,
     fortigate_url: str,
@@ -229,22 +377,25 @@ def create_address_group(
     fortigate_vdom: str = "root",
     comment: str = "",
     color: int = 0,
+    deadline_seconds: float = 0,
 ) -> str:
     """Create an address group in FortiGate that contains existing address objects.
 
     Args:
         name: Address group name
         members: Existing address object names (comma-separated)
-        fortigate_url: FortiGate URL (e.g., https://192.168.1.99)
+        fortigate_url: FortiGate URL (e.g., https://192.168.1.99; comma-separate the addresses of an HA cluster)
         fortigate_token: FortiGate API token
         fortigate_vdom: FortiGate VDOM (default: root)
         comment: Optional comment
         color: Color for the address group (0-32)
+        deadline_seconds: Overall time budget for the call in seconds (0 for the server default)
     """
     # Convert comma-separated string to list
     members_list = [m.strip() for m in members.split(",")]
 
-    result = FortiOSTools.create_address_group(
+    return await _run_tool(
+        FortiOSTools.create_address_group,
         fortigate_url,
         fortigate_token,
         fortigate_vdom,
@@ -252,48 +403,420 @@ def create_address_group(
         members_list,
         comment,
         color,
+        deadline=tool_deadline(deadline_seconds),
     )
-    return json.dumps(result, indent=2)
 
 
 @mcp.tool()
-def get_address_groups(
+async def get_address_groups(
     fortigate_url: str,
     fortigate_token: str,
     fortigate_vdom: str = "root",
     group_name: str = "",
+    fields: str = "",
+    filters: str = "",
+    output_format: str = "json",
+    mode: str = "records",
+    group_by: str = "",
+    top_n: int = 0,
+    max_bytes: int = 0,
+    max_records: int = 0,
+    continuation_token: str = "",
+    deadline_seconds: float = 0,
 ) -> str:
     """Get address groups from FortiGate.
 
     Args:
-        fortigate_url: FortiGate URL (e.g., https://192.168.1.99)
+        fortigate_url: FortiGate URL (e.g., https://192.168.1.99; comma-separate the addresses of an HA cluster)
         fortigate_token: FortiGate API token
         fortigate_vdom: FortiGate VDOM (default: root)
         group_name: Specific group name to retrieve (empty for all groups)
+        fields: Field names to return (comma-separated, empty for all fields)
+        filters: Record filters applied on the server, e.g. 'type==ipmask' or 'name=@web'
+            (operators ==, !=, =@, !@, <, <=, >, >=; ',' for OR, '&' for AND)
+        output_format: 'json' (default), 'csv' for a header row plus one line per record,
+            or 'raw' to forward the FortiGate response in details without re-encoding it
+            (not combinable with fields/filters)
+        mode: 'records' (default) or 'summary' to return counts computed on the server
+        group_by: Fields to count records by in summary mode (comma-separated, e.g. 'action')
+        top_n: Number of largest groups returned in summary mode (0 for the server default)
+        max_bytes: Size budget for the returned records in bytes (0 for the server default)
+        max_records: Maximum number of records returned (0 for the server default)
+        continuation_token: Token from a truncated result, to fetch its next chunk
+        deadline_seconds: Overall time budget for the call in seconds (0 for the server default)
     """
     group_name_param = group_name if group_name else None
-    result = FortiOSTools.get_address_groups(
-        fortigate_url, fortigate_token, fortigate_vdom, group_name_param
+    fields_list = [f.strip() for f in fields.split(",") if f.strip()] or None
+    filters_list = [f.strip() for f in filters.split("&") if f.strip()] or None
+    group_by_list = [f.strip() for f in group_by.split(",") if f.strip()] or None
+    return await _run_tool(
+        FortiOSTools.get_address_groups,
+        fortigate_url,
+        fortigate_token,
+        fortigate_vdom,
+        group_name_param,
+        fields_list,
+        filters_list,
+        output_format,
+        mode,
+        group_by_list,
+        top_n,
+        max_bytes,
+        max_records,
+        continuation_token or None,
+        deadline=tool_deadline(deadline_seconds),
     )
-    return json.dumps(result, indent=2)
 
 
 @mcp.tool()
-def delete_address_group(
-    name: str, fortigate_url: str, fortigate_token: str, fortigate_vdom: str = "root"
+async def delete_address_group(
+    name: str,
+    fortigate_url: str,
+    fortigate_token: str,
+    fortigate_vdom: str = "root",
+    deadline_seconds: float = 0,
 ) -> str:
     """Delete an address group from FortiGate.
 
     Args:
         name: Address group name to delete
-        fortigate_url: FortiGate URL (e.g., https://192.168.1.99)
+        fortigate_url: FortiGate URL (e.g., https://192.168.1.99; comma-separate the addresses of an HA cluster)
         fortigate_token: FortiGate API token
         fortigate_vdom: FortiGate VDOM (default: root)
+        deadline_seconds: Overall time budget for the call in seconds (0 for the server default)
     """
-    result = FortiOSTools.delete_address_group(
-        fortigate_url, fortigate_token, fortigate_vdom, name
+    return await _run_tool(
+        FortiOSTools.delete_address_group,
+        fortigate_url,
+        fortigate_token,
+        fortigate_vdom,
+        name,
+        deadline=tool_deadline(deadline_seconds),
+    )
+
+
+# ===============================
+# SERVICE OBJECT TOOLS
+# ===============================
+
+
+@mcp.tool()
+async def create_service(
+    name: str,
+    fortigate_url: str,
+    fortigate_token: str,
+    fortigate_vdom: str = "root",
+    protocol: str = "TCP/UDP/SCTP",
+    tcp_portrange: str = "",
+    udp_portrange: str = "",
+    sctp_portrange: str = "",
+    protocol_number: int = 0,
+    category: str = "",
+    comment: str = "",
+    color: int = 0,
+    deadline_seconds: float = 0,
+) -> str:
+    """Create a custom service object in FortiGate.
+
+    Args:
+        name: Service name
+        fortigate_url: FortiGate URL (e.g., https://192.168.1.99; comma-separate the addresses of an HA cluster)
+        fortigate_token: FortiGate API token
+        fortigate_vdom: FortiGate VDOM (default: root)
+        protocol: TCP/UDP/SCTP (default), ICMP, ICMP6 or IP
+        tcp_portrange: TCP destination ports, space-separated ports or ranges with optional
+            source ranges (e.g. '443 8000-8080:1024-65535')
+        udp_portrange: UDP destination ports, same format as tcp_portrange
+        sctp_portrange: SCTP destination ports, same format as tcp_portrange
+        protocol_number: IP protocol number for the IP protocol (0 for all)
+        category: Optional service category
+        comment: Optional comment
+        color: Color for the service (0-32)
+        deadline_seconds: Overall time budget for the call in seconds (0 for the server default)
+    """
+    return await _run_tool(
+        FortiOSTools.create_service,
+        fortigate_url,
+        fortigate_token,
+        fortigate_vdom,
+        name,
+        protocol,
+        tcp_portrange,
+        udp_portrange,
+        sctp_portrange,
+        protocol_number,
+        category,
+        comment,
+        color,
+        deadline=tool_deadline(deadline_seconds),
+    )
+
+
+@mcp.tool()
+async def get_services(
+    fortigate_url: str,
+    fortigate_token: str,
+    fortigate_vdom: str = "root",
+    service_name: str = "",
+    fields: str = "",
+    filters: str = "",
+    output_format: str = "json",
+    mode: str = "records",
+    group_by: str = "",
+    top_n: int = 0,
+    max_bytes: int = 0,
+    max_records: int = 0,
+    continuation_token: str = "",
+    deadline_seconds: float = 0,
+) -> str:
+    """Get custom service objects from FortiGate.
+
+    Args:
+        fortigate_url: FortiGate URL (e.g., https://192.168.1.99; comma-separate the addresses of an HA cluster)
+        fortigate_token: FortiGate API token
+        fortigate_vdom: FortiGate VDOM (default: root)
+        service_name: Specific service name to retrieve (empty for all services)
+        fields: Field names to return (comma-separated, empty for all fields)
+        filters: Record filters applied on the server, e.g. 'type==ipmask' or 'name=@web'
+            (operators ==, !=, =@, !@, <, <=, >, >=; ',' for OR, '&' for AND)
+        output_format: 'json' (default), 'csv' for a header row plus one line per record,
+            or 'raw' to forward the FortiGate response in details without re-encoding it
+            (not combinable with fields/filters)
+        mode: 'records' (default) or 'summary' to return counts computed on the server
+        group_by: Fields to count records by in summary mode (comma-separated, e.g. 'action')
+        top_n: Number of largest groups returned in summary mode (0 for the server default)
+        max_bytes: Size budget for the returned records in bytes (0 for the server default)
+        max_records: Maximum number of records returned (0 for the server default)
+        continuation_token: Token from a truncated result, to fetch its next chunk
+        deadline_seconds: Overall time budget for the call in seconds (0 for the server default)
+    """
+    service_name_param = service_name if service_name else None
+    fields_list = [f.strip() for f in fields.split(",") if f.strip()] or None
+    filters_list = [f.strip() for f in filters.split("&") if f.strip()] or None
+    group_by_list = [f.strip() for f in group_by.split(",") if f.strip()] or None
+    return await _run_tool(
+        FortiOSTools.get_services,
+        fortigate_url,
+        fortigate_token,
+        fortigate_vdom,
+        service_name_param,
+        fields_list,
+        filters_list,
+        output_format,
+        mode,
+        group_by_list,
+        top_n,
+        max_bytes,
+        max_records,
+        continuation_token or None,
+        deadline=tool_deadline(deadline_seconds),
+    )
+
+
+@mcp.tool()
+async def create_service_group(
+    name: str,
+    members: str,
+    fortigate_url: str,
+    fortigate_token: str,
+    fortigate_vdom: str = "root",
+    comment: str = "",
+    color: int = 0,
+    deadline_seconds: float = 0,
+) -> str:
+    """Create a service group in FortiGate that contains existing services or groups.
+
+    Args:
+        name: Service group name
+        members: Existing service or service group names (comma-separated)
+        fortigate_url: FortiGate URL (e.g., https://192.168.1.99; comma-separate the addresses of an HA cluster)
+        fortigate_token: FortiGate API token
+        fortigate_vdom: FortiGate VDOM (default: root)
+        comment: Optional comment
+        color: Color for the service group (0-32)
+        deadline_seconds: Overall time budget for the call in seconds (0 for the server default)
+    """
+    # Convert comma-separated string to list
+    members_list = [m.strip() for m in members.split(",")]
+
+    return await _run_tool(
+        FortiOSTools.create_service_group,
+        fortigate_url,
+        fortigate_token,
+        fortigate_vdom,
+        name,
+        members_list,
+        comment,
+        color,
+        deadline=tool_deadline(deadline_seconds),
+    )
+
+
+@mcp.tool()
+async def get_service_groups(
+    fortigate_url: str,
+    fortigate_token: str,
+    fortigate_vdom: str = "root",
+    group_name: str = "",
+    fields: str = "",
+    filters: str = "",
+    output_format: str = "json",
+    mode: str = "records",
+    group_by: str = "",
+    top_n: int = 0,
+    max_bytes: int = 0,
+    max_records: int = 0,
+    continuation_token: str = "",
+    deadline_seconds: float = 0,
+) -> str:
+    """Get service groups from FortiGate.
+
+    Args:
+        fortigate_url: FortiGate URL (e.g., https://192.168.1.99; comma-separate the addresses of an HA cluster)
+        fortigate_token: FortiGate API token
+        fortigate_vdom: FortiGate VDOM (default: root)
+        group_name: Specific group name to retrieve (empty for all groups)
+        fields: Field names to return (comma-separated, empty for all fields)
+        filters: Record filters applied on the server, e.g. 'type==ipmask' or 'name=@web'
+            (operators ==, !=, =@, !@, <, <=, >, >=; ',' for OR, '&' for AND)
+        output_format: 'json' (default), 'csv' for a header row plus one line per record,
+            or 'raw' to forward the FortiGate response in details without re-encoding it
+            (not combinable with fields/filters)
+        mode: 'records' (default) or 'summary' to return counts computed on the server
+        group_by: Fields to count records by in summary mode (comma-separated, e.g. 'action')
+        top_n: Number of largest groups returned in summary mode (0 for the server default)
+        max_bytes: Size budget for the returned records in bytes (0 for the server default)
+        max_records: Maximum number of records returned (0 for the server default)
+        continuation_token: Token from a truncated result, to fetch its next chunk
+        deadline_seconds: Overall time budget for the call in seconds (0 for the server default)
+    """
+    group_name_param = group_name if group_name else None
+    fields_list = [f.strip() for f in fields.split(",") if f.strip()] or None
+    filters_list = [f.strip() for f in filters.split("&") if f.strip()] or None
+    group_by_list = [f.strip() for f in group_by.split(",") if f.strip()] or None
+    return await _run_tool(
+        FortiOSTools.get_service_groups,
+        fortigate_url,
+        fortigate_token,
+        fortigate_vdom,
+        group_name_param,
+        fields_list,
+        filters_list,
+        output_format,
+        mode,
+        group_by_list,
+        top_n,
+        max_bytes,
+        max_records,
+        continuation_token or None,
+        deadline=tool_deadline(deadline_seconds),
+    )
+
+
+@mcp.tool()
+async def find_services(
+    queries: str,
+    fortigate_url: str,
+    fortigate_token: str,
+    fortigate_vdom: str = "root",
+    deadline_seconds: float = 0,
+) -> str:
+    """Find the services, service groups and policies that cover a protocol and port.
+
+    Answers questions like "which services cover tcp/8443", including
+    groups that contain a matching service directly or through nested
+    groups, and the firewall policies that use any of them.
+
+    Args:
+        queries: Protocol/port queries (comma-separated): tcp/<port>, udp/<port>,
+            sctp/<port>, icmp, icmp6 or ip/<protocol number>, e.g. 'tcp/8443,udp/53'
+        fortigate_url: FortiGate URL (e.g., https://192.168.1.99; comma-separate the addresses of an HA cluster)
+        fortigate_token: FortiGate API token
+        fortigate_vdom: FortiGate VDOM (default: root)
+        deadline_seconds: Overall time budget for the call in seconds (0 for the server default)
+    """
+    queries_list = [q.strip() for q in queries.split(",") if q.strip()]
+    return await _run_tool(
+        FortiOSTools.find_services,
+        fortigate_url,
+        fortigate_token,
+        fortigate_vdom,
+        queries_list,
+        deadline=tool_deadline(deadline_seconds),
+    )
+
+
+# ===============================
+# REFERENCE TOOLS
+# ===============================
+
+
+@mcp.tool()
+async def find_references(
+    table: str,
+    name: str,
+    fortigate_url: str,
+    fortigate_token: str,
+    fortigate_vdom: str = "root",
+    deadline_seconds: float = 0,
+) -> str:
+    """List the address groups, service groups, VIPs, VIP groups and policies that use an object.
+
+    Central SNAT, proxy, shaping, local-in and other policies are not
+    indexed; they are listed as unchecked in the result details.
+
+    Args:
+        table: Table of the object (addresses, address-groups, vips, vip-groups, services or service-groups)
+        name: Object name
+        fortigate_url: FortiGate URL (e.g., https://192.168.1.99; comma-separate the addresses of an HA cluster)
+        fortigate_token: FortiGate API token
+        fortigate_vdom: FortiGate VDOM (default: root)
+        deadline_seconds: Overall time budget for the call in seconds (0 for the server default)
+    """
+    return await _run_tool(
+        FortiOSTools.find_references,
+        fortigate_url,
+        fortigate_token,
+        fortigate_vdom,
+        table,
+        name,
+        deadline=tool_deadline(deadline_seconds),
+    )
+
+
+@mcp.tool()
+async def cascade_plan(
+    table: str,
+    name: str,
+    fortigate_url: str,
+    fortigate_token: str,
+    fortigate_vdom: str = "root",
+    deadline_seconds: float = 0,
+) -> str:
+    """Plan the ordered steps (detach from groups and policies, then delete) that remove an object.
+
+    Nothing is changed: each step lists the API request that carries it
+    out. Groups and policies left without a required member are deleted
+    in the plan too, so review it before applying it. References from
+    tables that are not indexed are listed as unchecked and not planned for.
+
+    Args:
+        table: Table of the object (addresses, address-groups, vips, vip-groups, services or service-groups)
+        name: Object name
+        fortigate_url: FortiGate URL (e.g., https://192.168.1.99; comma-separate the addresses of an HA cluster)
+        fortigate_token: FortiGate API token
+        fortigate_vdom: FortiGate VDOM (default: root)
+        deadline_seconds: Overall time budget for the call in seconds (0 for the server default)
+    """
+    return await _run_tool(
+        FortiOSTools.cascade_plan,
+        fortigate_url,
+        fortigate_token,
+        fortigate_vdom,
+        table,
+        name,
+        deadline=tool_deadline(deadline_seconds),
     )
-    return json.dumps(result, indent=2)
 
 
 # ===============================
@@ -302,7 +825,7 @@ def delete_address_group(
 
 
 @mcp.tool()
-def create_vip(
+async def create_vip(
     name: str,
     extip: str,
     mappedip: str,
@@ -315,6 +838,7 @@ def create_vip(
     mappedport: str = "",
     protocol: str = "tcp",
     comment: str = "",
+    deadline_seconds: float = 0,
 ) -> str:
     """Create a Virtual IP (VIP) object in FortiGate.
 
@@ -322,7 +846,7 @@ def create_vip(
         name: VIP object name
         extip: External IP address
         mappedip: Mapped IP addresses (comma-separated)
-        fortigate_url: FortiGate URL (e.g., https://192.168.1.99)
+        fortigate_url: FortiGate URL (e.g., https://192.168.1.99; comma-separate the addresses of an HA cluster)
         fortigate_token: FortiGate API token
         fortigate_vdom: FortiGate VDOM (default: root)
         extintf: External interface (default: any)
@@ -331,6 +855,7 @@ def create_vip(
         mappedport: Mapped port range (empty if no port forwarding)
         protocol: Protocol (tcp, udp, sctp)
         comment: Optional comment
+        deadline_seconds: Overall time budget for the call in seconds (0 for the server default)
     """
     # Convert comma-separated string to list
     mappedip_list = [ip.strip() for ip in mappedip.split(",")]
@@ -339,7 +864,8 @@ def create_vip(
     extport_param = extport if extport else None
     mappedport_param = mappedport if mappedport else None
 
-    result = FortiOSTools.create_vip(
+    return await _run_tool(
+        FortiOSTools.create_vip,
         fortigate_url,
         fortigate_token,
         fortigate_vdom,
@@ -352,45 +878,637 @@ def create_vip(
         mappedport_param,
         protocol,
         comment,
+        deadline=tool_deadline(deadline_seconds),
     )
-    return json.dumps(result, indent=2)
 
 
 @mcp.tool()
-def get_vips(
+async def get_vips(
     fortigate_url: str,
     fortigate_token: str,
     fortigate_vdom: str = "root",
     vip_name: str = "",
+    fields: str = "",
+    filters: str = "",
+    output_format: str = "json",
+    mode: str = "records",
+    group_by: str = "",
+    top_n: int = 0,
+    max_bytes: int = 0,
+    max_records: int = 0,
+    continuation_token: str = "",
+    deadline_seconds: float = 0,
 ) -> str:
     """Get VIP objects from FortiGate.
 
     Args:
-        fortigate_url: FortiGate URL (e.g., https://192.168.1.99)
+        fortigate_url: FortiGate URL (e.g., https://192.168.1.99; comma-separate the addresses of an HA cluster)
         fortigate_token: FortiGate API token
         fortigate_vdom: FortiGate VDOM (default: root)
         vip_name: Specific VIP name to retrieve (empty for all VIPs)
+        fields: Field names to return (comma-separated, empty for all fields)
+        filters: Record filters applied on the server, e.g. 'type==ipmask' or 'name=@web'
+            (operators ==, !=, =@, !@, <, <=, >, >=; ',' for OR, '&' for AND)
+        output_format: 'json' (default), 'csv' for a header row plus one line per record,
+            or 'raw' to forward the FortiGate response in details without re-encoding it
+            (not combinable with fields/filters)
+        mode: 'records' (default) or 'summary' to return counts computed on the server
+        group_by: Fields to count records by in summary mode (comma-separated, e.g. 'action')
+        top_n: Number of largest groups returned in summary mode (0 for the server default)
+        max_bytes: Size budget for the returned records in bytes (0 for the server default)
+        max_records: Maximum number of records returned (0 for the server default)
+        continuation_token: Token from a truncated result, to fetch its next chunk
+        deadline_seconds: Overall time budget for the call in seconds (0 for the server default)
     """
     vip_name_param = vip_name if vip_name else None
-    result = FortiOSTools.get_vips(
-        fortigate_url, fortigate_token, fortigate_vdom, vip_name_param
+    fields_list = [f.strip() for f in fields.split(",") if f.strip()] or None
+    filters_list = [f.strip() for f in filters.split("&") if f.strip()] or None
+    group_by_list = [f.strip() for f in group_by.split(",") if f.strip()] or None
+    return await _run_tool(
+        FortiOSTools.get_vips,
+        fortigate_url,
+        fortigate_token,
+        fortigate_vdom,
+        vip_name_param,
+        fields_list,
+        filters_list,
+        output_format,
+        mode,
+        group_by_list,
+        top_n,
+        max_bytes,
+        max_records,
+        continuation_token or None,
+        deadline=tool_deadline(deadline_seconds),
     )
-    return json.dumps(result, indent=2)
 
 
 # ===============================
 # DEBUG TOOLS
 # ===============================
 @mcp.tool()
-def ping_fortigate(fortigate_url: str, fortigate_token: str) -> str:
+async def ping_fortigate(
+    fortigate_url: str, fortigate_token: str, deadline_seconds: float = 0
+) -> str:
     """Ping the FortiGate to check connectivity.
 
     Args:
-        fortigate_url: FortiGate URL (e.g., https://192.168.1.99)
+        fortigate_url: FortiGate URL (e.g., https://192.168.1.99; comma-separate the addresses of an HA cluster)
+        fortigate_token: FortiGate API token
+        deadline_seconds: Overall time budget for the call in seconds (0 for the server default)
+    """
+    return await _run_tool(
+        FortiOSTools.ping_fortigate,
+        fortigate_url,
+        fortigate_token,
+        deadline=tool_deadline(deadline_seconds),
+    )
+
+
+# ===============================
+# DEVICE REGISTRY TOOLS
+# ===============================
+
+
+@mcp.tool()
+async def register_fortigate(
+    name: str,
+    fortigate_url: str,
+    fortigate_token: str,
+    fortigate_vdom: str = "root",
+    deadline_seconds: float = 0,
+) -> str:
+    """Register a FortiGate so its tables are exposed as MCP resources.
+
+    The address, VIP, service and policy tables (and their groups) and the
+    external resources then appear as fortios://<name>/<table> resources
+    that can be read page by page and subscribed to for change
+    notifications. The device is only visible to this MCP session, and its
+    credentials are kept in server memory only.
+
+    Args:
+        name: Name used for the device in resource URIs (letters, digits, '.', '-', '_')
+        fortigate_url: FortiGate URL (e.g., https://192.168.1.99; comma-separate the addresses of an HA cluster)
         fortigate_token: FortiGate API token
+        fortigate_vdom: FortiGate VDOM (default: root)
+        deadline_seconds: Overall time budget for the call in seconds (0 for the server default)
     """
-    result = FortiOSTools.ping_fortigate(fortigate_url, fortigate_token)
-    return json.dumps(result, indent=2)
+    return await _run_tool(
+        FortiOSTools.register_fortigate,
+        name,
+        fortigate_url,
+        fortigate_token,
+        fortigate_vdom,
+        scope=_caller_scope(),
+        deadline=tool_deadline(deadline_seconds),
+    )
+
+
+@mcp.tool()
+async def unregister_fortigate(name: str) -> str:
+    """Unregister a FortiGate and forget its credentials.
+
+    Args:
+        name: Registered device name
+    """
+    return dumps_result(FortiOSTools.unregister_fortigate(name, _caller_scope()))
+
+
+@mcp.tool()
+async def list_fortigates() -> str:
+    """List the FortiGates this session registered (tokens are never returned)."""
+    return dumps_result(FortiOSTools.list_fortigates(_caller_scope()))
+
+
+@mcp.tool()
+async def get_policy_usage(
+    fortigate_url: str,
+    fortigate_token: str,
+    fortigate_vdom: str = "root",
+    unused_days: int = 90,
+    top_n: int = 0,
+    max_unused: int = 0,
+    deadline_seconds: float = 0,
+) -> str:
+    """Find unused firewall policies and rank policies by traffic.
+
+    Joins the policy table with the per-policy hit, byte and last-used
+    counters. Counters only cover the time since they were last reset
+    (e.g. a reboot).
+
+    Args:
+        fortigate_url: FortiGate URL (e.g., https://192.168.1.99; comma-separate the addresses of an HA cluster)
+        fortigate_token: FortiGate API token
+        fortigate_vdom: FortiGate VDOM (default: root)
+        unused_days: Policies not used for this many days are reported as unused (0: never used)
+        top_n: Number of policies ranked by bytes (0 for the server default)
+        max_unused: Maximum number of unused policies listed (0 for the server default)
+        deadline_seconds: Overall time budget for the call in seconds (0 for the server default)
+    """
+    return await _run_tool(
+        FortiOSTools.get_policy_usage,
+        fortigate_url,
+        fortigate_token,
+        fortigate_vdom,
+        unused_days,
+        top_n,
+        max_unused,
+        deadline=tool_deadline(deadline_seconds),
+    )
+
+
+# ===============================
+# LOG TOOLS
+# ===============================
+
+
+@mcp.tool()
+async def query_logs(
+    fortigate_url: str,
+    fortigate_token: str,
+    fortigate_vdom: str = "root",
+    source: str = "memory",
+    log_type: str = "traffic",
+    subtype: str = "forward",
+    report: str = "",
+    group_by: str = "",
+    sum_fields: str = "",
+    filters: str = "",
+    top_n: int = 0,
+    max_rows: int = 0,
+    deadline_seconds: float = 0,
+) -> str:
+    """Aggregate FortiGate logs on the server and return the top groups, not raw rows.
+
+    Args:
+        fortigate_url: FortiGate URL (e.g., https://192.168.1.99; comma-separate the addresses of an HA cluster)
+        fortigate_token: FortiGate API token
+        fortigate_vdom: FortiGate VDOM (default: root)
+        source: Log device (memory, disk, fortianalyzer or forticloud)
+        log_type: Log type (traffic or event)
+        subtype: Log subtype, e.g. forward or local for traffic, system or vpn for events
+        report: Predefined aggregation: top_talkers (bytes per srcip),
+            top_denied_destinations (denied entries per dstip/dstport) or policy_hits (entries per policyid)
+        group_by: Fields to group entries by (comma-separated; overrides the report's)
+        sum_fields: Numeric fields summed per group instead of counting entries (comma-separated)
+        filters: Entry filters, e.g. 'srcintf==port1' or 'dstip=@10.0.' (same syntax as the get_* tools)
+        top_n: Number of largest groups returned (0 for the server default)
+        max_rows: Maximum number of log entries scanned (0 for the server default)
+        deadline_seconds: Overall time budget for the call in seconds (0 for the server default)
+    """
+    group_by_list = [f.strip() for f in group_by.split(",") if f.strip()] or None
+    sum_fields_list = [f.strip() for f in sum_fields.split(",") if f.strip()] or None
+    filters_list = [f.strip() for f in filters.split("&") if f.strip()] or None
+    return await _run_tool(
+        FortiOSTools.query_logs,
+        fortigate_url,
+        fortigate_token,
+        fortigate_vdom,
+        source,
+        log_type,
+        subtype,
+        report or None,
+        group_by_list,
+        sum_fields_list,
+        filters_list,
+        top_n,
+        max_rows,
+        deadline=tool_deadline(deadline_seconds),
+    )
+
+
+@mcp.tool()
+async def inspect_sessions(
+    fortigate_url: str,
+    fortigate_token: str,
+    fortigate_vdom: str = "root",
+    filters: str = "",
+    dimensions: str = "",
+    sum_fields: str = "",
+    top_n: int = 0,
+    max_sessions: int = 0,
+    deadline_seconds: float = 0,
+) -> str:
+    """Summarize the FortiGate session table: top sources, destinations, policies and protocols.
+
+    The session table is paged through and aggregated on the server; raw
+    sessions are never returned.
+
+    Args:
+        fortigate_url: FortiGate URL (e.g., https://192.168.1.99; comma-separate the addresses of an HA cluster)
+        fortigate_token: FortiGate API token
+        fortigate_vdom: FortiGate VDOM (default: root)
+        filters: Session filters, e.g. 'dport==443' or 'saddr=@10.1.' (same syntax as the get_* tools)
+        dimensions: Aggregates to return (comma-separated: source, destination, policy, protocol; empty for all)
+        sum_fields: Numeric fields summed per group instead of counting sessions, e.g. 'sentbyte,rcvdbyte'
+        top_n: Number of largest groups per aggregate (0 for the server default)
+        max_sessions: Maximum number of sessions scanned (0 for the server default)
+        deadline_seconds: Overall time budget for the call in seconds (0 for the server default)
+    """
+    filters_list = [f.strip() for f in filters.split("&") if f.strip()] or None
+    dimensions_list = [d.strip() for d in dimensions.split(",") if d.strip()] or None
+    sum_fields_list = [f.strip() for f in sum_fields.split(",") if f.strip()] or None
+    return await _run_tool(
+        FortiOSTools.inspect_sessions,
+        fortigate_url,
+        fortigate_token,
+        fortigate_vdom,
+        filters_list,
+        dimensions_list,
+        sum_fields_list,
+        top_n,
+        max_sessions,
+        deadline=tool_deadline(deadline_seconds),
+    )
+
+
+# ===============================
+# ROUTING TOOLS
+# ===============================
+
+
+@mcp.tool()
+async def lookup_routes(
+    ips: str,
+    fortigate_url: str,
+    fortigate_token: str,
+    fortigate_vdom: str = "root",
+    vrf: int = 0,
+    deadline_seconds: float = 0,
+) -> str:
+    """Find the route, gateway and interface a FortiGate uses for each of a batch of IPs.
+
+    Longest-prefix match against the active IPv4/IPv6 routing table, which
+    the server caches per device until routing changes.
+
+    Args:
+        ips: IPv4 or IPv6 addresses to look up (comma-separated, at most 1000)
+        fortigate_url: FortiGate URL (e.g., https://192.168.1.99; comma-separate the addresses of an HA cluster)
+        fortigate_token: FortiGate API token
+        fortigate_vdom: FortiGate VDOM (default: root)
+        vrf: VRF whose routes are used (default: 0)
+        deadline_seconds: Overall time budget for the call in seconds (0 for the server default)
+    """
+    ips_list = [ip.strip() for ip in ips.split(",") if ip.strip()]
+    return await _run_tool(
+        FortiOSTools.lookup_routes,
+        fortigate_url,
+        fortigate_token,
+        fortigate_vdom,
+        ips_list,
+        vrf,
+        deadline=tool_deadline(deadline_seconds),
+    )
+
+
+# ===============================
+# CONFIG BACKUP TOOLS
+# ===============================
+
+
+@mcp.tool()
+async def backup_config(
+    fortigate_url: str,
+    fortigate_token: str,
+    fortigate_vdom: str = "root",
+    device: str = "",
+    scope: str = "global",
+    deadline_seconds: float = 0,
+) -> str:
+    """Back up the full configuration of a FortiGate into the server's backup archive.
+
+    The backup is streamed to disk as compressed, deduplicated chunks; only
+    a summary (backup_id, size, new chunks stored) is returned. Use
+    get_config_backup to read it back.
+
+    Args:
+        fortigate_url: FortiGate URL (e.g., https://192.168.1.99; comma-separate the addresses of an HA cluster)
+        fortigate_token: FortiGate API token
+        fortigate_vdom: FortiGate VDOM (default: root)
+        device: Name to archive the backup under (default: the FortiGate serial number)
+        scope: Backup scope (global or vdom)
+        deadline_seconds: Overall time budget for the call in seconds (0 for 300)
+    """
+    return await _run_tool(
+        FortiOSTools.backup_config,
+        fortigate_url,
+        fortigate_token,
+        fortigate_vdom,
+        device or None,
+        scope,
+        deadline=tool_deadline(deadline_seconds or DEFAULT_BACKUP_DEADLINE),
+    )
+
+
+@mcp.tool()
+async def list_config_backups(
+    fortigate_url: str,
+    fortigate_token: str,
+    fortigate_vdom: str = "root",
+    device: str = "",
+    date: str = "",
+    limit: int = 100,
+) -> str:
+    """List the config backups archived with these FortiGate credentials, newest first.
+
+    Args:
+        fortigate_url: FortiGate URL the backups were taken with
+        fortigate_token: FortiGate API token the backups were taken with
+        fortigate_vdom: FortiGate VDOM the backups were taken with (default: root)
+        device: Only backups of this device
+        date: Only backups taken on this UTC date (YYYY-MM-DD)
+        limit: Maximum number of backups to list
+    """
+    return await _run_local(
+        FortiOSTools.list_config_backups,
+        fortigate_url,
+        fortigate_token,
+        fortigate_vdom,
+        device or None,
+        date or None,
+        limit,
+    )
+
+
+@mcp.tool()
+async def get_config_backup(
+    fortigate_url: str,
+    fortigate_token: str,
+    fortigate_vdom: str = "root",
+    backup_id: int = 0,
+    device: str = "",
+    date: str = "",
+    offset: int = 0,
+    max_bytes: int = 0,
+) -> str:
+    """Read an archived config backup.
+
+    Choose the backup by backup_id, or by device for its latest backup
+    taken on or before date. Long backups are returned in parts: when the
+    result is truncated, call again with offset set to next_offset. Only
+    backups taken with the same FortiGate credentials can be read.
+
+    Args:
+        fortigate_url: FortiGate URL the backups were taken with
+        fortigate_token: FortiGate API token the backups were taken with
+        fortigate_vdom: FortiGate VDOM the backups were taken with (default: root)
+        backup_id: Backup id from backup_config or list_config_backups
+        device: Device name (when no backup_id is given)
+        date: Latest backup on or before this UTC date (YYYY-MM-DD; default: the latest)
+        offset: Byte offset to read from
+        max_bytes: Maximum bytes of config text to return (0 for the server default)
+    """
+    return await _run_local(
+        FortiOSTools.get_config_backup,
+        fortigate_url,
+        fortigate_token,
+        fortigate_vdom,
+        backup_id or None,
+        device or None,
+        date or None,
+        offset,
+        max_bytes or None,
+    )
+
+
+@mcp.tool()
+async def diff_config_backups(
+    fortigate_url: str,
+    fortigate_token: str,
+    fortigate_vdom: str = "root",
+    old_backup_id: int = 0,
+    new_backup_id: int = 0,
+    device: str = "",
+    max_bytes: int = 0,
+    max_records: int = 0,
+    continuation_token: str = "",
+) -> str:
+    """Compare two archived config backups object by object.
+
+    Returns the config sections and objects that were added, removed,
+    modified (with the old and new value of each changed setting) or
+    reordered, instead of a line-by-line text diff. Only backups taken
+    with the same FortiGate credentials can be compared.
+
+    Args:
+        fortigate_url: FortiGate URL the backups were taken with
+        fortigate_token: FortiGate API token the backups were taken with
+        fortigate_vdom: FortiGate VDOM the backups were taken with (default: root)
+        old_backup_id: Backup to compare from
+        new_backup_id: Backup to compare to
+        device: Compare the two latest backups of this device (when no backup ids are given)
+        max_bytes: Maximum size of the returned changes in bytes (0 for the server default)
+        max_records: Maximum number of returned changes (0 for the server default)
+        continuation_token: Token from a truncated result, to get its next chunk
+    """
+    return await _run_local(
+        FortiOSTools.diff_config_backups,
+        fortigate_url,
+        fortigate_token,
+        fortigate_vdom,
+        old_backup_id or None,
+        new_backup_id or None,
+        device or None,
+        max_bytes,
+        max_records,
+        continuation_token or None,
+    )
+
+
+@mcp.tool()
+async def diff_cmdb_tables(
+    table: str,
+    device: str,
+    other_device: str,
+    max_bytes: int = 0,
+    max_records: int = 0,
+    continuation_token: str = "",
+    deadline_seconds: float = 0,
+) -> str:
+    """Compare a table between two registered FortiGates record by record.
+
+    Args:
+        table: Table to compare (addresses, address-groups, vips, vip-groups, policies, services,
+            service-groups or external-resources)
+        device: Registered device to compare from
+        other_device: Registered device to compare to
+        max_bytes: Maximum size of the returned changes in bytes (0 for the server default)
+        max_records: Maximum number of returned changes (0 for the server default)
+        continuation_token: Token from a truncated result, to get its next chunk
+        deadline_seconds: Overall time budget for the call in seconds (0 for the server default)
+    """
+    return await _run_tool(
+        FortiOSTools.diff_cmdb_tables,
+        table,
+        device,
+        other_device,
+        max_bytes,
+        max_records,
+        continuation_token or None,
+        scope=_caller_scope(),
+        deadline=tool_deadline(deadline_seconds),
+    )
+
+
+# ===============================
+# METRICS TOOLS
+# ===============================
+
+
+@mcp.tool()
+async def get_metric_trend(device: str, metric: str, window_minutes: float = 60) -> str:
+    """Trend, rate and percentiles of a monitor metric of a registered FortiGate.
+
+    Answered from samples the server keeps in memory, without contacting
+    the FortiGate. Sampling must be enabled with the FORTIOS_METRICS
+    environment variable.
+
+    Args:
+        device: Registered device name
+        metric: Metric name (cpu, mem, disk, session, session6 or setuprate)
+        window_minutes: How far back to look (0 for all samples kept)
+    """
+    return dumps_result(
+        query_metric(device.strip(), metric.strip(), window_minutes, _caller_scope())
+    )
+
+
+@mcp.tool()
+async def get_interface_throughput(
+    fortigate_url: str = "",
+    fortigate_token: str = "",
+    fortigate_vdom: str = "root",
+    interfaces: str = "",
+    devices: str = "",
+    deadline_seconds: float = 0,
+) -> str:
+    """Current bps and pps per interface of one or more FortiGates.
+
+    Rates cover the time since the previous call for the same device; the
+    first call for a device waits about a second to take two samples.
+
+    Args:
+        fortigate_url: FortiGate URL (e.g., https://192.168.1.99; not needed with devices)
+        fortigate_token: FortiGate API token (not needed with devices)
+        fortigate_vdom: FortiGate VDOM (default: root)
+        interfaces: Interfaces to report (comma-separated; empty for all)
+        devices: Registered devices to read at once (comma-separated)
+        deadline_seconds: Overall time budget for the call in seconds (0 for the server default)
+    """
+    interfaces_list = [i.strip() for i in interfaces.split(",") if i.strip()] or None
+    devices_list = [d.strip() for d in devices.split(",") if d.strip()] or None
+    return await _run_tool(
+        FortiOSTools.get_interface_throughput,
+        fortigate_url,
+        fortigate_token,
+        fortigate_vdom,
+        interfaces_list,
+        devices_list,
+        scope=_caller_scope(),
+        deadline=tool_deadline(deadline_seconds),
+    )
+
+
+# ===============================
+# RESOURCES
+# ===============================
+
+_server = mcp._mcp_server
+
+
+@_server.list_resources()
+async def list_resources(
+    request: types.ListResourcesRequest,
+) -> types.ListResourcesResult:
+    """List the table resources of this session's FortiGates, page by page"""
+    cursor = request.params.cursor if request.params else None
+    entries, next_cursor = list_table_resources(cursor, scope=_caller_scope())
+    return types.ListResourcesResult(
+        resources=[types.Resource(**entry) for entry in entries],
+        nextCursor=next_cursor,
+    )
+
+
+@_server.list_resource_templates()
+async def list_resource_templates() -> List[types.ResourceTemplate]:
+    """Templates of the table resources"""
+    return [
+        types.ResourceTemplate(
+            uriTemplate=f"{RESOURCE_SCHEME}://{{device}}/{table}",
+            name=table,
+            description=f"{endpoint} of a registered FortiGate",
+            mimeType="application/json",
+        )
+        for table, endpoint in TABLES.items()
+    ]
+
+
+@_server.read_resource()
+async def read_resource(uri: AnyUrl) -> List[ReadResourceContents]:
+    """Read one page of a table; follow nextUri for the next page"""
+    page = await _run_in_thread(
+        read_table_resource,
+        str(uri),
+        scope=_caller_scope(),
+        deadline=tool_deadline(),
+    )
+    return [
+        ReadResourceContents(content=dumps_result(page), mime_type="application/json")
+    ]
+
+
+@_server.subscribe_resource()
+async def subscribe_resource(uri: AnyUrl) -> None:
+    """Send resources/updated to this session when the table changes"""
+    session = _server.request_context.session
+    SUBSCRIPTIONS.subscribe(str(uri), session, session_scope(session))
+
+
+@_server.unsubscribe_resource()
+async def unsubscribe_resource(uri: AnyUrl) -> None:
+    """Stop change notifications for the table"""
+    session = _server.request_context.session
+    SUBSCRIPTIONS.unsubscribe(str(uri), session, session_scope(session))
 
 
 # Create the ASGI app with health check endpoint mounted alongside MCP
@@ -401,7 +1519,15 @@ mcp_app = mcp.streamable_http_app()
 async def lifespan(app):
     """Manage MCP server lifespan within the parent Starlette app"""
     async with mcp_app.router.lifespan_context(mcp_app):
-        yield
+        tasks = [asyncio.create_task(POLLER.run()), asyncio.create_task(SAMPLER.run())]
+        try:
+            yield
+        finally:
+            for task in tasks:
+                task.cancel()
+            for task in tasks:
+                with contextlib.suppress(asyncio.CancelledError):
+                    await task
 
 
 app = Starlette(
@@ -0,0 +1,210 @@
+"""
+Interval index of firewall service objects by protocol and port
+"""
+
+import threading
+from bisect import bisect_right
+from collections import OrderedDict
+from typing import Any, Dict, Iterable, List, Optional, Set, Tuple
+
+# Port-based protocols: name -> (IP protocol number, service field)
+PORT_PROTOCOLS = {
+    "tcp": (6, "tcp-portrange"),
+    "udp": (17, "udp-portrange"),
+    "sctp": (132, "sctp-portrange"),
+}
+# ICMP service protocols -> IP protocol number
+ICMP_PROTOCOLS = {"ICMP": 1, "ICMP6": 58}
+MAX_PORT = 65535
+# Built indexes kept (one per device and table revisions)
+MAX_CACHED_INDEXES = 64
+
+
+def parse_portrange(value: Any) -> List[Tuple[int, int]]:
+    """
+    Destination port intervals of a FortiOS portrange setting.
+
+    The setting is a space-separated list of "dst[:src]" entries where each
+    side is a port or a low-high range, e.g. "80 443 8000-8080:1024-65535".
+    Source ports are ignored; malformed entries are skipped.
+    """
+    intervals = []
+    for entry in str(value or "").split():
+        low, _, high = entry.split(":", 1)[0].partition("-")
+        try:
+            low_port = int(low)
+            high_port = int(high) if high else low_port
+        except ValueError:
+            continue
+        if 0 <= low_port <= high_port <= MAX_PORT:
+            intervals.append((low_port, high_port))
+    return intervals
+
+
+def _names(value: Any) -> List[str]:
+    """Member names of a reference list"""
+    if not isinstance(value, list):
+        return []
+    return [m["name"] for m in value if isinstance(m, dict) and m.get("name")]
+
+
+class IntervalIndex:
+    """
+    Stabbing-query index of closed integer intervals.
+
+    Interval ends are cut into elementary segments, each holding the
+    labels of every interval that covers it, so a query is one binary
+    search. Segments covered by the same intervals share one tuple.
+    """
+
+    def __init__(self, intervals: Iterable[Tuple[int, int, str]]):
+        events: Dict[int, List[Tuple[int, str]]] = {}
+        for low, high, label in intervals:
+            events.setdefault(low, []).append((1, label))
+            events.setdefault(high + 1, []).append((-1, label))
+        self._bounds: List[int] = []
+        self._labels: List[Tuple[str, ...]] = []
+        active: Dict[str, int] = {}
+        current: Tuple[str, ...] = ()
+        for point in sorted(events):
+            for delta, label in events[point]:
+                count = active.get(label, 0) + delta
+                if count:
+                    active[label] = count
+                else:
+                    active.pop(label, None)
+            labels = tuple(sorted(active))
+            if labels != current:
+                self._bounds.append(point)
+                self._labels.append(labels)
+                current = labels
+
+    def __len__(self) -> int:
+        return len(self._bounds)
+
+    def covering(self, point: int) -> Tuple[str, ...]:
+        """Labels of the intervals that contain point"""
+        segment = bisect_right(self._bounds, point) - 1
+        return self._labels[segment] if segment >= 0 else ()
+
+
+class ServiceIndex:
+    """
+    Services and service groups that cover a protocol and port.
+
+    Custom services with port ranges go into one IntervalIndex per
+    protocol. IP services match every port of their protocol number (all
+    protocols for number 0), and groups match through any member service
+    or nested group.
+    """
+
+    def __init__(
+        self,
+        services: Iterable[Dict[str, Any]],
+        groups: Iterable[Dict[str, Any]] = (),
+    ):
+        intervals: Dict[str, List[Tuple[int, int, str]]] = {
+            p: [] for p in PORT_PROTOCOLS
+        }
+        self._by_number: Dict[int, List[str]] = {}
+        self.services = 0
+        for service in services:
+            name = service.get("name") if isinstance(service, dict) else None
+            if not name:
+                continue
+            self.services += 1
+            protocol = str(service.get("protocol", "TCP/UDP/SCTP")).upper()
+            if protocol == "IP":
+                number = service.get("protocol-number")
+                number = number if isinstance(number, int) else 0
+                self._by_number.setdefault(number, []).append(name)
+            elif protocol in ICMP_PROTOCOLS:
+                self._by_number.setdefault(ICMP_PROTOCOLS[protocol], []).append(name)
+            elif protocol in ("TCP/UDP/SCTP", "TCP/UDP/UDP-LITE/SCTP"):
+                for proto, (_, field) in PORT_PROTOCOLS.items():
+                    for low, high in parse_portrange(service.get(field)):
+                        intervals[proto].append((low, high, name))
+        self._indexes = {p: IntervalIndex(i) for p, i in intervals.items()}
+        # member -> groups that contain it
+        self._parents: Dict[str, List[str]] = {}
+        self.groups = 0
+        for group in groups:
+            name = group.get("name") if isinstance(group, dict) else None
+            if not name:
+                continue
+            self.groups += 1
+            for member in _names(group.get("member")):
+                self._parents.setdefault(member, []).append(name)
+
+    def _containing_groups(self, names: Iterable[str]) -> List[str]:
+        found: Set[str] = set()
+        pending = list(names)
+        while pending:
+            for parent in self._parents.get(pending.pop(), []):
+                if parent not in found:
+                    found.add(parent)
+                    pending.append(parent)
+        return sorted(found)
+
+    def lookup(self, protocol: str, port: Optional[int] = None) -> Dict[str, Any]:
+        """
+        Services covering a protocol and port, and the groups that hold them.
+
+        protocol is tcp, udp or sctp with a port, or an IP protocol number
+        as a string (e.g. "47") without one.
+        """
+        if protocol in PORT_PROTOCOLS:
+            number = PORT_PROTOCOLS[protocol][0]
+            matched = set(self._indexes[protocol].covering(port or 0))
+        else:
+            number = int(protocol)
+            matched = set()
+        matched.update(self._by_number.get(number, []))
+        if number:
+            matched.update(self._by_number.get(0, []))
+        services = sorted(matched)
+        return {"services": services, "groups": self._containing_groups(services)}
+
+
+def policies_using(
+    policies: Iterable[Dict[str, Any]], names: Iterable[str]
+) -> List[Dict[str, Any]]:
+    """Policies (policyid and name) whose service list holds any of names"""
+    wanted = set(names)
+    return [
+        {"policyid": policy.get("policyid"), "name": policy.get("name", "")}
+        for policy in policies
+        if isinstance(policy, dict)
+        and wanted.intersection(_names(policy.get("service")))
+    ]
+
+
+class ServiceIndexCache:
+    """Thread-safe LRU of built indexes keyed by owner and table revisions"""
+
+    def __init__(self, max_indexes: int = MAX_CACHED_INDEXES):
+        self.max_indexes = max_indexes
+        self._lock = threading.Lock()
+        self._indexes: "OrderedDict[Tuple[str, Any, Any], ServiceIndex]" = OrderedDict()
+
+    def get(self, key: Tuple[str, Any, Any]) -> Optional[ServiceIndex]:
+        with self._lock:
+            index = self._indexes.get(key)
+            if index is not None:
+                self._indexes.move_to_end(key)
+            return index
+
+    def put(self, key: Tuple[str, Any, Any], index: ServiceIndex) -> None:
+        with self._lock:
+            self._indexes[key] = index
+            self._indexes.move_to_end(key)
+            while len(self._indexes) > self.max_indexes:
+                self._indexes.popitem(last=False)
+
+    def clear(self) -> None:
+        with self._lock:
+            self._indexes.clear()
+
+
+# Service indexes built by find_services
+SERVICE_INDEXES = ServiceIndexCache()
@@ -0,0 +1,176 @@
+"""
+On-disk storage under the server data directory
+"""
+
+import json
+import logging
+import os
+import sqlite3
+import threading
+import time
+import zlib
+from pathlib import Path
+from typing import Any, Optional, Tuple
+
+logger = logging.getLogger(__name__)
+
+# Environment variable naming the data directory
+DATA_DIR_ENV = "FORTIOS_DATA_DIR"
+DEFAULT_DATA_DIR = "data"
+SNAPSHOT_DB = "cmdb_snapshots.sqlite3"
+# Snapshots not refreshed for this long are dropped when the store opens
+MAX_SNAPSHOT_AGE = 7 * 24 * 3600
+
+_SCHEMA = """
+CREATE TABLE IF NOT EXISTS snapshots (
+    owner TEXT NOT NULL,
+    endpoint TEXT NOT NULL,
+    revision TEXT NOT NULL,
+    fetched_at REAL NOT NULL,
+    meta TEXT NOT NULL,
+    records BLOB NOT NULL,
+    PRIMARY KEY (owner, endpoint)
+)
+"""
+
+
+def data_dir() -> Path:
+    """Directory for persistent server data (FORTIOS_DATA_DIR, default ./data)"""
+    return Path(os.environ.get(DATA_DIR_ENV) or DEFAULT_DATA_DIR)
+
+
+class SnapshotStore:
+    """
+    SQLite store of the latest snapshot of each cached CMDB table.
+
+    Rows are keyed like the in-memory table cache, by (owner_key, endpoint),
+    so no credentials are written to disk. Records are stored as compressed
+    compact JSON. The database is opened on first use; if it cannot be
+    opened or written (e.g. a read-only filesystem) the store logs a warning
+    and disables itself, and the server keeps working from memory only.
+    """
+
+    def __init__(self, path: Optional[Path] = None):
+        self._path = path
+        self._lock = threading.Lock()
+        self._conn: Optional[sqlite3.Connection] = None
+        self._disabled = False
+
+    @property
+    def path(self) -> Path:
+        return self._path or data_dir() / SNAPSHOT_DB
+
+    def _connect(self) -> Optional[sqlite3.Connection]:
+        if self._conn is None and not self._disabled:
+            try:
+                self.path.parent.mkdir(parents=True, exist_ok=True)
+                conn = sqlite3.connect(str(self.path), check_same_thread=False)
+                conn.execute("PRAGMA journal_mode=WAL")
+                conn.execute(_SCHEMA)
+                conn.execute(
+                    "DELETE FROM snapshots WHERE fetched_at < ?",
+                    (time.time() - MAX_SNAPSHOT_AGE,),
+                )
+                conn.commit()
+                self._conn = conn
+                logger.info(f"CMDB snapshot store: {self.path}")
+            except (OSError, sqlite3.Error) as e:
+                logger.warning(f"CMDB snapshots disabled ({self.path}): {e}")
+                self._disabled = True
+        return self._conn
+
+    def _fail(self, action: str, error: Exception) -> None:
+        logger.warning(f"CMDB snapshot {action} failed, disabling snapshots: {error}")
+        self._disabled = True
+        if self._conn is not None:
+            self._conn.close()
+            self._conn = None
+
+    def load(self, key: Tuple[str, str]) -> Optional[Tuple[str, Any, Any, float]]:
+        """Stored (revision, records, meta, fetched_at) for key, or None"""
+        with self._lock:
+            conn = self._connect()
+            if conn is None:
+                return None
+            try:
+                row = conn.execute(
+                    "SELECT revision, records, meta, fetched_at FROM snapshots "
+                    "WHERE owner = ? AND endpoint = ?",
+                    key,
+                ).fetchone()
+            except sqlite3.Error as e:
+                self._fail("read", e)
+                return None
+        if row is None:
+            return None
+        revision, records, meta, fetched_at = row
+        return (
+            revision,
+            json.loads(zlib.decompress(records)),
+            json.loads(meta),
+            fetched_at,
+        )
+
+    def save(
+        self,
+        key: Tuple[str, str],
+        revision: str,
+        records: Any,
+        meta: Any,
+        fetched_at: float,
+    ) -> None:
+        """Store the snapshot of a table, replacing any older one"""
+        blob = zlib.compress(json.dumps(records, separators=(",", ":")).encode())
+        with self._lock:
+            conn = self._connect()
+            if conn is None:
+                return
+            try:
+                conn.execute(
+                    "INSERT OR REPLACE INTO snapshots VALUES (?, ?, ?, ?, ?, ?)",
+                    (*key, revision, fetched_at, json.dumps(meta), blob),
+                )
+                conn.commit()
+            except sqlite3.Error as e:
+                self._fail("write", e)
+
+    def set_revision(self, key: Tuple[str, str], revision: str) -> None:
+        """Mark a stored snapshot as current at a newer revision"""
+        with self._lock:
+            conn = self._connect()
+            if conn is None:
+                return
+            try:
+                conn.execute(
+                    "UPDATE snapshots SET revision = ? WHERE owner = ? AND endpoint = ?",
+                    (revision, *key),
+                )
+                conn.commit()
+            except sqlite3.Error as e:
+                self._fail("write", e)
+
+    def delete(self, key: Tuple[str, str]) -> None:
+        """Drop the snapshot of a table"""
+        with self._lock:
+            conn = self._connect()
+            if conn is None:
+                return
+            try:
+                conn.execute(
+                    "DELETE FROM snapshots WHERE owner = ? AND endpoint = ?", key
+                )
+                conn.commit()
+            except sqlite3.Error as e:
+                self._fail("write", e)
+
+    def close(self) -> None:
+        """Close the database; the next use reopens it (and retries if disabled)"""
+        with self._lock:
+            if self._conn is not None:
+                self._conn.close()
+            self._conn = None
+            self._disabled = False
+
+
+# Snapshots backing the shared CMDB table cache
+SNAPSHOTS = SnapshotStore()
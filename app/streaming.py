@@ -0,0 +1,228 @@
+"""
+Incremental parsing of large FortiOS API responses
+"""
+
+import codecs
+import json
+import re
+from typing import Any, Callable, Dict, Iterable, Iterator, List, Optional
+
+_WHITESPACE = " \t\n\r"
+_decoder = json.JSONDecoder()
+
+# FortiOS filter operators, longest first so "<=" wins over "<"
+_FILTER_PATTERN = re.compile(
+    r"^(?P<field>[^=!<>@]+)(?P<op>==|!=|=@|!@|<=|>=|<|>)(?P<value>.*)$"
+)
+
+
+class StreamParseError(ValueError):
+    """Raised when a streamed response is not a valid JSON object"""
+
+    pass
+
+
+class _Buffer:
+    """Text buffer over a byte-chunk iterator that drops consumed input"""
+
+    def __init__(self, chunks: Iterable[bytes]):
+        self._chunks = iter(chunks)
+        self._utf8 = codecs.getincrementaldecoder("utf-8")()
+        self.text = ""
+        self.pos = 0
+        self.eof = False
+
+    def fill(self) -> bool:
+        """Append the next chunk, discarding parsed text; False at end of input"""
+        if self.eof:
+            return False
+        consumed, self.pos = self.pos, 0
+        try:
+            chunk = next(self._chunks)
+        except StopIteration:
+            self.text = self.text[consumed:] + self._utf8.decode(b"", final=True)
+            self.eof = True
+            return False
+        self.text = self.text[consumed:] + self._utf8.decode(chunk)
+        return True
+
+    def peek(self) -> str:
+        """Next non-whitespace character ('' at end of input)"""
+        while True:
+            while self.pos < len(self.text) and self.text[self.pos] in _WHITESPACE:
+                self.pos += 1
+            if self.pos < len(self.text):
+                return self.text[self.pos]
+            if not self.fill():
+                return ""
+
+    def expect(self, chars: str) -> str:
+        """Consume one of chars (after whitespace) and return it"""
+        char = self.peek()
+        if not char or char not in chars:
+            raise StreamParseError(
+                f"Expected one of {chars!r} at offset {self.pos}, got {char!r}"
+            )
+        self.pos += 1
+        return char
+
+    def value(self) -> Any:
+        """Decode one complete JSON value, reading more input as needed"""
+        self.peek()
+        while True:
+            try:
+                value, end = _decoder.raw_decode(self.text, self.pos)
+            except json.JSONDecodeError as e:
+                if self.fill():
+                    continue
+                raise StreamParseError(f"Invalid JSON in stream: {e}") from e
+            # A number at the very end of the buffer may continue in the
+            # next chunk, so only accept it once more input has arrived
+            if end == len(self.text) and not self.eof:
+                self.fill()
+                continue
+            self.pos = end
+            return value
+
+
+def iter_json_array(
+    chunks: Iterable[bytes],
+    key: str = "results",
+    meta: Optional[Dict[str, Any]] = None,
+) -> Iterator[Any]:
+    """
+    Yield the items of one top-level array of a JSON object as they arrive.
+
+    Only one item is decoded at a time, so memory stays bounded by the chunk
+    size plus the largest single item regardless of the array length.
+
+    Args:
+        chunks: Response body as an iterable of byte chunks
+        key: Top-level member whose array items are streamed
+        meta: Dict that receives every other top-level member. Members that
+            follow the array are only available once it is exhausted.
+
+    Yields:
+        Items of the array, in order. If the member is not an array (e.g.
+        a single object), that value is yielded once.
+
+    Raises:
+        StreamParseError: If the body is not a valid JSON object
+    """
+    meta = {} if meta is None else meta
+    buf = _Buffer(chunks)
+
+    buf.expect("{")
+    if buf.peek() == "}":
+        buf.pos += 1
+        return
+
+    while True:
+        name = buf.value()
+        if not isinstance(name, str):
+            raise StreamParseError("Object keys must be strings")
+        buf.expect(":")
+
+        if name == key and buf.peek() == "[":
+            buf.pos += 1
+            if buf.peek() == "]":
+                buf.pos += 1
+            else:
+                while True:
+                    yield buf.value()
+                    if buf.expect(",]") == "]":
+                        break
+        elif name == key:
+            yield buf.value()
+        else:
+            meta[name] = buf.value()
+
+        if buf.expect(",}") == "}":
+            return
+
+
+def project(record: Any, fields: Optional[List[str]]) -> Any:
+    """Keep only the requested fields of a record (all fields if none given)"""
+    if not fields or not isinstance(record, dict):
+        return record
+    return {field: record[field] for field in fields if field in record}
+
+
+def _scalars(value: Any) -> List[Any]:
+    """Comparable values of a field; reference lists match on member names"""
+    if isinstance(value, list):
+        result = []
+        for item in value:
+            result.extend(_scalars(item))
+        return result
+    if isinstance(value, dict):
+        name = value.get("name", value.get("q_origin_key"))
+        return [] if name is None else [name]
+    return [value]
+
+
+def _compare(actual: Any, op: str, expected: str) -> bool:
+    text = str(actual)
+    if op == "==":
+        return text == expected
+    if op == "!=":
+        return text != expected
+    if op == "=@":
+        return expected.lower() in text.lower()
+    if op == "!@":
+        return expected.lower() not in text.lower()
+    try:
+        left, right = float(actual), float(expected)
+    except (TypeError, ValueError):
+        left, right = text, expected  # type: ignore[assignment]
+    if op == "<":
+        return left < right
+    if op == "<=":
+        return left <= right
+    if op == ">":
+        return left > right
+    return left >= right
+
+
+def _compile_condition(expression: str) -> Callable[[Dict[str, Any]], bool]:
+    match = _FILTER_PATTERN.match(expression.strip())
+    if not match:
+        raise ValueError(f"Invalid filter expression: '{expression}'")
+    field = match.group("field").strip()
+    op = match.group("op")
+    expected = match.group("value").strip()
+
+    def condition(record: Dict[str, Any]) -> bool:
+        values = _scalars(record.get(field))
+        if op in ("!=", "!@"):
+            # Negations must hold for every member of a list field
+            return all(_compare(v, op, expected) for v in values)
+        return any(_compare(v, op, expected) for v in values)
+
+    return condition
+
+
+def compile_filters(
+    filters: Optional[List[str]],
+) -> Callable[[Dict[str, Any]], bool]:
+    """
+    Compile FortiOS-style filter expressions into a record predicate.
+
+    Each expression is 'field<op>value' with op one of ==, !=, =@ (contains),
+    !@ (does not contain), <, <=, >, >=. Comma-separated alternatives inside
+    one expression are OR-ed; separate expressions are AND-ed. Fields that
+    hold reference lists (e.g. srcaddr) match on member names.
+
+    Raises:
+        ValueError: If an expression cannot be parsed
+    """
+    groups = [
+        [_compile_condition(alt) for alt in expression.split(",") if alt.strip()]
+        for expression in (filters or [])
+        if expression.strip()
+    ]
+
+    def predicate(record: Dict[str, Any]) -> bool:
+        return all(any(cond(record) for cond in group) for group in groups)
+
+    return predicate
@@ -0,0 +1,192 @@
+"""
+Interface throughput from deltas of cached counter samples
+"""
+
+import threading
+import time
+from collections import OrderedDict
+from typing import Any, Dict, List, NamedTuple, Optional, Set, Tuple
+
+from .fortios_client import CancelToken, FortiOSClient
+
+INTERFACE_ENDPOINT = "monitor/system/interface"
+# Rates are computed over at least this many seconds
+MIN_RATE_INTERVAL = 1.0
+# Devices whose last sample is kept; the least recently used go first
+MAX_TRACKED_DEVICES = 1024
+# Counters kept per interface, in this order
+COUNTERS = ("rx_bytes", "tx_bytes", "rx_packets", "tx_packets")
+
+
+class CounterSample(NamedTuple):
+    """Interface counters of a device at one point in time"""
+
+    taken: float  # time.monotonic()
+    counters: Dict[str, Tuple[int, ...]]
+    info: Dict[str, Dict[str, Any]]  # link state and speed per interface
+
+
+def parse_sample(results: Any, taken: float) -> CounterSample:
+    """Counter sample from a monitor/system/interface response"""
+    counters: Dict[str, Tuple[int, ...]] = {}
+    info: Dict[str, Dict[str, Any]] = {}
+    if isinstance(results, dict):
+        results = list(results.values())
+    for entry in results if isinstance(results, list) else []:
+        if not isinstance(entry, dict) or not entry.get("name"):
+            continue
+        values = tuple(
+            value
+            for value in (entry.get(counter) for counter in COUNTERS)
+            if isinstance(value, int)
+        )
+        if len(values) != len(COUNTERS):
+            continue
+        counters[entry["name"]] = values
+        info[entry["name"]] = {"link": entry.get("link"), "speed": entry.get("speed")}
+    return CounterSample(taken, counters, info)
+
+
+def counter_delta(previous: int, current: int) -> Optional[int]:
+    """
+    Increase of a counter between two samples, allowing for wrap-around.
+
+    A counter that went down is assumed to have wrapped at 32 bits if its
+    old value fit in 32 bits, else at 64 bits. If the wrap would imply it
+    advanced more than half its range, it was reset instead (reboot,
+    cleared counters) and the increase is unknown (None).
+    """
+    if current >= previous:
+        return current - previous
+    width = 2**32 if previous < 2**32 else 2**64
+    delta = current + width - previous
+    return delta if delta < width // 2 else None
+
+
+def interface_rates(
+    previous: CounterSample,
+    current: CounterSample,
+    interfaces: Optional[Set[str]] = None,
+) -> List[Dict[str, Any]]:
+    """
+    bps and pps per interface between two samples, busiest first.
+
+    Rates of counters that were reset are None, as are all rates of
+    interfaces that were not in the previous sample.
+    """
+    elapsed = current.taken - previous.taken
+    rates = []
+    for name, values in current.counters.items():
+        if interfaces and name not in interfaces:
+            continue
+        old = previous.counters.get(name)
+        deltas = [
+            counter_delta(before, after) if old is not None and elapsed > 0 else None
+            for before, after in zip(old or values, values)
+        ]
+        rx_bytes, tx_bytes, rx_packets, tx_packets = (
+            None if delta is None else delta / elapsed for delta in deltas
+        )
+        entry: Dict[str, Any] = {
+            "interface": name,
+            **current.info[name],
+            "rx_bps": None if rx_bytes is None else rx_bytes * 8,
+            "tx_bps": None if tx_bytes is None else tx_bytes * 8,
+            "rx_pps": rx_packets,
+            "tx_pps": tx_packets,
+        }
+        speed = entry.get("speed")
+        busiest = max(entry["rx_bps"] or 0, entry["tx_bps"] or 0)
+        if isinstance(speed, (int, float)) and speed > 0:
+            # speed is reported in Mbps
+            entry["utilization"] = busiest / (speed * 1_000_000)
+        rates.append(entry)
+    rates.sort(key=lambda e: (e["rx_bps"] or 0) + (e["tx_bps"] or 0), reverse=True)
+    return rates
+
+
+class CounterCache:
+    """Thread-safe LRU of the last counter sample per device (by owner_key)"""
+
+    def __init__(self, max_devices: int = MAX_TRACKED_DEVICES):
+        self.max_devices = max_devices
+        self._lock = threading.Lock()
+        self._samples: "OrderedDict[str, CounterSample]" = OrderedDict()
+
+    def get(self, owner: str) -> Optional[CounterSample]:
+        with self._lock:
+            sample = self._samples.get(owner)
+            if sample is not None:
+                self._samples.move_to_end(owner)
+            return sample
+
+    def put(self, owner: str, sample: CounterSample) -> None:
+        with self._lock:
+            self._samples[owner] = sample
+            self._samples.move_to_end(owner)
+            while len(self._samples) > self.max_devices:
+                self._samples.popitem(last=False)
+
+    def clear(self) -> None:
+        with self._lock:
+            self._samples.clear()
+
+
+def take_sample(
+    client: FortiOSClient,
+) -> Tuple[Optional[CounterSample], Dict[str, Any]]:
+    """Read interface counters; returns (sample, result) with sample None on failure"""
+    result = client.get(INTERFACE_ENDPOINT, params={"include_vlan": "true"})
+    if result.get("http_status") != 200:
+        return None, result
+    return parse_sample(result.get("results"), time.monotonic()), result
+
+
+def device_throughput(
+    client: FortiOSClient,
+    cache: CounterCache,
+    owner: str,
+    interfaces: Optional[Set[str]] = None,
+    cancel_token: Optional[CancelToken] = None,
+) -> Dict[str, Any]:
+    """
+    Interface rates of one device since its cached sample.
+
+    Usually a single request: the new sample is compared with the one kept
+    from the previous call, then replaces it. Only the first call for a
+    device (or one within MIN_RATE_INTERVAL of the last) waits and samples
+    again.
+
+    Returns:
+        {"interval_seconds", "interfaces"} or {"error": failed result}
+    """
+    previous = cache.get(owner)
+    if previous is None:
+        previous, result = take_sample(client)
+        if previous is None:
+            return {"error": result}
+    wait = previous.taken + MIN_RATE_INTERVAL - time.monotonic()
+    if wait > 0:
+        if cancel_token is None:
+            time.sleep(wait)
+        elif cancel_token.wait(wait):
+            return {
+                "error": {
+                    "status": "error",
+                    "message": f"Request cancelled: GET {INTERFACE_ENDPOINT}",
+                    "http_status": 0,
+                    "cancelled": True,
+                }
+            }
+    current, result = take_sample(client)
+    if current is None:
+        return {"error": result}
+    cache.put(owner, current)
+    return {
+        "interval_seconds": round(current.taken - previous.taken, 3),
+        "interfaces": interface_rates(previous, current, interfaces),
+    }
+
+
+# Last counter sample of every device throughput was asked for
+COUNTER_SAMPLES = CounterCache()
@@ -2,13 +2,71 @@
 FortiOS Tools Implementation for MCP Server
 """
 
+import datetime
 import ipaddress
+import json
 import logging
 import re
-from typing import Any, Dict, List, Optional
+from concurrent.futures import ThreadPoolExecutor, as_completed
+from typing import Any, Dict, Iterator, List, Optional, Tuple
 from urllib.parse import quote
 
-from .fortios_client import FortiOSClient
+from .aggregation import DEFAULT_TOP_N, GroupAggregator, aggregate_stream, summarize
+from .backup_archive import BACKUPS
+from .cmdb_cache import CMDB_CACHE, TABLES
+from .config_diff import backup_tree, diff_trees, table_tree
+from .devices import DEVICE_NAME_PATTERN, DEVICES, Device
+from .encoding import (
+    RawJSON,
+    csv_lines,
+    csv_records,
+    encoded_size,
+    string_size,
+    table_columns,
+)
+from .fortios_client import CancelToken, FortiOSClient, deadline_after
+from .inline_addresses import (
+    ADDRESS_INDEXES,
+    AddressIndex,
+    AddressKey,
+    address_body,
+    object_name,
+    parse_inline,
+)
+from .policy_usage import PolicyCounters, policy_usage
+from .preflight import NAME_TABLES, NameChecks, describe_unknown, unknown_names
+from .references import (
+    INDEXED_TABLES,
+    NAMESPACES,
+    REFERENCE_INDEXES,
+    ReferenceIndex,
+)
+from .result_buffer import (
+    DEFAULT_MAX_STREAMED_BYTES,
+    RESULT_BUFFER,
+    Page,
+    owner_key,
+    resolve_budget,
+    resolve_raw_budget,
+)
+from .routing import (
+    ROUTE_CONFIG_ENDPOINT,
+    ROUTE_ENDPOINTS,
+    ROUTE_STATISTICS_ENDPOINT,
+    ROUTE_TABLES,
+    RouteTable,
+)
+from .schema import SCHEMA_PARAMS, SCHEMAS, TableSchema, firmware_of
+from .service_index import (
+    ICMP_PROTOCOLS,
+    MAX_PORT,
+    PORT_PROTOCOLS,
+    SERVICE_INDEXES,
+    ServiceIndex,
+    policies_using,
+)
+from .streaming import compile_filters, project
+from .throughput import COUNTER_SAMPLES, device_throughput
 
 logger = logging.getLogger(__name__)
 
@@ -22,9 +80,71 @@ VALID_NAT_OPTIONS = {"enable", "disable"}
 VALID_LOGTRAFFIC_OPTIONS = {"all", "utm", "disable"}
 VALID_PORTFORWARD_OPTIONS = {"enable", "disable"}
 VALID_PROTOCOLS = {"tcp", "udp", "sctp"}
+VALID_SERVICE_PROTOCOLS = {"tcp/udp/sctp", "icmp", "icmp6", "ip"}
+VALID_OUTPUT_FORMATS = {"json", "raw", "csv"}
+VALID_MODES = {"records", "summary"}
+VALID_BACKUP_SCOPES = {"global", "vdom"}
+VALID_LOG_SOURCES = {"memory", "disk", "fortianalyzer", "forticloud"}
+VALID_LOG_TYPES = {"traffic", "event"}
+LOG_SUBTYPE_PATTERN = re.compile(r"^[a-z][a-z0-9\-]{0,31}$")
 MAX_COLOR_VALUE = 32
 MIN_COLOR_VALUE = 0
 
+# Overall time budget (seconds) for one tool call when the caller sets none
+DEFAULT_TOOL_DEADLINE = 60.0
+
+# Config backups are streamed to disk and may take longer than a table read
+DEFAULT_BACKUP_DEADLINE = 300.0
+CONFIG_BACKUP_ENDPOINT = "monitor/system/config/backup"
+# Log entries requested per page, and scanned per query unless told otherwise
+LOG_PAGE_ROWS = 1000
+DEFAULT_MAX_LOG_ROWS = 1_000_000
+# Predefined log aggregations: group_by, sum_fields and filters
+LOG_REPORTS: Dict[str, Dict[str, List[str]]] = {
+    "top_talkers": {"group_by": ["srcip"], "sum_fields": ["sentbyte", "rcvdbyte"]},
+    "top_denied_destinations": {
+        "group_by": ["dstip", "dstport"],
+        "filters": ["action==deny,action==block"],
+    },
+    "policy_hits": {"group_by": ["policyid"]},
+}
+
+# Session table paging: sessions per request, pages fetched at once, and
+# sessions scanned per call unless told otherwise
+SESSION_ENDPOINT = "monitor/firewall/session"
+SESSION_PAGE_SIZE = 1000
+SESSION_CONCURRENCY = 4
+DEFAULT_MAX_SESSIONS = 500_000
+# Session aggregates: name -> fields grouped by
+SESSION_DIMENSIONS = {
+    "source": ["saddr"],
+    "destination": ["daddr", "dport"],
+    "policy": ["policyid"],
+    "protocol": ["proto"],
+}
+
+# Policy usage: counters endpoint, default idle period and unused policies listed
+POLICY_COUNTERS_ENDPOINT = "monitor/firewall/policy"
+DEFAULT_UNUSED_DAYS = 90
+DEFAULT_MAX_UNUSED = 100
+
+# Devices whose interface counters are read at once
+THROUGHPUT_CONCURRENCY = 8
+
+# IPs looked up per route lookup call
+MAX_ROUTE_LOOKUPS = 1000
+
+# Protocol/port queries answered per find_services call
+MAX_SERVICE_QUERIES = 100
+SERVICE_QUERY_PATTERN = re.compile(r"^(?P<protocol>[a-z0-9]+)(?:/(?P<port>\d{1,5}))?$")
+
+# Inline addresses a policy may create, and address creates sent at once
+MAX_INLINE_ADDRESSES = 50
+INLINE_ADDRESS_CONCURRENCY = 4
+
+# A one-record CMDB read: cheap, and reports the current config revision
+REVISION_PROBE_PARAMS = {"start": 0, "count": 1}
+
 
 class ValidationError(Exception):
     """Raised when input validation fails"""
@@ -142,18 +262,249 @@ def _validate_choice(value: str, valid_options: set, field_name: str) -> str:
     return value
 
 
+def _compile_filters(filters: Optional[List[str]]):
+    """Compile record filter expressions, reporting syntax errors as validation errors"""
+    try:
+        return compile_filters(filters)
+    except ValueError as e:
+        raise ValidationError(str(e))
+
+
+def _validate_output_format(
+    output_format: str,
+    fields: Optional[List[str]] = None,
+    filters: Optional[List[str]] = None,
+) -> str:
+    """Validate a getter output format against the other read options"""
+    output_format = _validate_choice(
+        output_format, VALID_OUTPUT_FORMATS, "output_format"
+    )
+    if output_format == "raw" and (fields or filters):
+        raise ValidationError("raw output cannot be combined with fields or filters")
+    return output_format
+
+
+def _validate_device_name(name: str) -> str:
+    """Validate a registered device name (used in resource URIs)"""
+    name = name.strip()
+    if not DEVICE_NAME_PATTERN.match(name):
+        raise ValidationError(
+            "name must start with a letter or digit and contain only "
+            "letters, digits, '.', '-' and '_' (at most 63 characters)"
+        )
+    return name
+
+
+def _validate_mode(mode: str, output_format: str = "json") -> str:
+    """Validate a getter mode against the output format"""
+    mode = _validate_choice(mode, VALID_MODES, "mode")
+    if mode == "summary" and output_format == "raw":
+        raise ValidationError("summary mode cannot be combined with raw output")
+    return mode
+
+
+def _validate_date(date: str) -> str:
+    """Validate a YYYY-MM-DD date"""
+    date = date.strip()
+    try:
+        datetime.date.fromisoformat(date)
+    except ValueError:
+        raise ValidationError(f"Invalid date '{date}': expected YYYY-MM-DD")
+    return date
+
+
+def _validate_portrange(portrange: str, field_name: str) -> str:
+    """Validate a FortiOS port range list (e.g. 80 443 8000-8080:1024-65535)"""
+    entries = portrange.split()
+    for entry in entries:
+        for side in entry.split(":", 1):
+            low, _, high = side.partition("-")
+            try:
+                low_port = int(low)
+                high_port = int(high) if high else low_port
+            except ValueError:
+                low_port, high_port = -1, -1
+            if not 0 <= low_port <= high_port <= MAX_PORT:
+                raise ValidationError(f"Invalid port range for {field_name}: '{entry}'")
+    return " ".join(entries)
+
+
+def _validate_service_query(query: str) -> Tuple[str, Optional[int]]:
+    """Parse a service query ("tcp/8443", "icmp", "ip/47") into (protocol, port)"""
+    match = SERVICE_QUERY_PATTERN.match(query.strip().lower())
+    protocol = match.group("protocol") if match else ""
+    port = match.group("port") if match else None
+    if protocol in PORT_PROTOCOLS and port is not None and int(port) <= MAX_PORT:
+        return protocol, int(port)
+    if protocol.upper() in ICMP_PROTOCOLS and port is None:
+        return str(ICMP_PROTOCOLS[protocol.upper()]), None
+    if protocol == "ip" and port is not None and int(port) <= 255:
+        return str(int(port)), None
+    raise ValidationError(
+        f"Invalid service query '{query}'. Use tcp/<port>, udp/<port>, "
+        "sctp/<port>, icmp, icmp6 or ip/<protocol number>"
+    )
+
+
+def _validate_inline_addresses(fields: Dict[str, List[str]]) -> Dict[str, AddressKey]:
+    """
+    Inline IPs, CIDRs, ranges and prefixed FQDNs among policy addresses, by value.
+
+    Other values are left out: they are taken as address object names.
+    """
+    inline: Dict[str, AddressKey] = {}
+    for field, values in fields.items():
+        for value in values:
+            try:
+                key = parse_inline(value)
+            except ValueError as e:
+                raise ValidationError(f"Invalid {field}: {e}")
+            if key is not None:
+                inline[value] = key
+    if len(inline) > MAX_INLINE_ADDRESSES:
+        raise ValidationError(
+            f"At most {MAX_INLINE_ADDRESSES} inline addresses per policy"
+        )
+    return inline
+
+
+def tool_deadline(seconds: Optional[float] = None) -> Optional[float]:
+    """Resolve a per-call time budget into a deadline, inheriting the default"""
+    if seconds is None or seconds <= 0:
+        seconds = DEFAULT_TOOL_DEADLINE
+    return deadline_after(seconds)
+
+
+def _deadline_exceeded_response(details: Dict[str, Any]) -> Dict[str, Any]:
+    """Build the tool result returned when the call deadline has passed"""
+    return {
+        "success": False,
+        "message": "Deadline exceeded before the FortiGate responded",
+        "deadline_exceeded": True,
+        "details": details,
+    }
+
+
+def _cancelled_response(details: Dict[str, Any]) -> Dict[str, Any]:
+    """Build the tool result returned when the MCP request was cancelled"""
+    return {
+        "success": False,
+        "message": "Request cancelled by the client",
+        "cancelled": True,
+        "details": details,
+    }
+
+
+def _iter_log_entries(
+    client: FortiOSClient, endpoint: str, meta: Dict[str, Any], max_rows: int
+) -> Iterator[Dict[str, Any]]:
+    """
+    Stream log entries page by page (start/rows), one entry at a time.
+
+    meta receives the metadata of the last page, rows_scanned and complete
+    (whether the end of the log was reached); check it once the iterator is
+    exhausted, as an error, cancel or the deadline ends the stream early.
+    """
+    start = 0
+    session: Dict[str, Any] = {}
+    meta.update({"rows_scanned": 0, "complete": False})
+    while start < max_rows:
+        rows = min(LOG_PAGE_ROWS, max_rows - start)
+        page: Dict[str, Any] = {}
+        received = 0
+        params = {"start": start, "rows": rows, **session}
+        for entry in client.iter_results(endpoint, page, params=params):
+            received += 1
+            if isinstance(entry, dict):
+                yield entry
+        start += received
+        meta.update(page)
+        meta["rows_scanned"] = start
+        if page.get("http_status") != 200 or page.get("status") == "error":
+            return
+        if received < rows:
+            meta["complete"] = True
+            return
+        # Later pages continue the same log query on the FortiGate
+        if page.get("session_id"):
+            session = {"session_id": page["session_id"]}
+
+
+def _session_rows(result: Dict[str, Any]) -> List[Dict[str, Any]]:
+    """Sessions of one session table page"""
+    results = result.get("results")
+    if isinstance(results, dict):
+        results = results.get("details")
+    if not isinstance(results, list):
+        return []
+    return [row for row in results if isinstance(row, dict)]
+
+
+def _session_total(result: Dict[str, Any]) -> Optional[int]:
+    """Number of sessions the FortiGate reports for the query, if it does"""
+    results = result.get("results")
+    summary = results.get("summary") if isinstance(results, dict) else None
+    if isinstance(summary, dict):
+        for key in ("matched_count", "total"):
+            if isinstance(summary.get(key), int):
+                return summary[key]
+    return None
+
+
+def _page_response(page: Page) -> Dict[str, Any]:
+    """Build the getter response for one chunk of a (possibly) paged result"""
+    data: Any = page.records
+    columns = page.context.get("columns")
+    if columns is not None:
+        # CSV pages hold encoded lines; each page restates the header
+        data = "".join(csv_lines([columns]) + page.records)
+    response = {
+        "success": True,
+        "message": page.context["message"],
+        "data": data,
+        "details": page.context["details"],
+    }
+    if page.continuation_token:
+        response.update(
+            {
+                "truncated": True,
+                "continuation_token": page.continuation_token,
+                "remaining_records": page.remaining,
+            }
+        )
+    return response
+
+
 class FortiOSTools:
     """FortiOS tools implementation"""
 
     @staticmethod
-    def create_client(url: str, token: str, vdom: str = "root") -> FortiOSClient:
+    def create_client(
+        url: str,
+        token: str,
+        vdom: str = "root",
+        deadline: Optional[float] = None,
+        cancel_token: Optional[CancelToken] = None,
+    ) -> FortiOSClient:
         """Create FortiOS client instance"""
-        return FortiOSClient(url, token, vdom)
+        return FortiOSClient(
+            url, token, vdom, deadline=deadline, cancel_token=cancel_token
+        )
 
     @staticmethod
-    def _check_connectivity(url: str, token: str, vdom: str = "root") -> Dict[str, Any]:
+    def _check_connectivity(
+        url: str,
+        token: str,
+        vdom: str = "root",
+        deadline: Optional[float] = None,
+        cancel_token: Optional[CancelToken] = None,
+    ) -> Dict[str, Any]:
         """Check FortiGate connectivity before executing tools"""
-        ping_result = FortiOSTools.ping_fortigate(url, token, vdom)
+        ping_result = FortiOSTools.ping_fortigate(
+            url, token, vdom, deadline, cancel_token
+        )
+        if ping_result.get("deadline_exceeded") or ping_result.get("cancelled"):
+            return ping_result
         if not ping_result["success"]:
             return {
                 "success": False,
@@ -163,11 +514,26 @@ class FortiOSTools:
         return {"success": True, "message": "Connectivity verified"}
 
     @staticmethod
-    def ping_fortigate(url: str, token: str, vdom: str = "root") -> Dict[str, Any]:
+    def ping_fortigate(
+        url: str,
+        token: str,
+        vdom: str = "root",
+        deadline: Optional[float] = None,
+        cancel_token: Optional[CancelToken] = None,
+    ) -> Dict[str, Any]:
         """Ping the FortiGate to check connectivity."""
         try:
-            client = FortiOSTools.create_client(url, token, vdom)
+            client = FortiOSTools.create_client(
+                url, token, vdom, deadline, cancel_token
+            )
             result = client.get("monitor/system/status")
+            if result.get("deadline_exceeded"):
+                return _deadline_exceeded_response(result)
+            if result.get("cancelled"):
+                return _cancelled_response(result)
+            firmware = firmware_of(result)
+            if result.get("http_status") == 200 and firmware:
+                SCHEMAS.set_firmware(owner_key(url, token, vdom), firmware)
             return {
                 "success": result.get("http_status") == 200,
                 "message": (
@@ -185,6 +551,304 @@ class FortiOSTools:
                 "details": {},
             }
 
+    @staticmethod
+    def _read_table(
+        client: FortiOSClient,
+        endpoint: str,
+        fields: Optional[List[str]] = None,
+        filters: Optional[List[str]] = None,
+        max_bytes: Optional[int] = None,
+    ) -> Dict[str, Any]:
+        """
+        Stream a CMDB table or object, filtering and projecting record by record.
+
+        Returns a dictionary shaped like a client.get() result whose results
+        only hold the matching records, trimmed to the requested fields.
+        With max_bytes, the stream is abandoned once the matching records
+        reach that encoded size, so memory stays bounded however big the
+        table is; the result is then marked capped.
+        """
+        predicate = _compile_filters(filters)
+        meta: Dict[str, Any] = {}
+        records: List[Any] = []
+        used = 0
+        for record in client.iter_results(endpoint, meta):
+            if not predicate(record):
+                continue
+            record = project(record, fields)
+            if max_bytes is not None:
+                used += encoded_size(record)
+                if used > max_bytes and records:
+                    meta["capped"] = True
+                    break
+            records.append(record)
+        return {**meta, "results": records}
+
+    @staticmethod
+    def read_cached_table(
+        client: FortiOSClient, owner: str, endpoint: str
+    ) -> Dict[str, Any]:
+        """
+        Read a whole CMDB table, reusing the cached copy while it is current.
+
+        A one-record read is enough to learn the configuration revision; the
+        table is only downloaded again once the revision has moved.
+        """
+        key = (owner, endpoint)
+        cached = CMDB_CACHE.get(key)
+        if cached is not None:
+            probe = client.get(endpoint, params=REVISION_PROBE_PARAMS)
+            if probe.get("deadline_exceeded") or probe.get("cancelled"):
+                return probe
+            if (
+                probe.get("http_status") == 200
+                and probe.get("revision") == cached.revision
+            ):
+                logger.info(f"Using cached {endpoint} at revision {cached.revision}")
+                return {**cached.meta, "results": cached.records}
+
+        return FortiOSTools.refresh_cached_table(client, owner, endpoint)
+
+    @staticmethod
+    def refresh_cached_table(
+        client: FortiOSClient, owner: str, endpoint: str
+    ) -> Dict[str, Any]:
+        """Download a whole CMDB table and store it in the table cache"""
+        result = FortiOSTools._read_table(client, endpoint)
+        if result.get("http_status") == 200 and result.get("revision"):
+            meta = {k: v for k, v in result.items() if k != "results"}
+            CMDB_CACHE.put(
+                (owner, endpoint), result["revision"], result["results"], meta
+            )
+        return result
+
+    @staticmethod
+    def read_schema(
+        client: FortiOSClient, owner: str, endpoint: str
+    ) -> Optional[TableSchema]:
+        """
+        Compiled schema of a CMDB table, or None when it cannot be read.
+
+        Schemas are cached per firmware build. The build is learned from
+        the connectivity check, so a cached schema needs no request.
+        """
+        firmware = SCHEMAS.firmware(owner)
+        schema = SCHEMAS.get((firmware, endpoint)) if firmware else None
+        if schema is not None:
+            return schema
+        result = client.get(endpoint, params=SCHEMA_PARAMS)
+        if result.get("http_status") != 200 or not isinstance(
+            result.get("results"), dict
+        ):
+            logger.warning(f"Schema of {endpoint} unavailable, not checked locally")
+            return None
+        schema = TableSchema.from_results(result["results"])
+        firmware = firmware_of(result)
+        if firmware:
+            SCHEMAS.set_firmware(owner, firmware)
+            SCHEMAS.put((firmware, endpoint), schema)
+        return schema
+
+    @staticmethod
+    def _check_schema(
+        client: FortiOSClient, owner: str, endpoint: str, data: Dict[str, Any]
+    ) -> None:
+        """Raise ValidationError when a write body breaks the table's schema"""
+        schema = FortiOSTools.read_schema(client, owner, endpoint)
+        problems = schema.errors(data) if schema is not None else []
+        if problems:
+            raise ValidationError("; ".join(problems))
+
+    @staticmethod
+    def _summary_response(
+        client: FortiOSClient,
+        endpoint: str,
+        message: str,
+        owner: str,
+        filters: Optional[List[str]] = None,
+        group_by: Optional[List[str]] = None,
+        top_n: int = 0,
+    ) -> Dict[str, Any]:
+        """Build a getter response that summarizes the (filtered) table"""
+        predicate = _compile_filters(filters)
+        result = FortiOSTools.read_cached_table(client, owner, endpoint)
+        if result.get("deadline_exceeded"):
+            return _deadline_exceeded_response(result)
+        if result.get("cancelled"):
+            return _cancelled_response(result)
+        if result.get("http_status") != 200:
+            return {"success": False, "message": message, "data": {}, "details": result}
+
+        records = (r for r in result.get("results", []) if predicate(r))
+        return {
+            "success": True,
+            "message": f"{message} (summary)",
+            "data": summarize(records, group_by, top_n),
+            "details": {k: v for k, v in result.items() if k != "results"},
+        }
+
+    @staticmethod
+    def _table_response(
+        result: Dict[str, Any],
+        message: str,
+        owner: str,
+        max_bytes: Optional[int] = None,
+        max_records: Optional[int] = None,
+        output_format: str = "json",
+        fields: Optional[List[str]] = None,
+    ) -> Dict[str, Any]:
+        """
+        Build a getter response from a table result, within the size budgets.
+
+        Records over budget are cut at a record boundary and buffered; the
+        response then carries a continuation_token for the next chunk.
+        Records are only returned in data; details keeps the rest of the
+        upstream response (revision, status, ...). A capped read (see
+        _read_table) says so in its message.
+
+        With output_format="csv", data is a CSV document whose header row
+        names the columns once, instead of a list of objects that repeat
+        every key.
+        """
+        if result.get("deadline_exceeded"):
+            return _deadline_exceeded_response(result)
+        if result.get("cancelled"):
+            return _cancelled_response(result)
+        if result.get("http_status") != 200:
+            return {"success": False, "message": message, "data": [], "details": result}
+
+        details = {key: value for key, value in result.items() if key != "results"}
+        records = result.get("results", [])
+        if details.get("capped"):
+            message = (
+                f"{message} (first {len(records)} matching records only; "
+                "narrow the read with filters or fields)"
+            )
+        context: Dict[str, Any] = {"message": message, "details": details}
+        budgets = resolve_budget(max_bytes, max_records)
+        if output_format == "csv":
+            context["columns"] = table_columns(records, fields)
+            rows = csv_records(records, context["columns"])
+            page = RESULT_BUFFER.paginate(rows, owner, context, *budgets, string_size)
+        else:
+            page = RESULT_BUFFER.paginate(
+                records, owner, context, *budgets, encoded_size
+            )
+        return _page_response(page)
+
+    @staticmethod
+    def _continue_read(
+        url: str,
+        token: str,
+        vdom: str,
+        continuation_token: str,
+        max_bytes: Optional[int] = None,
+        max_records: Optional[int] = None,
+    ) -> Dict[str, Any]:
+        """Serve the next chunk of a buffered result (no FortiGate request)"""
+        return FortiOSTools._resume(
+            owner_key(url, token, vdom), continuation_token, max_bytes, max_records
+        )
+
+    @staticmethod
+    def _resume(
+        owner: str,
+        continuation_token: str,
+        max_bytes: Optional[int] = None,
+        max_records: Optional[int] = None,
+    ) -> Dict[str, Any]:
+        """Serve the next chunk of a result buffered for owner"""
+        page = RESULT_BUFFER.resume(
+            continuation_token.strip(), owner, *resolve_budget(max_bytes, max_records)
+        )
+        if page is None:
+            return {
+                "success": False,
+                "message": (
+                    "Continuation token is unknown or has expired; "
+                    "repeat the original request"
+                ),
+                "data": [],
+                "details": {},
+            }
+        return _page_response(page)
+
+    @staticmethod
+    def _read_raw(
+        client: FortiOSClient,
+        endpoint: str,
+        message: str,
+        owner: str,
+        max_bytes: Optional[int] = None,
+        max_records: Optional[int] = None,
+    ) -> Dict[str, Any]:
+        """
+        Read an endpoint and forward the upstream JSON body untouched.
+
+        On success the body is placed in details as RawJSON and spliced into
+        the tool response without being re-encoded. A successful body that
+        is not one UTF-8 JSON object is decoded and re-encoded instead, and
+        error bodies are small, so they are decoded and returned the usual
+        way. Bodies over the raw budget (max_bytes, or DEFAULT_MAX_RAW_BYTES
+        when unset) are decoded and paged like JSON output.
+        """
+        result = client.get_raw(endpoint)
+        if result.get("deadline_exceeded"):
+            return _deadline_exceeded_response(result)
+        if result.get("cancelled"):
+            return _cancelled_response(result)
+        if "body" not in result:
+            return {"success": False, "message": message, "data": [], "details": result}
+
+        body = result["body"]
+        if result["http_status"] == 200 and len(body) > resolve_raw_budget(max_bytes):
+            try:
+                table = json.loads(body)
+            except ValueError:
+                table = None
+            if isinstance(table, dict):
+                records = table.get("results", [])
+                table["results"] = records if isinstance(records, list) else [records]
+                table["http_status"] = 200
+                return FortiOSTools._table_response(
+                    table, message, owner, max_bytes, max_records
+                )
+
+        if result["http_status"] == 200:
+            try:
+                return {
+                    "success": True,
+                    "message": f"{message} (upstream response in details)",
+                    "details": RawJSON.wrap(body),
+                }
+            except ValueError:
+                pass
+
+        try:
+            details = json.loads(body)
+        except ValueError:
+            details = {
+                "status": "error",
+                "message": "Invalid JSON response",
+                "raw_response": body[:500].decode("utf-8", "replace"),
+            }
+        else:
+            if result["http_status"] == 200 and isinstance(details, dict):
+                return {
+                    "success": True,
+                    "message": f"{message} (upstream response in details)",
+                    "details": details,
+                }
+        if not isinstance(details, dict):
+            details = {"results": details}
+        details["http_status"] = result["http_status"]
+        return {
+            "success": False,
+            "message": message,
+            "data": [],
+            "details": details,
+        }
+
     @staticmethod
     def create_firewall_policy(
         url: str,
@@ -200,10 +864,48 @@ class FortiOSTools:
         status: str = "enable",
         nat: str = "disable",
         logtraffic: str = "utm",
+        deadline: Optional[float] = None,
+        cancel_token: Optional[CancelToken] = None,
     ) -> Dict[str, Any]:
-        """Create a firewall policy in FortiGate"""
+        """
+        Create a firewall policy in FortiGate.
+
+        Source and destination addresses may be given inline as IPv4
+        hosts, CIDRs, ranges or fqdn:<name>; each resolves to an existing
+        object matching the same addresses, or an object is created for it
+        first.
+        """
+        try:
+            inline = _validate_inline_addresses(
+                {"srcaddr": srcaddr, "dstaddr": dstaddr}
+            )
+        except ValidationError as e:
+            return {
+                "success": False,
+                "message": f"Validation error: {str(e)}",
+                "details": {},
+            }
+
+        # Check referenced names against the cached tables first
+        unknown = FortiOSTools._preflight(
+            url,
+            token,
+            vdom,
+            {
+                "srcaddr": ("address", [a for a in srcaddr if a not in inline]),
+                "dstaddr": ("address", [a for a in dstaddr if a not in inline]),
+                "service": ("service", service),
+            },
+            deadline,
+            cancel_token,
+        )
+        if unknown is not None:
+            return unknown
+
         # Check connectivity first
-        connectivity = FortiOSTools._check_connectivity(url, token, vdom)
+        connectivity = FortiOSTools._check_connectivity(
+            url, token, vdom, deadline, cancel_token
+        )
         if not connectivity["success"]:
             return connectivity
 
@@ -216,7 +918,19 @@ class FortiOSTools:
                 logtraffic, VALID_LOGTRAFFIC_OPTIONS, "logtraffic"
             )
 
-            client = FortiOSTools.create_client(url, token, vdom)
+            client = FortiOSTools.create_client(
+                url, token, vdom, deadline, cancel_token
+            )
+
+            addresses: List[Dict[str, Any]] = []
+            if inline:
+                resolved, addresses, failure = FortiOSTools._resolve_inline_addresses(
+                    client, owner_key(url, token, vdom), name, inline
+                )
+                if failure is not None:
+                    return failure
+                srcaddr = [resolved.get(addr, addr) for addr in srcaddr]
+                dstaddr = [resolved.get(addr, addr) for addr in dstaddr]
 
             policy_data = {
                 "name": name,
@@ -232,14 +946,24 @@ class FortiOSTools:
                 "logtraffic": logtraffic,
             }
 
+            FortiOSTools._check_schema(
+                client, owner_key(url, token, vdom), "cmdb/firewall/policy", policy_data
+            )
             logger.info(f"Creating firewall policy: {name}")
             result = client.post("cmdb/firewall/policy", policy_data)
+            if result.get("deadline_exceeded"):
+                return _deadline_exceeded_response(result)
+            if result.get("cancelled"):
+                return _cancelled_response(result)
 
-            return {
+            response = {
                 "success": result.get("http_status") == 200,
                 "message": f"Firewall policy '{name}' creation attempted",
                 "details": result,
             }
+            if addresses:
+                response["data"] = {"addresses": addresses}
+            return response
 
         except ValidationError as e:
             return {
@@ -255,6 +979,110 @@ class FortiOSTools:
                 "details": {},
             }
 
+    @staticmethod
+    def _resolve_inline_addresses(
+        client: FortiOSClient, owner: str, policy: str, inline: Dict[str, AddressKey]
+    ) -> Tuple[Dict[str, str], List[Dict[str, Any]], Optional[Dict[str, Any]]]:
+        """
+        Map inline policy addresses to address objects, creating missing ones.
+
+        Existing objects are found in an index of the address table, built
+        once per config revision. A value that is already an object's name
+        stays a name. The missing objects are checked against the schema
+        and then created INLINE_ADDRESS_CONCURRENCY requests at a time.
+
+        Returns:
+            (value -> object name, [{"value", "name", "created"}], failure),
+            with failure a tool result when a read or create failed
+        """
+        endpoint = TABLES["addresses"]
+        result = FortiOSTools.read_cached_table(client, owner, endpoint)
+        if result.get("deadline_exceeded"):
+            return {}, [], _deadline_exceeded_response(result)
+        if result.get("cancelled"):
+            return {}, [], _cancelled_response(result)
+        if result.get("http_status") != 200:
+            return (
+                {},
+                [],
+                {
+                    "success": False,
+                    "message": "Error reading address objects",
+                    "details": result,
+                },
+            )
+        revision = result.get("revision")
+        index = ADDRESS_INDEXES.get((owner, revision)) if revision else None
+        if index is None:
+            index = AddressIndex(result.get("results", []))
+            if revision:
+                ADDRESS_INDEXES.put((owner, revision), index)
+
+        resolved: Dict[str, str] = {}
+        addresses: List[Dict[str, Any]] = []
+        missing: Dict[AddressKey, str] = {}
+        for value, key in inline.items():
+            if value in index:
+                continue
+            existing = index.find(key)
+            if existing is None:
+                try:
+                    existing = missing.get(key) or object_name(key)
+                except ValueError as e:
+                    raise ValidationError(str(e))
+                if existing in index:
+                    raise ValidationError(
+                        f"Address object '{existing}' exists but does not match '{value}'"
+                    )
+                missing[key] = existing
+            resolved[value] = existing
+            addresses.append(
+                {"value": value, "name": existing, "created": key in missing}
+            )
+
+        bodies = [
+            address_body(key, new_name, f"Created for policy '{policy}'")
+            for key, new_name in missing.items()
+        ]
+        for body in bodies:
+            FortiOSTools._check_schema(client, owner, endpoint, body)
+        if not bodies:
+            return resolved, addresses, None
+
+        logger.info(f"Creating {len(bodies)} address objects for policy {policy}")
+        with ThreadPoolExecutor(
+            min(INLINE_ADDRESS_CONCURRENCY, len(bodies)),
+            thread_name_prefix="fortios-addresses",
+        ) as executor:
+            results = list(
+                executor.map(lambda body: client.post(endpoint, body), bodies)
+            )
+        failed = [r for r in results if r.get("http_status") != 200]
+        if not failed:
+            return resolved, addresses, None
+        created = [
+            body["name"]
+            for body, r in zip(bodies, results)
+            if r.get("http_status") == 200
+        ]
+        if failed[0].get("deadline_exceeded"):
+            return resolved, addresses, _deadline_exceeded_response(failed[0])
+        if failed[0].get("cancelled"):
+            return resolved, addresses, _cancelled_response(failed[0])
+        return (
+            resolved,
+            addresses,
+            {
+                "success": False,
+                "message": (
+                    f"Created {len(created)} of {len(bodies)} address objects; "
+                    f"policy '{policy}' not created"
+                ),
+                "data": {"created": created},
+                "details": failed[0],
+            },
+        )
+
     @staticmethod
     def create_address(
         url: str,
@@ -268,10 +1096,14 @@ class FortiOSTools:
         fqdn: Optional[str] = None,
         comment: str = "",
         color: int = 0,
+        deadline: Optional[float] = None,
+        cancel_token: Optional[CancelToken] = None,
     ) -> Dict[str, Any]:
         """Create an address object in FortiGate"""
         # Check connectivity first
-        connectivity = FortiOSTools._check_connectivity(url, token, vdom)
+        connectivity = FortiOSTools._check_connectivity(
+            url, token, vdom, deadline, cancel_token
+        )
         if not connectivity["success"]:
             return connectivity
 
@@ -280,7 +1112,9 @@ class FortiOSTools:
             address_type = _validate_address_type(address_type)
             color = _validate_color(color)
 
-            client = FortiOSTools.create_client(url, token, vdom)
+            client = FortiOSTools.create_client(
+                url, token, vdom, deadline, cancel_token
+            )
 
             address_data = {
                 "name": name,
@@ -318,8 +1152,18 @@ class FortiOSTools:
                 fqdn = _validate_fqdn(fqdn)
                 address_data["fqdn"] = fqdn
 
+            FortiOSTools._check_schema(
+                client,
+                owner_key(url, token, vdom),
+                "cmdb/firewall/address",
+                address_data,
+            )
             logger.info(f"Creating address object: {name}")
             result = client.post("cmdb/firewall/address", address_data)
+            if result.get("deadline_exceeded"):
+                return _deadline_exceeded_response(result)
+            if result.get("cancelled"):
+                return _cancelled_response(result)
 
             return {
                 "success": result.get("http_status") == 200,
@@ -350,10 +1194,26 @@ class FortiOSTools:
         members: List[str],
         comment: str = "",
         color: int = 0,
+        deadline: Optional[float] = None,
+        cancel_token: Optional[CancelToken] = None,
     ) -> Dict[str, Any]:
         """Create an address group in FortiGate"""
+        # Check referenced names against the cached tables first
+        unknown = FortiOSTools._preflight(
+            url,
+            token,
+            vdom,
+            {"member": ("address", members or [])},
+            deadline,
+            cancel_token,
+        )
+        if unknown is not None:
+            return unknown
+
         # Check connectivity first
-        connectivity = FortiOSTools._check_connectivity(url, token, vdom)
+        connectivity = FortiOSTools._check_connectivity(
+            url, token, vdom, deadline, cancel_token
+        )
         if not connectivity["success"]:
             return connectivity
 
@@ -367,7 +1227,9 @@ class FortiOSTools:
                     "message": "At least one member address is required",
                 }
 
-            client = FortiOSTools.create_client(url, token, vdom)
+            client = FortiOSTools.create_client(
+                url, token, vdom, deadline, cancel_token
+            )
 
             group_data = {
                 "name": name,
@@ -378,8 +1240,15 @@ class FortiOSTools:
             if comment:
                 group_data["comment"] = comment
 
+            FortiOSTools._check_schema(
+                client, owner_key(url, token, vdom), "cmdb/firewall/addrgrp", group_data
+            )
             logger.info(f"Creating address group: {name}")
             result = client.post("cmdb/firewall/addrgrp", group_data)
+            if result.get("deadline_exceeded"):
+                return _deadline_exceeded_response(result)
+            if result.get("cancelled"):
+                return _cancelled_response(result)
 
             return {
                 "success": result.get("http_status") == 200,
@@ -401,6 +1270,200 @@ class FortiOSTools:
                 "details": {},
             }
 
+    @staticmethod
+    def create_service(
+        url: str,
+        token: str,
+        vdom: str,
+        name: str,
+        protocol: str = "TCP/UDP/SCTP",
+        tcp_portrange: str = "",
+        udp_portrange: str = "",
+        sctp_portrange: str = "",
+        protocol_number: int = 0,
+        category: str = "",
+        comment: str = "",
+        color: int = 0,
+        deadline: Optional[float] = None,
+        cancel_token: Optional[CancelToken] = None,
+    ) -> Dict[str, Any]:
+        """Create a custom service object in FortiGate"""
+        # Check connectivity first
+        connectivity = FortiOSTools._check_connectivity(
+            url, token, vdom, deadline, cancel_token
+        )
+        if not connectivity["success"]:
+            return connectivity
+
+        try:
+            # Validate inputs
+            _validate_resource_name(name)
+            name = name.strip()
+            protocol = _validate_choice(
+                protocol, VALID_SERVICE_PROTOCOLS, "protocol"
+            ).upper()
+            color = _validate_color(color)
+
+            service_data: Dict[str, Any] = {
+                "name": name,
+                "protocol": protocol,
+                "color": color,
+            }
+
+            if comment:
+                service_data["comment"] = comment
+            if category:
+                _validate_resource_name(category, "category")
+                service_data["category"] = category.strip()
+
+            if protocol == "TCP/UDP/SCTP":
+                ranges = {
+                    "tcp-portrange": tcp_portrange,
+                    "udp-portrange": udp_portrange,
+                    "sctp-portrange": sctp_portrange,
+                }
+                ranges = {k: v for k, v in ranges.items() if v.strip()}
+                if not ranges:
+                    return {
+                        "success": False,
+                        "message": "At least one port range is required for TCP/UDP/SCTP",
+                    }
+                for field, portrange in ranges.items():
+                    service_data[field] = _validate_portrange(portrange, field)
+            elif protocol == "IP":
+                if not 0 <= protocol_number <= 255:
+                    raise ValidationError(
+                        f"Protocol number must be between 0 and 255, got {protocol_number}"
+                    )
+                service_data["protocol-number"] = protocol_number
+
+            client = FortiOSTools.create_client(
+                url, token, vdom, deadline, cancel_token
+            )
+
+            FortiOSTools._check_schema(
+                client,
+                owner_key(url, token, vdom),
+                "cmdb/firewall.service/custom",
+                service_data,
+            )
+            logger.info(f"Creating service: {name}")
+            result = client.post("cmdb/firewall.service/custom", service_data)
+            if result.get("deadline_exceeded"):
+                return _deadline_exceeded_response(result)
+            if result.get("cancelled"):
+                return _cancelled_response(result)
+
+            return {
+                "success": result.get("http_status") == 200,
+                "message": f"Service '{name}' creation attempted",
+                "details": result,
+            }
+
+        except ValidationError as e:
+            return {
+                "success": False,
+                "message": f"Validation error: {str(e)}",
+                "details": {},
+            }
+        except Exception as e:
+            logger.error(f"Error creating service: {e}")
+            return {
+                "success": False,
+                "message": f"Error creating service: {str(e)}",
+                "details": {},
+            }
+
+    @staticmethod
+    def create_service_group(
+        url: str,
+        token: str,
+        vdom: str,
+        name: str,
+        members: List[str],
+        comment: str = "",
+        color: int = 0,
+        deadline: Optional[float] = None,
+        cancel_token: Optional[CancelToken] = None,
+    ) -> Dict[str, Any]:
+        """Create a service group in FortiGate"""
+        # Check referenced names against the cached tables first
+        unknown = FortiOSTools._preflight(
+            url,
+            token,
+            vdom,
+            {"member": ("service", members or [])},
+            deadline,
+            cancel_token,
+        )
+        if unknown is not None:
+            return unknown
+
+        # Check connectivity first
+        connectivity = FortiOSTools._check_connectivity(
+            url, token, vdom, deadline, cancel_token
+        )
+        if not connectivity["success"]:
+            return connectivity
+
+        try:
+            # Validate inputs
+            _validate_resource_name(name)
+            name = name.strip()
+            color = _validate_color(color)
+
+            if not members:
+                return {
+                    "success": False,
+                    "message": "At least one member service is required",
+                }
+
+            client = FortiOSTools.create_client(
+                url, token, vdom, deadline, cancel_token
+            )
+
+            group_data = {
+                "name": name,
+                "member": [{"name": member} for member in members],
+                "color": color,
+            }
+
+            if comment:
+                group_data["comment"] = comment
+
+            FortiOSTools._check_schema(
+                client,
+                owner_key(url, token, vdom),
+                "cmdb/firewall.service/group",
+                group_data,
+            )
+            logger.info(f"Creating service group: {name}")
+            result = client.post("cmdb/firewall.service/group", group_data)
+            if result.get("deadline_exceeded"):
+                return _deadline_exceeded_response(result)
+            if result.get("cancelled"):
+                return _cancelled_response(result)
+
+            return {
+                "success": result.get("http_status") == 200,
+                "message": f"Service group '{name}' creation attempted",
+                "details": result,
+            }
+
+        except ValidationError as e:
+            return {
+                "success": False,
+                "message": f"Validation error: {str(e)}",
+                "details": {},
+            }
+        except Exception as e:
+            logger.error(f"Error creating service group: {e}")
+            return {
+                "success": False,
+                "message": f"Error creating service group: {str(e)}",
+                "details": {},
+            }
+
     @staticmethod
     def create_vip(
         url: str,
@@ -415,10 +1478,14 @@ class FortiOSTools:
         mappedport: Optional[str] = None,
         protocol: str = "tcp",
         comment: str = "",
+        deadline: Optional[float] = None,
+        cancel_token: Optional[CancelToken] = None,
     ) -> Dict[str, Any]:
         """Create a Virtual IP (VIP) object in FortiGate"""
         # Check connectivity first
-        connectivity = FortiOSTools._check_connectivity(url, token, vdom)
+        connectivity = FortiOSTools._check_connectivity(
+            url, token, vdom, deadline, cancel_token
+        )
         if not connectivity["success"]:
             return connectivity
 
@@ -432,7 +1499,9 @@ class FortiOSTools:
             for ip in mappedip:
                 _validate_ip(ip, "mappedip")
 
-            client = FortiOSTools.create_client(url, token, vdom)
+            client = FortiOSTools.create_client(
+                url, token, vdom, deadline, cancel_token
+            )
 
             vip_data = {
                 "name": name,
@@ -450,8 +1519,15 @@ class FortiOSTools:
             if comment:
                 vip_data["comment"] = comment
 
+            FortiOSTools._check_schema(
+                client, owner_key(url, token, vdom), "cmdb/firewall/vip", vip_data
+            )
             logger.info(f"Creating VIP object: {name}")
             result = client.post("cmdb/firewall/vip", vip_data)
+            if result.get("deadline_exceeded"):
+                return _deadline_exceeded_response(result)
+            if result.get("cancelled"):
+                return _cancelled_response(result)
 
             return {
                 "success": result.get("http_status") == 200,
@@ -474,40 +1550,98 @@ class FortiOSTools:
             }
 
     @staticmethod
-    def get_firewall_policies(
-        url: str, token: str, vdom: str, policy_id: Optional[str] = None
+    def _get_table(
+        url: str,
+        token: str,
+        vdom: str,
+        endpoint: str,
+        label: str,
+        name: Optional[str],
+        name_field: str,
+        fields: Optional[List[str]],
+        filters: Optional[List[str]],
+        output_format: str,
+        mode: str,
+        group_by: Optional[List[str]],
+        top_n: int,
+        max_bytes: Optional[int],
+        max_records: Optional[int],
+        continuation_token: Optional[str],
+        deadline: Optional[float],
+        cancel_token: Optional[CancelToken],
     ) -> Dict[str, Any]:
-        """Get firewall policies from FortiGate"""
+        """
+        Read a CMDB table, or one record of it, for the get_* tools.
+
+        Whole tables are streamed and parsed record by record; fields and
+        filters are applied during the stream, so only matching records
+        are ever held in memory. output_format="csv" returns data as a
+        CSV document; output_format="raw" skips decoding entirely and
+        forwards the upstream body in details.
+
+        mode="summary" returns counts instead of records: the number of
+        matching records and, with group_by, the top_n largest groups.
+        Summaries are computed on the server from a cached copy of the
+        table that is only downloaded again when the config revision moves.
+
+        Results larger than max_bytes or max_records are cut short and
+        return a continuation_token; pass it back (with the same url,
+        token and vdom) to get the next chunk.
+        """
+        if continuation_token:
+            return FortiOSTools._continue_read(
+                url, token, vdom, continuation_token, max_bytes, max_records
+            )
+
         # Check connectivity first
-        connectivity = FortiOSTools._check_connectivity(url, token, vdom)
+        connectivity = FortiOSTools._check_connectivity(
+            url, token, vdom, deadline, cancel_token
+        )
         if not connectivity["success"]:
             return connectivity
 
+        message = f"{label[0].upper()}{label[1:]} retrieved"
         try:
-            client = FortiOSTools.create_client(url, token, vdom)
+            output_format = _validate_output_format(output_format, fields, filters)
+            mode = _validate_mode(mode, output_format)
+            client = FortiOSTools.create_client(
+                url, token, vdom, deadline, cancel_token
+            )
 
-            if policy_id:
-                safe_id = _validate_resource_name(policy_id, "policy_id")
-                endpoint = f"cmdb/firewall/policy/{safe_id}"
-                logger.info(f"Getting firewall policy: {policy_id}")
+            if name:
+                safe_name = _validate_resource_name(name, name_field)
+                endpoint = f"{endpoint}/{safe_name}"
+                logger.info(f"Getting {label}: {name}")
             else:
-                endpoint = "cmdb/firewall/policy"
-                logger.info("Getting all firewall policies")
-
-            result = client.get(endpoint)
+                logger.info(f"Getting all {label}")
+
+            owner = owner_key(url, token, vdom)
+            if mode == "summary":
+                return FortiOSTools._summary_response(
+                    client, endpoint, message, owner, filters, group_by, top_n
+                )
+            if output_format == "raw":
+                return FortiOSTools._read_raw(
+                    client, endpoint, message, owner, max_bytes, max_records
+                )
+
+            stream_budget = max(
+                DEFAULT_MAX_STREAMED_BYTES, resolve_budget(max_bytes)[0]
+            )
+            result = FortiOSTools._read_table(
+                client, endpoint, fields, filters, stream_budget
+            )
+            return FortiOSTools._table_response(
+                result,
+                message,
+                owner,
+                max_bytes,
+                max_records,
+                output_format,
+                fields,
+            )
 
-            return {
-                "success": result.get("http_status") == 200,
-                "message": "Firewall policies retrieved",
-                "data": (
-                    result.get("results", [])
-                    if result.get("http_status") == 200
-                    else []
-                ),
-                "details": result,
-            }
-
-        except ValidationError as e:
+        except ValidationError as e:
             return {
                 "success": False,
                 "message": f"Validation error: {str(e)}",
@@ -515,45 +1649,293 @@ class FortiOSTools:
                 "details": {},
             }
         except Exception as e:
-            logger.error(f"Error getting firewall policies: {e}")
+            logger.error(f"Error getting {label}: {e}")
             return {
                 "success": False,
-                "message": f"Error getting firewall policies: {str(e)}",
+                "message": f"Error getting {label}: {str(e)}",
                 "data": [],
                 "details": {},
             }
 
+    @staticmethod
+    def get_firewall_policies(
+        url: str,
+        token: str,
+        vdom: str,
+        policy_id: Optional[str] = None,
+        fields: Optional[List[str]] = None,
+        filters: Optional[List[str]] = None,
+        output_format: str = "json",
+        mode: str = "records",
+        group_by: Optional[List[str]] = None,
+        top_n: int = 0,
+        max_bytes: Optional[int] = None,
+        max_records: Optional[int] = None,
+        continuation_token: Optional[str] = None,
+        deadline: Optional[float] = None,
+        cancel_token: Optional[CancelToken] = None,
+    ) -> Dict[str, Any]:
+        """Get firewall policies from FortiGate"""
+        return FortiOSTools._get_table(
+            url,
+            token,
+            vdom,
+            "cmdb/firewall/policy",
+            "firewall policies",
+            policy_id,
+            "policy_id",
+            fields,
+            filters,
+            output_format,
+            mode,
+            group_by,
+            top_n,
+            max_bytes,
+            max_records,
+            continuation_token,
+            deadline,
+            cancel_token,
+        )
+
     @staticmethod
     def get_addresses(
-        url: str, token: str, vdom: str, address_name: Optional[str] = None
+        url: str,
+        token: str,
+        vdom: str,
+        address_name: Optional[str] = None,
+        fields: Optional[List[str]] = None,
+        filters: Optional[List[str]] = None,
+        output_format: str = "json",
+        mode: str = "records",
+        group_by: Optional[List[str]] = None,
+        top_n: int = 0,
+        max_bytes: Optional[int] = None,
+        max_records: Optional[int] = None,
+        continuation_token: Optional[str] = None,
+        deadline: Optional[float] = None,
+        cancel_token: Optional[CancelToken] = None,
     ) -> Dict[str, Any]:
         """Get address objects from FortiGate"""
+        return FortiOSTools._get_table(
+            url,
+            token,
+            vdom,
+            "cmdb/firewall/address",
+            "address objects",
+            address_name,
+            "address_name",
+            fields,
+            filters,
+            output_format,
+            mode,
+            group_by,
+            top_n,
+            max_bytes,
+            max_records,
+            continuation_token,
+            deadline,
+            cancel_token,
+        )
+
+    @staticmethod
+    def get_address_groups(
+        url: str,
+        token: str,
+        vdom: str,
+        group_name: Optional[str] = None,
+        fields: Optional[List[str]] = None,
+        filters: Optional[List[str]] = None,
+        output_format: str = "json",
+        mode: str = "records",
+        group_by: Optional[List[str]] = None,
+        top_n: int = 0,
+        max_bytes: Optional[int] = None,
+        max_records: Optional[int] = None,
+        continuation_token: Optional[str] = None,
+        deadline: Optional[float] = None,
+        cancel_token: Optional[CancelToken] = None,
+    ) -> Dict[str, Any]:
+        """Get address groups from FortiGate"""
+        return FortiOSTools._get_table(
+            url,
+            token,
+            vdom,
+            "cmdb/firewall/addrgrp",
+            "address groups",
+            group_name,
+            "group_name",
+            fields,
+            filters,
+            output_format,
+            mode,
+            group_by,
+            top_n,
+            max_bytes,
+            max_records,
+            continuation_token,
+            deadline,
+            cancel_token,
+        )
+
+    @staticmethod
+    def get_services(
+        url: str,
+        token: str,
+        vdom: str,
+        service_name: Optional[str] = None,
+        fields: Optional[List[str]] = None,
+        filters: Optional[List[str]] = None,
+        output_format: str = "json",
+        mode: str = "records",
+        group_by: Optional[List[str]] = None,
+        top_n: int = 0,
+        max_bytes: Optional[int] = None,
+        max_records: Optional[int] = None,
+        continuation_token: Optional[str] = None,
+        deadline: Optional[float] = None,
+        cancel_token: Optional[CancelToken] = None,
+    ) -> Dict[str, Any]:
+        """Get custom service objects from FortiGate"""
+        return FortiOSTools._get_table(
+            url,
+            token,
+            vdom,
+            "cmdb/firewall.service/custom",
+            "services",
+            service_name,
+            "service_name",
+            fields,
+            filters,
+            output_format,
+            mode,
+            group_by,
+            top_n,
+            max_bytes,
+            max_records,
+            continuation_token,
+            deadline,
+            cancel_token,
+        )
+
+    @staticmethod
+    def get_service_groups(
+        url: str,
+        token: str,
+        vdom: str,
+        group_name: Optional[str] = None,
+        fields: Optional[List[str]] = None,
+        filters: Optional[List[str]] = None,
+        output_format: str = "json",
+        mode: str = "records",
+        group_by: Optional[List[str]] = None,
+        top_n: int = 0,
+        max_bytes: Optional[int] = None,
+        max_records: Optional[int] = None,
+        continuation_token: Optional[str] = None,
+        deadline: Optional[float] = None,
+        cancel_token: Optional[CancelToken] = None,
+    ) -> Dict[str, Any]:
+        """Get service groups from FortiGate"""
+        return FortiOSTools._get_table(
+            url,
+            token,
+            vdom,
+            "cmdb/firewall.service/group",
+            "service groups",
+            group_name,
+            "group_name",
+            fields,
+            filters,
+            output_format,
+            mode,
+            group_by,
+            top_n,
+            max_bytes,
+            max_records,
+            continuation_token,
+            deadline,
+            cancel_token,
+        )
+
+    @staticmethod
+    def get_vips(
+        url: str,
+        token: str,
+        vdom: str,
+        vip_name: Optional[str] = None,
+        fields: Optional[List[str]] = None,
+        filters: Optional[List[str]] = None,
+        output_format: str = "json",
+        mode: str = "records",
+        group_by: Optional[List[str]] = None,
+        top_n: int = 0,
+        max_bytes: Optional[int] = None,
+        max_records: Optional[int] = None,
+        continuation_token: Optional[str] = None,
+        deadline: Optional[float] = None,
+        cancel_token: Optional[CancelToken] = None,
+    ) -> Dict[str, Any]:
+        """Get VIP objects from FortiGate"""
+        return FortiOSTools._get_table(
+            url,
+            token,
+            vdom,
+            "cmdb/firewall/vip",
+            "VIP objects",
+            vip_name,
+            "vip_name",
+            fields,
+            filters,
+            output_format,
+            mode,
+            group_by,
+            top_n,
+            max_bytes,
+            max_records,
+            continuation_token,
+            deadline,
+            cancel_token,
+        )
+
+    @staticmethod
+    def delete_address(
+        url: str,
+        token: str,
+        vdom: str,
+        name: str,
+        deadline: Optional[float] = None,
+        cancel_token: Optional[CancelToken] = None,
+    ) -> Dict[str, Any]:
+        """Delete an address object from FortiGate"""
         # Check connectivity first
-        connectivity = FortiOSTools._check_connectivity(url, token, vdom)
+        connectivity = FortiOSTools._check_connectivity(
+            url, token, vdom, deadline, cancel_token
+        )
         if not connectivity["success"]:
             return connectivity
 
         try:
-            client = FortiOSTools.create_client(url, token, vdom)
+            safe_name = _validate_resource_name(name, "name")
+            client = FortiOSTools.create_client(
+                url, token, vdom, deadline, cancel_token
+            )
 
-            if address_name:
-                safe_name = _validate_resource_name(address_name, "address_name")
-                endpoint = f"cmdb/firewall/address/{safe_name}"
-                logger.info(f"Getting address object: {address_name}")
-            else:
-                endpoint = "cmdb/firewall/address"
-                logger.info("Getting all address objects")
+            blocked = FortiOSTools._blocked_delete(
+                client, owner_key(url, token, vdom), "addresses", name, "Address object"
+            )
+            if blocked is not None:
+                return blocked
 
-            result = client.get(endpoint)
+            logger.info(f"Deleting address object: {name}")
+            result = client.delete(f"cmdb/firewall/address/{safe_name}")
+            if result.get("deadline_exceeded"):
+                return _deadline_exceeded_response(result)
+            if result.get("cancelled"):
+                return _cancelled_response(result)
 
             return {
                 "success": result.get("http_status") == 200,
-                "message": "Address objects retrieved",
-                "data": (
-                    result.get("results", [])
-                    if result.get("http_status") == 200
-                    else []
-                ),
+                "message": f"Address object '{name}' deletion attempted",
                 "details": result,
             }
 
@@ -561,49 +1943,59 @@ class FortiOSTools:
             return {
                 "success": False,
                 "message": f"Validation error: {str(e)}",
-                "data": [],
                 "details": {},
             }
         except Exception as e:
-            logger.error(f"Error getting address objects: {e}")
+            logger.error(f"Error deleting address object: {e}")
             return {
                 "success": False,
-                "message": f"Error getting address objects: {str(e)}",
-                "data": [],
+                "message": f"Error deleting address object: {str(e)}",
                 "details": {},
             }
 
     @staticmethod
-    def get_address_groups(
-        url: str, token: str, vdom: str, group_name: Optional[str] = None
+    def delete_address_group(
+        url: str,
+        token: str,
+        vdom: str,
+        name: str,
+        deadline: Optional[float] = None,
+        cancel_token: Optional[CancelToken] = None,
     ) -> Dict[str, Any]:
-        """Get address groups from FortiGate"""
+        """Delete an address group from FortiGate"""
         # Check connectivity first
-        connectivity = FortiOSTools._check_connectivity(url, token, vdom)
+        connectivity = FortiOSTools._check_connectivity(
+            url, token, vdom, deadline, cancel_token
+        )
         if not connectivity["success"]:
             return connectivity
 
         try:
-            client = FortiOSTools.create_client(url, token, vdom)
+            safe_name = _validate_resource_name(name, "name")
+            client = FortiOSTools.create_client(
+                url, token, vdom, deadline, cancel_token
+            )
 
-            if group_name:
-                safe_name = _validate_resource_name(group_name, "group_name")
-                endpoint = f"cmdb/firewall/addrgrp/{safe_name}"
-                logger.info(f"Getting address group: {group_name}")
-            else:
-                endpoint = "cmdb/firewall/addrgrp"
-                logger.info("Getting all address groups")
+            blocked = FortiOSTools._blocked_delete(
+                client,
+                owner_key(url, token, vdom),
+                "address-groups",
+                name,
+                "Address group",
+            )
+            if blocked is not None:
+                return blocked
 
-            result = client.get(endpoint)
+            logger.info(f"Deleting address group: {name}")
+            result = client.delete(f"cmdb/firewall/addrgrp/{safe_name}")
+            if result.get("deadline_exceeded"):
+                return _deadline_exceeded_response(result)
+            if result.get("cancelled"):
+                return _cancelled_response(result)
 
             return {
                 "success": result.get("http_status") == 200,
-                "message": "Address groups retrieved",
-                "data": (
-                    result.get("results", [])
-                    if result.get("http_status") == 200
-                    else []
-                ),
+                "message": f"Address group '{name}' deletion attempted",
                 "details": result,
             }
 
@@ -611,136 +2003,1395 @@ class FortiOSTools:
             return {
                 "success": False,
                 "message": f"Validation error: {str(e)}",
-                "data": [],
                 "details": {},
             }
         except Exception as e:
-            logger.error(f"Error getting address groups: {e}")
+            logger.error(f"Error deleting address group: {e}")
             return {
                 "success": False,
-                "message": f"Error getting address groups: {str(e)}",
-                "data": [],
+                "message": f"Error deleting address group: {str(e)}",
                 "details": {},
             }
 
     @staticmethod
-    def get_vips(
-        url: str, token: str, vdom: str, vip_name: Optional[str] = None
+    def register_fortigate(
+        name: str,
+        url: str,
+        token: str,
+        vdom: str = "root",
+        scope: str = "",
+        deadline: Optional[float] = None,
+        cancel_token: Optional[CancelToken] = None,
     ) -> Dict[str, Any]:
-        """Get VIP objects from FortiGate"""
+        """
+        Register a FortiGate so its tables are exposed as MCP resources.
+
+        The device is only visible within the registering scope (the MCP
+        session). The credentials are kept in server memory only, never on
+        disk.
+        """
+        try:
+            name = _validate_device_name(name)
+        except ValidationError as e:
+            return {
+                "success": False,
+                "message": f"Validation error: {str(e)}",
+                "details": {},
+            }
+
         # Check connectivity first
-        connectivity = FortiOSTools._check_connectivity(url, token, vdom)
+        connectivity = FortiOSTools._check_connectivity(
+            url, token, vdom, deadline, cancel_token
+        )
         if not connectivity["success"]:
             return connectivity
 
+        device = Device(name, url, token, vdom, scope)
+        DEVICES.register(device)
+        logger.info(f"Registered FortiGate: {name}")
+        return {
+            "success": True,
+            "message": f"FortiGate '{name}' registered",
+            "details": device.describe(),
+        }
+
+    @staticmethod
+    def unregister_fortigate(name: str, scope: str = "") -> Dict[str, Any]:
+        """Forget a registered FortiGate and its credentials"""
+        removed = DEVICES.unregister(name.strip(), scope)
+        return {
+            "success": removed,
+            "message": (
+                f"FortiGate '{name}' unregistered"
+                if removed
+                else f"FortiGate '{name}' is not registered"
+            ),
+            "details": {},
+        }
+
+    @staticmethod
+    def list_fortigates(scope: str = "") -> Dict[str, Any]:
+        """List the FortiGates registered in a scope (without their tokens)"""
+        devices = [device.describe() for device in DEVICES.all(scope)]
+        return {
+            "success": True,
+            "message": f"{len(devices)} FortiGate(s) registered",
+            "data": devices,
+        }
+
+    @staticmethod
+    def backup_config(
+        url: str,
+        token: str,
+        vdom: str = "root",
+        device: Optional[str] = None,
+        scope: str = "global",
+        deadline: Optional[float] = None,
+        cancel_token: Optional[CancelToken] = None,
+    ) -> Dict[str, Any]:
+        """
+        Stream a full config backup of a FortiGate into the backup archive.
+
+        The backup is written to disk chunk by chunk as it downloads and is
+        never held in memory whole. Chunks already archived (from earlier
+        backups of this or any other device) are not stored again. The
+        backup is recorded for the url, vdom and token it was taken with,
+        and only these credentials can read it back.
+        """
         try:
-            client = FortiOSTools.create_client(url, token, vdom)
+            scope = _validate_choice(scope, VALID_BACKUP_SCOPES, "scope")
+            if device:
+                device = _validate_device_name(device)
+        except ValidationError as e:
+            return {
+                "success": False,
+                "message": f"Validation error: {str(e)}",
+                "details": {},
+            }
 
-            if vip_name:
-                safe_name = _validate_resource_name(vip_name, "vip_name")
-                endpoint = f"cmdb/firewall/vip/{safe_name}"
-                logger.info(f"Getting VIP object: {vip_name}")
-            else:
-                endpoint = "cmdb/firewall/vip"
-                logger.info("Getting all VIP objects")
+        # Check connectivity first
+        connectivity = FortiOSTools._check_connectivity(
+            url, token, vdom, deadline, cancel_token
+        )
+        if not connectivity["success"]:
+            return connectivity
+
+        try:
+            client = FortiOSTools.create_client(
+                url, token, vdom, deadline, cancel_token
+            )
+            if not device:
+                status = client.get("monitor/system/status")
+                device = status.get("serial") or vdom
+            meta: Dict[str, Any] = {}
+            content = BACKUPS.write(
+                client.iter_body(CONFIG_BACKUP_ENDPOINT, meta, params={"scope": scope})
+            )
+            if meta.get("deadline_exceeded"):
+                return _deadline_exceeded_response(meta)
+            if meta.get("cancelled"):
+                return _cancelled_response(meta)
+            if meta.get("http_status") != 200 or meta.get("status") == "error":
+                return {
+                    "success": False,
+                    "message": "Failed to download config backup",
+                    "details": meta,
+                }
+            if not content.size:
+                return {
+                    "success": False,
+                    "message": "FortiGate returned an empty config backup",
+                    "details": meta,
+                }
+            backup = BACKUPS.record(owner_key(url, token, vdom), device, content)
+        except Exception as e:
+            logger.error(f"Error backing up config: {e}")
+            return {
+                "success": False,
+                "message": f"Error backing up config: {str(e)}",
+                "details": {},
+            }
 
-            result = client.get(endpoint)
+        logger.info(
+            f"Config backup {backup['backup_id']} of {device}: {content.size} bytes, "
+            f"{content.new_chunks}/{len(content.chunks)} new chunks"
+        )
+        return {
+            "success": True,
+            "message": f"Config backup of '{device}' archived",
+            "data": {
+                **backup,
+                "chunks": len(content.chunks),
+                "new_chunks": content.new_chunks,
+                "stored_bytes": content.stored_bytes,
+            },
+        }
 
+    @staticmethod
+    def list_config_backups(
+        url: str,
+        token: str,
+        vdom: str = "root",
+        device: Optional[str] = None,
+        date: Optional[str] = None,
+        limit: int = 100,
+    ) -> Dict[str, Any]:
+        """List the config backups archived with these credentials, newest first"""
+        try:
+            if date:
+                date = _validate_date(date)
+            owner = owner_key(url, token, vdom)
+            backups = BACKUPS.list(owner, device, date, max(limit, 1))
+        except ValidationError as e:
             return {
-                "success": result.get("http_status") == 200,
-                "message": "VIP objects retrieved",
-                "data": (
-                    result.get("results", [])
-                    if result.get("http_status") == 200
-                    else []
-                ),
-                "details": result,
+                "success": False,
+                "message": f"Validation error: {str(e)}",
+                "details": {},
+            }
+        except Exception as e:
+            logger.error(f"Error listing config backups: {e}")
+            return {
+                "success": False,
+                "message": f"Error listing config backups: {str(e)}",
+                "details": {},
             }
+        return {
+            "success": True,
+            "message": f"{len(backups)} config backup(s)",
+            "data": backups,
+        }
 
+    @staticmethod
+    def get_config_backup(
+        url: str,
+        token: str,
+        vdom: str = "root",
+        backup_id: Optional[int] = None,
+        device: Optional[str] = None,
+        date: Optional[str] = None,
+        offset: int = 0,
+        max_bytes: Optional[int] = None,
+    ) -> Dict[str, Any]:
+        """
+        Read a config backup archived with these credentials.
+
+        The backup is chosen by backup_id, or as the latest backup of device
+        taken on or before date (UTC, YYYY-MM-DD; default: the latest). At
+        most max_bytes of config text are returned from offset; when more is
+        left, next_offset continues the read.
+        """
+        try:
+            if date:
+                date = _validate_date(date)
+            owner = owner_key(url, token, vdom)
+            if backup_id is not None:
+                backup = BACKUPS.get(owner, backup_id)
+            elif device:
+                backup = BACKUPS.find(owner, device, date)
+            else:
+                raise ValidationError("backup_id or device is required")
+            if backup is None:
+                return {
+                    "success": False,
+                    "message": "Config backup not found",
+                    "details": {},
+                }
+            offset = max(offset, 0)
+            limit = resolve_budget(max_bytes)[0]
+            data = BACKUPS.read(owner, backup["backup_id"], offset, limit)
         except ValidationError as e:
             return {
                 "success": False,
                 "message": f"Validation error: {str(e)}",
-                "data": [],
                 "details": {},
             }
         except Exception as e:
-            logger.error(f"Error getting VIP objects: {e}")
+            logger.error(f"Error reading config backup: {e}")
+            return {
+                "success": False,
+                "message": f"Error reading config backup: {str(e)}",
+                "details": {},
+            }
+
+        end = offset + len(data)
+        response = {
+            "success": True,
+            "message": f"Config backup {backup['backup_id']} of '{backup['device']}'",
+            "data": data.decode("utf-8", "replace"),
+            "details": {**backup, "offset": offset},
+        }
+        if end < backup["size"]:
+            response.update({"truncated": True, "next_offset": end})
+        return response
+
+    @staticmethod
+    def _diff_response(
+        changes: List[Dict[str, Any]],
+        message: str,
+        details: Dict[str, Any],
+        owner: str,
+        max_bytes: Optional[int] = None,
+        max_records: Optional[int] = None,
+    ) -> Dict[str, Any]:
+        """Build a diff response; long change lists are paged like getter results"""
+        counts: Dict[str, int] = {}
+        for change in changes:
+            counts[change["change"]] = counts.get(change["change"], 0) + 1
+        context = {
+            "message": f"{message}: {len(changes)} change(s)",
+            "details": {**details, "counts": counts},
+        }
+        page = RESULT_BUFFER.paginate(
+            changes, owner, context, *resolve_budget(max_bytes, max_records)
+        )
+        return _page_response(page)
+
+    @staticmethod
+    def diff_config_backups(
+        url: str,
+        token: str,
+        vdom: str = "root",
+        old_backup_id: Optional[int] = None,
+        new_backup_id: Optional[int] = None,
+        device: Optional[str] = None,
+        max_bytes: Optional[int] = None,
+        max_records: Optional[int] = None,
+        continuation_token: Optional[str] = None,
+    ) -> Dict[str, Any]:
+        """
+        Structural diff of two config backups archived with these credentials.
+
+        Both backups are parsed into trees of config sections and objects
+        and compared subtree by subtree; identical subtrees are skipped by
+        their hash. Without backup ids, the two latest backups of device are
+        compared.
+        """
+        owner = owner_key(url, token, vdom)
+        if continuation_token:
+            return FortiOSTools._resume(
+                owner, continuation_token, max_bytes, max_records
+            )
+
+        try:
+            if old_backup_id is not None and new_backup_id is not None:
+                old = BACKUPS.get(owner, old_backup_id)
+                new = BACKUPS.get(owner, new_backup_id)
+            elif device:
+                latest = BACKUPS.list(owner, device, limit=2)
+                old, new = (latest[1], latest[0]) if len(latest) == 2 else (None, None)
+            else:
+                raise ValidationError(
+                    "old_backup_id and new_backup_id, or device, are required"
+                )
+            if old is None or new is None:
+                return {
+                    "success": False,
+                    "message": "Config backups not found",
+                    "data": [],
+                    "details": {},
+                }
+            changes = diff_trees(
+                backup_tree(BACKUPS, owner, old), backup_tree(BACKUPS, owner, new)
+            )
+        except ValidationError as e:
             return {
                 "success": False,
-                "message": f"Error getting VIP objects: {str(e)}",
+                "message": f"Validation error: {str(e)}",
+                "details": {},
+            }
+        except Exception as e:
+            logger.error(f"Error diffing config backups: {e}")
+            return {
+                "success": False,
+                "message": f"Error diffing config backups: {str(e)}",
+                "details": {},
+            }
+
+        return FortiOSTools._diff_response(
+            changes,
+            f"Config backup {old['backup_id']} -> {new['backup_id']}",
+            {"old": old, "new": new},
+            owner,
+            max_bytes,
+            max_records,
+        )
+
+    @staticmethod
+    def diff_cmdb_tables(
+        table: str,
+        device: str,
+        other_device: str,
+        max_bytes: Optional[int] = None,
+        max_records: Optional[int] = None,
+        continuation_token: Optional[str] = None,
+        scope: str = "",
+        deadline: Optional[float] = None,
+        cancel_token: Optional[CancelToken] = None,
+    ) -> Dict[str, Any]:
+        """
+        Structural diff of a CMDB table between two registered FortiGates.
+
+        Tables are read through the CMDB cache (usually kept current by the
+        revision poller), keyed by record mkey, and compared by subtree
+        hash, so only records that differ are visited.
+        """
+        first = DEVICES.get(device.strip(), scope)
+        second = DEVICES.get(other_device.strip(), scope)
+        if first is None or second is None:
+            missing = device if first is None else other_device
+            return {
+                "success": False,
+                "message": f"FortiGate '{missing}' is not registered",
                 "data": [],
                 "details": {},
             }
+        if continuation_token:
+            return FortiOSTools._resume(
+                first.owner, continuation_token, max_bytes, max_records
+            )
+        if table not in TABLES:
+            return {
+                "success": False,
+                "message": (
+                    f"Validation error: Invalid table '{table}'. "
+                    f"Must be one of: {', '.join(sorted(TABLES))}"
+                ),
+                "details": {},
+            }
+
+        try:
+            trees = []
+            details: Dict[str, Any] = {}
+            for side, dev in (("old", first), ("new", second)):
+                client = FortiOSTools.create_client(
+                    dev.url, dev.token, dev.vdom, deadline, cancel_token
+                )
+                result = FortiOSTools.read_cached_table(
+                    client, dev.owner, TABLES[table]
+                )
+                if result.get("deadline_exceeded"):
+                    return _deadline_exceeded_response(result)
+                if result.get("cancelled"):
+                    return _cancelled_response(result)
+                if result.get("http_status") != 200:
+                    return {
+                        "success": False,
+                        "message": f"Failed to read {table} from '{dev.name}'",
+                        "data": [],
+                        "details": result,
+                    }
+                trees.append(table_tree(result.get("results", [])))
+                details[side] = {
+                    "device": dev.name,
+                    "revision": result.get("revision"),
+                }
+            old, new = trees
+            changes = diff_trees(old, new, path=[table])
+        except Exception as e:
+            logger.error(f"Error diffing CMDB tables: {e}")
+            return {
+                "success": False,
+                "message": f"Error diffing CMDB tables: {str(e)}",
+                "details": {},
+            }
+
+        return FortiOSTools._diff_response(
+            changes,
+            f"{table} of '{first.name}' -> '{second.name}'",
+            details,
+            first.owner,
+            max_bytes,
+            max_records,
+        )
 
     @staticmethod
-    def delete_address(url: str, token: str, vdom: str, name: str) -> Dict[str, Any]:
-        """Delete an address object from FortiGate"""
+    def query_logs(
+        url: str,
+        token: str,
+        vdom: str = "root",
+        source: str = "memory",
+        log_type: str = "traffic",
+        subtype: str = "forward",
+        report: Optional[str] = None,
+        group_by: Optional[List[str]] = None,
+        sum_fields: Optional[List[str]] = None,
+        filters: Optional[List[str]] = None,
+        top_n: int = 0,
+        max_rows: int = 0,
+        deadline: Optional[float] = None,
+        cancel_token: Optional[CancelToken] = None,
+    ) -> Dict[str, Any]:
+        """
+        Aggregate FortiGate log entries on the server.
+
+        The log is paged through as a stream and every entry is filtered and
+        counted as it arrives, in memory bounded by a SpaceSaving sketch, so
+        only the heaviest groups are returned, never raw rows. report picks a
+        predefined aggregation (top_talkers, top_denied_destinations,
+        policy_hits); group_by, sum_fields and filters refine or replace it.
+        """
+        try:
+            source = _validate_choice(source, VALID_LOG_SOURCES, "source")
+            log_type = _validate_choice(log_type, VALID_LOG_TYPES, "log_type")
+            subtype = subtype.strip()
+            if not LOG_SUBTYPE_PATTERN.match(subtype):
+                raise ValidationError(f"Invalid log subtype '{subtype}'")
+            preset = {}
+            if report:
+                preset = LOG_REPORTS.get(report.strip(), {})
+                if not preset:
+                    raise ValidationError(
+                        f"Invalid report '{report}'. "
+                        f"Must be one of: {', '.join(sorted(LOG_REPORTS))}"
+                    )
+            group_by = group_by or preset.get("group_by")
+            if not group_by:
+                raise ValidationError("report or group_by is required")
+            sum_fields = sum_fields or preset.get("sum_fields")
+            predicate = _compile_filters(preset.get("filters", []) + (filters or []))
+        except ValidationError as e:
+            return {
+                "success": False,
+                "message": f"Validation error: {str(e)}",
+                "details": {},
+            }
+
         # Check connectivity first
-        connectivity = FortiOSTools._check_connectivity(url, token, vdom)
+        connectivity = FortiOSTools._check_connectivity(
+            url, token, vdom, deadline, cancel_token
+        )
         if not connectivity["success"]:
             return connectivity
 
+        endpoint = f"log/{source}/{log_type}/{subtype}"
         try:
-            safe_name = _validate_resource_name(name, "name")
-            client = FortiOSTools.create_client(url, token, vdom)
-
-            logger.info(f"Deleting address object: {name}")
-            result = client.delete(f"cmdb/firewall/address/{safe_name}")
+            client = FortiOSTools.create_client(
+                url, token, vdom, deadline, cancel_token
+            )
+            meta: Dict[str, Any] = {}
+            entries = _iter_log_entries(
+                client,
+                endpoint,
+                meta,
+                max_rows if max_rows > 0 else DEFAULT_MAX_LOG_ROWS,
+            )
+            summary = aggregate_stream(
+                (entry for entry in entries if predicate(entry)),
+                group_by,
+                top_n,
+                sum_fields,
+            )
+        except Exception as e:
+            logger.error(f"Error querying logs: {e}")
+            return {
+                "success": False,
+                "message": f"Error querying logs: {str(e)}",
+                "details": {},
+            }
 
+        details = {
+            "endpoint": endpoint,
+            "rows_scanned": meta.get("rows_scanned", 0),
+            "complete": meta.get("complete", False),
+        }
+        if meta.get("deadline_exceeded"):
+            return _deadline_exceeded_response({**meta, "partial": summary})
+        if meta.get("cancelled"):
+            return _cancelled_response(meta)
+        if meta.get("http_status") != 200 or meta.get("status") == "error":
             return {
-                "success": result.get("http_status") == 200,
-                "message": f"Address object '{name}' deletion attempted",
-                "details": result,
+                "success": False,
+                "message": f"Failed to read {endpoint}",
+                "data": {},
+                "details": {**meta, **details},
             }
+        return {
+            "success": True,
+            "message": (
+                f"{report or 'Log aggregation'}: {summary['count']} matching of "
+                f"{details['rows_scanned']} entries"
+            ),
+            "data": summary,
+            "details": details,
+        }
 
+    @staticmethod
+    def inspect_sessions(
+        url: str,
+        token: str,
+        vdom: str = "root",
+        filters: Optional[List[str]] = None,
+        dimensions: Optional[List[str]] = None,
+        sum_fields: Optional[List[str]] = None,
+        top_n: int = 0,
+        max_sessions: int = 0,
+        deadline: Optional[float] = None,
+        cancel_token: Optional[CancelToken] = None,
+    ) -> Dict[str, Any]:
+        """
+        Aggregate the firewall session table on the server.
+
+        The first page reports how many sessions there are; the remaining
+        pages are then fetched SESSION_CONCURRENCY at a time. Every page is
+        filtered and folded into per-dimension top-N aggregates (source,
+        destination, policy, protocol) as it arrives and then dropped, so
+        raw sessions are never returned or kept. The session table changes
+        while it is paged, so the result is a close approximation rather
+        than a snapshot.
+        """
+        try:
+            dimensions = [
+                _validate_choice(dim, set(SESSION_DIMENSIONS), "dimension")
+                for dim in (dimensions or SESSION_DIMENSIONS)
+            ]
+            predicate = _compile_filters(filters)
         except ValidationError as e:
             return {
                 "success": False,
                 "message": f"Validation error: {str(e)}",
                 "details": {},
             }
+
+        # Check connectivity first
+        connectivity = FortiOSTools._check_connectivity(
+            url, token, vdom, deadline, cancel_token
+        )
+        if not connectivity["success"]:
+            return connectivity
+
+        limit = max_sessions if max_sessions > 0 else DEFAULT_MAX_SESSIONS
+        aggregators = {
+            dim: GroupAggregator(SESSION_DIMENSIONS[dim], top_n, sum_fields)
+            for dim in dimensions
+        }
+        scanned = matched = 0
+        try:
+            client = FortiOSTools.create_client(
+                url, token, vdom, deadline, cancel_token
+            )
+
+            def fetch(start: int) -> Dict[str, Any]:
+                count = min(SESSION_PAGE_SIZE, limit - start)
+                params = {"start": start, "count": count, "summary": "true"}
+                return client.get(SESSION_ENDPOINT, params=params)
+
+            def consume(result: Dict[str, Any]) -> int:
+                nonlocal scanned, matched
+                rows = _session_rows(result)
+                scanned += len(rows)
+                for row in rows:
+                    if predicate(row):
+                        matched += 1
+                        for aggregator in aggregators.values():
+                            aggregator.add(row)
+                return len(rows)
+
+            first = fetch(0)
+            failure = None if first.get("http_status") == 200 else first
+            total = _session_total(first) if failure is None else None
+            complete = False
+            if failure is None:
+                received = consume(first)
+                if total is not None:
+                    starts = range(
+                        SESSION_PAGE_SIZE, min(total, limit), SESSION_PAGE_SIZE
+                    )
+                    with ThreadPoolExecutor(
+                        SESSION_CONCURRENCY, thread_name_prefix="fortios-sessions"
+                    ) as executor:
+                        pages = [executor.submit(fetch, start) for start in starts]
+                        for future in as_completed(pages):
+                            result = future.result()
+                            if result.get("http_status") != 200:
+                                failure = result
+                                for page in pages:
+                                    page.cancel()
+                                break
+                            consume(result)
+                    complete = failure is None and limit >= total
+                else:
+                    # No total reported: page one request at a time to the end
+                    start = received
+                    while failure is None and received == SESSION_PAGE_SIZE:
+                        if start >= limit:
+                            break
+                        result = fetch(start)
+                        if result.get("http_status") != 200:
+                            failure = result
+                            break
+                        received = consume(result)
+                        start += received
+                    complete = (
+                        failure is None
+                        and received < SESSION_PAGE_SIZE
+                        and start < limit
+                    )
         except Exception as e:
-            logger.error(f"Error deleting address object: {e}")
+            logger.error(f"Error inspecting sessions: {e}")
             return {
                 "success": False,
-                "message": f"Error deleting address object: {str(e)}",
+                "message": f"Error inspecting sessions: {str(e)}",
                 "details": {},
             }
 
+        data: Dict[str, Any] = {
+            "sessions_scanned": scanned,
+            "sessions_matched": matched,
+            "total_sessions": total,
+            "complete": complete,
+        }
+        for dim, aggregator in aggregators.items():
+            aggregate = aggregator.result()
+            del aggregate["count"]
+            data[dim] = aggregate
+
+        if failure is not None:
+            if failure.get("deadline_exceeded"):
+                return _deadline_exceeded_response({**failure, "partial": data})
+            if failure.get("cancelled"):
+                return _cancelled_response(failure)
+            return {
+                "success": False,
+                "message": "Failed to read the session table",
+                "data": {},
+                "details": failure,
+            }
+        return {
+            "success": True,
+            "message": f"{matched} matching of {scanned} sessions",
+            "data": data,
+        }
+
     @staticmethod
-    def delete_address_group(
-        url: str, token: str, vdom: str, name: str
+    def get_policy_usage(
+        url: str,
+        token: str,
+        vdom: str = "root",
+        unused_days: int = DEFAULT_UNUSED_DAYS,
+        top_n: int = 0,
+        max_unused: int = 0,
+        deadline: Optional[float] = None,
+        cancel_token: Optional[CancelToken] = None,
     ) -> Dict[str, Any]:
-        """Delete an address group from FortiGate"""
+        """
+        Join firewall policies with their hit, byte and last-used counters.
+
+        Flags policies not used for unused_days and ranks policies by
+        traffic. Counters only cover the time since they were last reset
+        (e.g. by a reboot or "diagnose firewall iprope clear").
+        """
+        if unused_days < 0:
+            return {
+                "success": False,
+                "message": "Validation error: unused_days must not be negative",
+                "details": {},
+            }
+
         # Check connectivity first
-        connectivity = FortiOSTools._check_connectivity(url, token, vdom)
+        connectivity = FortiOSTools._check_connectivity(
+            url, token, vdom, deadline, cancel_token
+        )
         if not connectivity["success"]:
             return connectivity
 
         try:
-            safe_name = _validate_resource_name(name, "name")
-            client = FortiOSTools.create_client(url, token, vdom)
+            client = FortiOSTools.create_client(
+                url, token, vdom, deadline, cancel_token
+            )
+            policies = FortiOSTools.read_cached_table(
+                client, owner_key(url, token, vdom), "cmdb/firewall/policy"
+            )
+            meta: Dict[str, Any] = {}
+            counters = None
+            if policies.get("http_status") == 200:
+                counters = PolicyCounters.from_records(
+                    client.iter_results(POLICY_COUNTERS_ENDPOINT, meta)
+                )
+        except Exception as e:
+            logger.error(f"Error reading policy usage: {e}")
+            return {
+                "success": False,
+                "message": f"Error reading policy usage: {str(e)}",
+                "details": {},
+            }
 
-            logger.info(f"Deleting address group: {name}")
-            result = client.delete(f"cmdb/firewall/addrgrp/{safe_name}")
+        for result in (policies, meta):
+            if result.get("deadline_exceeded"):
+                return _deadline_exceeded_response(result)
+            if result.get("cancelled"):
+                return _cancelled_response(result)
+        if counters is None or meta.get("http_status") != 200:
+            return {
+                "success": False,
+                "message": "Failed to read policies and their counters",
+                "data": {},
+                "details": meta if counters is not None else policies,
+            }
+
+        usage = policy_usage(
+            policies.get("results", []),
+            counters,
+            unused_days,
+            top_n if top_n > 0 else DEFAULT_TOP_N,
+            max_unused if max_unused > 0 else DEFAULT_MAX_UNUSED,
+        )
+        return {
+            "success": True,
+            "message": (
+                f"{usage['unused_count']} of {usage['policies']} policies "
+                f"unused for {unused_days} days"
+            ),
+            "data": usage,
+            "details": {"revision": policies.get("revision")},
+        }
+
+    @staticmethod
+    def get_interface_throughput(
+        url: str = "",
+        token: str = "",
+        vdom: str = "root",
+        interfaces: Optional[List[str]] = None,
+        devices: Optional[List[str]] = None,
+        scope: str = "",
+        deadline: Optional[float] = None,
+        cancel_token: Optional[CancelToken] = None,
+    ) -> Dict[str, Any]:
+        """
+        Per-interface bps and pps of one FortiGate or of registered devices.
+
+        Rates are computed from the deltas between the interface counters
+        read now and the ones kept in memory from the previous call, so a
+        call costs one request per device; 32- and 64-bit counter wraps are
+        allowed for. There is no separate connectivity check, to keep it at
+        one request. Devices are read THROUGHPUT_CONCURRENCY at a time.
+        """
+        wanted = {name.strip() for name in interfaces or [] if name.strip()}
+        if devices:
+            targets = [DEVICES.get(name.strip(), scope) for name in devices]
+            missing = [name for name, dev in zip(devices, targets) if dev is None]
+            if missing:
+                return {
+                    "success": False,
+                    "message": f"FortiGates not registered: {', '.join(missing)}",
+                    "data": [],
+                    "details": {},
+                }
+        elif url and token:
+            targets = [Device(url, url, token, vdom)]
+        else:
+            return {
+                "success": False,
+                "message": "Validation error: url and token or devices are required",
+                "details": {},
+            }
+
+        def measure(device: Device) -> Dict[str, Any]:
+            try:
+                client = FortiOSTools.create_client(
+                    device.url, device.token, device.vdom, deadline, cancel_token
+                )
+                result = device_throughput(
+                    client, COUNTER_SAMPLES, device.owner, wanted, cancel_token
+                )
+            except Exception as e:
+                logger.error(f"Error reading interface counters of {device.name}: {e}")
+                result = {"error": {"status": "error", "message": str(e)}}
+            return {"device": device.name, **result}
+
+        with ThreadPoolExecutor(
+            min(THROUGHPUT_CONCURRENCY, len(targets)),
+            thread_name_prefix="fortios-throughput",
+        ) as executor:
+            measured = list(executor.map(measure, targets))
+
+        failed = [entry for entry in measured if "error" in entry]
+        if len(failed) == len(measured):
+            error = failed[0]["error"]
+            if error.get("deadline_exceeded"):
+                return _deadline_exceeded_response(error)
+            if error.get("cancelled"):
+                return _cancelled_response(error)
+            if len(measured) == 1:
+                return {
+                    "success": False,
+                    "message": "Failed to read interface counters",
+                    "data": [],
+                    "details": error,
+                }
+        return {
+            "success": len(failed) < len(measured),
+            "message": (
+                f"Throughput of {len(measured) - len(failed)} of "
+                f"{len(measured)} devices"
+            ),
+            "data": measured,
+        }
+
+    @staticmethod
+    def _route_table(
+        client: FortiOSClient, owner: str, version: int, fingerprint: Any
+    ) -> Dict[str, Any]:
+        """
+        Route table of one IP version, reusing the cached one while current.
+
+        Returns a dictionary shaped like a client.get() result with the
+        RouteTable in "table" and whether it came from the cache in "cached".
+        """
+        table = ROUTE_TABLES.get(owner, version)
+        if table is not None and table.current(fingerprint):
+            return {"http_status": 200, "table": table, "cached": True}
+        meta: Dict[str, Any] = {}
+        table = RouteTable.from_records(
+            version, client.iter_results(ROUTE_ENDPOINTS[version], meta), fingerprint
+        )
+        if meta.get("http_status") != 200:
+            return meta
+        ROUTE_TABLES.put(owner, table)
+        return {**meta, "table": table, "cached": False}
 
+    @staticmethod
+    def lookup_routes(
+        url: str,
+        token: str,
+        vdom: str = "root",
+        ips: Optional[List[str]] = None,
+        vrf: int = 0,
+        deadline: Optional[float] = None,
+        cancel_token: Optional[CancelToken] = None,
+    ) -> Dict[str, Any]:
+        """
+        Find the route and interface the FortiGate uses for each of a batch of IPs.
+
+        The IPv4 and IPv6 routing tables are read once into prefix tries and
+        cached per device. Each call only checks two cheap fingerprints of
+        the routing state (the route counts per type and the configuration
+        revision) and reads a table again when either has moved or the copy
+        is older than ROUTE_TABLE_MAX_AGE.
+        """
+        try:
+            if not ips:
+                raise ValidationError("At least one IP is required")
+            if len(ips) > MAX_ROUTE_LOOKUPS:
+                raise ValidationError(
+                    f"At most {MAX_ROUTE_LOOKUPS} IPs can be looked up at once"
+                )
+            addresses = [_validate_ip(ip) for ip in ips]
+            if vrf < 0:
+                raise ValidationError("vrf must not be negative")
+        except ValidationError as e:
             return {
-                "success": result.get("http_status") == 200,
-                "message": f"Address group '{name}' deletion attempted",
+                "success": False,
+                "message": f"Validation error: {str(e)}",
+                "details": {},
+            }
+
+        # Check connectivity first
+        connectivity = FortiOSTools._check_connectivity(
+            url, token, vdom, deadline, cancel_token
+        )
+        if not connectivity["success"]:
+            return connectivity
+
+        owner = owner_key(url, token, vdom)
+        versions = sorted({ipaddress.ip_address(ip).version for ip in addresses})
+        try:
+            client = FortiOSTools.create_client(
+                url, token, vdom, deadline, cancel_token
+            )
+            statistics = client.get(ROUTE_STATISTICS_ENDPOINT)
+            config = client.get(ROUTE_CONFIG_ENDPOINT, params=REVISION_PROBE_PARAMS)
+            for probe in (statistics, config):
+                if probe.get("deadline_exceeded"):
+                    return _deadline_exceeded_response(probe)
+                if probe.get("cancelled"):
+                    return _cancelled_response(probe)
+            # A probe that fails leaves its half of the fingerprint unknown,
+            # and the table then only expires by age
+            fingerprint = (
+                (
+                    statistics.get("results")
+                    if statistics.get("http_status") == 200
+                    else None
+                ),
+                config.get("revision") if config.get("http_status") == 200 else None,
+            )
+            tables = {}
+            for version in versions:
+                result = FortiOSTools._route_table(client, owner, version, fingerprint)
+                if result.get("http_status") != 200:
+                    break
+                tables[version] = result
+        except Exception as e:
+            logger.error(f"Error looking up routes: {e}")
+            return {
+                "success": False,
+                "message": f"Error looking up routes: {str(e)}",
+                "details": {},
+            }
+
+        if len(tables) < len(versions):
+            if result.get("deadline_exceeded"):
+                return _deadline_exceeded_response(result)
+            if result.get("cancelled"):
+                return _cancelled_response(result)
+            return {
+                "success": False,
+                "message": f"Failed to read {ROUTE_ENDPOINTS[version]}",
+                "data": [],
                 "details": result,
             }
 
+        data = [
+            tables[ipaddress.ip_address(ip).version]["table"].lookup(ip, vrf)
+            for ip in addresses
+        ]
+        routed = sum(1 for entry in data if entry["routes"])
+        return {
+            "success": True,
+            "message": f"{routed} of {len(data)} IPs have a route",
+            "data": data,
+            "details": {
+                "vrf": vrf,
+                "tables": {
+                    f"ipv{version}": {
+                        "routes": result["table"].routes,
+                        "cached": result["cached"],
+                    }
+                    for version, result in tables.items()
+                },
+            },
+        }
+
+    @staticmethod
+    def read_service_index(
+        client: FortiOSClient, owner: str
+    ) -> Tuple[Optional[ServiceIndex], Dict[str, Any]]:
+        """
+        Port/protocol index of a device's services and service groups.
+
+        Both tables are read through the CMDB cache, and the index built
+        from them is reused for as long as their revisions stay the same.
+
+        Returns:
+            (index, details), with index None and details the failed read on error
+        """
+        tables = []
+        for endpoint in (TABLES["services"], TABLES["service-groups"]):
+            result = FortiOSTools.read_cached_table(client, owner, endpoint)
+            if result.get("http_status") != 200:
+                return None, result
+            tables.append(result)
+        services, groups = tables
+        key = (owner, services.get("revision"), groups.get("revision"))
+        index = SERVICE_INDEXES.get(key) if all(key) else None
+        if index is None:
+            index = ServiceIndex(services.get("results", []), groups.get("results", []))
+            if all(key):
+                SERVICE_INDEXES.put(key, index)
+        return index, {"revision": services.get("revision")}
+
+    @staticmethod
+    def find_services(
+        url: str,
+        token: str,
+        vdom: str = "root",
+        queries: Optional[List[str]] = None,
+        deadline: Optional[float] = None,
+        cancel_token: Optional[CancelToken] = None,
+    ) -> Dict[str, Any]:
+        """
+        Find the services, service groups and policies that cover protocols and ports.
+
+        Answers queries such as "tcp/8443" from an interval index of the
+        service port ranges: each query is one binary search, whatever
+        the number of services and overlapping ranges. The policies whose
+        service list holds a matching service or group are listed too.
+        """
+        try:
+            if not queries:
+                raise ValidationError("At least one query is required")
+            if len(queries) > MAX_SERVICE_QUERIES:
+                raise ValidationError(
+                    f"At most {MAX_SERVICE_QUERIES} queries can be answered at once"
+                )
+            parsed = [_validate_service_query(query) for query in queries]
         except ValidationError as e:
             return {
                 "success": False,
                 "message": f"Validation error: {str(e)}",
                 "details": {},
             }
+
+        # Check connectivity first
+        connectivity = FortiOSTools._check_connectivity(
+            url, token, vdom, deadline, cancel_token
+        )
+        if not connectivity["success"]:
+            return connectivity
+
+        try:
+            client = FortiOSTools.create_client(
+                url, token, vdom, deadline, cancel_token
+            )
+            owner = owner_key(url, token, vdom)
+            index, details = FortiOSTools.read_service_index(client, owner)
+            if index is not None:
+                policies = FortiOSTools.read_cached_table(
+                    client, owner, TABLES["policies"]
+                )
+                if policies.get("http_status") != 200:
+                    index, details = None, policies
         except Exception as e:
-            logger.error(f"Error deleting address group: {e}")
+            logger.error(f"Error finding services: {e}")
             return {
                 "success": False,
-                "message": f"Error deleting address group: {str(e)}",
+                "message": f"Error finding services: {str(e)}",
                 "details": {},
             }
+
+        if index is None:
+            if details.get("deadline_exceeded"):
+                return _deadline_exceeded_response(details)
+            if details.get("cancelled"):
+                return _cancelled_response(details)
+            return {
+                "success": False,
+                "message": "Failed to read services, service groups and policies",
+                "data": [],
+                "details": details,
+            }
+        matches = [
+            (query.strip(), index.lookup(protocol, port))
+            for query, (protocol, port) in zip(queries, parsed)
+        ]
+        records = policies.get("results", [])
+        return {
+            "success": True,
+            "message": f"Searched {index.services} services and {index.groups} groups",
+            "data": [
+                {
+                    "query": query,
+                    **match,
+                    "policies": policies_using(
+                        records, match["services"] + match["groups"]
+                    ),
+                }
+                for query, match in matches
+            ],
+            "details": details,
+        }
+
+    @staticmethod
+    def read_reference_index(
+        client: FortiOSClient, owner: str
+    ) -> Tuple[Optional[ReferenceIndex], Dict[str, Any]]:
+        """
+        Reverse-reference index of a device's address, service, VIP and policy tables.
+
+        The config revision covers every table, so one one-record read
+        tells whether the index built at that revision can be reused.
+        Otherwise the tables are read through the CMDB cache (only the
+        changed ones are downloaded) and the index is built again.
+
+        Returns:
+            (index, details), with index None and details the failed read on error
+        """
+        probe = client.get(TABLES["addresses"], params=REVISION_PROBE_PARAMS)
+        if probe.get("http_status") != 200:
+            return None, probe
+        revision = probe.get("revision")
+        index = REFERENCE_INDEXES.get((owner, revision)) if revision else None
+        if index is not None:
+            return index, {"revision": revision}
+        tables = {}
+        for table in INDEXED_TABLES:
+            result = FortiOSTools.read_cached_table(client, owner, TABLES[table])
+            if result.get("http_status") != 200:
+                return None, result
+            tables[table] = result.get("results", [])
+            revision = result.get("revision") or revision
+        index = ReferenceIndex(tables)
+        if revision:
+            REFERENCE_INDEXES.put((owner, revision), index)
+        return index, {"revision": revision}
+
+    @staticmethod
+    def _blocked_delete(
+        client: FortiOSClient, owner: str, table: str, name: str, label: str
+    ) -> Optional[Dict[str, Any]]:
+        """
+        Failure result listing what uses an object, or None to go ahead.
+
+        Only the indexed tables are checked; for references elsewhere, and
+        when the reference index cannot be read, the FortiGate remains the
+        judge of the delete.
+        """
+        name = name.strip()
+        try:
+            index, _ = FortiOSTools.read_reference_index(client, owner)
+        except Exception as e:
+            logger.warning(f"Reference check before deleting {name} failed: {e}")
+            return None
+        blockers = index.referrers(table, name) if index is not None else []
+        if not blockers:
+            return None
+        return {
+            "success": False,
+            "message": f"{label} '{name}' is in use by {len(blockers)} objects",
+            "data": [ref._asdict() for ref in blockers],
+            "details": {
+                "hint": "cascade_plan lists the steps that detach and delete it"
+            },
+        }
+
+    @staticmethod
+    def _preflight(
+        url: str,
+        token: str,
+        vdom: str,
+        checks: NameChecks,
+        deadline: Optional[float],
+        cancel_token: Optional[CancelToken],
+    ) -> Optional[Dict[str, Any]]:
+        """
+        Failure result naming unknown referenced objects, or None to go ahead.
+
+        Names are looked up in the cached address and service tables, so a
+        request whose names are all known costs no request. A miss is
+        confirmed with a one-record read: at the cached revision the request
+        is rejected with close-match suggestions, otherwise the tables are
+        downloaded again and checked once more. Kinds whose tables are not
+        cached, and failed reads, leave the decision to the FortiGate.
+        """
+        owner = owner_key(url, token, vdom)
+        revisions, unknown = unknown_names(owner, checks)
+        if not unknown:
+            return None
+        try:
+            client = FortiOSTools.create_client(
+                url, token, vdom, deadline, cancel_token
+            )
+            probe = client.get(TABLES["addresses"], params=REVISION_PROBE_PARAMS)
+            if probe.get("deadline_exceeded"):
+                return _deadline_exceeded_response(probe)
+            if probe.get("cancelled"):
+                return _cancelled_response(probe)
+            revision = probe.get("revision")
+            if probe.get("http_status") != 200 or not revision:
+                return None
+            stale = {
+                checks[field][0]
+                for field in unknown
+                if revisions[checks[field][0]] != revision
+            }
+            if stale:
+                for kind in sorted(stale):
+                    for table in NAME_TABLES[kind]:
+                        result = FortiOSTools.refresh_cached_table(
+                            client, owner, TABLES[table]
+                        )
+                        if result.get("http_status") != 200:
+                            return None
+                _, unknown = unknown_names(owner, checks)
+                if not unknown:
+                    return None
+        except Exception as e:
+            logger.warning(f"Name check failed, leaving it to the FortiGate: {e}")
+            return None
+        return {
+            "success": False,
+            "message": f"Validation error: Unknown objects: {describe_unknown(unknown)}",
+            "details": {"unknown": unknown, "revision": revision},
+        }
+
+    @staticmethod
+    def _reference_query(
+        url: str,
+        token: str,
+        vdom: str,
+        table: str,
+        name: str,
+        deadline: Optional[float],
+        cancel_token: Optional[CancelToken],
+    ) -> Tuple[Optional[ReferenceIndex], Dict[str, Any]]:
+        """
+        Validate a (table, name) query and read the reference index for it.
+
+        Returns:
+            (index, details) on success, or (None, tool failure result)
+        """
+        if table not in NAMESPACES:
+            return None, {
+                "success": False,
+                "message": (
+                    f"Validation error: Invalid table '{table}'. "
+                    f"Must be one of: {', '.join(sorted(NAMESPACES))}"
+                ),
+                "details": {},
+            }
+        try:
+            _validate_resource_name(name)
+        except ValidationError as e:
+            return None, {
+                "success": False,
+                "message": f"Validation error: {str(e)}",
+                "details": {},
+            }
+
+        # Check connectivity first
+        connectivity = FortiOSTools._check_connectivity(
+            url, token, vdom, deadline, cancel_token
+        )
+        if not connectivity["success"]:
+            return None, connectivity
+
+        try:
+            client = FortiOSTools.create_client(
+                url, token, vdom, deadline, cancel_token
+            )
+            index, details = FortiOSTools.read_reference_index(
+                client, owner_key(url, token, vdom)
+            )
+        except Exception as e:
+            logger.error(f"Error reading references: {e}")
+            return None, {
+                "success": False,
+                "message": f"Error reading references: {str(e)}",
+                "details": {},
+            }
+        if index is None:
+            if details.get("deadline_exceeded"):
+                return None, _deadline_exceeded_response(details)
+            if details.get("cancelled"):
+                return None, _cancelled_response(details)
+            return None, {
+                "success": False,
+                "message": "Failed to read the tables that hold references",
+                "data": [],
+                "details": details,
+            }
+        if not index.exists(table, name.strip()):
+            return None, {
+                "success": False,
+                "message": f"'{name.strip()}' not found in {table}",
+                "data": [],
+                "details": details,
+            }
+        return index, details
+
+    @staticmethod
+    def find_references(
+        url: str,
+        token: str,
+        vdom: str,
+        table: str,
+        name: str,
+        deadline: Optional[float] = None,
+        cancel_token: Optional[CancelToken] = None,
+    ) -> Dict[str, Any]:
+        """
+        List the groups, VIPs and policies that use an object.
+
+        Answered from a reverse-reference index built over the address,
+        address group, VIP, VIP group, service, service group and policy
+        tables, and kept until the config revision moves. Places the index
+        does not read are listed in details["unchecked"], so an empty
+        result is reported as unchecked rather than as unused.
+        """
+        index, details = FortiOSTools._reference_query(
+            url, token, vdom, table, name, deadline, cancel_token
+        )
+        if index is None:
+            return details
+        name = name.strip()
+        references = index.referrers(table, name)
+        unchecked = index.unchecked(table)
+        return {
+            "success": True,
+            "message": (
+                f"'{name}' is used by {len(references)} objects"
+                if references
+                else f"No indexed object uses '{name}'; "
+                f"unchecked: {', '.join(unchecked)}"
+            ),
+            "data": [ref._asdict() for ref in references],
+            "details": {**details, "unchecked": unchecked},
+        }
+
+    @staticmethod
+    def cascade_plan(
+        url: str,
+        token: str,
+        vdom: str,
+        table: str,
+        name: str,
+        deadline: Optional[float] = None,
+        cancel_token: Optional[CancelToken] = None,
+    ) -> Dict[str, Any]:
+        """
+        Plan the ordered detach-then-delete steps that remove an object.
+
+        Nothing is changed on the FortiGate: each step names the request
+        (method, endpoint and body) that carries it out. Referrers that
+        would be left without a required reference (a group's last member,
+        a policy's last source or destination) are deleted in the plan too,
+        so review the plan before applying it. References from places the
+        index does not read (details["unchecked"]) are not planned for.
+        """
+        index, details = FortiOSTools._reference_query(
+            url, token, vdom, table, name, deadline, cancel_token
+        )
+        if index is None:
+            return details
+        name = name.strip()
+        steps = index.cascade_plan(table, name)
+        deletes = sum(1 for step in steps if step["action"] == "delete")
+        return {
+            "success": True,
+            "message": (
+                f"{len(steps) - deletes} detaches and {deletes} deletes remove "
+                f"'{name}' from the indexed tables"
+            ),
+            "data": steps,
+            "details": {**details, "unchecked": index.unchecked(table)},
+        }
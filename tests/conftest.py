@@ -0,0 +1,19 @@
+"""
+Shared test fixtures.
+"""
+
+import pytest
+
+from app.backup_archive import BACKUPS
+from app.storage import DATA_DIR_ENV, SNAPSHOTS
+
+
+@pytest.fixture(autouse=True)
+def isolated_data_dir(tmp_path, monkeypatch):
+    """Keep on-disk server data (snapshots, backups) in a per-test directory"""
+    SNAPSHOTS.close()
+    BACKUPS.close()
+    monkeypatch.setenv(DATA_DIR_ENV, str(tmp_path / "data"))
+    yield tmp_path / "data"
+    SNAPSHOTS.close()
+    BACKUPS.close()
@@ -0,0 +1,155 @@
+"""
+Tests for summary mode and the CMDB table cache.
+"""
+
+from unittest.mock import Mock, patch
+
+import pytest
+
+from app.aggregation import summarize
+from app.cmdb_cache import CMDB_CACHE, TableCache
+from app.tools import FortiOSTools
+
+POLICIES = [
+    {
+        "policyid": 1,
+        "action": "accept",
+        "srcintf": [{"name": "port1"}],
+        "dstintf": [{"name": "port2"}],
+    },
+    {
+        "policyid": 2,
+        "action": "accept",
+        "srcintf": [{"name": "port1"}],
+        "dstintf": [{"name": "port2"}],
+    },
+    {
+        "policyid": 3,
+        "action": "deny",
+        "srcintf": [{"name": "port3"}],
+        "dstintf": [{"name": "port2"}],
+    },
+    {
+        "policyid": 4,
+        "action": "accept",
+        "srcintf": [{"name": "port3"}],
+        "dstintf": [{"name": "port1"}],
+    },
+]
+
+
+@pytest.fixture(autouse=True)
+def clear_cache():
+    """Isolate tests from tables cached elsewhere"""
+    CMDB_CACHE.clear()
+    yield
+    CMDB_CACHE.clear()
+
+
+# ===============================
+# AGGREGATION TESTS
+# ===============================
+
+
+class TestSummarize:
+    """Test one-pass counting and grouping"""
+
+    def test_count_only(self):
+        assert summarize(POLICIES) == {"count": 4}
+
+    def test_group_by(self):
+        summary = summarize(POLICIES, ["action"])
+        assert summary["groups"] == [
+            {"group": {"action": "accept"}, "count": 3},
+            {"group": {"action": "deny"}, "count": 1},
+        ]
+        assert summary["distinct_groups"] == 2
+        assert summary["other_count"] == 0
+
+    def test_group_by_interface_pair_with_top_n(self):
+        summary = summarize(POLICIES, ["srcintf", "dstintf"], top_n=1)
+        assert summary["groups"] == [
+            {"group": {"srcintf": "port1", "dstintf": "port2"}, "count": 2}
+        ]
+        assert summary["distinct_groups"] == 3
+        assert summary["other_count"] == 2
+
+    def test_accepts_iterators(self):
+        assert summarize(iter(POLICIES), ["action"])["count"] == 4
+
+
+# ===============================
+# TABLE CACHE TESTS
+# ===============================
+
+
+class TestTableCache:
+    """Test the revision-validated table cache"""
+
+    def test_lru_eviction(self):
+        cache = TableCache(max_tables=2)
+        cache.put(("me", "a"), "r1", [], {})
+        cache.put(("me", "b"), "r1", [], {})
+        cache.get(("me", "a"))
+        cache.put(("me", "c"), "r1", [], {})
+        assert cache.get(("me", "a")) is not None
+        assert cache.get(("me", "b")) is None
+
+    def _summary(self, client, **kwargs):
+        with (
+            patch.object(
+                FortiOSTools,
+                "_check_connectivity",
+                return_value={"success": True, "message": "Connectivity verified"},
+            ),
+            patch.object(FortiOSTools, "create_client", return_value=client),
+        ):
+            return FortiOSTools.get_firewall_policies(
+                "https://test.com", "token", "root", mode="summary", **kwargs
+            )
+
+    def _client(self, revision):
+        client = Mock()
+
+        def iter_results(endpoint, meta):
+            meta.update({"http_status": 200, "revision": revision[0]})
+            yield from POLICIES
+
+        client.iter_results.side_effect = iter_results
+        client.get.side_effect = lambda endpoint, params=None: {
+            "http_status": 200,
+            "revision": revision[0],
+            "results": POLICIES[:1],
+        }
+        return client
+
+    def test_summary_mode(self):
+        client = self._client(["r1"])
+        result = self._summary(client, group_by=["action"], filters=["srcintf==port1"])
+
+        assert result["success"] is True
+        assert result["data"]["count"] == 2
+        assert result["data"]["groups"] == [{"group": {"action": "accept"}, "count": 2}]
+        assert "results" not in result["details"]
+
+    def test_summary_reuses_table_until_revision_moves(self):
+        revision = ["r1"]
+        client = self._client(revision)
+
+        self._summary(client)
+        self._summary(client)
+        assert client.iter_results.call_count == 1
+        assert client.get.call_args[1]["params"] == {"start": 0, "count": 1}
+
+        revision[0] = "r2"
+        self._summary(client)
+        assert client.iter_results.call_count == 2
+
+    def test_summary_with_raw_output_is_validation_error(self):
+        result = self._summary(Mock(), output_format="raw")
+        assert result["success"] is False
+        assert "Validation error" in result["message"]
+
+
+if __name__ == "__main__":
+    pytest.main([__file__, "-v"])
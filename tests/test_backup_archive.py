@@ -0,0 +1,266 @@
+"""
+Tests for the content-addressed config backup archive.
+"""
+
+import hashlib
+import random
+import sqlite3
+from unittest.mock import MagicMock, Mock, patch
+
+import pytest
+
+from app.backup_archive import (
+    BACKUPS,
+    MAX_CHUNK_SIZE,
+    MIN_CHUNK_SIZE,
+    BackupArchive,
+    iter_chunks,
+)
+from app.fortios_client import FortiOSClient
+from app.result_buffer import owner_key
+from app.tools import FortiOSTools
+
+OWNER = owner_key("https://fgt", "token", "root")
+
+
+def _config(entries: int, seed: int = 1) -> bytes:
+    rng = random.Random(seed)
+    lines = ["#config-version=FGT60F-7.4.3\n", "config firewall address\n"]
+    for i in range(entries):
+        lines += [
+            f'    edit "host-{i}"\n',
+            f"        set subnet 10.{i // 256 % 256}.{i % 256}.{rng.randint(1, 254)} 255.255.255.255\n",
+            "    next\n",
+        ]
+    lines.append("end\n")
+    return "".join(lines).encode()
+
+
+def _chunks(data: bytes, size: int):
+    return [data[i : i + size] for i in range(0, len(data), size)]
+
+
+class TestChunking:
+    """Test content-defined chunking"""
+
+    @pytest.mark.parametrize("read_size", [1, 100, 8192, 10**7])
+    def test_chunks_independent_of_read_size(self, read_size):
+        body = _config(3000)
+        chunks = list(iter_chunks(_chunks(body, read_size)))
+        assert b"".join(chunks) == body
+        assert chunks == list(iter_chunks([body]))
+        assert all(len(chunk) <= MAX_CHUNK_SIZE for chunk in chunks)
+        assert all(len(chunk) >= MIN_CHUNK_SIZE for chunk in chunks[:-1])
+
+    def test_edit_changes_few_chunks(self):
+        body = _config(3000)
+        edited = body.replace(b'edit "host-1500"', b'edit "renamed-1500"')
+        before = set(iter_chunks([body]))
+        after = list(iter_chunks([edited]))
+        assert len(before) > 10
+        assert sum(chunk not in before for chunk in after) <= 2
+
+    def test_long_lines_are_cut(self):
+        body = b"x" * (MAX_CHUNK_SIZE * 2 + 10)
+        chunks = list(iter_chunks(_chunks(body, 1000)))
+        assert [len(chunk) for chunk in chunks] == [MAX_CHUNK_SIZE, MAX_CHUNK_SIZE, 10]
+
+
+class TestBackupArchive:
+    """Test storing, deduplicating and reading backups"""
+
+    def test_round_trip_and_dedupe(self, tmp_path):
+        archive = BackupArchive(tmp_path)
+        body = _config(2000)
+
+        first = archive.write(_chunks(body, 4096))
+        assert first.size == len(body)
+        assert first.sha256 == hashlib.sha256(body).hexdigest()
+        assert first.new_chunks == len(first.chunks)
+
+        again = archive.write([body])
+        assert again.new_chunks == 0
+        assert again.stored_bytes == 0
+
+        backup = archive.record(OWNER, "fw1", first, taken_at=1700000000.0)
+        assert backup["date"] == "2023-11-14"
+        assert archive.read(OWNER, backup["backup_id"]) == body
+        assert archive.read(OWNER, backup["backup_id"], 100, 50) == body[100:150]
+        end = len(body) - 5
+        assert archive.read(OWNER, backup["backup_id"], end, 1000) == body[end:]
+
+    def test_find_and_list_by_device_and_date(self, tmp_path):
+        archive = BackupArchive(tmp_path)
+        content = archive.write([_config(10)])
+        day1 = archive.record(OWNER, "fw1", content, taken_at=1700000000.0)
+        day2 = archive.record(OWNER, "fw1", content, taken_at=1700086400.0)
+        archive.record(OWNER, "fw2", content, taken_at=1700086400.0)
+
+        assert archive.find(OWNER, "fw1") == day2
+        assert archive.find(OWNER, "fw1", "2023-11-14") == day1
+        assert archive.find(OWNER, "fw1", "2023-01-01") is None
+        listed = archive.list(OWNER, date="2023-11-15")
+        assert [b["device"] for b in listed] == ["fw2", "fw1"]
+        assert archive.list(OWNER, device="fw1") == [day2, day1]
+
+    def test_owners_do_not_share_backups(self, tmp_path):
+        archive = BackupArchive(tmp_path)
+        other = owner_key("https://other", "token", "root")
+        mine = archive.record(OWNER, "fw1", archive.write([_config(10)]))
+        theirs = archive.record(other, "fw1", archive.write([_config(20)]))
+
+        assert archive.list(OWNER) == [mine]
+        assert archive.find(OWNER, "fw1") == mine
+        assert archive.get(OWNER, theirs["backup_id"]) is None
+        with pytest.raises(KeyError):
+            archive.read(OWNER, theirs["backup_id"])
+        with pytest.raises(KeyError):
+            list(archive.iter_content(OWNER, theirs["backup_id"]))
+
+    def test_rows_without_owner_are_hidden(self, tmp_path):
+        archive = BackupArchive(tmp_path)
+        content = archive.write([_config(10)])
+        archive.close()
+        conn = sqlite3.connect(str(tmp_path / "index.sqlite3"))
+        conn.execute(
+            "CREATE TABLE backups (id INTEGER PRIMARY KEY AUTOINCREMENT, "
+            "device TEXT NOT NULL, taken_at REAL NOT NULL, day TEXT NOT NULL, "
+            "size INTEGER NOT NULL, sha256 TEXT NOT NULL, chunks TEXT NOT NULL)"
+        )
+        conn.execute(
+            "INSERT INTO backups (device, taken_at, day, size, sha256, chunks) "
+            "VALUES ('fw1', 1700000000.0, '2023-11-14', 1, 'x', '[]')"
+        )
+        conn.commit()
+        conn.close()
+
+        assert archive.list(OWNER) == []
+        assert archive.get(OWNER, 1) is None
+        backup = archive.record(OWNER, "fw1", content)
+        assert archive.list(OWNER) == [backup]
+
+    def test_read_unknown_backup(self, tmp_path):
+        with pytest.raises(KeyError):
+            BackupArchive(tmp_path).read(OWNER, 42)
+
+
+class TestBackupTools:
+    """Test the backup tools"""
+
+    def _stream_response(self, body: bytes, status: int = 200):
+        response = MagicMock()
+        response.status_code = status
+        response.iter_content.return_value = _chunks(body, 1000)
+        response.json.return_value = {"status": "error", "error": -14}
+        response.__enter__.return_value = response
+        return response
+
+    def test_iter_body_streams_bytes(self):
+        client = FortiOSClient("https://test.com", "token", "root")
+        body = _config(100)
+        response = self._stream_response(body)
+
+        with patch.object(client.session, "get", return_value=response) as mock_get:
+            meta = {}
+            data = b"".join(client.iter_body("monitor/system/config/backup", meta))
+
+        assert data == body
+        assert meta["http_status"] == 200
+        assert mock_get.call_args[1]["stream"] is True
+
+    def test_iter_body_reports_http_errors(self):
+        client = FortiOSClient("https://test.com", "token", "root")
+        response = self._stream_response(b"", 403)
+
+        with patch.object(client.session, "get", return_value=response):
+            meta = {}
+            assert list(client.iter_body("monitor/system/config/backup", meta)) == []
+
+        assert meta["http_status"] == 403
+        assert meta["error"] == -14
+
+    def _client(self, body: bytes, status: int = 200):
+        client = Mock()
+        client.get.return_value = {"http_status": 200, "serial": "FGT60F0000000001"}
+
+        def iter_body(endpoint, meta, params=None):
+            meta["http_status"] = status
+            if status == 200:
+                yield from _chunks(body, 500)
+
+        client.iter_body.side_effect = iter_body
+        return client
+
+    @patch("app.tools.FortiOSTools._check_connectivity")
+    @patch("app.tools.FortiOSTools.create_client")
+    def test_backup_then_read(self, mock_create_client, mock_connectivity):
+        mock_connectivity.return_value = {"success": True}
+        body = _config(1000)
+        mock_create_client.return_value = self._client(body)
+
+        first = FortiOSTools.backup_config("https://fgt", "token", "root")
+        second = FortiOSTools.backup_config("https://fgt", "token", "root")
+
+        assert first["success"] is True
+        assert first["data"]["device"] == "FGT60F0000000001"
+        assert first["data"]["new_chunks"] == first["data"]["chunks"]
+        assert second["data"]["new_chunks"] == 0
+        call = mock_create_client.return_value.iter_body.call_args
+        assert call[1]["params"] == {"scope": "global"}
+
+        listed = FortiOSTools.list_config_backups(
+            "https://fgt", "token", "root", device="FGT60F0000000001"
+        )
+        assert len(listed["data"]) == 2
+        # Another token sees none of them
+        assert FortiOSTools.list_config_backups("https://fgt", "other")["data"] == []
+        assert (
+            FortiOSTools.get_config_backup(
+                "https://fgt", "other", backup_id=first["data"]["backup_id"]
+            )["message"]
+            == "Config backup not found"
+        )
+
+        text = ""
+        offset = 0
+        while True:
+            part = FortiOSTools.get_config_backup(
+                "https://fgt",
+                "token",
+                "root",
+                device="FGT60F0000000001",
+                offset=offset,
+                max_bytes=10000,
+            )
+            assert part["success"] is True
+            text += part["data"]
+            if not part.get("truncated"):
+                break
+            offset = part["next_offset"]
+        assert text.encode() == body
+        assert part["details"]["backup_id"] == second["data"]["backup_id"]
+
+    @patch("app.tools.FortiOSTools._check_connectivity")
+    @patch("app.tools.FortiOSTools.create_client")
+    def test_failed_download_is_not_recorded(
+        self, mock_create_client, mock_connectivity
+    ):
+        mock_connectivity.return_value = {"success": True}
+        mock_create_client.return_value = self._client(b"", 403)
+
+        result = FortiOSTools.backup_config("https://fgt", "token", "root", "fw1")
+
+        assert result["success"] is False
+        assert BACKUPS.list(OWNER) == []
+
+    def test_validation(self):
+        assert (
+            FortiOSTools.backup_config("u", "t", "root", scope="all")["success"]
+            is False
+        )
+        listed = FortiOSTools.list_config_backups("u", "t", date="14/11/2023")
+        assert listed["success"] is False
+        assert FortiOSTools.get_config_backup("u", "t")["success"] is False
+        assert FortiOSTools.get_config_backup("u", "t", backup_id=7)["message"] == (
+            "Config backup not found"
+        )
@@ -0,0 +1,236 @@
+"""
+Tests for the structural config and table diff.
+"""
+
+from unittest.mock import Mock, patch
+
+from app.backup_archive import BACKUPS
+from app.config_diff import diff_trees, parse_config, table_tree
+from app.devices import DEVICES, Device
+from app.result_buffer import owner_key
+from app.tools import FortiOSTools
+
+OWNER = owner_key("https://fgt", "token", "root")
+
+CONFIG = """#config-version=FGT60F-7.4.3-FW-build2573-240201:opmode=0:vdom=0
+config system global
+    set hostname "fw1"
+    set timezone 04
+end
+config firewall address
+    edit "web"
+        set subnet 10.0.0.1 255.255.255.255
+    next
+    edit "db"
+        set subnet 10.0.0.2 255.255.255.255
+        set comment "multi
+line"
+    next
+end
+config firewall policy
+    edit 1
+        set srcaddr "web"
+        set action accept
+    next
+    edit 2
+        set srcaddr "db"
+        set action deny
+    next
+end
+"""
+
+
+def _tree(text: str):
+    return parse_config(text.splitlines())
+
+
+def _by_change(changes):
+    return {(c["path"], c["change"]): c for c in changes}
+
+
+class TestParseConfig:
+    """Test parsing CLI config into trees"""
+
+    def test_sections_objects_and_settings(self):
+        tree = _tree(CONFIG)
+        assert tree.children["system global"].settings["hostname"] == '"fw1"'
+        address = tree.children["firewall address"]
+        assert list(address.children) == ["web", "db"]
+        assert address.children["db"].settings["comment"] == '"multi\nline"'
+        assert list(tree.children["firewall policy"].children) == ["1", "2"]
+
+    def test_identical_configs_have_equal_digests(self):
+        assert _tree(CONFIG).digest == _tree(CONFIG).digest
+        assert diff_trees(_tree(CONFIG), _tree(CONFIG)) == []
+
+
+class TestDiffTrees:
+    """Test the object-level diff"""
+
+    def test_added_removed_and_modified(self):
+        new = CONFIG.replace('set hostname "fw1"', 'set hostname "fw2"')
+        new = new.replace('    edit "web"\n', '    edit "app"\n')
+        changes = _by_change(diff_trees(_tree(CONFIG), _tree(new)))
+
+        assert set(changes) == {
+            ("system global", "modified"),
+            ("firewall address/web", "removed"),
+            ("firewall address/app", "added"),
+        }
+        assert changes[("system global", "modified")]["settings"] == {
+            "hostname": {"old": '"fw1"', "new": '"fw2"'}
+        }
+
+    def test_policy_reorder_detected(self):
+        moved = CONFIG.replace(
+            """    edit 1
+        set srcaddr "web"
+        set action accept
+    next
+    edit 2
+        set srcaddr "db"
+        set action deny
+    next
+""",
+            """    edit 2
+        set srcaddr "db"
+        set action deny
+    next
+    edit 1
+        set srcaddr "web"
+        set action accept
+    next
+""",
+        )
+        assert diff_trees(_tree(CONFIG), _tree(moved)) == [
+            {"path": "firewall policy", "change": "reordered"}
+        ]
+
+    def test_table_tree_keys_records(self):
+        old = table_tree(
+            [
+                {
+                    "q_origin_key": "web",
+                    "name": "web",
+                    "subnet": "10.0.0.1 255.255.255.255",
+                },
+                {"q_origin_key": "grp", "name": "grp", "member": [{"name": "web"}]},
+            ]
+        )
+        new = table_tree(
+            [
+                {
+                    "q_origin_key": "web",
+                    "name": "web",
+                    "subnet": "10.0.0.9 255.255.255.255",
+                },
+                {"q_origin_key": "grp", "name": "grp", "member": [{"name": "web"}]},
+            ]
+        )
+        assert diff_trees(old, new, ["addresses"]) == [
+            {
+                "path": "addresses/web",
+                "change": "modified",
+                "settings": {
+                    "subnet": {
+                        "old": "10.0.0.1 255.255.255.255",
+                        "new": "10.0.0.9 255.255.255.255",
+                    }
+                },
+            }
+        ]
+
+
+class TestDiffTools:
+    """Test the diff tools"""
+
+    def test_diff_latest_backups_of_device(self):
+        new = CONFIG.replace("set action deny", "set action accept")
+        for text in (CONFIG, new):
+            BACKUPS.record(OWNER, "fw1", BACKUPS.write([text.encode()]))
+
+        result = FortiOSTools.diff_config_backups("https://fgt", "token", device="fw1")
+
+        assert result["success"] is True
+        assert result["data"] == [
+            {
+                "path": "firewall policy/2",
+                "change": "modified",
+                "settings": {"action": {"old": "deny", "new": "accept"}},
+            }
+        ]
+        assert result["details"]["counts"] == {"modified": 1}
+
+    def test_long_diff_is_paged(self):
+        added = "".join(f'    edit "h{i}"\n    next\n' for i in range(30))
+        new = CONFIG.replace(
+            "config firewall address\n", "config firewall address\n" + added
+        )
+        old = BACKUPS.record(OWNER, "fw1", BACKUPS.write([CONFIG.encode()]))
+        new = BACKUPS.record(OWNER, "fw1", BACKUPS.write([new.encode()]))
+
+        first = FortiOSTools.diff_config_backups(
+            "https://fgt",
+            "token",
+            "root",
+            old["backup_id"],
+            new["backup_id"],
+            max_records=20,
+        )
+        rest = FortiOSTools.diff_config_backups(
+            "https://fgt",
+            "token",
+            continuation_token=first["continuation_token"],
+            max_records=20,
+        )
+
+        assert first["truncated"] is True
+        changes = first["data"] + rest["data"]
+        assert len([c for c in changes if c["change"] == "added"]) == 30
+
+    def test_missing_backups(self):
+        assert FortiOSTools.diff_config_backups("u", "t")["success"] is False
+        assert FortiOSTools.diff_config_backups("u", "t", "root", 1, 2)["message"] == (
+            "Config backups not found"
+        )
+
+    def test_other_owners_backups_are_not_diffed(self):
+        for text in (CONFIG, CONFIG.replace("set action deny", "set action accept")):
+            BACKUPS.record(OWNER, "fw1", BACKUPS.write([text.encode()]))
+
+        result = FortiOSTools.diff_config_backups("https://fgt", "other", device="fw1")
+
+        assert result["message"] == "Config backups not found"
+
+    @patch("app.tools.FortiOSTools.read_cached_table")
+    @patch("app.tools.FortiOSTools.create_client")
+    def test_diff_cmdb_tables(self, mock_create_client, mock_read):
+        DEVICES.clear()
+        DEVICES.register(Device("site-a", "https://a", "ta", "root"))
+        DEVICES.register(Device("site-b", "https://b", "tb", "root"))
+        mock_create_client.return_value = Mock()
+        mock_read.side_effect = [
+            {"http_status": 200, "revision": "r1", "results": [{"name": "web"}]},
+            {"http_status": 200, "revision": "r2", "results": [{"name": "db"}]},
+        ]
+
+        try:
+            result = FortiOSTools.diff_cmdb_tables("addresses", "site-a", "site-b")
+        finally:
+            DEVICES.clear()
+
+        assert result["success"] is True
+        assert _by_change(result["data"]).keys() == {
+            ("addresses/web", "removed"),
+            ("addresses/db", "added"),
+        }
+        assert result["details"]["new"] == {"device": "site-b", "revision": "r2"}
+
+    def test_diff_cmdb_tables_validation(self):
+        assert FortiOSTools.diff_cmdb_tables("addresses", "x", "y")["success"] is False
+        DEVICES.register(Device("site-a", "https://a", "ta", "root"))
+        try:
+            result = FortiOSTools.diff_cmdb_tables("routes", "site-a", "site-a")
+        finally:
+            DEVICES.clear()
+        assert result["message"].startswith("Validation error")
@@ -0,0 +1,255 @@
+"""
+Tests for raw passthrough of upstream responses.
+"""
+
+import json
+from unittest.mock import Mock, patch
+
+import pytest
+
+from app.encoding import RawJSON, csv_records, dumps_result, table_columns
+from app.fortios_client import FortiOSClient
+from app.tools import FortiOSTools
+
+UPSTREAM = b'{"http_method":"GET","results":[{"name":"all","subnet":"0.0.0.0 0.0.0.0"}],"status":"success"}'
+
+
+# ===============================
+# SERIALIZATION TESTS
+# ===============================
+
+
+class TestDumpsResult:
+    """Test splicing raw upstream bodies into tool responses"""
+
+    def test_plain_results_unchanged(self):
+        result = {"success": True, "data": [1, 2]}
+        assert dumps_result(result) == json.dumps(result, indent=2)
+
+    def test_raw_body_spliced_verbatim(self):
+        text = dumps_result(
+            {"success": True, "message": "ok", "details": RawJSON.wrap(UPSTREAM)}
+        )
+        assert UPSTREAM.decode() in text
+        assert json.loads(text) == {
+            "success": True,
+            "message": "ok",
+            "details": json.loads(UPSTREAM),
+        }
+
+    def test_only_raw_members(self):
+        text = dumps_result({"details": RawJSON.wrap(b"{}")})
+        assert json.loads(text) == {"details": {}}
+
+    def test_wrap_rejects_non_objects(self):
+        with pytest.raises(ValueError):
+            RawJSON.wrap(b"[1, 2]")
+        with pytest.raises(ValueError):
+            RawJSON.wrap(b"<html>error</html>")
+
+    @pytest.mark.parametrize(
+        "body",
+        [
+            b'{"a": 1}, "injected": {"b": 2}',
+            b'{"a": 1} {"b": 2}',
+            b'{"a": [1, 2}',
+            b'{"name": "caf\xe9"}',
+        ],
+    )
+    def test_wrap_rejects_malformed_bodies(self, body):
+        with pytest.raises(ValueError):
+            RawJSON.wrap(body)
+
+
+# ===============================
+# RAW READ TESTS
+# ===============================
+
+
+class TestRawReads:
+    """Test output_format='raw' on the getters"""
+
+    def _run_get_addresses(self, raw_result, **kwargs):
+        mock_client = Mock()
+        mock_client.get_raw.return_value = raw_result
+        with (
+            patch.object(
+                FortiOSTools,
+                "_check_connectivity",
+                return_value={"success": True, "message": "Connectivity verified"},
+            ),
+            patch.object(FortiOSTools, "create_client", return_value=mock_client),
+        ):
+            result = FortiOSTools.get_addresses(
+                "https://test.com", "token", "root", output_format="raw", **kwargs
+            )
+        return result, mock_client
+
+    def test_client_get_raw_returns_body(self):
+        client = FortiOSClient("https://test.com", "token", "root")
+        response = Mock()
+        response.status_code = 200
+        response.content = UPSTREAM
+
+        with patch.object(client.session, "get", return_value=response):
+            result = client.get_raw("cmdb/firewall/address")
+
+        assert result == {"http_status": 200, "body": UPSTREAM}
+        response.json.assert_not_called()
+
+    def test_raw_success_is_not_decoded(self):
+        result, mock_client = self._run_get_addresses(
+            {"http_status": 200, "body": UPSTREAM}
+        )
+
+        assert result["success"] is True
+        assert isinstance(result["details"], RawJSON)
+        assert result["details"] == UPSTREAM
+        mock_client.iter_results.assert_not_called()
+
+    def test_non_utf8_raw_success_is_reencoded(self):
+        body = '{"results": [{"name": "café"}]}'.encode("utf-16")
+        result, _ = self._run_get_addresses({"http_status": 200, "body": body})
+
+        assert result["success"] is True
+        assert result["details"] == {"results": [{"name": "café"}]}
+        json.loads(dumps_result(result))
+
+    def test_invalid_raw_success_is_an_error(self):
+        result, _ = self._run_get_addresses(
+            {"http_status": 200, "body": b'{"results": [}, "x": {}'}
+        )
+
+        assert result["success"] is False
+        assert result["details"]["message"] == "Invalid JSON response"
+        json.loads(dumps_result(result))
+
+    def test_raw_error_body_is_decoded(self):
+        result, _ = self._run_get_addresses(
+            {"http_status": 404, "body": b'{"status": "error", "error": -3}'}
+        )
+
+        assert result["success"] is False
+        assert result["details"]["error"] == -3
+        assert result["details"]["http_status"] == 404
+
+    def test_raw_with_filters_is_validation_error(self):
+        result, mock_client = self._run_get_addresses(
+            {"http_status": 200, "body": UPSTREAM}, filters=["type==ipmask"]
+        )
+
+        assert result["success"] is False
+        assert "Validation error" in result["message"]
+        mock_client.get_raw.assert_not_called()
+
+
+# ===============================
+# CSV OUTPUT TESTS
+# ===============================
+
+POLICIES = [
+    {
+        "policyid": 1,
+        "name": "web",
+        "srcaddr": [{"name": "all", "q_origin_key": "all"}],
+        "dstaddr": [{"name": "web 1"}, {"name": "web-2"}],
+        "action": "accept",
+    },
+    {"policyid": 2, "name": 'say "hi", ok', "action": "deny", "comments": None},
+]
+
+
+class TestCsvOutput:
+    """Test the tabular output format"""
+
+    def test_columns_in_first_seen_order(self):
+        assert table_columns(POLICIES) == [
+            "policyid",
+            "name",
+            "srcaddr",
+            "dstaddr",
+            "action",
+            "comments",
+        ]
+        assert table_columns(POLICIES, ["name", "action"]) == ["name", "action"]
+
+    def test_rows(self):
+        lines = csv_records(POLICIES, ["policyid", "name", "dstaddr", "comments"])
+        assert lines == [
+            '1,web,"""web 1"" web-2",\n',
+            '2,"say ""hi"", ok",,\n',
+        ]
+
+    def test_getter_csv_output(self):
+        mock_client = Mock()
+
+        def iter_results(endpoint, meta):
+            meta.update({"http_status": 200, "status": "success"})
+            yield from POLICIES
+
+        mock_client.iter_results.side_effect = iter_results
+        with (
+            patch.object(
+                FortiOSTools,
+                "_check_connectivity",
+                return_value={"success": True, "message": "Connectivity verified"},
+            ),
+            patch.object(FortiOSTools, "create_client", return_value=mock_client),
+        ):
+            result = FortiOSTools.get_firewall_policies(
+                "https://test.com",
+                "token",
+                "root",
+                fields=["policyid", "srcaddr", "action"],
+                output_format="csv",
+            )
+
+        assert result["success"] is True
+        assert result["data"] == "policyid,srcaddr,action\n1,all,accept\n2,,deny\n"
+
+    def test_csv_is_smaller_than_json(self):
+        records = [
+            {
+                "name": f"host-{i}",
+                "type": "ipmask",
+                "subnet": f"10.0.0.{i % 250} 255.255.255.255",
+            }
+            for i in range(1000)
+        ]
+        columns = table_columns(records)
+        as_csv = dumps_result({"data": "".join(csv_records(records, columns))})
+        as_json = dumps_result({"data": records})
+        assert len(as_csv) * 2 < len(as_json)
+
+    def test_csv_pages_repeat_header(self):
+        mock_client = Mock()
+
+        def iter_results(endpoint, meta):
+            meta.update({"http_status": 200})
+            yield from ({"name": f"a{i}"} for i in range(5))
+
+        mock_client.iter_results.side_effect = iter_results
+        with (
+            patch.object(
+                FortiOSTools,
+                "_check_connectivity",
+                return_value={"success": True, "message": "Connectivity verified"},
+            ),
+            patch.object(FortiOSTools, "create_client", return_value=mock_client),
+        ):
+            first = FortiOSTools.get_addresses(
+                "https://test.com", "token", "root", output_format="csv", max_records=3
+            )
+        second = FortiOSTools.get_addresses(
+            "https://test.com",
+            "token",
+            "root",
+            continuation_token=first["continuation_token"],
+        )
+
+        assert first["data"] == "name\na0\na1\na2\n"
+        assert second["data"] == "name\na3\na4\n"
+
+
+if __name__ == "__main__":
+    pytest.main([__file__, "-v"])
@@ -0,0 +1,186 @@
+"""
+Tests for inline addresses in firewall policies.
+"""
+
+from unittest.mock import Mock, patch
+
+import pytest
+
+from app.inline_addresses import (
+    ADDRESS_INDEXES,
+    AddressIndex,
+    address_body,
+    object_name,
+    parse_inline,
+)
+from app.tools import FortiOSTools
+
+ADDRESSES = [
+    {"name": "all", "type": "ipmask", "subnet": "0.0.0.0 0.0.0.0"},
+    {"name": "web-net", "type": "ipmask", "subnet": "10.1.0.0 255.255.255.0"},
+    {"name": "a-web-net", "type": "ipmask", "subnet": "10.1.0.0 255.255.255.0"},
+    {
+        "name": "dmz-only",
+        "type": "ipmask",
+        "subnet": "10.2.0.0 255.255.255.0",
+        "associated-interface": "dmz",
+    },
+    {
+        "name": "pool",
+        "type": "iprange",
+        "start-ip": "10.3.0.10",
+        "end-ip": "10.3.0.20",
+    },
+    {"name": "Updates", "type": "fqdn", "fqdn": "Update.Example.com"},
+    {"name": "mail.example.com", "type": "ipmask", "subnet": "10.9.0.1/32"},
+]
+
+
+class TestInlineParsing:
+    """Test inline values and the index of existing objects"""
+
+    def test_parse_inline(self):
+        assert parse_inline("10.1.0.5") == ("ipmask", "10.1.0.5/32")
+        assert parse_inline(" 10.1.0.0/24 ") == ("ipmask", "10.1.0.0/24")
+        assert parse_inline("10.3.0.10-10.3.0.20") == (
+            "iprange",
+            "10.3.0.10-10.3.0.20",
+        )
+        assert parse_inline("FQDN:Update.example.com.") == (
+            "fqdn",
+            "update.example.com",
+        )
+        # Names that look like host names stay names
+        assert parse_inline("web.internal") is None
+        assert parse_inline("web-servers") is None
+        for value in (
+            "10.1.0.5/24",
+            "10.3.0.20-10.3.0.10",
+            "10.1.0.0/33",
+            "fqdn:not_a_host",
+            "2001:db8::1",
+            "2001:db8::/64",
+            "2001:db8::1-2001:db8::9",
+        ):
+            with pytest.raises(ValueError):
+                parse_inline(value)
+
+    def test_index_finds_equivalent_objects(self):
+        index = AddressIndex(ADDRESSES)
+        assert index.find(("ipmask", "0.0.0.0/0")) == "all"
+        # Two equivalent objects: the first name in sort order wins
+        assert index.find(("ipmask", "10.1.0.0/24")) == "a-web-net"
+        # Objects bound to an interface are not reused
+        assert index.find(("ipmask", "10.2.0.0/24")) is None
+        assert index.find(("iprange", "10.3.0.10-10.3.0.20")) == "pool"
+        assert index.find(("fqdn", "update.example.com")) == "Updates"
+
+    def test_new_objects(self):
+        assert object_name(("ipmask", "10.4.0.7/32")) == "host-10.4.0.7"
+        assert object_name(("ipmask", "10.4.0.0/16")) == "net-10.4.0.0_16"
+        assert address_body(("ipmask", "10.4.0.0/16"), "net-10.4.0.0_16") == {
+            "name": "net-10.4.0.0_16",
+            "type": "ipmask",
+            "subnet": "10.4.0.0 255.255.0.0",
+        }
+        with pytest.raises(ValueError):
+            object_name(("fqdn", "a" * 70 + ".example.com"))
+
+
+class TestInlinePolicy:
+    """Test create_firewall_policy with inline addresses"""
+
+    def setup_method(self):
+        ADDRESS_INDEXES.clear()
+
+    def _create(self, srcaddr, dstaddr):
+        return FortiOSTools.create_firewall_policy(
+            "https://fgt",
+            "token",
+            "root",
+            "web-in",
+            ["port1"],
+            ["port2"],
+            srcaddr,
+            dstaddr,
+            ["HTTPS"],
+            "accept",
+        )
+
+    @patch("app.tools.FortiOSTools._check_connectivity")
+    @patch("app.tools.FortiOSTools.read_cached_table")
+    @patch("app.tools.FortiOSTools.create_client")
+    def test_reuses_and_creates(self, mock_create_client, mock_read, mock_connectivity):
+        mock_connectivity.return_value = {"success": True}
+        mock_read.return_value = {
+            "http_status": 200,
+            "revision": "r1",
+            "results": ADDRESSES,
+        }
+        client = Mock()
+        client.get.return_value = {"http_status": 404}
+        client.post.return_value = {"http_status": 200}
+        mock_create_client.return_value = client
+
+        result = self._create(
+            ["10.1.0.0/24", "10.4.0.7", "10.4.0.7/32"],
+            ["mail.example.com", "fqdn:update.example.com", "203.0.113.0/28"],
+        )
+
+        assert result["success"] is True
+        assert result["data"]["addresses"] == [
+            {"value": "10.1.0.0/24", "name": "a-web-net", "created": False},
+            {"value": "10.4.0.7", "name": "host-10.4.0.7", "created": True},
+            {"value": "10.4.0.7/32", "name": "host-10.4.0.7", "created": True},
+            {"value": "fqdn:update.example.com", "name": "Updates", "created": False},
+            {"value": "203.0.113.0/28", "name": "net-203.0.113.0_28", "created": True},
+        ]
+        posts = [c.args for c in client.post.call_args_list]
+        assert sorted(body["name"] for endpoint, body in posts[:-1]) == [
+            "host-10.4.0.7",
+            "net-203.0.113.0_28",
+        ]
+        assert posts[0][1]["comment"] == "Created for policy 'web-in'"
+        endpoint, policy = posts[-1]
+        assert endpoint == "cmdb/firewall/policy"
+        assert policy["srcaddr"] == [
+            {"name": "a-web-net"},
+            {"name": "host-10.4.0.7"},
+            {"name": "host-10.4.0.7"},
+        ]
+        # An object named like an FQDN stays a name
+        assert policy["dstaddr"] == [
+            {"name": "mail.example.com"},
+            {"name": "Updates"},
+            {"name": "net-203.0.113.0_28"},
+        ]
+
+    @patch("app.tools.FortiOSTools._check_connectivity")
+    @patch("app.tools.FortiOSTools.read_cached_table")
+    @patch("app.tools.FortiOSTools.create_client")
+    def test_failed_create_stops_policy(
+        self, mock_create_client, mock_read, mock_connectivity
+    ):
+        mock_connectivity.return_value = {"success": True}
+        mock_read.return_value = {"http_status": 200, "revision": "r1", "results": []}
+        client = Mock()
+        client.get.return_value = {"http_status": 404}
+        client.post.side_effect = lambda endpoint, body: (
+            {"http_status": 500, "error": -5}
+            if body["name"] == "host-10.4.0.8"
+            else {"http_status": 200}
+        )
+        mock_create_client.return_value = client
+
+        result = self._create(["10.4.0.7"], ["10.4.0.8"])
+
+        assert result["success"] is False
+        assert result["message"] == (
+            "Created 1 of 2 address objects; policy 'web-in' not created"
+        )
+        assert result["data"] == {"created": ["host-10.4.0.7"]}
+        assert client.post.call_count == 2
+
+    def test_invalid_inline_address(self):
+        result = self._create(["10.1.0.5/24"], ["all"])
+        assert result["message"].startswith("Validation error: Invalid srcaddr")
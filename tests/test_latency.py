@@ -0,0 +1,256 @@
+"""
+Tests for endpoint latency tracking, HA failover and hedged reads.
+"""
+
+import time
+from unittest.mock import Mock, patch
+
+import pytest
+import requests
+
+from app.fortios_client import MAX_TIMEOUT, MIN_TIMEOUT, FortiOSClient, parse_urls
+from app.latency import (
+    ENDPOINT_LATENCY,
+    LatencyStats,
+    LatencyTracker,
+    endpoint_class,
+)
+
+
+@pytest.fixture(autouse=True)
+def clear_latency():
+    """Isolate tests from latency samples recorded elsewhere"""
+    ENDPOINT_LATENCY.clear()
+    yield
+    ENDPOINT_LATENCY.clear()
+
+
+def _ok_response():
+    response = Mock()
+    response.status_code = 200
+    response.json.return_value = {"results": []}
+    return response
+
+
+# ===============================
+# LATENCY STATISTICS TESTS
+# ===============================
+
+
+class TestLatencyStats:
+    """Test EWMA, percentile and ranking logic"""
+
+    def test_ewma_moves_towards_samples(self):
+        stats = LatencyStats(alpha=0.5)
+        stats.record(1.0)
+        stats.record(3.0)
+        assert stats.ewma == 2.0
+
+    def test_percentile_needs_samples(self):
+        stats = LatencyStats()
+        stats.record(0.1)
+        assert stats.percentile(95) is None
+
+    def test_percentile(self):
+        stats = LatencyStats()
+        for i in range(1, 101):
+            stats.record(i / 100)
+        assert stats.percentile(95) == pytest.approx(0.95)
+
+    def test_rank_prefers_fast_healthy_endpoints(self):
+        tracker = LatencyTracker()
+        tracker.record("https://a", 0.5)
+        tracker.record("https://b", 0.1)
+        tracker.record("https://c", 0.01)
+        tracker.record_failure("https://c")
+        assert tracker.rank(["https://a", "https://b", "https://c"]) == [
+            "https://b",
+            "https://a",
+            "https://c",
+        ]
+
+    def test_rank_probes_unmeasured_endpoints_first(self):
+        tracker = LatencyTracker()
+        tracker.record("https://a", 0.2)
+        assert tracker.rank(["https://a", "https://b"]) == ["https://b", "https://a"]
+
+
+# ===============================
+# HA ENDPOINT TESTS
+# ===============================
+
+
+class TestHAEndpoints:
+    """Test multi-endpoint targets"""
+
+    def test_parse_comma_separated_urls(self):
+        assert parse_urls("https://10.0.0.1/, https://10.0.0.2") == [
+            "https://10.0.0.1",
+            "https://10.0.0.2",
+        ]
+
+    def test_primary_url_is_first_endpoint(self):
+        client = FortiOSClient("https://10.0.0.1,https://10.0.0.2", "token")
+        assert client.url == "https://10.0.0.1"
+        assert client.urls == ["https://10.0.0.1", "https://10.0.0.2"]
+
+    def test_failover_without_backoff(self):
+        """A connection failure moves to the other unit immediately"""
+        client = FortiOSClient(
+            "https://10.0.0.1,https://10.0.0.2", "token",
+            retry_backoff=5.0, hedge_reads=False,
+        )
+
+        def fake_post(url, **kwargs):
+            if url.startswith("https://10.0.0.1"):
+                raise requests.exceptions.ConnectionError("refused")
+            return _ok_response()
+
+        with patch.object(client.session, "post", side_effect=fake_post) as mock_post:
+            start = time.monotonic()
+            result = client.post("cmdb/firewall/address", {"name": "a"})
+
+        assert result["http_status"] == 200
+        assert mock_post.call_count == 2
+        assert time.monotonic() - start < 1
+
+    def test_failed_endpoint_ranked_last(self):
+        """After a failure, the next request starts on the healthy unit"""
+        ENDPOINT_LATENCY.record_failure("https://10.0.0.1")
+        client = FortiOSClient(
+            "https://10.0.0.1,https://10.0.0.2", "token", hedge_reads=False
+        )
+
+        with patch.object(client.session, "get", return_value=_ok_response()) as mock_get:
+            client.get("monitor/system/status")
+
+        assert mock_get.call_args[0][0].startswith("https://10.0.0.2/")
+
+    def test_hedged_get_uses_faster_endpoint(self):
+        """A slow primary is hedged to the backup after its p95 latency"""
+        for _ in range(10):
+            ENDPOINT_LATENCY.record("https://10.0.0.1", 0.01)
+            ENDPOINT_LATENCY.record("https://10.0.0.2", 0.02)
+        client = FortiOSClient("https://10.0.0.1,https://10.0.0.2", "token")
+
+        def fake_get(url, **kwargs):
+            if url.startswith("https://10.0.0.1"):
+                time.sleep(1)
+            response = _ok_response()
+            response.json.return_value = {"served_by": url}
+            return response
+
+        with patch.object(client.session, "get", side_effect=fake_get) as mock_get:
+            start = time.monotonic()
+            result = client.get("monitor/system/status")
+            elapsed = time.monotonic() - start
+
+        assert result["served_by"].startswith("https://10.0.0.2/")
+        assert mock_get.call_count == 2
+        assert elapsed < 0.8
+
+    def test_losing_hedged_response_is_closed(self):
+        """The response that loses the race is closed once it arrives"""
+        client = FortiOSClient("https://10.0.0.1,https://10.0.0.2", "token")
+        responses = {}
+
+        def fake_get(url, **kwargs):
+            if url.startswith("https://10.0.0.1"):
+                time.sleep(1.2)
+            response = _ok_response()
+            responses[url.split("/api")[0]] = response
+            return response
+
+        with patch.object(client.session, "get", side_effect=fake_get):
+            client.get("monitor/system/status")
+            time.sleep(0.5)
+
+        responses["https://10.0.0.1"].close.assert_called_once()
+        responses["https://10.0.0.2"].close.assert_not_called()
+
+    def test_fast_primary_is_not_hedged(self):
+        client = FortiOSClient("https://10.0.0.1,https://10.0.0.2", "token")
+
+        with patch.object(client.session, "get", return_value=_ok_response()) as mock_get:
+            client.get("monitor/system/status")
+
+        assert mock_get.call_count == 1
+
+
+# ===============================
+# ADAPTIVE TIMEOUT TESTS
+# ===============================
+
+
+class TestAdaptiveTimeouts:
+    """Test timeouts computed from observed latency and response size"""
+
+    def test_endpoint_classes(self):
+        assert endpoint_class("cmdb/firewall/policy") == "cmdb/firewall/policy"
+        assert endpoint_class("cmdb/firewall/policy/5") == "cmdb/firewall/policy/*"
+        assert endpoint_class("monitor/system/status") == "monitor/system/status"
+
+    def test_unmeasured_class_uses_default(self):
+        tracker = LatencyTracker()
+        assert tracker.timeout(("d", "c"), "d", 10, 2, 120) == 10
+
+    def test_fast_class_clamped_to_floor(self):
+        tracker = LatencyTracker()
+        for _ in range(5):
+            tracker.record(("d", "monitor/system/status"), 0.05)
+        assert tracker.timeout(("d", "monitor/system/status"), "d", 10, 2, 120) == 2
+
+    def test_slow_class_gets_longer_timeout(self):
+        tracker = LatencyTracker()
+        for seconds in (20, 24, 22, 26):
+            tracker.record(("d", "cmdb/firewall/policy"), seconds)
+        timeout = tracker.timeout(("d", "cmdb/firewall/policy"), "d", 10, 2, 120)
+        assert 26 < timeout < 120
+
+    def test_large_responses_add_transfer_allowance(self):
+        tracker = LatencyTracker()
+        tracker.record("d", 1.0, size=1_000_000)  # device moves ~1 MB/s
+        tracker.record(("d", "small"), 1.0, size=1_000)
+        tracker.record(("d", "large"), 1.0, size=20_000_000)
+        small = tracker.timeout(("d", "small"), "d", 10, 0, 120)
+        large = tracker.timeout(("d", "large"), "d", 10, 0, 120)
+        assert large - small == pytest.approx(20 - 0.001)
+
+    def test_timeouts_back_off_until_success(self):
+        tracker = LatencyTracker()
+        tracker.record(("d", "c"), 5.0)
+        first = tracker.timeout(("d", "c"), "d", 10, 2, 1000)
+        tracker.record_failure(("d", "c"), timed_out=True)
+        assert tracker.timeout(("d", "c"), "d", 10, 2, 1000) == pytest.approx(first * 2)
+        tracker.record(("d", "c"), 5.0)
+        assert tracker.timeout(("d", "c"), "d", 10, 2, 1000) < first * 2
+
+    def test_ceiling(self):
+        tracker = LatencyTracker()
+        tracker.record(("d", "c"), 500.0)
+        assert tracker.timeout(("d", "c"), "d", 10, 2, 120) == 120
+
+    def test_client_uses_adaptive_timeout(self):
+        """The client sends the learned timeout for the endpoint class"""
+        for _ in range(5):
+            ENDPOINT_LATENCY.record(("https://10.0.0.1", "monitor/system/status"), 0.01)
+        client = FortiOSClient("https://10.0.0.1", "token")
+
+        with patch.object(client.session, "get", return_value=_ok_response()) as mock_get:
+            client.get("monitor/system/status")
+            assert mock_get.call_args[1]["timeout"] == MIN_TIMEOUT
+            client.get("cmdb/firewall/policy")
+            assert mock_get.call_args[1]["timeout"] == client.timeout
+
+    def test_fixed_timeout_when_disabled(self):
+        ENDPOINT_LATENCY.record(("https://10.0.0.1", "monitor/system/status"), 500)
+        client = FortiOSClient("https://10.0.0.1", "token", adaptive_timeout=False)
+
+        with patch.object(client.session, "get", return_value=_ok_response()) as mock_get:
+            client.get("monitor/system/status")
+
+        assert mock_get.call_args[1]["timeout"] == client.timeout < MAX_TIMEOUT
+
+
+if __name__ == "__main__":
+    pytest.main([__file__, "-v"])
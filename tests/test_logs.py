@@ -0,0 +1,302 @@
+"""
+Tests for streaming log and session table aggregation.
+"""
+
+import random
+from collections import Counter
+from unittest.mock import Mock, patch
+
+from app.aggregation import SpaceSaving, aggregate_stream
+from app.tools import FortiOSTools
+
+
+def _entry(i: int, **fields):
+    return {
+        "srcip": f"10.0.0.{i % 7}",
+        "dstip": "192.0.2.1",
+        "dstport": 443,
+        "policyid": i % 3,
+        "action": "accept",
+        "sentbyte": 100,
+        "rcvdbyte": 1000,
+        **fields,
+    }
+
+
+class TestSpaceSaving:
+    """Test the bounded-memory heavy hitter sketch"""
+
+    def test_exact_below_capacity(self):
+        sketch = SpaceSaving(10)
+        for key in "aabbbc":
+            sketch.add(key)
+        assert sketch.exact is True
+        assert sketch.top(2) == [("b", 3, 0), ("a", 2, 0)]
+
+    def test_heavy_hitters_found_in_long_tail(self):
+        rng = random.Random(7)
+        stream = ["heavy-1"] * 3000 + ["heavy-2"] * 2000
+        stream += [f"rare-{rng.randint(0, 50000)}" for _ in range(20000)]
+        rng.shuffle(stream)
+
+        sketch = SpaceSaving(100)
+        for key in stream:
+            sketch.add(key)
+
+        true = Counter(stream)
+        top = sketch.top(2)
+        assert [key for key, _, _ in top] == ["heavy-1", "heavy-2"]
+        for key, count, error in top:
+            # Counts never underestimate, and overestimate by at most error
+            assert count - error <= true[key] <= count
+        assert sketch.exact is False
+        assert len(sketch._counts) == 100
+
+    def test_weights(self):
+        sketch = SpaceSaving(2)
+        sketch.add("a", 5)
+        sketch.add("b", 1)
+        sketch.add("c", 2)
+        assert sketch.total == 8
+        assert sketch.top(1) == [("a", 5, 0)]
+        assert ("c", 3, 1) in sketch.top(2)
+
+
+class TestAggregateStream:
+    """Test grouping a record stream"""
+
+    def test_sum_fields(self):
+        result = aggregate_stream(
+            (_entry(i) for i in range(70)), ["srcip"], 2, ["sentbyte", "rcvdbyte"]
+        )
+        assert result["count"] == 70
+        assert result["total"] == 70 * 1100
+        assert result["metric"] == "sentbyte+rcvdbyte"
+        assert result["groups"][0]["value"] == 10 * 1100
+        assert result["exact"] is True
+
+
+class TestQueryLogs:
+    """Test the log query tool"""
+
+    def _client(self, entries, page_meta=None):
+        client = Mock()
+        calls = []
+
+        def iter_results(endpoint, meta, params=None):
+            calls.append(dict(params))
+            meta.update({"http_status": 200, "session_id": 42, **(page_meta or {})})
+            start, rows = params["start"], params["rows"]
+            end = start + rows
+            yield from entries[start:end]
+
+        client.iter_results.side_effect = iter_results
+        client.calls = calls
+        return client
+
+    @patch("app.tools.LOG_PAGE_ROWS", 10)
+    @patch("app.tools.FortiOSTools._check_connectivity")
+    @patch("app.tools.FortiOSTools.create_client")
+    def test_pages_until_end_of_log(self, mock_create_client, mock_connectivity):
+        mock_connectivity.return_value = {"success": True}
+        entries = [_entry(i) for i in range(25)]
+        mock_create_client.return_value = client = self._client(entries)
+
+        result = FortiOSTools.query_logs(
+            "https://fgt", "token", "root", report="policy_hits"
+        )
+
+        assert result["success"] is True
+        assert result["details"] == {
+            "endpoint": "log/memory/traffic/forward",
+            "rows_scanned": 25,
+            "complete": True,
+        }
+        assert [c["start"] for c in client.calls] == [0, 10, 20]
+        assert "session_id" not in client.calls[0]
+        assert client.calls[1]["session_id"] == 42
+        groups = {g["group"]["policyid"]: g["value"] for g in result["data"]["groups"]}
+        assert groups == {"0": 9, "1": 8, "2": 8}
+
+    @patch("app.tools.FortiOSTools._check_connectivity")
+    @patch("app.tools.FortiOSTools.create_client")
+    def test_denied_destinations_report_filters(
+        self, mock_create_client, mock_connectivity
+    ):
+        mock_connectivity.return_value = {"success": True}
+        entries = [_entry(i) for i in range(5)] + [
+            _entry(i, action="deny", dstip="198.51.100.9") for i in range(3)
+        ]
+        mock_create_client.return_value = self._client(entries)
+
+        result = FortiOSTools.query_logs(
+            "https://fgt",
+            "token",
+            "root",
+            report="top_denied_destinations",
+            filters=["srcip!=10.0.0.2"],
+        )
+
+        assert result["data"]["count"] == 2
+        assert result["data"]["groups"] == [
+            {"group": {"dstip": "198.51.100.9", "dstport": "443"}, "value": 2}
+        ]
+
+    @patch("app.tools.FortiOSTools._check_connectivity")
+    @patch("app.tools.FortiOSTools.create_client")
+    def test_max_rows_bounds_scan(self, mock_create_client, mock_connectivity):
+        mock_connectivity.return_value = {"success": True}
+        entries = [_entry(i) for i in range(50)]
+        mock_create_client.return_value = self._client(entries)
+
+        result = FortiOSTools.query_logs(
+            "https://fgt", "token", "root", group_by=["srcip"], max_rows=20
+        )
+
+        assert result["details"]["rows_scanned"] == 20
+        assert result["details"]["complete"] is False
+
+    @patch("app.tools.FortiOSTools._check_connectivity")
+    @patch("app.tools.FortiOSTools.create_client")
+    def test_upstream_error(self, mock_create_client, mock_connectivity):
+        mock_connectivity.return_value = {"success": True}
+        client = Mock()
+
+        def iter_results(endpoint, meta, params=None):
+            meta.update({"http_status": 404, "status": "error"})
+            return iter(())
+
+        client.iter_results.side_effect = iter_results
+        mock_create_client.return_value = client
+
+        result = FortiOSTools.query_logs(
+            "https://fgt", "token", "root", source="disk", report="top_talkers"
+        )
+
+        assert result["success"] is False
+        assert result["message"] == "Failed to read log/disk/traffic/forward"
+
+    def test_validation(self):
+        for kwargs in (
+            {"source": "usb", "report": "policy_hits"},
+            {"subtype": "../x", "report": "policy_hits"},
+            {"report": "nope"},
+            {},
+            {"group_by": ["srcip"], "filters": ["srcip"]},
+        ):
+            result = FortiOSTools.query_logs("https://fgt", "token", "root", **kwargs)
+            assert result["success"] is False
+            assert result["message"].startswith("Validation error")
+
+
+def _session(i: int, **fields):
+    return {
+        "saddr": f"10.0.0.{i % 5}",
+        "daddr": "192.0.2.1",
+        "dport": 443 if i % 2 else 80,
+        "policyid": 1 + i % 2,
+        "proto": 6,
+        "sentbyte": 10,
+        "rcvdbyte": 20,
+        **fields,
+    }
+
+
+class TestInspectSessions:
+    """Test paging and aggregating the session table"""
+
+    def _client(self, sessions, report_total=True, fail_at=None):
+        client = Mock()
+        starts = []
+
+        def get(endpoint, params=None):
+            starts.append(params["start"])
+            if params["start"] == fail_at:
+                return {"http_status": 500, "status": "error"}
+            start = params["start"]
+            end = start + params["count"]
+            results = {"details": sessions[start:end]}
+            if report_total:
+                results["summary"] = {"matched_count": len(sessions)}
+            return {"http_status": 200, "results": results}
+
+        client.get.side_effect = get
+        client.starts = starts
+        return client
+
+    @patch("app.tools.SESSION_PAGE_SIZE", 10)
+    @patch("app.tools.FortiOSTools._check_connectivity")
+    @patch("app.tools.FortiOSTools.create_client")
+    def test_pages_concurrently_and_aggregates(
+        self, mock_create_client, mock_connectivity
+    ):
+        mock_connectivity.return_value = {"success": True}
+        sessions = [_session(i) for i in range(95)]
+        mock_create_client.return_value = client = self._client(sessions)
+
+        result = FortiOSTools.inspect_sessions(
+            "https://fgt", "token", "root", filters=["dport==443"]
+        )
+
+        assert result["success"] is True
+        data = result["data"]
+        assert sorted(client.starts) == list(range(0, 95, 10))
+        assert data["sessions_scanned"] == 95
+        assert data["sessions_matched"] == 47
+        assert data["complete"] is True
+        assert data["policy"]["groups"] == [{"group": {"policyid": "2"}, "value": 47}]
+        assert data["destination"]["groups"][0]["group"] == {
+            "daddr": "192.0.2.1",
+            "dport": "443",
+        }
+        assert set(data) >= {"source", "protocol"}
+
+    @patch("app.tools.SESSION_PAGE_SIZE", 10)
+    @patch("app.tools.FortiOSTools._check_connectivity")
+    @patch("app.tools.FortiOSTools.create_client")
+    def test_pages_sequentially_without_total(
+        self, mock_create_client, mock_connectivity
+    ):
+        mock_connectivity.return_value = {"success": True}
+        sessions = [_session(i) for i in range(25)]
+        mock_create_client.return_value = client = self._client(
+            sessions, report_total=False
+        )
+
+        result = FortiOSTools.inspect_sessions(
+            "https://fgt",
+            "token",
+            "root",
+            dimensions=["source"],
+            sum_fields=["sentbyte", "rcvdbyte"],
+        )
+
+        assert client.starts == [0, 10, 20]
+        assert list(result["data"]) == [
+            "sessions_scanned",
+            "sessions_matched",
+            "total_sessions",
+            "complete",
+            "source",
+        ]
+        assert result["data"]["source"]["total"] == 25 * 30
+        assert result["data"]["complete"] is True
+
+    @patch("app.tools.SESSION_PAGE_SIZE", 10)
+    @patch("app.tools.FortiOSTools._check_connectivity")
+    @patch("app.tools.FortiOSTools.create_client")
+    def test_failed_page(self, mock_create_client, mock_connectivity):
+        mock_connectivity.return_value = {"success": True}
+        sessions = [_session(i) for i in range(50)]
+        mock_create_client.return_value = self._client(sessions, fail_at=30)
+
+        result = FortiOSTools.inspect_sessions("https://fgt", "token", "root")
+
+        assert result["success"] is False
+        assert result["message"] == "Failed to read the session table"
+
+    def test_validation(self):
+        result = FortiOSTools.inspect_sessions(
+            "https://fgt", "token", "root", dimensions=["country"]
+        )
+        assert result["message"].startswith("Validation error")
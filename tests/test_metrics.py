@@ -0,0 +1,123 @@
+"""
+Tests for the metric ring buffers and sampler.
+"""
+
+import asyncio
+from unittest.mock import Mock, patch
+
+import pytest
+
+from app.devices import DEVICES, Device
+from app.metrics import (
+    METRICS,
+    METRICS_ENV,
+    MetricsSampler,
+    MetricsStore,
+    RingBuffer,
+    configured_metrics,
+    query_metric,
+    series_stats,
+)
+
+
+@pytest.fixture(autouse=True)
+def clean_registries():
+    DEVICES.clear()
+    METRICS.clear()
+    yield
+    DEVICES.clear()
+    METRICS.clear()
+
+
+class TestRingBuffer:
+    """Test the fixed-size sample buffer"""
+
+    def test_overwrites_oldest(self):
+        ring = RingBuffer(3)
+        for i in range(5):
+            ring.append(float(i), i * 10.0)
+        assert len(ring) == 3
+        assert ring.samples() == ([2.0, 3.0, 4.0], [20.0, 30.0, 40.0])
+        assert ring.samples(since=3.5) == ([4.0], [40.0])
+
+    def test_storage_is_preallocated(self):
+        ring = RingBuffer(100)
+        assert len(ring._times) == 100
+        assert ring._values.typecode == "d"
+
+
+class TestSeriesStats:
+    """Test trend, rate and percentile queries"""
+
+    def test_rising_series(self):
+        times = [0.0, 60.0, 120.0, 180.0]
+        stats = series_stats(times, [10.0, 20.0, 30.0, 40.0])
+        assert stats["trend"] == "rising"
+        assert stats["slope_per_minute"] == pytest.approx(10.0)
+        assert stats["rate_per_second"] == pytest.approx(30 / 180)
+        assert stats["p50"] == pytest.approx(25.0)
+        assert stats["max"] == 40.0
+
+    def test_flat_and_single_sample(self):
+        assert series_stats([0.0, 60.0], [50.0, 50.5])["trend"] == "flat"
+        single = series_stats([0.0], [7.0])
+        assert single["trend"] == "unknown"
+        assert single["p95"] == 7.0
+        assert series_stats([], []) == {"samples": 0}
+
+
+class TestSampler:
+    """Test sampling registered devices"""
+
+    @patch("app.metrics.FortiOSTools.create_client")
+    def test_sample_once_records_values(self, mock_create_client):
+        DEVICES.register(Device("fw1", "https://fw1", "token", "root"))
+        client = Mock()
+        client.get.return_value = {
+            "http_status": 200,
+            "results": {
+                "cpu": [{"current": 12, "historical": {}}],
+                "session": [{"current": 3400}],
+            },
+        }
+        mock_create_client.return_value = client
+        store = MetricsStore()
+        store.record("gone", "cpu", 1.0, 1.0)
+
+        recorded = asyncio.run(
+            MetricsSampler(store, ["cpu", "mem", "session"]).sample_once()
+        )
+
+        assert recorded == 2
+        assert store.series() == {"fw1": ["cpu", "session"]}
+        assert store.query("fw1", "session")["last"] == 3400.0
+
+    def test_run_is_disabled_without_metrics(self, monkeypatch):
+        monkeypatch.delenv(METRICS_ENV, raising=False)
+        asyncio.run(asyncio.wait_for(MetricsSampler(MetricsStore()).run(), 1))
+
+    def test_configured_metrics(self, monkeypatch):
+        monkeypatch.setenv(METRICS_ENV, "session, cpu,bogus")
+        assert configured_metrics() == ["cpu", "session"]
+
+
+class TestQueryMetric:
+    """Test the metric trend tool"""
+
+    def test_answers_from_memory(self):
+        for i in range(10):
+            METRICS.record("fw1", "cpu", 1_000.0 + i * 60, 10.0 + i)
+        with patch("app.metrics.time.time", return_value=1_600.0):
+            result = query_metric("fw1", "cpu", window_minutes=5)
+        assert result["success"] is True
+        assert result["data"]["samples"] == 5
+        assert result["data"]["trend"] == "rising"
+
+    def test_no_samples(self, monkeypatch):
+        monkeypatch.delenv(METRICS_ENV, raising=False)
+        result = query_metric("fw1", "cpu")
+        assert result["success"] is False
+        assert METRICS_ENV in result["details"]["hint"]
+
+    def test_invalid_metric(self):
+        assert query_metric("fw1", "fan")["message"].startswith("Validation error")
@@ -0,0 +1,108 @@
+"""
+Tests for the policy usage join.
+"""
+
+from unittest.mock import Mock, patch
+
+from app.policy_usage import PolicyCounters, policy_usage
+from app.tools import FortiOSTools
+
+NOW = 1_700_000_000
+DAY = 86400
+
+POLICIES = [
+    {"policyid": 1, "name": "web", "status": "enable"},
+    {"policyid": 2, "name": "dns", "status": "enable"},
+    {"policyid": 3, "name": "legacy", "status": "enable"},
+    {"policyid": 4, "name": "new", "status": "disable"},
+]
+
+COUNTERS = [
+    {"policyid": 0, "hit_count": 99, "bytes": 1, "last_used": NOW},
+    {"policyid": 1, "hit_count": 50, "bytes": 5000, "last_used": NOW - DAY},
+    {
+        "policyid": 2,
+        "hit_count": 10,
+        "software_bytes": 300,
+        "asic_bytes": 700,
+        "last_used": NOW - 200 * DAY,
+    },
+    {"policyid": 3, "hit_count": 0, "bytes": 0, "last_used": 0},
+]
+
+
+class TestPolicyUsage:
+    """Test joining policies with their counters"""
+
+    def test_counters_are_columnar(self):
+        counters = PolicyCounters.from_records(COUNTERS + ["junk", {"policyid": "x"}])
+        assert counters.index == {0: 0, 1: 1, 2: 2, 3: 3}
+        assert counters.bytes.tolist() == [1, 5000, 1000, 0]
+        assert counters.hits.typecode == "q"
+
+    def test_unused_and_top(self):
+        usage = policy_usage(
+            POLICIES, PolicyCounters.from_records(COUNTERS), 90, 2, 10, now=NOW
+        )
+
+        assert usage["policies"] == 4
+        assert usage["without_counters"] == 1
+        assert usage["unused_count"] == 3
+        # Never used first, then least recently used
+        assert [p["policyid"] for p in usage["unused"]] == [3, 4, 2]
+        assert usage["unused"][2]["last_used"] == "2023-04-28T22:13:20+00:00"
+        assert [p["policyid"] for p in usage["top_by_bytes"]] == [1, 2]
+        assert usage["top_by_bytes"][1]["bytes"] == 1000
+
+    def test_zero_days_means_never_used(self):
+        usage = policy_usage(
+            POLICIES, PolicyCounters.from_records(COUNTERS), 0, 5, 1, now=NOW
+        )
+        assert usage["unused_count"] == 2
+        assert len(usage["unused"]) == 1
+
+    @patch("app.tools.FortiOSTools.read_cached_table")
+    @patch("app.tools.FortiOSTools._check_connectivity")
+    @patch("app.tools.FortiOSTools.create_client")
+    def test_tool(self, mock_create_client, mock_connectivity, mock_read):
+        mock_connectivity.return_value = {"success": True}
+        mock_read.return_value = {
+            "http_status": 200,
+            "revision": "r1",
+            "results": POLICIES,
+        }
+        client = Mock()
+
+        def iter_results(endpoint, meta):
+            meta["http_status"] = 200
+            yield from COUNTERS
+
+        client.iter_results.side_effect = iter_results
+        mock_create_client.return_value = client
+
+        result = FortiOSTools.get_policy_usage("https://fgt", "token", "root", 30)
+
+        assert result["success"] is True
+        assert client.iter_results.call_args[0][0] == "monitor/firewall/policy"
+        assert result["details"] == {"revision": "r1"}
+        assert result["data"]["unused_days"] == 30
+
+    @patch("app.tools.FortiOSTools.read_cached_table")
+    @patch("app.tools.FortiOSTools._check_connectivity")
+    @patch("app.tools.FortiOSTools.create_client")
+    def test_policy_read_failure(
+        self, mock_create_client, mock_connectivity, mock_read
+    ):
+        mock_connectivity.return_value = {"success": True}
+        mock_read.return_value = {"http_status": 403, "status": "error"}
+        mock_create_client.return_value = Mock()
+
+        result = FortiOSTools.get_policy_usage("https://fgt", "token", "root")
+
+        assert result["success"] is False
+        assert result["details"]["http_status"] == 403
+        mock_create_client.return_value.iter_results.assert_not_called()
+
+    def test_negative_days(self):
+        result = FortiOSTools.get_policy_usage("https://fgt", "token", "root", -1)
+        assert result["message"].startswith("Validation error")
@@ -0,0 +1,273 @@
+"""
+Tests for the background revision poller.
+"""
+
+import threading
+import time
+from unittest.mock import AsyncMock, Mock, patch
+
+import pytest
+
+from app.cmdb_cache import CMDB_CACHE
+from app.devices import DEVICES, Device
+from app.poller import (
+    CONFIG_CHANGE_LOG,
+    CONFIG_CHANGE_ROWS,
+    ConfigLog,
+    RevisionPoller,
+    _config_changes,
+    changed_tables,
+)
+from app.resources import TABLES, SubscriptionRegistry
+from app.tools import FortiOSTools
+
+
+@pytest.fixture(autouse=True)
+def clean_state():
+    """Isolate tests from devices and tables left elsewhere"""
+    DEVICES.clear()
+    CMDB_CACHE.clear()
+    yield
+    DEVICES.clear()
+    CMDB_CACHE.clear()
+
+
+class FakeFortiGate:
+    """In-memory FortiGate: config revision, CMDB tables and a change log"""
+
+    def __init__(self, log_available=True):
+        self.revision = 1
+        self.tables = {endpoint: [{"name": "a"}] for endpoint in TABLES.values()}
+        self.events = []
+        self.log_available = log_available
+        self.table_reads = []
+        self.active = 0
+        self.max_active = 0
+        self._lock = threading.Lock()
+
+    def change(self, endpoint, records):
+        """Change a table the way a CLI/GUI edit would"""
+        self.revision += 1
+        self.tables[endpoint] = records
+        cfgpath = endpoint.split("/", 1)[1].replace("/", ".")
+        self.events.append({"eventtime": 1000 + self.revision, "cfgpath": cfgpath})
+
+    def get(self, endpoint, params=None):
+        with self._lock:
+            self.active += 1
+            self.max_active = max(self.max_active, self.active)
+        time.sleep(0.01)
+        with self._lock:
+            self.active -= 1
+        if endpoint == CONFIG_CHANGE_LOG:
+            if not self.log_available:
+                return {"http_status": 404}
+            return {"http_status": 200, "results": list(reversed(self.events))}
+        return {
+            "http_status": 200,
+            "revision": str(self.revision),
+            "results": self.tables[endpoint][:1],
+        }
+
+    def iter_results(self, endpoint, meta):
+        self.table_reads.append(endpoint)
+        meta.update({"http_status": 200, "revision": str(self.revision)})
+        yield from self.tables[endpoint]
+
+    def client(self, *args, **kwargs):
+        client = Mock()
+        client.get.side_effect = self.get
+        client.iter_results.side_effect = self.iter_results
+        return client
+
+
+def _poller(**kwargs):
+    session = Mock()
+    session.send_resource_updated = AsyncMock()
+    subscriptions = SubscriptionRegistry()
+    subscriptions.subscribe("fortios://fw1/addresses", session)
+    subscriptions.subscribe("fortios://fw1/policies", session)
+    return RevisionPoller(jitter=0, subscriptions=subscriptions, **kwargs), session
+
+
+class TestChangedTables:
+    """Test mapping config change events to tables"""
+
+    def test_events_since_mark(self):
+        events = [
+            {"eventtime": 30, "cfgpath": "firewall.vip"},
+            {"eventtime": 20, "cfgpath": "system.interface"},
+            {"eventtime": 10, "cfgpath": "firewall.address"},
+        ]
+        log = ConfigLog(events, len(events), 10)
+        assert changed_tables(log, 10) == {"vips"}
+        assert changed_tables(log, 20) == {"vips"}
+        # The revision moved but no newer event names a cached table
+        assert changed_tables(log, 30) is None
+        assert changed_tables(ConfigLog(events[1:], 2, 10), 10) is None
+
+    def test_unknown_without_mark_or_log(self):
+        assert changed_tables(ConfigLog([], 0, None), None) is None
+        assert changed_tables(None, 10) is None
+
+    def test_full_window_of_other_events(self):
+        # One config change among a full window of logins: the window starts
+        # after the mark, so earlier config changes may have rotated out
+        rows = [
+            {"eventtime": 100 + i, "logdesc": "Admin login successful"}
+            for i in range(CONFIG_CHANGE_ROWS - 1)
+        ]
+        rows.append({"eventtime": 500, "cfgpath": "firewall.vip"})
+        client = Mock()
+        client.get.return_value = {"http_status": 200, "results": rows}
+        with patch.object(FortiOSTools, "create_client", return_value=client):
+            log = _config_changes(Device("fw1", "https://x", "t", "root"))
+
+        assert log.rows == CONFIG_CHANGE_ROWS
+        assert log.oldest == 100
+        assert [event["eventtime"] for event in log.events] == [500]
+        assert changed_tables(log, 50) is None
+        # The mark is inside the window: nothing older was missed
+        assert changed_tables(log, 150) == {"vips"}
+
+
+class TestRevisionPoller:
+    """Test cache refresh and change notifications"""
+
+    @pytest.mark.asyncio
+    async def test_first_poll_warms_cache(self):
+        fortigate = FakeFortiGate()
+        DEVICES.register(Device("fw1", "https://x", "t", "root"))
+        poller, session = _poller()
+
+        with patch.object(FortiOSTools, "create_client", side_effect=fortigate.client):
+            assert await poller.poll_once() == []
+
+        assert sorted(fortigate.table_reads) == sorted(TABLES.values())
+        session.send_resource_updated.assert_not_awaited()
+
+    @pytest.mark.asyncio
+    async def test_unchanged_revision_reads_nothing(self):
+        fortigate = FakeFortiGate()
+        DEVICES.register(Device("fw1", "https://x", "t", "root"))
+        poller, _ = _poller()
+
+        with patch.object(FortiOSTools, "create_client", side_effect=fortigate.client):
+            await poller.poll_once()
+            fortigate.table_reads.clear()
+            await poller.poll_once()
+
+        assert fortigate.table_reads == []
+
+    @pytest.mark.asyncio
+    async def test_only_changed_table_is_refreshed(self):
+        fortigate = FakeFortiGate()
+        fortigate.events.append({"eventtime": 1000, "cfgpath": "system.dns"})
+        device = Device("fw1", "https://x", "t", "root")
+        DEVICES.register(device)
+        poller, session = _poller()
+
+        with patch.object(FortiOSTools, "create_client", side_effect=fortigate.client):
+            await poller.poll_once()
+            fortigate.table_reads.clear()
+            fortigate.change("cmdb/firewall/address", [{"name": "a"}, {"name": "b"}])
+            changed = await poller.poll_once()
+
+            assert changed == ["fortios://fw1/addresses"]
+            assert fortigate.table_reads == ["cmdb/firewall/address"]
+            session.send_resource_updated.assert_awaited_once()
+
+            # The other tables were marked current, so reads hit the cache
+            fortigate.table_reads.clear()
+            client = fortigate.client()
+            FortiOSTools.read_cached_table(client, device.owner, "cmdb/firewall/policy")
+            assert fortigate.table_reads == []
+
+    @pytest.mark.asyncio
+    async def test_rotated_log_refreshes_every_table(self):
+        fortigate = FakeFortiGate()
+        DEVICES.register(Device("fw1", "https://x", "t", "root"))
+        poller, _ = _poller()
+
+        with patch.object(FortiOSTools, "create_client", side_effect=fortigate.client):
+            fortigate.change("cmdb/firewall/vip", [{"name": "v"}])
+            await poller.poll_once()
+            fortigate.table_reads.clear()
+            # A policy change, then enough logins to push it out of the window
+            fortigate.change("cmdb/firewall/policy", [{"name": "p"}])
+            fortigate.events = [
+                {"eventtime": 2000 + i, "logdesc": "Admin login successful"}
+                for i in range(CONFIG_CHANGE_ROWS)
+            ]
+            fortigate.change("cmdb/firewall/address", [{"name": "b"}])
+            changed = await poller.poll_once()
+
+        assert len(fortigate.table_reads) == len(TABLES)
+        assert sorted(changed) == ["fortios://fw1/addresses", "fortios://fw1/policies"]
+
+    @pytest.mark.asyncio
+    async def test_without_log_every_table_is_refreshed(self):
+        fortigate = FakeFortiGate(log_available=False)
+        DEVICES.register(Device("fw1", "https://x", "t", "root"))
+        poller, session = _poller()
+
+        with patch.object(FortiOSTools, "create_client", side_effect=fortigate.client):
+            await poller.poll_once()
+            fortigate.table_reads.clear()
+            fortigate.change("cmdb/firewall/policy", [{"name": "p"}])
+            changed = await poller.poll_once()
+
+        assert len(fortigate.table_reads) == len(TABLES)
+        # Only the table whose records changed is notified
+        assert changed == ["fortios://fw1/policies"]
+        session.send_resource_updated.assert_awaited_once()
+
+    @pytest.mark.asyncio
+    async def test_concurrency_limit(self):
+        fortigate = FakeFortiGate()
+        for i in range(6):
+            DEVICES.register(Device(f"fw{i}", "https://x", f"t{i}", "root"))
+        poller, _ = _poller(max_concurrency=2)
+
+        with patch.object(FortiOSTools, "create_client", side_effect=fortigate.client):
+            await poller.poll_once()
+
+        assert fortigate.max_active <= 2
+
+    @pytest.mark.asyncio
+    async def test_jitter_spreads_device_polls(self):
+        DEVICES.register(Device("fw1", "https://x", "t", "root"))
+        poller = RevisionPoller(interval=10, jitter=0.5)
+        sleeps = []
+
+        async def fake_sleep(seconds):
+            sleeps.append(seconds)
+
+        with (
+            patch("app.poller.asyncio.sleep", side_effect=fake_sleep),
+            patch("app.poller.probe_revision", return_value=None),
+        ):
+            await poller.poll_once()
+
+        assert len(sleeps) == 1 and 0 <= sleeps[0] <= 5
+
+    @pytest.mark.asyncio
+    async def test_failing_device_does_not_stop_others(self):
+        fortigate = FakeFortiGate()
+        DEVICES.register(Device("bad", "https://bad", "t", "root"))
+        DEVICES.register(Device("fw1", "https://x", "t", "root"))
+        poller, _ = _poller()
+
+        def create_client(url, *args, **kwargs):
+            if url == "https://bad":
+                raise RuntimeError("boom")
+            return fortigate.client()
+
+        with patch.object(FortiOSTools, "create_client", side_effect=create_client):
+            await poller.poll_once()
+
+        assert len(fortigate.table_reads) == len(TABLES)
+
+
+if __name__ == "__main__":
+    pytest.main([__file__, "-v"])
@@ -0,0 +1,173 @@
+"""
+Tests for the local check of referenced names before creates.
+"""
+
+from unittest.mock import Mock, patch
+
+from app.cmdb_cache import CMDB_CACHE, TABLES
+from app.preflight import NameIndex, describe_unknown, unknown_names
+from app.result_buffer import owner_key
+from app.schema import SCHEMA_PARAMS
+from app.tools import FortiOSTools
+
+OWNER = owner_key("https://fgt", "token", "root")
+RECORDS = {
+    "addresses": [
+        {"name": "all"},
+        {"name": "web-1"},
+        {"name": "web-2"},
+        {"name": "db"},
+    ],
+    "address-groups": [{"name": "web"}],
+    "vips": [{"name": "vip-db"}],
+    "vip-groups": [{"name": "vip-grp"}],
+    "external-resources": [{"name": "threat-feed"}],
+    "services": [{"name": "HTTPS"}, {"name": "HTTP"}],
+    "service-groups": [{"name": "Web Access"}],
+}
+
+
+def _cache(revision="r1", tables=RECORDS):
+    for table, records in tables.items():
+        CMDB_CACHE.put((OWNER, TABLES[table]), revision, records, {})
+
+
+def _client(revision="r1"):
+    client = Mock()
+    client.get.return_value = {"http_status": 200, "revision": revision}
+    client.post.return_value = {"http_status": 200}
+    return client
+
+
+class TestNameIndex:
+    """Test cached name lookups"""
+
+    def setup_method(self):
+        CMDB_CACHE.clear()
+
+    def test_suggestions(self):
+        index = NameIndex(["web-1", "web-2", "db", "HTTPS"])
+        assert "db" in index
+        assert index.suggest("web1") == ["web-1", "web-2"]
+        assert index.suggest("zzz") == []
+
+    def test_unknown_names(self):
+        _cache()
+        revisions, unknown = unknown_names(
+            OWNER,
+            {
+                "srcaddr": ("address", ["web", "vip-db", "web3"]),
+                "service": ("service", ["HTTPS", "Web Access"]),
+            },
+        )
+        assert revisions == {"address": "r1", "service": "r1"}
+        assert unknown == {"srcaddr": {"web3": ["web", "web-2", "web-1"]}}
+        assert describe_unknown(unknown) == (
+            "srcaddr 'web3' (did you mean 'web', 'web-2', 'web-1'?)"
+        )
+
+    def test_vip_groups_and_external_resources_are_addresses(self):
+        _cache()
+        checks = {"dstaddr": ("address", ["vip-grp", "threat-feed"])}
+        assert unknown_names(OWNER, checks) == ({"address": "r1"}, {})
+
+    def test_uncached_kinds_are_not_checked(self):
+        _cache(tables={"services": RECORDS["services"]})
+        assert unknown_names(OWNER, {"service": ("service", ["nope"])}) == ({}, {})
+
+
+class TestPreflightTools:
+    """Test the check in the create tools"""
+
+    def setup_method(self):
+        CMDB_CACHE.clear()
+
+    def teardown_method(self):
+        CMDB_CACHE.clear()
+
+    @patch("app.tools.FortiOSTools._check_connectivity")
+    @patch("app.tools.FortiOSTools.create_client")
+    def test_known_names_cost_nothing(self, mock_create_client, mock_connectivity):
+        _cache()
+        mock_connectivity.return_value = {"success": True}
+        mock_create_client.return_value = client = _client()
+
+        result = FortiOSTools.create_address_group(
+            "https://fgt", "token", "root", "all-web", ["web-1", "web-2"]
+        )
+
+        assert result["success"] is True
+        # Only the table schema is read; no name lookups
+        client.get.assert_called_once_with(
+            "cmdb/firewall/addrgrp", params=SCHEMA_PARAMS
+        )
+
+    @patch("app.tools.FortiOSTools._check_connectivity")
+    @patch("app.tools.FortiOSTools.create_client")
+    def test_rejects_unknown_names(self, mock_create_client, mock_connectivity):
+        _cache()
+        mock_create_client.return_value = client = _client()
+
+        result = FortiOSTools.create_firewall_policy(
+            "https://fgt",
+            "token",
+            "root",
+            "web-in",
+            ["port1"],
+            ["port2"],
+            ["all"],
+            ["web-1", "vip-dbb"],
+            ["HTTPS", "Web Acces"],
+            "accept",
+        )
+
+        assert result["success"] is False
+        assert result["message"] == (
+            "Validation error: Unknown objects: dstaddr 'vip-dbb' (did you mean "
+            "'vip-db'?); service 'Web Acces' (did you mean 'Web Access'?)"
+        )
+        # The one-record revision read is the only request made
+        assert client.get.call_count == 1
+        client.post.assert_not_called()
+        mock_connectivity.assert_not_called()
+
+    @patch("app.tools.FortiOSTools._check_connectivity")
+    @patch("app.tools.FortiOSTools._read_table")
+    @patch("app.tools.FortiOSTools.create_client")
+    def test_stale_cache_is_refreshed(
+        self, mock_create_client, mock_read, mock_connectivity
+    ):
+        _cache()
+        mock_connectivity.return_value = {"success": True}
+        mock_create_client.return_value = client = _client("r2")
+        mock_read.side_effect = lambda client, endpoint, **kwargs: {
+            "http_status": 200,
+            "revision": "r2",
+            "results": ([{"name": "web-3"}] if endpoint == TABLES["addresses"] else []),
+        }
+
+        result = FortiOSTools.create_address_group(
+            "https://fgt", "token", "root", "new-web", ["web-3"]
+        )
+
+        assert result["success"] is True
+        client.post.assert_called_once()
+        assert CMDB_CACHE.get((OWNER, TABLES["addresses"])).revision == "r2"
+        assert CMDB_CACHE.get((OWNER, TABLES["services"])).revision == "r1"
+
+    @patch("app.tools.FortiOSTools._check_connectivity")
+    @patch("app.tools.FortiOSTools.create_client")
+    def test_failed_probe_leaves_it_to_the_device(
+        self, mock_create_client, mock_connectivity
+    ):
+        _cache()
+        mock_connectivity.return_value = {"success": True}
+        mock_create_client.return_value = client = _client()
+        client.get.return_value = {"http_status": 500}
+
+        result = FortiOSTools.create_service_group(
+            "https://fgt", "token", "root", "grp", ["NOPE"]
+        )
+
+        assert result["success"] is True
+        client.post.assert_called_once()
@@ -0,0 +1,192 @@
+"""
+Tests for the reverse-reference index and cascade delete plans.
+"""
+
+from unittest.mock import Mock, patch
+
+from app.cmdb_cache import TABLES as ENDPOINTS
+from app.references import REFERENCE_INDEXES, UNCHECKED_REFERRERS, ReferenceIndex
+from app.tools import FortiOSTools
+
+
+def _members(*names):
+    return [{"name": name} for name in names]
+
+
+TABLES = {
+    "addresses": [{"name": "web1"}, {"name": "web2"}, {"name": "db"}, {"name": "app"}],
+    "address-groups": [
+        {"name": "web", "member": _members("web1", "web2")},
+        {"name": "only-db", "member": _members("db")},
+        {"name": "all", "member": _members("web", "only-db")},
+    ],
+    "vips": [
+        {"name": "vip-db", "mapped-addr": "db", "service": _members("HTTPS")},
+        {"name": "vip-app", "mapped-addr": "app"},
+    ],
+    "vip-groups": [{"name": "vips", "member": _members("vip-app")}],
+    "services": [{"name": "HTTPS"}],
+    "service-groups": [],
+    "policies": [
+        {
+            "policyid": 1,
+            "srcaddr": _members("all"),
+            "dstaddr": _members("web1", "vip-db"),
+            "service": _members("HTTPS"),
+        },
+        {"policyid": 2, "srcaddr": _members("db"), "dstaddr": _members("db")},
+    ],
+}
+
+
+def _steps(steps):
+    return [(s["action"], s["table"], s["name"]) for s in steps]
+
+
+class TestReferenceIndex:
+    """Test reverse references and plans"""
+
+    def test_referrers(self):
+        index = ReferenceIndex(TABLES)
+        assert [tuple(r) for r in index.referrers("addresses", "web1")] == [
+            ("address-groups", "web", "member"),
+            ("policies", "1", "dstaddr"),
+        ]
+        assert index.referrers("services", "HTTPS")[0].table == "vips"
+        assert index.referrers("addresses", "web2")[0].name == "web"
+        assert index.exists("vips", "vip-db")
+        assert not index.exists("addresses", "vip-db")
+
+    def test_detach_only_plan(self):
+        steps = ReferenceIndex(TABLES).cascade_plan("addresses", "web1")
+
+        assert _steps(steps) == [
+            ("detach", "address-groups", "web"),
+            ("detach", "policies", "1"),
+            ("delete", "addresses", "web1"),
+        ]
+        assert steps[0]["data"] == {"member": [{"name": "web2"}]}
+        assert steps[1]["endpoint"] == "cmdb/firewall/policy/1"
+        assert steps[1]["data"] == {"dstaddr": [{"name": "vip-db"}]}
+        assert steps[2]["method"] == "DELETE"
+
+    def test_cascades_through_last_members(self):
+        steps = ReferenceIndex(TABLES).cascade_plan("addresses", "db")
+
+        # only-db loses its last member and the VIP its mapped address, so
+        # both go; policy 2 has no other source and goes as well
+        assert _steps(steps) == [
+            ("detach", "address-groups", "all"),
+            ("detach", "policies", "1"),
+            ("delete", "address-groups", "only-db"),
+            ("delete", "vips", "vip-db"),
+            ("delete", "policies", "2"),
+            ("delete", "addresses", "db"),
+        ]
+        assert steps[0]["remove"] == ["only-db"]
+        assert steps[1]["data"] == {"dstaddr": [{"name": "web1"}]}
+
+    def test_vip_group_members(self):
+        index = ReferenceIndex(TABLES)
+        assert [tuple(r) for r in index.referrers("vips", "vip-app")] == [
+            ("vip-groups", "vips", "member")
+        ]
+        # The group loses its only member, so it goes before the VIP
+        assert _steps(index.cascade_plan("addresses", "app")) == [
+            ("delete", "vip-groups", "vips"),
+            ("delete", "vips", "vip-app"),
+            ("delete", "addresses", "app"),
+        ]
+        assert "central SNAT" in index.unchecked("addresses")
+
+
+class TestReferenceTools:
+    """Test the reference tools and the checked deletes"""
+
+    def setup_method(self):
+        REFERENCE_INDEXES.clear()
+
+    def _client(self):
+        client = Mock()
+        client.get.return_value = {"http_status": 200, "revision": "r1", "results": []}
+        client.delete.return_value = {"http_status": 200}
+        return client
+
+    def _read(self, client, owner, endpoint):
+        table = next(t for t, e in ENDPOINTS.items() if e == endpoint)
+        return {"http_status": 200, "revision": "r1", "results": TABLES[table]}
+
+    @patch("app.tools.FortiOSTools._check_connectivity")
+    @patch("app.tools.FortiOSTools.read_cached_table")
+    @patch("app.tools.FortiOSTools.create_client")
+    def test_delete_blocked_by_references(
+        self, mock_create_client, mock_read, mock_connectivity
+    ):
+        mock_connectivity.return_value = {"success": True}
+        mock_create_client.return_value = client = self._client()
+        mock_read.side_effect = self._read
+
+        blocked = FortiOSTools.delete_address("https://fgt", "token", "root", "web2")
+        free = FortiOSTools.delete_address_group("https://fgt", "token", "root", "all")
+
+        assert blocked["success"] is False
+        assert blocked["message"] == "Address object 'web2' is in use by 1 objects"
+        assert blocked["data"] == [
+            {"table": "address-groups", "name": "web", "field": "member"}
+        ]
+        assert free["success"] is False
+        assert free["data"][0] == {"table": "policies", "name": "1", "field": "srcaddr"}
+        client.delete.assert_not_called()
+        # Both checks used the index built at revision r1
+        assert mock_read.call_count == len(TABLES)
+
+    @patch("app.tools.FortiOSTools._check_connectivity")
+    @patch("app.tools.FortiOSTools.read_cached_table")
+    @patch("app.tools.FortiOSTools.create_client")
+    def test_delete_unreferenced(
+        self, mock_create_client, mock_read, mock_connectivity
+    ):
+        mock_connectivity.return_value = {"success": True}
+        mock_create_client.return_value = client = self._client()
+        mock_read.side_effect = self._read
+
+        FortiOSTools.cascade_plan("https://fgt", "token", "root", "addresses", "db")
+        result = FortiOSTools.delete_address("https://fgt", "token", "root", "spare")
+
+        assert result["success"] is True
+        client.delete.assert_called_once_with("cmdb/firewall/address/spare")
+
+    @patch("app.tools.FortiOSTools._check_connectivity")
+    @patch("app.tools.FortiOSTools.read_cached_table")
+    @patch("app.tools.FortiOSTools.create_client")
+    def test_find_references_and_plan(
+        self, mock_create_client, mock_read, mock_connectivity
+    ):
+        mock_connectivity.return_value = {"success": True}
+        mock_create_client.return_value = self._client()
+        mock_read.side_effect = self._read
+
+        refs = FortiOSTools.find_references(
+            "https://fgt", "token", "root", "services", "HTTPS"
+        )
+        plan = FortiOSTools.cascade_plan(
+            "https://fgt", "token", "root", "addresses", "web1"
+        )
+        missing = FortiOSTools.find_references(
+            "https://fgt", "token", "root", "addresses", "nope"
+        )
+
+        assert [r["table"] for r in refs["data"]] == ["vips", "policies"]
+        assert refs["details"]["unchecked"] == UNCHECKED_REFERRERS["service"]
+        assert plan["message"] == (
+            "2 detaches and 1 deletes remove 'web1' from the indexed tables"
+        )
+        assert "central SNAT" in plan["details"]["unchecked"]
+        assert missing["message"] == "'nope' not found in addresses"
+
+    def test_validation(self):
+        for table, name in (("policies", "1"), ("addresses", "../x")):
+            result = FortiOSTools.find_references(
+                "https://fgt", "token", "root", table, name
+            )
+            assert result["message"].startswith("Validation error")
@@ -0,0 +1,269 @@
+"""
+Tests for the device registry, table resources and subscriptions.
+"""
+
+import gc
+import json
+from unittest.mock import AsyncMock, Mock, patch
+
+import pytest
+from mcp import types
+
+from app.cmdb_cache import CMDB_CACHE
+from app.devices import DEVICES, Device, session_scope
+from app.resources import (
+    SUBSCRIPTIONS,
+    SubscriptionRegistry,
+    decode_cursor,
+    encode_cursor,
+    list_table_resources,
+    parse_table_uri,
+    read_table_resource,
+)
+from app.tools import FortiOSTools
+
+ADDRESSES = [{"name": f"host-{i}"} for i in range(5)]
+
+
+@pytest.fixture(autouse=True)
+def clean_state():
+    """Isolate tests from devices, subscriptions and tables left elsewhere"""
+    DEVICES.clear()
+    SUBSCRIPTIONS.clear()
+    CMDB_CACHE.clear()
+    yield
+    DEVICES.clear()
+    SUBSCRIPTIONS.clear()
+    CMDB_CACHE.clear()
+
+
+def _fake_client(revision):
+    """Client whose tables are ADDRESSES at the revision in revision[0]"""
+    client = Mock()
+
+    def iter_results(endpoint, meta):
+        meta.update({"http_status": 200, "revision": revision[0]})
+        yield from ADDRESSES
+
+    client.iter_results.side_effect = iter_results
+    client.get.side_effect = lambda endpoint, params=None: {
+        "http_status": 200,
+        "revision": revision[0],
+        "results": ADDRESSES[:1],
+    }
+    return client
+
+
+# ===============================
+# DEVICE REGISTRY TESTS
+# ===============================
+
+
+class TestDeviceRegistry:
+    """Test registering FortiGates"""
+
+    def test_register_and_list_without_token(self):
+        with patch.object(
+            FortiOSTools,
+            "_check_connectivity",
+            return_value={"success": True, "message": "Connectivity verified"},
+        ):
+            result = FortiOSTools.register_fortigate(
+                "fw1", "https://10.0.0.1", "secret", "root"
+            )
+
+        assert result["success"] is True
+        listed = FortiOSTools.list_fortigates()
+        assert listed["data"] == [
+            {"name": "fw1", "url": "https://10.0.0.1", "vdom": "root"}
+        ]
+        assert "secret" not in json.dumps(listed)
+
+    def test_unreachable_device_not_registered(self):
+        with patch.object(
+            FortiOSTools,
+            "_check_connectivity",
+            return_value={"success": False, "message": "FortiGate not reachable"},
+        ):
+            result = FortiOSTools.register_fortigate("fw1", "https://x", "t")
+
+        assert result["success"] is False
+        assert DEVICES.get("fw1") is None
+
+    @pytest.mark.parametrize("name", ["", "a/b", "-fw", "fw 1", "x" * 64])
+    def test_invalid_names(self, name):
+        result = FortiOSTools.register_fortigate(name, "https://x", "t")
+        assert result["success"] is False
+        assert "Validation error" in result["message"]
+
+    def test_unregister(self):
+        DEVICES.register(Device("fw1", "https://x", "t", "root"))
+        assert FortiOSTools.unregister_fortigate("fw1")["success"] is True
+        assert FortiOSTools.unregister_fortigate("fw1")["success"] is False
+
+    def test_devices_are_scoped_to_their_session(self):
+        DEVICES.register(Device("fw1", "https://x", "t", "root", "session-a"))
+
+        assert FortiOSTools.list_fortigates("session-b")["data"] == []
+        assert FortiOSTools.unregister_fortigate("fw1", "session-b")["success"] is False
+        result = FortiOSTools.diff_cmdb_tables(
+            "addresses", "fw1", "fw1", scope="session-b"
+        )
+        assert result["message"] == "FortiGate 'fw1' is not registered"
+        assert DEVICES.get("fw1", "session-a") is not None
+
+    def test_devices_dropped_with_their_session(self):
+        class Session:
+            pass
+
+        session = Session()
+        scope = session_scope(session)
+        assert session_scope(session) == scope
+        DEVICES.register(Device("fw1", "https://x", "t", "root", scope))
+
+        del session
+        gc.collect()
+        assert DEVICES.all() == []
+
+
+# ===============================
+# TABLE RESOURCE TESTS
+# ===============================
+
+
+class TestTableResources:
+    """Test resource URIs, listing and paged reads"""
+
+    def test_parse_uri(self):
+        assert parse_table_uri("fortios://fw1/addresses") == ("fw1", "addresses", None)
+        assert parse_table_uri("fortios://fw1/vips?cursor=abc") == (
+            "fw1",
+            "vips",
+            "abc",
+        )
+        with pytest.raises(ValueError):
+            parse_table_uri("fortios://fw1/secrets")
+        with pytest.raises(ValueError):
+            parse_table_uri("https://fw1/addresses")
+
+    def test_cursor_round_trip(self):
+        assert decode_cursor(encode_cursor({"r": "x", "o": 3})) == {"r": "x", "o": 3}
+        with pytest.raises(ValueError):
+            decode_cursor("not-a-cursor")
+
+    def test_list_is_paginated(self):
+        for name in ("fw1", "fw2", "fw3"):
+            DEVICES.register(Device(name, "https://x", "t", "root"))
+
+        uris = []
+        cursor = None
+        while True:
+            resources, cursor = list_table_resources(cursor, page_size=5)
+            uris.extend(r["uri"] for r in resources)
+            if cursor is None:
+                break
+
+        assert len(uris) == 24
+        assert uris[0] == "fortios://fw1/addresses"
+        assert len(set(uris)) == 24
+
+    def test_read_pages(self):
+        DEVICES.register(Device("fw1", "https://x", "t", "root"))
+        client = _fake_client(["r1"])
+
+        with patch.object(FortiOSTools, "create_client", return_value=client):
+            first = read_table_resource("fortios://fw1/addresses", page_size=3)
+            second = read_table_resource(first["nextUri"], page_size=3)
+
+        assert first["results"] == ADDRESSES[:3]
+        assert first["total"] == 5
+        assert second["results"] == ADDRESSES[3:]
+        assert "nextCursor" not in second
+        assert client.iter_results.call_count == 1
+
+    def test_cursor_rejected_after_table_changes(self):
+        DEVICES.register(Device("fw1", "https://x", "t", "root"))
+        revision = ["r1"]
+        client = _fake_client(revision)
+
+        with patch.object(FortiOSTools, "create_client", return_value=client):
+            first = read_table_resource("fortios://fw1/addresses", page_size=3)
+            revision[0] = "r2"
+            with pytest.raises(ValueError, match="changed"):
+                read_table_resource(first["nextUri"], page_size=3)
+
+    def test_unregistered_device(self):
+        with pytest.raises(ValueError, match="not registered"):
+            read_table_resource("fortios://nope/addresses")
+
+    def test_other_sessions_devices_are_hidden(self):
+        DEVICES.register(Device("fw1", "https://x", "t", "root", "session-a"))
+
+        assert list_table_resources(scope="session-b") == ([], None)
+        with pytest.raises(ValueError, match="not registered"):
+            read_table_resource("fortios://fw1/addresses", scope="session-b")
+
+
+# ===============================
+# SUBSCRIPTION TESTS
+# ===============================
+
+
+class TestSubscriptions:
+    """Test change notifications"""
+
+    @pytest.mark.asyncio
+    async def test_notify_subscribers(self):
+        DEVICES.register(Device("fw1", "https://x", "t", "root"))
+        registry = SubscriptionRegistry()
+        session = Mock()
+        session.send_resource_updated = AsyncMock()
+        registry.subscribe("fortios://fw1/addresses?cursor=abc", session)
+
+        assert registry.uris() == ["fortios://fw1/addresses"]
+        assert await registry.notify("fortios://fw1/addresses") == 1
+        assert (
+            str(session.send_resource_updated.call_args[0][0])
+            == "fortios://fw1/addresses"
+        )
+
+        registry.unsubscribe("fortios://fw1/addresses", session)
+        assert registry.uris() == []
+
+    @pytest.mark.asyncio
+    async def test_subscriptions_are_scoped(self):
+        DEVICES.register(Device("fw1", "https://x", "t", "root", "session-a"))
+        registry = SubscriptionRegistry()
+        session = Mock()
+        session.send_resource_updated = AsyncMock()
+
+        with pytest.raises(ValueError, match="not registered"):
+            registry.subscribe("fortios://fw1/addresses", session, "session-b")
+        registry.subscribe("fortios://fw1/addresses", session, "session-a")
+
+        assert await registry.notify("fortios://fw1/addresses", "session-b") == 0
+        assert await registry.notify("fortios://fw1/addresses", "session-a") == 1
+
+    def test_server_serves_subscriptions(self):
+        from app.server import mcp
+
+        handlers = mcp._mcp_server.request_handlers
+        assert types.SubscribeRequest in handlers
+        assert types.UnsubscribeRequest in handlers
+
+    @pytest.mark.asyncio
+    async def test_list_resources_handler(self):
+        from app.server import mcp
+
+        DEVICES.register(Device("fw1", "https://x", "t", "root"))
+        handler = mcp._mcp_server.request_handlers[types.ListResourcesRequest]
+        with patch("app.server._caller_scope", return_value=""):
+            result = await handler(types.ListResourcesRequest(method="resources/list"))
+
+        uris = [str(r.uri) for r in result.root.resources]
+        assert "fortios://fw1/policies" in uris
+        assert result.root.nextCursor is None
+
+
+if __name__ == "__main__":
+    pytest.main([__file__, "-v"])
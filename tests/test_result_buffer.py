@@ -0,0 +1,226 @@
+"""
+Tests for result size budgets and continuation tokens.
+"""
+
+import json
+from unittest.mock import Mock, patch
+
+import pytest
+
+from app.encoding import RawJSON, dumps_result, encoded_size
+from app.result_buffer import (
+    DEFAULT_MAX_RESULT_BYTES,
+    DEFAULT_MAX_RESULT_RECORDS,
+    RESULT_BUFFER,
+    ResultBuffer,
+    owner_key,
+    split_records,
+)
+from app.tools import FortiOSTools
+
+RECORDS = [
+    {"name": f"host-{i}", "subnet": f"10.0.{i}.1 255.255.255.255"} for i in range(50)
+]
+
+
+@pytest.fixture(autouse=True)
+def clear_buffer():
+    """Isolate tests from results buffered elsewhere"""
+    RESULT_BUFFER.clear()
+    yield
+    RESULT_BUFFER.clear()
+
+
+# ===============================
+# BUFFER TESTS
+# ===============================
+
+
+class TestResultBuffer:
+    """Test budget splitting and the continuation buffer"""
+
+    def test_encoded_size_matches_response(self):
+        small = len(dumps_result({"data": RECORDS[:1]}))
+        large = len(dumps_result({"data": RECORDS[:11]}))
+        assert large - small == sum(encoded_size(r) for r in RECORDS[1:11])
+
+    def test_split_by_records(self):
+        assert split_records(RECORDS, 10**9, 7) == 7
+
+    def test_split_by_bytes(self):
+        budget = 3 * encoded_size(RECORDS[0])
+        assert split_records(RECORDS, budget, 100) == 3
+
+    def test_split_always_makes_progress(self):
+        assert split_records(RECORDS, 1, 100) == 1
+
+    def test_paginate_and_resume(self):
+        buffer = ResultBuffer()
+        page = buffer.paginate(RECORDS, "me", {"message": "m"}, 10**9, 20)
+        assert page.records == RECORDS[:20]
+        assert page.remaining == 30
+
+        seen = list(page.records)
+        while page.continuation_token:
+            page = buffer.resume(page.continuation_token, "me", 10**9, 20)
+            assert page.context == {"message": "m"}
+            seen.extend(page.records)
+        assert seen == RECORDS
+
+    def test_small_result_is_not_buffered(self):
+        buffer = ResultBuffer()
+        page = buffer.paginate(RECORDS[:3], "me", {}, 10**9, 20)
+        assert page.continuation_token is None
+        assert page.remaining == 0
+
+    def test_tokens_are_single_use_and_owner_bound(self):
+        buffer = ResultBuffer()
+        token = buffer.paginate(RECORDS, "me", {}, 10**9, 20).continuation_token
+        assert buffer.resume(token, "someone-else", 10**9, 20) is None
+        assert buffer.resume(token, "me", 10**9, 20) is not None
+        assert buffer.resume(token, "me", 10**9, 20) is None
+
+    def test_tokens_expire(self):
+        buffer = ResultBuffer(ttl=0)
+        token = buffer.paginate(RECORDS, "me", {}, 10**9, 20).continuation_token
+        assert buffer.resume(token, "me", 10**9, 20) is None
+
+    def test_oldest_results_evicted(self):
+        buffer = ResultBuffer(max_entries=2)
+        tokens = [
+            buffer.paginate(RECORDS, "me", {}, 10**9, 20).continuation_token
+            for _ in range(3)
+        ]
+        assert buffer.resume(tokens[0], "me", 10**9, 20) is None
+        assert buffer.resume(tokens[2], "me", 10**9, 20) is not None
+
+
+# ===============================
+# GETTER PAGING TESTS
+# ===============================
+
+
+class TestGetterPaging:
+    """Test budgets and continuation on the getters"""
+
+    def _get_addresses(self, records, **kwargs):
+        mock_client = Mock()
+
+        def iter_results(endpoint, meta):
+            meta.update({"http_status": 200, "status": "success", "revision": "r1"})
+            yield from records
+
+        mock_client.iter_results.side_effect = iter_results
+        with (
+            patch.object(
+                FortiOSTools,
+                "_check_connectivity",
+                return_value={"success": True, "message": "Connectivity verified"},
+            ),
+            patch.object(FortiOSTools, "create_client", return_value=mock_client),
+        ):
+            return FortiOSTools.get_addresses(
+                "https://test.com", "token", "root", **kwargs
+            )
+
+    def test_result_within_budget(self):
+        result = self._get_addresses(RECORDS)
+        assert result["data"] == RECORDS
+        assert "continuation_token" not in result
+        assert result["details"] == {
+            "http_status": 200,
+            "status": "success",
+            "revision": "r1",
+        }
+
+    def test_default_record_budget(self):
+        records = [{"name": str(i)} for i in range(DEFAULT_MAX_RESULT_RECORDS + 5)]
+        result = self._get_addresses(records)
+        assert len(result["data"]) == DEFAULT_MAX_RESULT_RECORDS
+        assert result["remaining_records"] == 5
+
+    def test_byte_budget_and_continuation(self):
+        budget = 10 * encoded_size(RECORDS[0])
+        result = self._get_addresses(RECORDS, max_bytes=budget)
+        assert result["truncated"] is True
+        assert len(result["data"]) == 10
+        assert len(json.dumps(result["data"], indent=2)) <= budget
+
+        seen = list(result["data"])
+        with patch.object(FortiOSTools, "_check_connectivity") as mock_check:
+            while result.get("continuation_token"):
+                result = FortiOSTools.get_addresses(
+                    "https://test.com",
+                    "token",
+                    "root",
+                    max_bytes=budget,
+                    continuation_token=result["continuation_token"],
+                )
+                assert result["success"] is True
+                assert result["details"]["revision"] == "r1"
+                seen.extend(result["data"])
+        mock_check.assert_not_called()
+        assert seen == RECORDS
+
+    def test_continuation_bound_to_credentials(self):
+        result = self._get_addresses(RECORDS, max_records=5)
+        other = FortiOSTools.get_addresses(
+            "https://test.com",
+            "other-token",
+            "root",
+            continuation_token=result["continuation_token"],
+        )
+        assert other["success"] is False
+        assert "expired" in other["message"]
+
+    def test_owner_key_does_not_contain_token(self):
+        assert "secret" not in owner_key("https://test.com", "secret", "root")
+
+    def test_large_raw_body_is_paged(self):
+        body = json.dumps({"results": RECORDS, "revision": "r1"}).encode()
+        mock_client = Mock()
+        mock_client.get_raw.return_value = {"http_status": 200, "body": body}
+        with (
+            patch.object(
+                FortiOSTools,
+                "_check_connectivity",
+                return_value={"success": True, "message": "Connectivity verified"},
+            ),
+            patch.object(FortiOSTools, "create_client", return_value=mock_client),
+        ):
+            result = FortiOSTools.get_addresses(
+                "https://test.com",
+                "token",
+                "root",
+                output_format="raw",
+                max_bytes=len(body) // 2,
+            )
+
+        assert result["truncated"] is True
+        assert result["data"] == RECORDS[: len(result["data"])]
+        assert result["details"]["revision"] == "r1"
+
+    def test_raw_body_over_json_budget_passes_through(self):
+        records = [{"name": f"addr-{i}", "comment": "x" * 300} for i in range(1000)]
+        body = json.dumps({"results": records}).encode()
+        assert len(body) > DEFAULT_MAX_RESULT_BYTES
+        mock_client = Mock()
+        mock_client.get_raw.return_value = {"http_status": 200, "body": body}
+        with (
+            patch.object(
+                FortiOSTools,
+                "_check_connectivity",
+                return_value={"success": True, "message": "Connectivity verified"},
+            ),
+            patch.object(FortiOSTools, "create_client", return_value=mock_client),
+        ):
+            result = FortiOSTools.get_addresses(
+                "https://test.com", "token", "root", output_format="raw"
+            )
+
+        assert isinstance(result["details"], RawJSON)
+        assert "truncated" not in result
+
+
+if __name__ == "__main__":
+    pytest.main([__file__, "-v"])
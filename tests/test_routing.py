@@ -0,0 +1,175 @@
+"""
+Tests for routing table lookups.
+"""
+
+import ipaddress
+import random
+from unittest.mock import Mock, patch
+
+from app.routing import ROUTE_TABLES, PrefixTrie, RouteTable
+from app.tools import FortiOSTools
+
+
+def _route(ip_mask: str, interface: str, **fields):
+    return {
+        "ip_version": 6 if ":" in ip_mask else 4,
+        "type": "static",
+        "ip_mask": ip_mask,
+        "distance": 10,
+        "priority": 1,
+        "metric": 0,
+        "gateway": "10.0.0.254",
+        "interface": interface,
+        "vrf": 0,
+        **fields,
+    }
+
+
+ROUTES_V4 = [
+    _route("0.0.0.0/0", "wan1"),
+    _route("10.0.0.0/8", "lan"),
+    _route("10.1.0.0/16", "dmz", type="ospf", distance=110),
+    _route("10.1.2.0/24", "vpn1", type="bgp", distance=20),
+    _route("10.1.2.0/24", "vpn2", type="bgp", distance=20),
+    _route("10.1.2.0/24", "wan2", type="static", distance=200),
+    _route("192.0.2.0/24", "vrf-lan", vrf=5),
+]
+ROUTES_V6 = [_route("2001:db8::/32", "lan"), _route("::/0", "wan1")]
+
+
+class TestPrefixTrie:
+    """Test longest-prefix match"""
+
+    def test_matches_linear_scan(self):
+        rng = random.Random(3)
+        prefixes = {
+            ipaddress.ip_network(
+                (rng.getrandbits(32), rng.randint(0, 32)), strict=False
+            )
+            for _ in range(300)
+        }
+        trie = PrefixTrie(32)
+        for network in prefixes:
+            trie.setdefault(int(network.network_address), network.prefixlen, network)
+
+        for _ in range(500):
+            address = ipaddress.ip_address(rng.getrandbits(32))
+            matches = [n for n in prefixes if address in n]
+            expected = max(matches, key=lambda n: n.prefixlen, default=None)
+            prefixlen, value = trie.lookup(int(address))
+            assert value == expected
+            assert prefixlen == (expected.prefixlen if expected else -1)
+
+
+class TestRouteTable:
+    """Test route selection per IP"""
+
+    def test_longest_prefix_and_ecmp(self):
+        table = RouteTable.from_records(4, ROUTES_V4 + ROUTES_V6)
+
+        assert table.routes == len(ROUTES_V4)
+        result = table.lookup("10.1.2.3")
+        assert result["prefix"] == "10.1.2.0/24"
+        assert [r["interface"] for r in result["routes"]] == ["vpn1", "vpn2"]
+        assert table.lookup("10.1.9.9")["routes"][0]["interface"] == "dmz"
+        assert table.lookup("10.200.0.1")["prefix"] == "10.0.0.0/8"
+        assert table.lookup("8.8.8.8")["prefix"] == "0.0.0.0/0"
+
+    def test_vrf(self):
+        table = RouteTable.from_records(4, ROUTES_V4)
+        assert table.lookup("192.0.2.1")["prefix"] == "0.0.0.0/0"
+        assert table.lookup("192.0.2.1", vrf=5)["routes"][0]["interface"] == "vrf-lan"
+        assert table.lookup("8.8.8.8", vrf=7) == {
+            "ip": "8.8.8.8",
+            "prefix": None,
+            "routes": [],
+        }
+
+
+class TestLookupRoutes:
+    """Test the route lookup tool"""
+
+    def setup_method(self):
+        ROUTE_TABLES.clear()
+
+    def _client(self, statistics=None, revision="r1"):
+        client = Mock()
+        state = {"statistics": statistics or {"total_lines": 9}, "revision": revision}
+        reads = []
+
+        def get(endpoint, params=None):
+            if endpoint == "monitor/router/statistics":
+                return {"http_status": 200, "results": state["statistics"]}
+            return {"http_status": 200, "revision": state["revision"], "results": []}
+
+        def iter_results(endpoint, meta, params=None):
+            reads.append(endpoint)
+            meta["http_status"] = 200
+            return iter(ROUTES_V6 if endpoint.endswith("ipv6") else ROUTES_V4)
+
+        client.get.side_effect = get
+        client.iter_results.side_effect = iter_results
+        client.state = state
+        client.reads = reads
+        return client
+
+    @patch("app.tools.FortiOSTools._check_connectivity")
+    @patch("app.tools.FortiOSTools.create_client")
+    def test_batch_lookup_reuses_cached_tables(
+        self, mock_create_client, mock_connectivity
+    ):
+        mock_connectivity.return_value = {"success": True}
+        mock_create_client.return_value = client = self._client()
+
+        first = FortiOSTools.lookup_routes(
+            "https://fgt", "token", ips=["10.1.2.3", "2001:db8::1", "9.9.9.9"]
+        )
+        second = FortiOSTools.lookup_routes("https://fgt", "token", ips=["10.0.0.1"])
+
+        assert first["success"] is True
+        assert [entry["prefix"] for entry in first["data"]] == [
+            "10.1.2.0/24",
+            "2001:db8::/32",
+            "0.0.0.0/0",
+        ]
+        assert first["details"]["tables"]["ipv4"] == {"routes": 7, "cached": False}
+        assert second["details"]["tables"] == {"ipv4": {"routes": 7, "cached": True}}
+        assert sorted(client.reads) == ["monitor/router/ipv4", "monitor/router/ipv6"]
+
+    @patch("app.tools.FortiOSTools._check_connectivity")
+    @patch("app.tools.FortiOSTools.create_client")
+    def test_routing_change_invalidates(self, mock_create_client, mock_connectivity):
+        mock_connectivity.return_value = {"success": True}
+        mock_create_client.return_value = client = self._client()
+
+        FortiOSTools.lookup_routes("https://fgt", "token", ips=["10.0.0.1"])
+        client.state["statistics"] = {"total_lines": 10}
+        FortiOSTools.lookup_routes("https://fgt", "token", ips=["10.0.0.1"])
+        client.state["revision"] = "r2"
+        FortiOSTools.lookup_routes("https://fgt", "token", ips=["10.0.0.1"])
+        FortiOSTools.lookup_routes("https://fgt", "token", ips=["10.0.0.1"])
+
+        assert client.reads == ["monitor/router/ipv4"] * 3
+
+    @patch("app.tools.FortiOSTools._check_connectivity")
+    @patch("app.tools.FortiOSTools.create_client")
+    def test_upstream_error(self, mock_create_client, mock_connectivity):
+        mock_connectivity.return_value = {"success": True}
+        client = self._client()
+
+        def iter_results(endpoint, meta, params=None):
+            meta.update({"http_status": 403, "status": "error"})
+            return iter(())
+
+        client.iter_results.side_effect = iter_results
+        mock_create_client.return_value = client
+
+        result = FortiOSTools.lookup_routes("https://fgt", "token", ips=["10.0.0.1"])
+
+        assert result["success"] is False
+        assert result["message"] == "Failed to read monitor/router/ipv4"
+
+    def test_validation(self):
+        for kwargs in ({}, {"ips": ["10.0.0.300"]}, {"ips": ["10.0.0.1"], "vrf": -1}):
+            result = FortiOSTools.lookup_routes("https://fgt", "token", **kwargs)
+            assert result["message"].startswith("Validation error")
@@ -0,0 +1,203 @@
+"""
+Tests for CMDB schema validation of writes.
+"""
+
+from unittest.mock import Mock, patch
+
+from app.schema import SCHEMA_PARAMS, SCHEMAS, TableSchema, firmware_of
+from app.tools import FortiOSTools
+
+NAME_ENTRY = {"name": {"category": "unitary", "type": "string", "size": 79}}
+
+
+def _options(*names):
+    return {
+        "category": "unitary",
+        "type": "option",
+        "options": [{"name": name} for name in names],
+    }
+
+
+POLICY_SCHEMA = {
+    "name": "policy",
+    "category": "table",
+    "children": {
+        "name": {"category": "unitary", "type": "string", "size": 35},
+        "action": {
+            "category": "unitary",
+            "type": "option",
+            "options": [{"name": "accept"}, {"name": "deny"}, {"name": "ipsec"}],
+        },
+        "schedule": {"category": "unitary", "type": "string", "size": 35},
+        **{
+            table: {"category": "table", "children": NAME_ENTRY}
+            for table in ("srcintf", "dstintf", "srcaddr", "dstaddr", "service")
+        },
+        "status": _options("enable", "disable"),
+        "nat": _options("enable", "disable"),
+        "logtraffic": _options("all", "utm", "disable"),
+        "inspection-mode": {
+            "category": "unitary",
+            "type": "option",
+            "options": [{"name": "proxy"}, {"name": "flow"}],
+        },
+        "tcp-session-without-syn": {
+            "category": "unitary",
+            "type": "option",
+            "multiple_values": True,
+            "options": [{"name": "all"}, {"name": "data-only"}],
+        },
+        "color": {
+            "category": "unitary",
+            "type": "integer",
+            "min-value": 0,
+            "max-value": 32,
+        },
+        "gateway": {"category": "unitary", "type": "ipv4-address"},
+        "uuid": {"category": "unitary", "type": "uuid"},
+    },
+}
+
+
+def _response(results, version="v7.2.8", build=1639):
+    return {
+        "http_status": 200,
+        "version": version,
+        "build": build,
+        "results": results,
+    }
+
+
+class TestTableSchema:
+    """Test compiled validators"""
+
+    def test_valid_body(self):
+        schema = TableSchema.from_results(POLICY_SCHEMA)
+        assert (
+            schema.errors(
+                {
+                    "name": "web-in",
+                    "action": "accept",
+                    "schedule": {"q_origin_key": "always"},
+                    "srcaddr": [{"name": "all", "q_origin_key": "all"}],
+                    "tcp-session-without-syn": "all data-only",
+                    "color": "3",
+                    "gateway": "10.0.0.1",
+                    "uuid": "anything",
+                }
+            )
+            == []
+        )
+
+    def test_errors(self):
+        schema = TableSchema.from_results(POLICY_SCHEMA)
+        assert schema.errors(
+            {
+                "name": "x" * 36,
+                "action": "allow",
+                "srcaddr": [{"name": "y" * 80}, "all"],
+                "color": 33,
+                "gateway": "10.0.0.256",
+                "inspection_mode": "flow",
+            }
+        ) == [
+            "name: longer than 35 characters",
+            "action: 'allow' is not one of accept, deny, ipsec",
+            "srcaddr[0].name: longer than 79 characters",
+            "srcaddr[1]: expected an object",
+            "color: 33 is above 32",
+            "gateway: '10.0.0.256' is not an IPv4 address",
+            "inspection_mode: unknown field",
+        ]
+
+    def test_firmware_of(self):
+        assert firmware_of(_response({})) == "v7.2.8 build 1639"
+        assert firmware_of({"http_status": 200}) is None
+
+
+class TestSchemaTools:
+    """Test schema checks in the write tools"""
+
+    def setup_method(self):
+        SCHEMAS.clear()
+
+    def teardown_method(self):
+        SCHEMAS.clear()
+
+    def _client(self):
+        client = Mock()
+        client.get.side_effect = lambda endpoint, params=None: (
+            _response(POLICY_SCHEMA) if params == SCHEMA_PARAMS else _response({})
+        )
+        client.post.return_value = {"http_status": 200}
+        return client
+
+    def _create(self, action="accept"):
+        return FortiOSTools.create_firewall_policy(
+            "https://fgt",
+            "token",
+            "root",
+            "web-in",
+            [],
+            [],
+            ["all"],
+            [],
+            [],
+            action,
+        )
+
+    @patch("app.tools.FortiOSTools.create_client")
+    def test_schema_read_once_per_firmware(self, mock_create_client):
+        mock_create_client.return_value = client = self._client()
+
+        first = self._create()
+        second = self._create()
+
+        schema_reads = [c for c in client.get.call_args_list if c.kwargs.get("params")]
+        assert first["success"] is True and second["success"] is True
+        assert len(schema_reads) == 1
+        assert client.post.call_count == 2
+
+    @patch("app.tools.FortiOSTools.create_client")
+    def test_invalid_write_not_sent(self, mock_create_client):
+        mock_create_client.return_value = client = self._client()
+
+        # Skip the hand-written action check so only the schema judges it
+        with patch("app.tools._validate_action", side_effect=lambda a: a):
+            result = self._create("allow")
+
+        assert result["success"] is False
+        assert result["message"] == (
+            "Validation error: action: 'allow' is not one of accept, deny, ipsec"
+        )
+        client.post.assert_not_called()
+
+    @patch("app.tools.FortiOSTools.create_client")
+    def test_firmware_upgrade_reads_new_schema(self, mock_create_client):
+        mock_create_client.return_value = client = self._client()
+        self._create()
+
+        upgraded = _response({}, version="v7.4.4", build=2662)
+        client.get.side_effect = lambda endpoint, params=None: (
+            {**upgraded, "results": POLICY_SCHEMA} if params else upgraded
+        )
+        self._create()
+
+        schema_reads = [c for c in client.get.call_args_list if c.kwargs.get("params")]
+        assert len(schema_reads) == 2
+
+    @patch("app.tools.FortiOSTools._check_connectivity")
+    @patch("app.tools.FortiOSTools.create_client")
+    def test_unavailable_schema_is_skipped(self, mock_create_client, mock_connectivity):
+        mock_connectivity.return_value = {"success": True}
+        client = Mock()
+        client.get.return_value = {"http_status": 403}
+        client.post.return_value = {"http_status": 200}
+        mock_create_client.return_value = client
+
+        result = FortiOSTools.create_address(
+            "https://fgt", "token", "root", "net", subnet="10.0.0.0/24"
+        )
+
+        assert result["success"] is True
+        client.post.assert_called_once()
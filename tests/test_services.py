@@ -0,0 +1,252 @@
+"""
+Tests for service objects and the port/protocol index.
+"""
+
+import random
+from unittest.mock import Mock, patch
+
+import pytest
+
+from app.service_index import (
+    SERVICE_INDEXES,
+    IntervalIndex,
+    ServiceIndex,
+    parse_portrange,
+)
+from app.tools import (
+    FortiOSTools,
+    ValidationError,
+    _validate_portrange,
+    _validate_service_query,
+)
+
+SERVICES = [
+    {"name": "HTTPS", "protocol": "TCP/UDP/SCTP", "tcp-portrange": "443"},
+    {
+        "name": "WEB-ALT",
+        "protocol": "TCP/UDP/SCTP",
+        "tcp-portrange": "8000-8999 8443:1024-65535",
+        "udp-portrange": "8443",
+    },
+    {"name": "HIGH", "protocol": "TCP/UDP/SCTP", "tcp-portrange": "1024-65535"},
+    {
+        "name": "DNS",
+        "protocol": "TCP/UDP/SCTP",
+        "udp-portrange": "53",
+        "tcp-portrange": "53",
+    },
+    {"name": "ALL", "protocol": "IP", "protocol-number": 0},
+    {"name": "GRE", "protocol": "IP", "protocol-number": 47},
+    {"name": "PING", "protocol": "ICMP"},
+]
+GROUPS = [
+    {"name": "web", "member": [{"name": "HTTPS"}, {"name": "WEB-ALT"}]},
+    {"name": "apps", "member": [{"name": "web"}, {"name": "DNS"}]},
+    {"name": "tunnels", "member": [{"name": "GRE"}]},
+]
+
+
+class TestIntervalIndex:
+    """Test stabbing queries against a linear scan"""
+
+    def test_matches_linear_scan(self):
+        rng = random.Random(5)
+        intervals = []
+        for i in range(200):
+            low = rng.randint(0, 65535)
+            intervals.append((low, min(65535, low + rng.randint(0, 2000)), f"s{i}"))
+        index = IntervalIndex(intervals)
+
+        for port in [0, 65535] + [rng.randint(0, 65535) for _ in range(500)]:
+            expected = sorted(
+                {name for low, high, name in intervals if low <= port <= high}
+            )
+            assert list(index.covering(port)) == expected
+
+
+class TestServiceIndex:
+    """Test protocol/port lookups"""
+
+    def test_parse_portrange(self):
+        assert parse_portrange("80 8000-8080:1024-65535 x 9-1") == [
+            (80, 80),
+            (8000, 8080),
+        ]
+        assert parse_portrange(None) == []
+
+    def test_tcp_port_with_groups(self):
+        result = ServiceIndex(SERVICES, GROUPS).lookup("tcp", 8443)
+        assert result == {
+            "services": ["ALL", "HIGH", "WEB-ALT"],
+            "groups": ["apps", "web"],
+        }
+
+    def test_udp_and_ip_protocols(self):
+        index = ServiceIndex(SERVICES, GROUPS)
+        assert index.lookup("udp", 53)["services"] == ["ALL", "DNS"]
+        assert index.lookup("47") == {"services": ["ALL", "GRE"], "groups": ["tunnels"]}
+        assert index.lookup("1")["services"] == ["ALL", "PING"]
+        assert index.lookup("0")["services"] == ["ALL"]
+
+
+class TestServiceValidation:
+    """Test service input validation"""
+
+    def test_portrange(self):
+        assert _validate_portrange(" 443  8000-8080:1024-65535 ", "tcp") == (
+            "443 8000-8080:1024-65535"
+        )
+        for value in ("70000", "90-80", "http", "1:x"):
+            with pytest.raises(ValidationError):
+                _validate_portrange(value, "tcp-portrange")
+
+    def test_service_query(self):
+        assert _validate_service_query("TCP/8443") == ("tcp", 8443)
+        assert _validate_service_query("icmp6") == ("58", None)
+        assert _validate_service_query("ip/047") == ("47", None)
+        for query in ("tcp", "tcp/70000", "http/80", "ip/300", "icmp/8"):
+            with pytest.raises(ValidationError):
+                _validate_service_query(query)
+
+
+class TestServiceTools:
+    """Test the service tools"""
+
+    def setup_method(self):
+        SERVICE_INDEXES.clear()
+
+    @patch("app.tools.FortiOSTools._check_connectivity")
+    @patch("app.tools.FortiOSTools.create_client")
+    def test_create_service(self, mock_create_client, mock_connectivity):
+        mock_connectivity.return_value = {"success": True}
+        client = Mock()
+        client.post.return_value = {"http_status": 200}
+        mock_create_client.return_value = client
+
+        result = FortiOSTools.create_service(
+            "https://fgt", "token", "root", "Web Alt", tcp_portrange="8443 8000-8999"
+        )
+
+        assert result["success"] is True
+        client.post.assert_called_once_with(
+            "cmdb/firewall.service/custom",
+            {
+                "name": "Web Alt",
+                "protocol": "TCP/UDP/SCTP",
+                "color": 0,
+                "tcp-portrange": "8443 8000-8999",
+            },
+        )
+
+    @patch("app.tools.FortiOSTools._check_connectivity")
+    def test_create_service_validation(self, mock_connectivity):
+        mock_connectivity.return_value = {"success": True}
+        for kwargs in (
+            {},
+            {"tcp_portrange": "99999"},
+            {"protocol": "GRE"},
+            {"protocol": "IP", "protocol_number": 256},
+        ):
+            result = FortiOSTools.create_service(
+                "https://fgt", "token", "root", "svc", **kwargs
+            )
+            assert result["success"] is False
+
+    @patch("app.tools.FortiOSTools._check_connectivity")
+    @patch("app.tools.FortiOSTools.create_client")
+    def test_create_service_group(self, mock_create_client, mock_connectivity):
+        mock_connectivity.return_value = {"success": True}
+        client = Mock()
+        client.post.return_value = {"http_status": 200}
+        mock_create_client.return_value = client
+
+        result = FortiOSTools.create_service_group(
+            "https://fgt", "token", "root", "web", ["HTTPS", "WEB-ALT"]
+        )
+
+        assert result["success"] is True
+        assert client.post.call_args[0] == (
+            "cmdb/firewall.service/group",
+            {
+                "name": "web",
+                "member": [{"name": "HTTPS"}, {"name": "WEB-ALT"}],
+                "color": 0,
+            },
+        )
+
+    @patch("app.tools.FortiOSTools._check_connectivity")
+    @patch("app.tools.FortiOSTools.read_cached_table")
+    @patch("app.tools.FortiOSTools.create_client")
+    def test_find_services_reuses_index(
+        self, mock_create_client, mock_read, mock_connectivity
+    ):
+        mock_connectivity.return_value = {"success": True}
+        mock_create_client.return_value = Mock()
+        tables = {
+            "cmdb/firewall.service/custom": {
+                "http_status": 200,
+                "revision": "r1",
+                "results": SERVICES,
+            },
+            "cmdb/firewall.service/group": {
+                "http_status": 200,
+                "revision": "r1",
+                "results": GROUPS,
+            },
+            "cmdb/firewall/policy": {
+                "http_status": 200,
+                "revision": "r1",
+                "results": [
+                    {"policyid": 1, "name": "web", "service": [{"name": "web"}]},
+                    {"policyid": 2, "name": "dns", "service": [{"name": "DNS"}]},
+                ],
+            },
+        }
+        mock_read.side_effect = lambda client, owner, endpoint: tables[endpoint]
+
+        with patch("app.tools.ServiceIndex", wraps=ServiceIndex) as mock_index:
+            first = FortiOSTools.find_services(
+                "https://fgt", "token", queries=["tcp/443", "udp/8443"]
+            )
+            second = FortiOSTools.find_services(
+                "https://fgt", "token", queries=["ip/47"]
+            )
+
+        assert first["success"] is True
+        assert first["data"] == [
+            {
+                "query": "tcp/443",
+                "services": ["ALL", "HTTPS"],
+                "groups": ["apps", "web"],
+                "policies": [{"policyid": 1, "name": "web"}],
+            },
+            {
+                "query": "udp/8443",
+                "services": ["ALL", "WEB-ALT"],
+                "groups": ["apps", "web"],
+                "policies": [{"policyid": 1, "name": "web"}],
+            },
+        ]
+        assert second["data"][0]["policies"] == []
+        assert second["data"][0]["groups"] == ["tunnels"]
+        assert mock_index.call_count == 1
+
+    @patch("app.tools.FortiOSTools._check_connectivity")
+    @patch("app.tools.FortiOSTools.read_cached_table")
+    @patch("app.tools.FortiOSTools.create_client")
+    def test_find_services_read_error(
+        self, mock_create_client, mock_read, mock_connectivity
+    ):
+        mock_connectivity.return_value = {"success": True}
+        mock_create_client.return_value = Mock()
+        mock_read.return_value = {"http_status": 403, "status": "error"}
+
+        result = FortiOSTools.find_services("https://fgt", "token", queries=["tcp/22"])
+
+        assert result["success"] is False
+        assert result["details"]["http_status"] == 403
+
+    def test_find_services_validation(self):
+        for queries in (None, ["tcp/99999"], ["tcp/1"] * 101):
+            result = FortiOSTools.find_services("https://fgt", "token", queries=queries)
+            assert result["message"].startswith("Validation error")
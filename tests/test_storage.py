@@ -0,0 +1,132 @@
+"""
+Tests for the on-disk CMDB snapshot store.
+"""
+
+import time
+from unittest.mock import Mock, patch
+
+import pytest
+
+from app.cmdb_cache import TableCache
+from app.devices import DEVICES, Device
+from app.poller import RevisionPoller
+from app.resources import TABLES, SubscriptionRegistry
+from app.storage import SNAPSHOTS, SnapshotStore, data_dir
+from app.tools import FortiOSTools
+
+KEY = ("owner-hash", "cmdb/firewall/address")
+RECORDS = [{"name": "a", "subnet": "10.0.0.1 255.255.255.255"}]
+
+
+class TestSnapshotStore:
+    """Test persisting tables and surviving restarts"""
+
+    def test_round_trip(self, tmp_path):
+        now = time.time()
+        store = SnapshotStore(tmp_path / "s.db")
+        store.save(KEY, "r1", RECORDS, {"vdom": "root"}, now)
+        store.close()
+
+        assert SnapshotStore(tmp_path / "s.db").load(KEY) == (
+            "r1",
+            RECORDS,
+            {"vdom": "root"},
+            now,
+        )
+
+    def test_old_snapshots_pruned_on_open(self, tmp_path):
+        store = SnapshotStore(tmp_path / "s.db")
+        store.save(KEY, "r1", RECORDS, {}, 123.0)
+        store.close()
+        assert store.load(KEY) is None
+
+    def test_missing_and_deleted(self, tmp_path):
+        store = SnapshotStore(tmp_path / "s.db")
+        assert store.load(KEY) is None
+        store.save(KEY, "r1", RECORDS, {}, 1.0)
+        store.delete(KEY)
+        assert store.load(KEY) is None
+
+    def test_unwritable_location_disables_store(self, tmp_path):
+        blocker = tmp_path / "file"
+        blocker.write_text("not a directory")
+        store = SnapshotStore(blocker / "s.db")
+
+        store.save(KEY, "r1", RECORDS, {}, 1.0)
+        assert store.load(KEY) is None
+
+    def test_data_dir_from_environment(self, isolated_data_dir):
+        assert data_dir() == isolated_data_dir
+        assert SNAPSHOTS.path.parent == isolated_data_dir
+
+    def test_cache_survives_restart(self, tmp_path):
+        store = SnapshotStore(tmp_path / "s.db")
+        TableCache(store=store).put(KEY, "r1", RECORDS, {"revision": "r1"})
+
+        restarted = TableCache(store=SnapshotStore(tmp_path / "s.db"))
+        table = restarted.get(KEY)
+        assert table.revision == "r1"
+        assert table.records == RECORDS
+
+    def test_revalidate_is_persisted(self, tmp_path):
+        store = SnapshotStore(tmp_path / "s.db")
+        cache = TableCache(store=store)
+        cache.put(KEY, "r1", RECORDS, {})
+        cache.revalidate(KEY, "r2")
+
+        assert SnapshotStore(tmp_path / "s.db").load(KEY)[0] == "r2"
+
+    @pytest.mark.asyncio
+    async def test_restart_does_not_reload_current_tables(self, tmp_path):
+        """After a restart the poller only probes; snapshots at the current revision are used"""
+        device = Device("fw1", "https://x", "t", "root")
+        DEVICES.clear()
+        DEVICES.register(device)
+        table_reads = []
+
+        def client(*args, **kwargs):
+            mock = Mock()
+            mock.get.return_value = {
+                "http_status": 200,
+                "revision": "r1",
+                "results": [],
+            }
+
+            def iter_results(endpoint, meta):
+                table_reads.append(endpoint)
+                meta.update({"http_status": 200, "revision": "r1"})
+                yield from RECORDS
+
+            mock.iter_results.side_effect = iter_results
+            return mock
+
+        store = SnapshotStore(tmp_path / "s.db")
+        with (
+            patch("app.poller.CMDB_CACHE", TableCache(store=store)),
+            patch("app.resources.CMDB_CACHE", TableCache(store=store)),
+            patch("app.tools.CMDB_CACHE", TableCache(store=store)),
+            patch.object(FortiOSTools, "create_client", side_effect=client),
+        ):
+            await RevisionPoller(
+                jitter=0, subscriptions=SubscriptionRegistry()
+            ).poll_once()
+        assert len(table_reads) == len(TABLES)
+
+        # Simulated restart: fresh memory caches and poller over the same database
+        table_reads.clear()
+        store = SnapshotStore(tmp_path / "s.db")
+        with (
+            patch("app.poller.CMDB_CACHE", TableCache(store=store)),
+            patch("app.resources.CMDB_CACHE", TableCache(store=store)),
+            patch("app.tools.CMDB_CACHE", TableCache(store=store)),
+            patch.object(FortiOSTools, "create_client", side_effect=client),
+        ):
+            await RevisionPoller(
+                jitter=0, subscriptions=SubscriptionRegistry()
+            ).poll_once()
+        assert table_reads == []
+        DEVICES.clear()
+
+
+if __name__ == "__main__":
+    pytest.main([__file__, "-v"])
@@ -0,0 +1,240 @@
+"""
+Tests for incremental response parsing, projection and filtering.
+"""
+
+import json
+from unittest.mock import MagicMock, Mock, patch
+
+import pytest
+
+from app.fortios_client import FortiOSClient
+from app.streaming import (
+    StreamParseError,
+    compile_filters,
+    iter_json_array,
+    project,
+)
+from app.tools import FortiOSTools
+
+
+def _chunks(data: bytes, size: int):
+    return [data[i : i + size] for i in range(0, len(data), size)]
+
+
+SAMPLE = {
+    "http_method": "GET",
+    "results": [
+        {"name": "web-1", "type": "ipmask", "subnet": "10.0.0.1 255.255.255.255"},
+        {"name": "dns", "type": "fqdn", "fqdn": "dns.example.com", "color": 12345},
+        {"name": "café", "type": "iprange", "start-ip": "10.0.0.1"},
+    ],
+    "vdom": "root",
+    "revision": "f3a9",
+    "status": "success",
+    "http_status": 200,
+}
+
+
+# ===============================
+# INCREMENTAL PARSER TESTS
+# ===============================
+
+
+class TestIterJsonArray:
+    """Test the incremental JSON array parser"""
+
+    @pytest.mark.parametrize("chunk_size", [1, 2, 5, 64, 100000])
+    def test_any_chunking_gives_same_records(self, chunk_size):
+        body = json.dumps(SAMPLE).encode()
+        meta = {}
+        records = list(iter_json_array(_chunks(body, chunk_size), meta=meta))
+        assert records == SAMPLE["results"]
+        assert meta["revision"] == "f3a9"
+        assert meta["http_status"] == 200
+        assert "results" not in meta
+
+    def test_number_split_across_chunks(self):
+        body = b'{"results": [123456], "size": 98765}'
+        meta = {}
+        assert list(iter_json_array(_chunks(body, 17), meta=meta)) == [123456]
+        assert meta["size"] == 98765
+
+    def test_empty_results(self):
+        assert list(iter_json_array([b'{"results": [], "status": "success"}'])) == []
+
+    def test_non_array_results_yielded_once(self):
+        body = b'{"results": {"hostname": "FGT"}}'
+        assert list(iter_json_array([body])) == [{"hostname": "FGT"}]
+
+    def test_records_are_yielded_before_body_ends(self):
+        """Records come out while later chunks are still unread"""
+
+        def body():
+            yield b'{"results": [{"name": "a"},'
+            yield b' {"name": "b"}'
+            raise AssertionError("read past the records that were needed")
+
+        stream = iter_json_array(body())
+        assert next(stream) == {"name": "a"}
+
+    def test_truncated_body_raises(self):
+        with pytest.raises(StreamParseError):
+            list(iter_json_array([b'{"results": [{"name": "a"']))
+
+    def test_not_an_object_raises(self):
+        with pytest.raises(StreamParseError):
+            list(iter_json_array([b"[1, 2]"]))
+
+
+# ===============================
+# PROJECTION AND FILTER TESTS
+# ===============================
+
+
+class TestProjectionAndFilters:
+    """Test record projection and FortiOS-style filters"""
+
+    def test_project(self):
+        record = {"name": "a", "subnet": "1.1.1.1 255.255.255.255", "uuid": "x"}
+        assert project(record, ["name", "subnet", "missing"]) == {
+            "name": "a",
+            "subnet": "1.1.1.1 255.255.255.255",
+        }
+        assert project(record, None) is record
+
+    def test_equality_and_contains(self):
+        predicate = compile_filters(["type==ipmask"])
+        assert predicate({"type": "ipmask"})
+        assert not predicate({"type": "fqdn"})
+        assert compile_filters(["name=@WEB"])({"name": "my-web-server"})
+        assert compile_filters(["name!@web"])({"name": "dns"})
+
+    def test_or_within_and_across_expressions(self):
+        predicate = compile_filters(["type==ipmask,type==fqdn", "name=@web"])
+        assert predicate({"type": "fqdn", "name": "web"})
+        assert not predicate({"type": "iprange", "name": "web"})
+        assert not predicate({"type": "fqdn", "name": "dns"})
+
+    def test_numeric_comparison(self):
+        assert compile_filters(["policyid>=10"])({"policyid": 12})
+        assert not compile_filters(["policyid<10"])({"policyid": 12})
+
+    def test_reference_lists_match_member_names(self):
+        record = {"srcaddr": [{"name": "all", "q_origin_key": "all"}]}
+        assert compile_filters(["srcaddr==all"])(record)
+        assert not compile_filters(["srcaddr!=all"])(record)
+
+    def test_invalid_expression(self):
+        with pytest.raises(ValueError):
+            compile_filters(["name"])
+
+
+# ===============================
+# STREAMING CLIENT AND TOOL TESTS
+# ===============================
+
+
+class TestStreamingReads:
+    """Test the streamed GET path of the client and the getters"""
+
+    def _stream_response(self, body: bytes, status: int = 200):
+        response = MagicMock()
+        response.status_code = status
+        response.iter_content.return_value = _chunks(body, 7)
+        response.json.return_value = json.loads(body)
+        response.__enter__.return_value = response
+        return response
+
+    def test_iter_results_streams_records(self):
+        client = FortiOSClient("https://test.com", "token", "root")
+        response = self._stream_response(json.dumps(SAMPLE).encode())
+
+        with patch.object(client.session, "get", return_value=response) as mock_get:
+            meta = {}
+            records = list(client.iter_results("cmdb/firewall/address", meta))
+
+        assert records == SAMPLE["results"]
+        assert meta["http_status"] == 200
+        assert mock_get.call_args[1]["stream"] is True
+
+    def test_iter_results_reports_http_errors(self):
+        client = FortiOSClient("https://test.com", "token", "root")
+        response = self._stream_response(b'{"status": "error", "error": -3}', 404)
+
+        with patch.object(client.session, "get", return_value=response):
+            meta = {}
+            records = list(client.iter_results("cmdb/firewall/address/x", meta))
+
+        assert records == []
+        assert meta["http_status"] == 404
+        assert meta["error"] == -3
+
+    def test_get_addresses_applies_fields_and_filters(self):
+        mock_client = Mock()
+
+        def iter_results(endpoint, meta):
+            meta.update({"http_status": 200, "status": "success"})
+            yield from SAMPLE["results"]
+
+        mock_client.iter_results.side_effect = iter_results
+        with (
+            patch.object(
+                FortiOSTools,
+                "_check_connectivity",
+                return_value={"success": True, "message": "Connectivity verified"},
+            ),
+            patch.object(FortiOSTools, "create_client", return_value=mock_client),
+        ):
+            result = FortiOSTools.get_addresses(
+                "https://test.com",
+                "token",
+                "root",
+                fields=["name"],
+                filters=["type!=ipmask"],
+            )
+
+        assert result["success"] is True
+        assert result["data"] == [{"name": "dns"}, {"name": "café"}]
+
+    def test_read_stops_at_the_memory_cap(self):
+        pulled = []
+
+        def iter_results(endpoint, meta):
+            meta.update({"http_status": 200})
+            for i in range(10000):
+                pulled.append(i)
+                yield {"name": f"host-{i}", "subnet": "10.0.0.1 255.255.255.255"}
+
+        client = Mock()
+        client.iter_results.side_effect = iter_results
+        read = FortiOSTools._read_table(
+            client, "cmdb/firewall/address", ["name"], None, 4096
+        )
+        result = FortiOSTools._table_response(read, "Addresses retrieved", "owner")
+
+        # Only the records that fit were kept, and the stream was abandoned
+        assert len(pulled) < 200
+        assert result["details"]["capped"] is True
+        assert result["message"].startswith(
+            f"Addresses retrieved (first {len(result['data'])} matching records only"
+        )
+
+    def test_invalid_filter_is_validation_error(self):
+        with (
+            patch.object(
+                FortiOSTools,
+                "_check_connectivity",
+                return_value={"success": True, "message": "Connectivity verified"},
+            ),
+            patch.object(FortiOSTools, "create_client", return_value=Mock()),
+        ):
+            result = FortiOSTools.get_addresses(
+                "https://test.com", "token", "root", filters=["bogus"]
+            )
+
+        assert result["success"] is False
+        assert "Validation error" in result["message"]
+
+
+if __name__ == "__main__":
+    pytest.main([__file__, "-v"])
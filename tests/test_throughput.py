@@ -0,0 +1,168 @@
+"""
+Tests for interface throughput from counter deltas.
+"""
+
+from unittest.mock import Mock, patch
+
+from app.devices import DEVICES, Device
+from app.throughput import (
+    COUNTER_SAMPLES,
+    CounterCache,
+    CounterSample,
+    counter_delta,
+    interface_rates,
+    parse_sample,
+)
+from app.tools import FortiOSTools
+
+
+def _interface(name: str, rx_bytes: int, tx_bytes: int = 0, **fields):
+    return {
+        "name": name,
+        "link": True,
+        "speed": 1000,
+        "rx_bytes": rx_bytes,
+        "tx_bytes": tx_bytes,
+        "rx_packets": rx_bytes // 100,
+        "tx_packets": tx_bytes // 100,
+        **fields,
+    }
+
+
+def _response(*interfaces):
+    return {
+        "http_status": 200,
+        "results": {entry["name"]: entry for entry in interfaces},
+    }
+
+
+class TestCounterDelta:
+    """Test counter differences across wraps and resets"""
+
+    def test_increase(self):
+        assert counter_delta(100, 250) == 150
+
+    def test_32_bit_wrap(self):
+        assert counter_delta(2**32 - 10, 5) == 15
+
+    def test_64_bit_wrap(self):
+        assert counter_delta(2**64 - 10, 5) == 15
+
+    def test_reset_is_unknown(self):
+        assert counter_delta(1_000_000_000, 1000) is None
+        assert counter_delta(2**40, 1000) is None
+
+
+class TestInterfaceRates:
+    """Test rates between two samples"""
+
+    def test_rates_busiest_first(self):
+        old = parse_sample(
+            _response(_interface("wan1", 0), _interface("lan", 0))["results"], 10.0
+        )
+        new = parse_sample(
+            [_interface("wan1", 1_000_000), _interface("lan", 2_000_000)], 12.0
+        )
+
+        rates = interface_rates(old, new)
+
+        assert [r["interface"] for r in rates] == ["lan", "wan1"]
+        assert rates[1]["rx_bps"] == 4_000_000
+        assert rates[1]["rx_pps"] == 5000
+        assert rates[1]["tx_bps"] == 0
+        assert rates[1]["utilization"] == 0.004
+
+    def test_new_interface_and_filter(self):
+        old = parse_sample([_interface("wan1", 0)], 0.0)
+        new = parse_sample([_interface("wan1", 800), _interface("vlan10", 50)], 1.0)
+
+        rates = {r["interface"]: r for r in interface_rates(old, new)}
+        assert rates["vlan10"]["rx_bps"] is None
+        assert [r["interface"] for r in interface_rates(old, new, {"wan1"})] == ["wan1"]
+
+    def test_cache_evicts_least_recently_used(self):
+        cache = CounterCache(max_devices=2)
+        sample = CounterSample(0.0, {}, {})
+        cache.put("a", sample)
+        cache.put("b", sample)
+        cache.get("a")
+        cache.put("c", sample)
+        assert cache.get("b") is None
+        assert cache.get("a") is sample
+
+
+class TestGetInterfaceThroughput:
+    """Test the throughput tool"""
+
+    def setup_method(self):
+        COUNTER_SAMPLES.clear()
+
+    @patch("app.throughput.time.sleep")
+    @patch("app.throughput.time.monotonic")
+    @patch("app.tools.FortiOSTools.create_client")
+    def test_one_request_after_first_call(
+        self, mock_create_client, mock_monotonic, mock_sleep
+    ):
+        client = Mock()
+        client.get.side_effect = [
+            _response(_interface("wan1", 0)),
+            _response(_interface("wan1", 1000)),
+            _response(_interface("wan1", 11000)),
+        ]
+        mock_create_client.return_value = client
+        mock_monotonic.side_effect = [100.0, 100.2, 101.0, 111.0, 111.0]
+
+        first = FortiOSTools.get_interface_throughput("https://fgt", "token")
+        second = FortiOSTools.get_interface_throughput("https://fgt", "token")
+
+        # First call: baseline, wait out MIN_RATE_INTERVAL, second sample
+        mock_sleep.assert_called_once()
+        assert first["data"][0]["interval_seconds"] == 1.0
+        assert first["data"][0]["interfaces"][0]["rx_bps"] == 8000
+        # Second call: one request, delta against the cached sample
+        assert client.get.call_count == 3
+        assert second["success"] is True
+        assert second["data"][0]["interval_seconds"] == 10.0
+        assert second["data"][0]["interfaces"][0]["rx_bps"] == 8000
+
+    @patch("app.tools.FortiOSTools.create_client")
+    def test_many_devices(self, mock_create_client):
+        DEVICES.register(Device("site-a", "https://a", "ta", "root"))
+        DEVICES.register(Device("site-b", "https://b", "tb", "root"))
+        clients = {"https://a": Mock(), "https://b": Mock()}
+        clients["https://a"].get.return_value = _response(_interface("wan1", 0))
+        clients["https://b"].get.return_value = {"http_status": 401, "status": "error"}
+        mock_create_client.side_effect = lambda url, *args: clients[url]
+        for device in DEVICES.all():
+            COUNTER_SAMPLES.put(
+                device.owner, parse_sample([_interface("wan1", 0)], 0.0)
+            )
+
+        try:
+            result = FortiOSTools.get_interface_throughput(devices=["site-a", "site-b"])
+        finally:
+            DEVICES.clear()
+
+        assert result["success"] is True
+        assert result["message"] == "Throughput of 1 of 2 devices"
+        by_device = {entry["device"]: entry for entry in result["data"]}
+        assert by_device["site-a"]["interfaces"][0]["rx_bps"] == 0
+        assert by_device["site-b"]["error"]["http_status"] == 401
+
+    @patch("app.tools.FortiOSTools.create_client")
+    def test_upstream_error(self, mock_create_client):
+        client = Mock()
+        client.get.return_value = {"http_status": 403, "status": "error"}
+        mock_create_client.return_value = client
+
+        result = FortiOSTools.get_interface_throughput("https://fgt", "token")
+
+        assert result["success"] is False
+        assert result["message"] == "Failed to read interface counters"
+
+    def test_validation(self):
+        assert FortiOSTools.get_interface_throughput()["message"].startswith(
+            "Validation error"
+        )
+        result = FortiOSTools.get_interface_throughput(devices=["nope"])
+        assert result["message"] == "FortiGates not registered: nope"
@@ -3,8 +3,11 @@ Tests for input validation, path traversal protection, retry logic,
 and health endpoint functionality.
 """
 
+import asyncio
 import json
+import threading
 import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
 from unittest.mock import Mock, patch, MagicMock
 
 import pytest
@@ -29,7 +32,7 @@ from app.tools import (
     VALID_PORTFORWARD_OPTIONS,
     VALID_PROTOCOLS,
 )
-from app.fortios_client import FortiOSClient
+from app.fortios_client import CancelToken, FortiOSClient
 
 
 def _mock_connectivity_ok():
@@ -562,6 +565,239 @@ class TestRetryLogic:
         assert mock_get.call_count == 2
 
 
+# ===============================
+# DEADLINE PROPAGATION TESTS
+# ===============================
+
+
+class TestDeadlinePropagation:
+    """Test that a call deadline bounds retries, backoff and HTTP timeouts"""
+
+    def test_expired_deadline_skips_request(self):
+        """No request is sent once the deadline has passed"""
+        client = FortiOSClient(
+            "https://test.com", "token", "root", deadline=time.monotonic() - 1
+        )
+
+        with patch.object(client.session, "get") as mock_get:
+            result = client.get("cmdb/firewall/policy")
+
+        assert result["deadline_exceeded"] is True
+        assert result["http_status"] == 0
+        mock_get.assert_not_called()
+
+    def test_timeout_shrinks_to_remaining_time(self):
+        """Per-attempt HTTP timeout never exceeds the time left"""
+        client = FortiOSClient(
+            "https://test.com", "token", "root", deadline=time.monotonic() + 2
+        )
+
+        mock_response = Mock()
+        mock_response.status_code = 200
+        mock_response.json.return_value = {}
+
+        with patch.object(client.session, "get", return_value=mock_response) as mock_get:
+            client.get("cmdb/firewall/policy")
+
+        assert mock_get.call_args[1]["timeout"] <= 2
+
+    def test_backoff_past_deadline_stops_retrying(self):
+        """A retry whose backoff would overrun the deadline is not attempted"""
+        client = FortiOSClient(
+            "https://test.com", "token", "root",
+            max_retries=3, retry_backoff=5.0,
+            deadline=time.monotonic() + 1,
+        )
+
+        with patch.object(client.session, "get") as mock_get:
+            mock_get.side_effect = requests.exceptions.ConnectionError("refused")
+            start = time.monotonic()
+            result = client.get("cmdb/firewall/policy")
+
+        assert result["deadline_exceeded"] is True
+        assert mock_get.call_count == 1
+        assert time.monotonic() - start < 1
+
+    def test_tool_returns_deadline_exceeded(self):
+        """Tools surface a clean deadline-exceeded result from the pre-check"""
+        mock_client = Mock()
+        mock_client.get.return_value = {
+            "status": "error",
+            "http_status": 0,
+            "deadline_exceeded": True,
+        }
+        with patch.object(FortiOSTools, "create_client", return_value=mock_client):
+            result = FortiOSTools.get_addresses(
+                "https://test.com", "token", "root", deadline=time.monotonic()
+            )
+
+        assert result["success"] is False
+        assert result["deadline_exceeded"] is True
+        mock_client.get.assert_called_once_with("monitor/system/status")
+
+    def test_slow_body_stops_at_deadline(self):
+        """A body that keeps trickling in is cut off at the deadline"""
+        server = ThreadingHTTPServer(("127.0.0.1", 0), _TrickleHandler)
+        threading.Thread(target=server.serve_forever, daemon=True).start()
+        try:
+            client = FortiOSClient(
+                f"http://127.0.0.1:{server.server_address[1]}",
+                "token",
+                "root",
+                deadline=time.monotonic() + 0.5,
+            )
+            start = time.monotonic()
+            result = client.get("monitor/system/status")
+            elapsed = time.monotonic() - start
+        finally:
+            server.shutdown()
+            server.server_close()
+
+        assert result["deadline_exceeded"] is True
+        assert elapsed < 1.5
+
+
+class _TrickleHandler(BaseHTTPRequestHandler):
+    """HTTP handler that sends its body a few bytes at a time for 3 seconds"""
+
+    def do_GET(self):
+        self.send_response(200)
+        self.send_header("Content-Length", "30")
+        self.end_headers()
+        for _ in range(30):
+            self.wfile.write(b" ")
+            self.wfile.flush()
+            time.sleep(0.1)
+
+    def log_message(self, format, *args):
+        pass
+
+
+# ===============================
+# CANCELLATION TESTS
+# ===============================
+
+
+class _SlowHandler(BaseHTTPRequestHandler):
+    """HTTP handler that stalls long enough for a request to be cancelled"""
+
+    def do_GET(self):
+        time.sleep(3)
+        self.send_response(200)
+        self.end_headers()
+        self.wfile.write(b"{}")
+
+    def log_message(self, format, *args):
+        pass
+
+
+class TestCancellation:
+    """Test that cancelling a tool call aborts requests and retry loops"""
+
+    def test_cancel_interrupts_backoff(self):
+        """Cancelling during a retry backoff returns immediately"""
+        token = CancelToken()
+        client = FortiOSClient(
+            "https://test.com", "token", "root",
+            max_retries=3, retry_backoff=5.0, cancel_token=token,
+        )
+
+        with patch.object(client.session, "get") as mock_get:
+            mock_get.side_effect = requests.exceptions.ConnectionError("refused")
+            threading.Timer(0.1, token.cancel).start()
+            start = time.monotonic()
+            result = client.get("cmdb/firewall/policy")
+
+        assert result["cancelled"] is True
+        assert mock_get.call_count == 1
+        assert time.monotonic() - start < 2
+
+    def test_cancel_aborts_in_flight_request(self):
+        """Cancelling shuts down the socket of a request awaiting a response"""
+        server = ThreadingHTTPServer(("127.0.0.1", 0), _SlowHandler)
+        threading.Thread(target=server.serve_forever, daemon=True).start()
+        try:
+            token = CancelToken()
+            client = FortiOSClient(
+                f"http://127.0.0.1:{server.server_address[1]}", "token", "root",
+                cancel_token=token,
+            )
+            threading.Timer(0.2, token.cancel).start()
+            start = time.monotonic()
+            result = client.get("monitor/system/status")
+            elapsed = time.monotonic() - start
+        finally:
+            server.shutdown()
+            server.server_close()
+
+        assert result["cancelled"] is True
+        assert elapsed < 2
+
+    def test_cancelled_token_skips_request(self):
+        """No request is sent for an already-cancelled call"""
+        token = CancelToken()
+        token.cancel()
+        client = FortiOSClient("https://test.com", "token", "root", cancel_token=token)
+
+        with patch.object(client.session, "get") as mock_get:
+            result = client.get("cmdb/firewall/policy")
+
+        assert result["cancelled"] is True
+        mock_get.assert_not_called()
+
+    def test_cancelled_table_read_returns_cancelled(self):
+        """A getter whose streamed read was cancelled says so like other tools"""
+        mock_client = Mock()
+
+        def iter_results(endpoint, meta):
+            meta.update({"status": "error", "http_status": 0, "cancelled": True})
+            yield from ()
+
+        mock_client.iter_results.side_effect = iter_results
+        with patch.object(
+            FortiOSTools, "_check_connectivity", return_value={"success": True}
+        ), patch.object(FortiOSTools, "create_client", return_value=mock_client):
+            result = FortiOSTools.get_addresses("https://test.com", "token", "root")
+
+        assert result["success"] is False
+        assert result["cancelled"] is True
+        assert result["message"] == "Request cancelled by the client"
+
+    def test_cancelled_write_returns_cancelled(self):
+        """A create cancelled mid-request reports the cancellation"""
+        mock_client = Mock()
+        mock_client.get.return_value = {"http_status": 404}
+        mock_client.post.return_value = {
+            "status": "error", "http_status": 0, "cancelled": True,
+        }
+        with patch.object(
+            FortiOSTools, "_check_connectivity", return_value={"success": True}
+        ), patch.object(FortiOSTools, "create_client", return_value=mock_client):
+            result = FortiOSTools.create_address(
+                "https://test.com", "token", "root", "net", subnet="10.0.0.0/24"
+            )
+
+        assert result["success"] is False
+        assert result["cancelled"] is True
+
+    @pytest.mark.asyncio
+    async def test_run_tool_cancels_token(self):
+        """Cancelling the MCP handler cancels the worker's token"""
+        from app.server import _run_tool
+
+        tokens = []
+
+        def blocking_tool(cancel_token):
+            tokens.append(cancel_token)
+            cancel_token.wait(5)
+            return {"success": True}
+
+        with pytest.raises(asyncio.TimeoutError):
+            await asyncio.wait_for(_run_tool(blocking_tool), timeout=0.2)
+
+        assert tokens[0].cancelled is True
+
+
 # ===============================
 # URL CONSTRUCTION TESTS
 # ===============================